@@ -4,7 +4,13 @@ import json
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
+from doc_agent.core.admission_controller import (
+    AdmissionController,
+    QueueFullError,
+)
+from doc_agent.core.config import settings
 from doc_agent.core.document_generator import generate_document_sync
 from doc_agent.core.logger import logger
 
@@ -20,6 +26,7 @@ from doc_agent.schemas import (
     DocumentGenerationRequest,
     EditActionRequest,
     OutlineGenerationRequest,
+    QueuePositionResponse,
     TaskCreationResponse,  # 导入统一的响应模型
 )
 
@@ -29,9 +36,8 @@ from doc_agent.tools.ai_editing_tool import AIEditingTool
 # 导入Celery任务
 from workers import tasks
 
-# 并发控制
-MAX_CONCURRENT_TASKS = 3  # 最大并发任务数
-task_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+# 并发控制：大纲、文档、编辑任务分通道排队，按权重分配名额，排队已满时返回 429
+admission_controller = AdmissionController(settings.admission_config)
 
 # 创建API路由器实例
 # router = APIRouter()
@@ -43,6 +49,13 @@ def get_ai_editing_tool():
     return Container().ai_editing_tool
 
 
+def _queue_full(error: QueueFullError) -> HTTPException:
+    """排队已满时返回 429，并通过 Retry-After 告知客户端何时重试"""
+    return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                         detail=str(error),
+                         headers={"Retry-After": str(error.retry_after)})
+
+
 # =================================================================
 #  核心接口改造 (使用 FastAPI BackgroundTasks, 不再依赖 Celery)
 # =================================================================
@@ -61,10 +74,10 @@ async def generate_outline_endpoint(request: OutlineGenerationRequest,
     logger.info(f"收到大纲生成请求，正在添加到后台任务。SessionId: {request.session_id}")
     task_id = generate_task_id()
 
-    # 使用信号量控制并发，避免资源竞争
-    async def run_with_semaphore():
-        async with task_semaphore:
-            await generate_outline_async(
+    # 进入大纲通道排队，获得名额后在后台执行
+    try:
+        admission_controller.submit(
+            "outline", str(task_id), lambda: generate_outline_async(
                 task_id=str(task_id),
                 session_id=request.session_id,
                 task_prompt=request.task_prompt,
@@ -72,9 +85,9 @@ async def generate_outline_endpoint(request: OutlineGenerationRequest,
                 context_files=request.context_files,
                 style_guide_content=request.style_guide_content,
                 requirements=request.requirements,
-            )
-
-    asyncio.create_task(run_with_semaphore())
+            ))
+    except QueueFullError as e:
+        raise _queue_full(e) from e
 
     logger.success(f"大纲生成任务 {task_id} 已提交到后台。")
     return TaskCreationResponse(
@@ -101,17 +114,18 @@ async def generate_document_endpoint(request: DocumentGenerationRequest,
     context_files = request.context_files
     is_online = request.is_online
 
-    # 使用信号量控制并发，避免资源竞争
-    async def run_with_semaphore():
-        async with task_semaphore:
-            await generate_document_sync(task_id=str(task_id),
-                                         task_prompt=task_prompt,
-                                         session_id=session_id,
-                                         outline_file_token=outline_json_file,
-                                         context_files=context_files,
-                                         is_online=is_online)
-
-    asyncio.create_task(run_with_semaphore())
+    # 进入文档通道排队，获得名额后在后台执行
+    try:
+        admission_controller.submit(
+            "document", str(task_id), lambda: generate_document_sync(
+                task_id=str(task_id),
+                task_prompt=task_prompt,
+                session_id=session_id,
+                outline_file_token=outline_json_file,
+                context_files=context_files,
+                is_online=is_online))
+    except QueueFullError as e:
+        raise _queue_full(e) from e
 
     logger.success(f"文档生成任务 {task_id} 已提交到后台。")
     return TaskCreationResponse(
@@ -551,6 +565,32 @@ def generate_mock_web_sources(chapter_title: str, chapter_index: int) -> list:
 # --- 其他端点保持不变 ---
 
 
+@router.get("/jobs/{task_id}/queue",
+            response_model=QueuePositionResponse,
+            response_model_by_alias=True,
+            summary="查询任务的排队位置和预计开始时间")
+async def get_queue_position(task_id: str):
+    """
+    返回任务在所属通道中的排队位置和预计开始时间。
+    任务已结束或不存在时返回 404。
+    """
+    position = admission_controller.position(task_id)
+    if position is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"任务 {task_id} 不在队列中")
+    return QueuePositionResponse(task_id=position["ticket_id"],
+                                 lane=position["lane"],
+                                 status=position["status"],
+                                 position=position["position"],
+                                 eta_seconds=position["eta_seconds"])
+
+
+@router.get("/jobs/admission", summary="查看任务准入控制状态")
+async def get_admission_status():
+    """各通道的并发上限、执行和排队数量，以及观测到的 LLM 端点时延"""
+    return admission_controller.snapshot()
+
+
 @router.get("/health")
 async def health_check():
     logger.info("健康检查端点被调用")
@@ -574,6 +614,13 @@ async def edit_text(request: EditActionRequest,
     """
     logger.info(f"收到文本编辑请求，操作类型: {request.action}")
 
+    # 编辑是交互式任务，在请求内排队等待名额，名额在流式响应结束时释放
+    try:
+        ticket = await admission_controller.acquire("edit",
+                                                    str(generate_task_id()))
+    except QueueFullError as e:
+        raise _queue_full(e) from e
+
     async def event_generator():
         """SSE 事件生成器"""
         try:
@@ -606,9 +653,17 @@ async def edit_text(request: EditActionRequest,
             yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
             logger.error(f"文本编辑失败: {e}")
 
-    # 返回流式响应
+    async def guarded_event_generator():
+        try:
+            async for event in event_generator():
+                yield event
+        finally:
+            admission_controller.release(ticket)
+
+    # 返回流式响应（生成器未被迭代时由后台任务兜底释放名额）
     return StreamingResponse(
-        event_generator(),
+        guarded_event_generator(),
+        background=BackgroundTask(admission_controller.release, ticket),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+引用标记处理基准测试
+对比多次 re.findall / re.sub / str.replace 的旧实现与单次扫描的引用引擎
+在约1万字符的合成章节上的耗时
+
+用法:
+    python examples/benchmark_citations.py
+    python examples/benchmark_citations.py --chars 20000 --rounds 500
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from doc_agent.core.logger import logger
+from doc_agent.graph.common import process_citations, rewrite_citations
+
+logger.remove()
+
+
+def build_chapter(chars: int, seed: int = 42) -> str:
+    """生成包含各种引用格式的合成章节"""
+    rng = random.Random(seed)
+    words = ["水电站", "施工", "混凝土", "质量", "安全", "监测", "大坝", "结构",
+             "设计", "运行", "维护", "数据", "模型", "系统"]
+    markers = [
+        lambda: f"[{rng.randint(1, 30)}]",
+        lambda: f"<[{rng.randint(1, 30)}]>",
+        lambda: f"<[{rng.randint(1, 30)}], [{rng.randint(1, 30)}]>",
+        lambda: f"<信息源 {rng.randint(1, 30)}>",
+        lambda: f"**<信息源 {rng.randint(1, 30)}>**",
+        lambda: f"<sources>[{rng.randint(1, 30)}, {rng.randint(1, 30)}]</sources>",
+        lambda: "<sources>[]</sources>",
+    ]
+    parts = ["## 章节标题\n\n"]
+    length = 0
+    while length < chars:
+        sentence = "".join(rng.choices(words, k=rng.randint(8, 20)))
+        if rng.random() < 0.6:
+            sentence += rng.choice(markers)()
+        sentence += "。" if rng.random() < 0.9 else "。\n\n### 小节\n\n"
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)
+
+
+def legacy_writer_postprocess(text: str) -> tuple[str, set[int]]:
+    """旧实现：5 次 findall 识别引用 + 4 次 sub 标准化格式"""
+    cited = set()
+    for pattern in (r'<\[(\d+)\]>', r'\*\*<信息源\s*(\d+)>\*\*', r'\[(\d+)\]',
+                    r'<信息源\s*(\d+)>'):
+        cited.update(int(source_id) for source_id in re.findall(pattern, text))
+    for match in re.findall(r'<\[(\d+)\],\s*\[(\d+)\]>', text):
+        cited.update(int(source_id) for source_id in match)
+
+    text = re.sub(r'\*\*<信息源\s*(\d+)>\*\*', r'[\1]', text)
+    text = re.sub(r'<信息源\s*(\d+)>', r'[\1]', text)
+    text = re.sub(r'<\[(\d+)\],\s*\[(\d+)\]>', r'[\1][\2]', text)
+    text = re.sub(r'<\[(\d+)\]>', r'[\1]', text)
+    return text, cited
+
+
+def legacy_process_citations(text: str, sources: list) -> str:
+    """旧实现：每个 <sources> 标签一次 str.replace(..., 1)（保留原有日志调用）"""
+    source_map = {source.id: source for source in sources}
+    global_cited = {}
+    matches = re.findall(r'<sources>\[([^\]]*)\]</sources>', text)
+    logger.debug(f"🔍 找到 {len(matches)} 个引用标记")
+    for match in matches:
+        if not match.strip():
+            text = text.replace(f'<sources>[{match}]</sources>', '', 1)
+            logger.debug("  📝 处理空引用标记（综合分析）")
+            continue
+        source_ids = [int(i.strip()) for i in match.split(',')
+                      if i.strip().isdigit()]
+        logger.debug(f"  📚 解析到源ID: {source_ids}")
+        markers = []
+        for source_id in source_ids:
+            if source_id in source_map:
+                global_cited.setdefault(source_id, source_map[source_id])
+                number = list(global_cited).index(source_id) + 1
+                markers.append(f"[{number}]")
+                logger.debug(
+                    f"    ✅ 添加引用源: [{number}] {source_map[source_id].title}")
+        text = text.replace(f'<sources>[{match}]</sources>', "".join(markers),
+                            1)
+    return text
+
+
+def timeit(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="引用标记处理基准测试")
+    parser.add_argument("--chars", type=int, default=10000, help="章节字符数")
+    parser.add_argument("--rounds", type=int, default=200, help="重复轮数")
+    args = parser.parse_args()
+
+    chapter = build_chapter(args.chars)
+    sources = [
+        SimpleNamespace(id=i, title=f"信源{i}") for i in range(1, 31)
+    ]
+
+    # 结果一致性检查
+    assert legacy_writer_postprocess(chapter)[0] == rewrite_citations(
+        chapter)[0]
+    assert legacy_process_citations(chapter, sources) == process_citations(
+        chapter, sources)[0]
+
+    print(f"章节: {len(chapter)} 字符, {args.rounds} 轮\n")
+    print(f"{'场景':<24}{'旧实现(ms)':>12}{'引擎(ms)':>12}{'加速比':>8}")
+    for label, legacy, engine in (
+        ("写作后处理", lambda: legacy_writer_postprocess(chapter),
+         lambda: rewrite_citations(chapter)),
+        ("<sources> 标签处理", lambda: legacy_process_citations(chapter, sources),
+         lambda: process_citations(chapter, sources)),
+    ):
+        legacy_ms = timeit(legacy, args.rounds)
+        engine_ms = timeit(engine, args.rounds)
+        print(f"{label:<24}{legacy_ms:>12.3f}{engine_ms:>12.3f}"
+              f"{legacy_ms / engine_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+HTML正文提取基准测试
+对比 BeautifulSoup 基线与 lxml 提取引擎在已保存网页语料上的吞吐量
+
+用法:
+    python examples/benchmark_html_extraction.py --corpus /path/to/saved_pages
+    python examples/benchmark_html_extraction.py            # 使用合成语料
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from doc_agent.utils.html_extractor import get_html_extractor
+
+
+def load_corpus(corpus_dir: str) -> list[bytes]:
+    """读取目录下所有已保存的 .html/.htm 页面"""
+    paths = sorted(
+        p for p in Path(corpus_dir).rglob("*")
+        if p.suffix.lower() in (".html", ".htm"))
+    return [p.read_bytes() for p in paths]
+
+
+def build_synthetic_corpus(pages: int = 50, seed: int = 42) -> list[bytes]:
+    """生成带导航、侧栏、脚本和长正文的合成页面"""
+    rng = random.Random(seed)
+    words = ["水电站", "施工", "混凝土", "质量", "安全", "监测", "大坝", "结构",
+             "设计", "运行", "维护", "analysis", "model", "data", "system"]
+    corpus = []
+    for i in range(pages):
+        paragraphs = "".join(
+            "<p>" + "，".join(
+                " ".join(rng.choices(words, k=12)) for _ in range(6)) + "。</p>"
+            for _ in range(rng.randint(40, 200)))
+        nav = "".join(f'<li><a href="/p{j}">栏目{j}</a></li>'
+                      for j in range(60))
+        script = "var data = " + "[" + ",".join(
+            str(rng.random()) for _ in range(2000)) + "];"
+        page = (f"<html><head><title>页面{i}</title><style>body{{margin:0}}"
+                f"</style><script>{script}</script></head><body>"
+                f"<nav><ul>{nav}</ul></nav>"
+                f'<div class="sidebar"><ul>{nav}</ul></div>'
+                f'<div id="content"><article><h1>标题{i}</h1>{paragraphs}'
+                f"</article></div><footer>Copyright {i}</footer>"
+                f"</body></html>")
+        corpus.append(page.encode("utf-8"))
+    return corpus
+
+
+def run_engine(name: str, corpus: list[bytes], main_content: bool,
+               rounds: int) -> tuple[float, int]:
+    """返回 (总耗时秒, 输出字符数)"""
+    extractor = get_html_extractor(name)
+    output_chars = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page in corpus:
+            output_chars += len(
+                extractor.extract(page, main_content=main_content))
+    return time.perf_counter() - start, output_chars // rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML正文提取基准测试")
+    parser.add_argument("--corpus", help="已保存网页目录（.html/.htm）")
+    parser.add_argument("--rounds", type=int, default=3, help="重复轮数")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_synthetic_corpus()
+    if not corpus:
+        print(f"语料目录中没有HTML页面: {args.corpus}")
+        return
+
+    total_mb = sum(len(page) for page in corpus) / 1024 / 1024
+    print(f"语料: {len(corpus)} 个页面, {total_mb:.2f} MB, {args.rounds} 轮\n")
+    print(f"{'引擎':<22}{'页面/秒':>10}{'MB/秒':>10}{'输出字符':>12}{'加速比':>8}")
+
+    baseline = None
+    for name, main_content in (("bs4", False), ("lxml", False),
+                               ("lxml", True)):
+        elapsed, chars = run_engine(name, corpus, main_content, args.rounds)
+        if baseline is None:
+            baseline = elapsed
+        label = f"{name}{' +main_content' if main_content else ''}"
+        pages_per_sec = len(corpus) * args.rounds / elapsed
+        mb_per_sec = total_mb * args.rounds / elapsed
+        print(f"{label:<22}{pages_per_sec:>10.1f}{mb_per_sec:>10.2f}"
+              f"{chars:>12}{baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+提示词共享前缀测量工具
+用合成作业（长样式指南 + 多章节）生成每章的 writer 提示词，统计同一作业内
+各章节提示词的公共前缀长度，对比调整前（章节变量在前、按章节随机采样样式指南）
+与稳定前缀布局可被推理服务前缀缓存复用的预填充比例
+
+用法:
+    python examples/measure_prompt_prefix.py
+    python examples/measure_prompt_prefix.py --chapters 12 --style-chars 20000
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from doc_agent.core.logger import logger
+from doc_agent.graph.chapter_workflow.nodes import writer
+from doc_agent.graph.common import PromptPrefixTracker
+from doc_agent.prompts.writer import PROMPTS
+
+logger.remove()
+
+# 调整前的 V4_FAST 模板：章节信息位于主题之后、写作规则之前
+LEGACY_V4_FAST = """
+**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写简洁的章节内容，并严格按照引用规范进行写作。
+
+**文档主题:** {topic}
+
+**当前章节信息:**
+- 章节标题: {chapter_title}
+- 章节描述: {chapter_description}
+- 章节序号: 第{chapter_number}章（共{total_chapters}章）
+- 章节字数：{chapter_word_count}
+- 子章节编排：{sub_sections_info}
+
+**已完成的章节内容（用于保持连贯性）:**
+{previous_chapters_context}
+
+**本章可用信息源列表**
+{available_sources_text}
+
+**重要引用规则:**
+在撰写每个段落或关键陈述时，你必须严格遵循以下规则：
+
+1. **引用格式:** 在段落中适当位置使用后面的引用格式，如 `<[1]>`、`<[2]>` 等，对应本章可用信息源列表中的源ID。
+
+2. **专业论文引用原则:**
+   - **引用密度控制:** 每个段落最多引用2-3个信息源，避免过度引用
+   - **引用时机:** 只在以下情况引用：
+     * 引用具体数据、统计数字或研究结果
+     * 引用权威观点或专家意见
+     * 引用技术规范或标准
+     * 引用历史事件或重要案例
+   - **避免过度引用:** 不要为常识性内容或自己的分析总结添加引用
+   - **引用质量:** 优先引用权威、可靠的信息源，避免重复引用相同内容
+   - **段落结构:** 每个段落应该有明确的主题，引用应该支持而不是主导内容
+
+**写作任务:**
+基于提供的研究数据，为当前章节撰写简洁内容。请遵循以下要求：
+
+1. **保持连贯性:** 确保当前章节与已完成的章节内容自然衔接。
+
+2. **章节结构:**
+   - 以二级标题（##）开始，使用章节标题，注意加入章节序号，格式为（1. 2. 3.）
+   - 包含简短的引言，说明本章节的主要内容
+   - 使用三级标题（###）组织节，注意加入节号，格式为（1.1 1.2 1.3）
+
+3. **内容要求:**
+   - 综合分析研究数据，突出重点
+   - 保持客观，基于事实
+   - 使用简洁明了的表达
+   - 适当引用已完成章节的内容以保持连贯性
+
+4. **格式要求:**
+   - 使用Markdown格式
+   - 根据需要适当使用列表、公式、表格、引用等格式元素
+   - 重要观点使用粗体强调
+
+5. **篇幅控制:**
+   - 字数必须严格控制在{chapter_word_count}字，不要超过
+   - 章节内容应该简洁但完整
+   - 重点突出，避免冗余
+
+6. **其他要求**
+   - 写作要求：{prompt_requirements}
+   - 行文风格参考：{style_requirements}
+
+**输出格式示例:**
+
+## 水电站技术发展概述
+
+水电站技术发展经历了多个重要阶段。根据最新研究，现代水电站技术已经从传统的机械控制系统发展到智能化的数字控制系统 <[1]> <[3]>。这一技术演进不仅提高了发电效率，还显著增强了系统的安全性和可靠性。
+
+综合分析表明，水电站技术的未来发展将更加注重环保和可持续性。通过整合可再生能源技术和智能电网系统，水电站将在未来的能源结构中发挥更加重要的作用。
+
+在具体的技术实现方面，现代水电站采用了先进的计算机监控系统，能够实时监测设备运行状态，及时发现和处理潜在问题 <[2]>。根据行业标准，这些系统的可靠性已达到99.5%以上 <[3]>。
+
+
+
+请严格按照上述格式要求撰写当前章节的内容。
+"""
+
+
+def build_job(chapters: int, style_chars: int, seed: int = 42) -> dict:
+    """生成合成作业：章节列表、用户要求、样式指南和每章信息源"""
+    rng = random.Random(seed)
+    words = ["水电站", "施工", "混凝土", "质量", "安全", "监测", "大坝", "结构",
+             "设计", "运行", "维护", "数据", "模型", "系统"]
+
+    def text(chars: int) -> str:
+        return "".join(rng.choices(words, k=max(1, chars // 3)))
+
+    def documents(total_chars: int, size: int = 500) -> list:
+        return [
+            SimpleNamespace(content=text(size))
+            for _ in range(max(1, total_chars // size))
+        ]
+
+    chapter_list = [{
+        "chapter_title": f"第{i + 1}章 {text(12)}",
+        "description": text(60),
+        "chapter_word_count": 2000,
+        "sub_sections": []
+    } for i in range(chapters)]
+    return {
+        "topic": "水电站大坝施工质量与安全监测",
+        "chapters": chapter_list,
+        "requirements": documents(3000),
+        "style_guide": documents(style_chars),
+        "sources_text": [text(6000) for _ in range(chapters)],
+        "previous_context": [text(300 * min(i, 5)) for i in range(chapters)],
+    }
+
+
+def legacy_sample(sources: list, max_length: int, rng: random.Random) -> str:
+    """调整前的采样：按章节剩余长度计算预算并随机抽取"""
+    whole_content = "".join(source.content for source in sources)
+    if len(whole_content) <= max_length:
+        return whole_content
+    sample_count = max(1, int(max_length / len(whole_content) * len(sources)))
+    indices = sorted(rng.sample(range(len(sources)), sample_count))
+    return "... ".join(sources[i].content for i in indices)
+
+
+def legacy_prompts(job: dict, max_length: int = 30000) -> list[str]:
+    rng = random.Random(0)
+    prompts = []
+    for index, chapter in enumerate(job["chapters"]):
+        used_length = (len(job["topic"]) + len(chapter["description"]) +
+                       len(job["previous_context"][index]) + 200)
+        remaining_length = max_length - used_length
+        prompts.append(
+            LEGACY_V4_FAST.format(
+                topic=job["topic"],
+                chapter_title=chapter["chapter_title"],
+                chapter_description=chapter["description"],
+                chapter_number=index + 1,
+                total_chapters=len(job["chapters"]),
+                chapter_word_count=chapter["chapter_word_count"],
+                sub_sections_info="",
+                previous_chapters_context=job["previous_context"][index],
+                available_sources_text=job["sources_text"][index],
+                prompt_requirements=legacy_sample(job["requirements"],
+                                                  int(remaining_length * 0.25),
+                                                  rng),
+                style_requirements=legacy_sample(job["style_guide"],
+                                                 int(remaining_length * 0.15),
+                                                 rng)))
+    return prompts
+
+
+def stable_prefix_prompts(job: dict) -> list[str]:
+    shared_sections = writer._build_shared_sections(job["topic"],
+                                                    job["chapters"],
+                                                    job["requirements"],
+                                                    job["style_guide"], "")
+    prompts = []
+    for index, chapter in enumerate(job["chapters"]):
+        prompts.append(PROMPTS["v4_fast"].format(
+            topic=job["topic"],
+            chapter_title=chapter["chapter_title"],
+            chapter_description=chapter["description"],
+            chapter_number=index + 1,
+            total_chapters=len(job["chapters"]),
+            chapter_word_count=chapter["chapter_word_count"],
+            sub_sections_info="",
+            previous_chapters_context=job["previous_context"][index],
+            available_sources_text=job["sources_text"][index],
+            **shared_sections))
+    return prompts
+
+
+def measure(prompts: list[str]) -> dict:
+    tracker = PromptPrefixTracker()
+    for prompt in prompts:
+        tracker.record("writer", prompt)
+    return tracker.report()["writer"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提示词共享前缀测量")
+    parser.add_argument("--chapters", type=int, default=8, help="章节数")
+    parser.add_argument("--style-chars",
+                        type=int,
+                        default=12000,
+                        help="样式指南字符数")
+    args = parser.parse_args()
+
+    job = build_job(args.chapters, args.style_chars)
+    print(f"作业: {args.chapters} 章, 样式指南 {args.style_chars} 字符\n")
+    print(f"{'布局':<16}{'平均长度':>10}{'共享前缀':>10}{'可复用比例':>12}")
+    for label, prompts in (("调整前", legacy_prompts(job)),
+                           ("稳定前缀", stable_prefix_prompts(job))):
+        stats = measure(prompts)
+        print(f"{label:<16}{stats['avg_prompt_chars']:>10}"
+              f"{stats['shared_prefix_chars']:>10}"
+              f"{stats['reusable_ratio']:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
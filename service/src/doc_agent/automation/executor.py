@@ -6,6 +6,9 @@
 - 任务队列管理
 - 结果归档和检索
 - 执行报告生成
+
+批量作业保存在 SQLite 存储中，每次变更只写入该作业；
+内存中只保留未结束的作业，历史作业按需从存储查询
 """
 
 import asyncio
@@ -18,6 +21,9 @@ from enum import Enum
 from pathlib import Path
 from typing import Optional
 
+from .scheduler import TaskPriority, TaskStatus
+from .storage import RecordStore
+
 
 class ExecutionStatus(Enum):
     """执行状态枚举"""
@@ -28,6 +34,10 @@ class ExecutionStatus(Enum):
     CANCELLED = "cancelled"
 
 
+# 未结束的作业状态
+_ACTIVE_STATUSES = (ExecutionStatus.PENDING, ExecutionStatus.RUNNING)
+
+
 @dataclass
 class BatchJob:
     """批量作业数据类"""
@@ -113,7 +123,7 @@ class AutomationExecutor:
         Args:
             scheduler: 调度器实例
             storage_path: 结果存储路径
-            max_concurrent_tasks: 最大并发任务数
+            max_concurrent_tasks: 最大并发任务数（由调度器的工作协程池执行）
         """
         self.scheduler = scheduler
         self.storage_path = Path(storage_path) if storage_path else Path(
@@ -121,7 +131,13 @@ class AutomationExecutor:
         self.storage_path.mkdir(parents=True, exist_ok=True)
 
         self.max_concurrent_tasks = max_concurrent_tasks
+        # 未结束的批量作业；已结束的作业只保存在存储中
         self.batch_jobs: dict[str, BatchJob] = {}
+        self._store = RecordStore(self.storage_path / "automation.db",
+                                  "batch_jobs",
+                                  indexes=("status", "created_at",
+                                           "total_tasks", "completed_tasks",
+                                           "failed_tasks"))
         self.running = False
         self.logger = logging.getLogger(__name__)
 
@@ -129,28 +145,25 @@ class AutomationExecutor:
         self._load_batch_jobs()
 
     def _load_batch_jobs(self):
-        """从存储加载批量作业"""
-        jobs_file = self.storage_path / "batch_jobs.json"
-        if jobs_file.exists():
-            try:
-                with open(jobs_file, 'r', encoding='utf-8') as f:
-                    jobs_data = json.load(f)
-                    for job_data in jobs_data:
-                        job = BatchJob.from_dict(job_data)
-                        self.batch_jobs[job.id] = job
-                self.logger.info(f"加载了 {len(self.batch_jobs)} 个批量作业")
-            except Exception as e:
-                self.logger.error(f"加载批量作业失败: {e}")
-
-    def _save_batch_jobs(self):
-        """保存批量作业到存储"""
-        jobs_file = self.storage_path / "batch_jobs.json"
+        """从存储加载未结束的批量作业"""
+        self._store.migrate_json(self.storage_path / "batch_jobs.json")
         try:
-            jobs_data = [job.to_dict() for job in self.batch_jobs.values()]
-            with open(jobs_file, 'w', encoding='utf-8') as f:
-                json.dump(jobs_data, f, ensure_ascii=False, indent=2)
+            for job_data in self._store.query(
+                    {"status": [status.value for status in _ACTIVE_STATUSES]}):
+                job = BatchJob.from_dict(job_data)
+                self.batch_jobs[job.id] = job
+            self.logger.info(f"加载了 {len(self.batch_jobs)} 个未完成批量作业")
+        except Exception as e:
+            self.logger.error(f"加载批量作业失败: {e}")
+
+    def _save_batch_job(self, job: BatchJob):
+        """保存单个批量作业到存储，已结束的作业从内存中移除"""
+        try:
+            self._store.put(job.to_dict())
         except Exception as e:
             self.logger.error(f"保存批量作业失败: {e}")
+        if job.status not in _ACTIVE_STATUSES:
+            self.batch_jobs.pop(job.id, None)
 
     def create_batch_job(self,
                          name: str,
@@ -174,7 +187,7 @@ class AutomationExecutor:
                        metadata=metadata or {})
 
         self.batch_jobs[job.id] = job
-        self._save_batch_jobs()
+        self._save_batch_job(job)
 
         self.logger.info(
             f"创建批量作业: {job.name} (ID: {job.id}), 任务数: {job.total_tasks}")
@@ -182,20 +195,32 @@ class AutomationExecutor:
 
     def get_batch_job(self, job_id: str) -> Optional[BatchJob]:
         """获取批量作业"""
-        return self.batch_jobs.get(job_id)
+        job = self.batch_jobs.get(job_id)
+        if job is None:
+            job_data = self._store.get(job_id)
+            job = BatchJob.from_dict(job_data) if job_data else None
+        return job
 
     def get_batch_jobs(self,
-                       status: Optional[ExecutionStatus] = None
-                       ) -> list[BatchJob]:
-        """获取批量作业列表"""
-        jobs = list(self.batch_jobs.values())
-
-        if status:
-            jobs = [j for j in jobs if j.status == status]
-
-        # 按创建时间倒序排列
-        jobs.sort(key=lambda j: j.created_at, reverse=True)
-        return jobs
+                       status: Optional[ExecutionStatus] = None,
+                       limit: Optional[int] = None) -> list[BatchJob]:
+        """获取批量作业列表（按创建时间倒序，使用存储索引过滤）"""
+        filters = {"status": status.value} if status else {}
+        jobs_data = self._store.query(filters,
+                                      order_by=("-created_at", ),
+                                      limit=limit)
+        # 未结束的作业返回内存中的对象
+        return [
+            self.batch_jobs.get(job_data["id"]) or BatchJob.from_dict(job_data)
+            for job_data in jobs_data
+        ]
+
+    def import_batch_jobs(self, jobs: list[BatchJob]):
+        """批量导入作业"""
+        self._store.put_many([job.to_dict() for job in jobs])
+        for job in jobs:
+            if job.status in _ACTIVE_STATUSES:
+                self.batch_jobs[job.id] = job
 
     def cancel_batch_job(self, job_id: str) -> bool:
         """取消批量作业"""
@@ -204,20 +229,20 @@ class AutomationExecutor:
                 ExecutionStatus.PENDING, ExecutionStatus.RUNNING
         ]:
             job.status = ExecutionStatus.CANCELLED
-            self._save_batch_jobs()
+            self._save_batch_job(job)
             self.logger.info(f"取消批量作业: {job.name} (ID: {job_id})")
             return True
         return False
 
     def delete_batch_job(self, job_id: str) -> bool:
         """删除批量作业"""
-        if job_id in self.batch_jobs:
-            job = self.batch_jobs[job_id]
-            del self.batch_jobs[job_id]
-            self._save_batch_jobs()
-            self.logger.info(f"删除批量作业: {job.name} (ID: {job_id})")
-            return True
-        return False
+        job = self.get_batch_job(job_id)
+        if job is None:
+            return False
+        self.batch_jobs.pop(job_id, None)
+        self._store.delete(job_id)
+        self.logger.info(f"删除批量作业: {job.name} (ID: {job_id})")
+        return True
 
     async def execute_batch_job(self, job_id: str):
         """执行批量作业"""
@@ -230,21 +255,17 @@ class AutomationExecutor:
 
         job.status = ExecutionStatus.RUNNING
         job.started_at = datetime.now()
-        self._save_batch_jobs()
+        self._save_batch_job(job)
 
         self.logger.info(f"开始执行批量作业: {job.name} (ID: {job_id})")
 
         try:
-            # 创建信号量控制并发数
-            semaphore = asyncio.Semaphore(self.max_concurrent_tasks)
-
-            # 创建所有任务
+            # 所有子任务一次性提交到调度器的优先级队列，并发度由调度器的工作协程池控制
             tasks = []
             for i, topic in enumerate(job.topics):
                 task_name = f"{job.name}_task_{i+1}"
                 task = asyncio.create_task(
-                    self._execute_single_task(semaphore, job, topic,
-                                              task_name))
+                    self._execute_single_task(job, topic, task_name))
                 tasks.append(task)
 
             # 等待所有任务完成
@@ -261,69 +282,58 @@ class AutomationExecutor:
             self.logger.error(f"批量作业失败: {job.name} (ID: {job_id}), 错误: {e}")
 
         finally:
-            self._save_batch_jobs()
+            self._save_batch_job(job)
 
-    async def _execute_single_task(self, semaphore: asyncio.Semaphore,
-                                   job: BatchJob, topic: str, task_name: str):
+    async def _execute_single_task(self, job: BatchJob, topic: str,
+                                   task_name: str):
         """执行单个任务"""
-        async with semaphore:
-            try:
-                self.logger.info(f"开始执行任务: {task_name} (主题: {topic})")
-
-                # 添加任务到调度器
-                task_id = self.scheduler.add_task(
-                    name=task_name,
-                    topic=topic,
-                    description=f"批量作业 {job.name} 的子任务",
-                    priority=self.scheduler.TaskPriority.NORMAL)
-
-                # 等待任务完成
-                while True:
-                    task = self.scheduler.get_task(task_id)
-                    if not task:
-                        break
-
-                    if task.status in [
-                            self.scheduler.TaskStatus.COMPLETED,
-                            self.scheduler.TaskStatus.FAILED,
-                            self.scheduler.TaskStatus.CANCELLED
-                    ]:
-                        break
-
-                    await asyncio.sleep(2)
-
-                # 获取任务结果
-                task = self.scheduler.get_task(task_id)
-                if task:
-                    result = {
-                        "task_id":
-                        task_id,
-                        "topic":
-                        topic,
-                        "status":
-                        task.status.value,
-                        "result":
-                        task.result,
-                        "error_message":
-                        task.error_message,
-                        "duration":
-                        (task.completed_at - task.started_at).total_seconds()
-                        if task.completed_at and task.started_at else None
-                    }
-
-                    job.results.append(result)
-
-                    if task.status == self.scheduler.TaskStatus.COMPLETED:
-                        job.completed_tasks += 1
-                        self.logger.info(f"任务完成: {task_name}")
-                    else:
-                        job.failed_tasks += 1
-                        self.logger.error(
-                            f"任务失败: {task_name}, 错误: {task.error_message}")
-
-            except Exception as e:
-                job.failed_tasks += 1
-                self.logger.error(f"任务执行异常: {task_name}, 错误: {e}")
+        try:
+            self.logger.info(f"开始执行任务: {task_name} (主题: {topic})")
+
+            # 添加任务到调度器
+            task_id = self.scheduler.add_task(
+                name=task_name,
+                topic=topic,
+                description=f"批量作业 {job.name} 的子任务",
+                priority=TaskPriority.NORMAL)
+
+            # 等待任务结束（调度器在任务完成、失败或取消时直接唤醒，停止时抛出异常）
+            task = await self.scheduler.wait_for_task(task_id)
+
+            # 获取任务结果
+            if task:
+                result = {
+                    "task_id":
+                    task_id,
+                    "topic":
+                    topic,
+                    "status":
+                    task.status.value,
+                    "result":
+                    task.result,
+                    "error_message":
+                    task.error_message,
+                    "duration":
+                    (task.completed_at - task.started_at).total_seconds()
+                    if task.completed_at and task.started_at else None
+                }
+
+                job.results.append(result)
+
+                if task.status == TaskStatus.COMPLETED:
+                    job.completed_tasks += 1
+                    self.logger.info(f"任务完成: {task_name}")
+                else:
+                    job.failed_tasks += 1
+                    self.logger.error(
+                        f"任务失败: {task_name}, 错误: {task.error_message}")
+
+        except Exception as e:
+            job.failed_tasks += 1
+            self.logger.error(f"任务执行异常: {task_name}, 错误: {e}")
+
+        # 每个子任务结束即保存作业进度
+        self._save_batch_job(job)
 
     def archive_results(self,
                         job_id: str,
@@ -336,7 +346,7 @@ class AutomationExecutor:
         Returns:
             str: 归档文件路径
         """
-        job = self.batch_jobs.get(job_id)
+        job = self.get_batch_job(job_id)
         if not job:
             raise ValueError(f"批量作业不存在: {job_id}")
 
@@ -403,17 +413,18 @@ class AutomationExecutor:
 
     def get_statistics(self) -> dict:
         """获取执行器统计信息"""
-        total_jobs = len(self.batch_jobs)
-        status_counts = {}
-        for status in ExecutionStatus:
-            status_counts[status.value] = len(
-                self.get_batch_jobs(status=status))
-
-        total_tasks = sum(job.total_tasks for job in self.batch_jobs.values())
-        completed_tasks = sum(job.completed_tasks
-                              for job in self.batch_jobs.values())
-        failed_tasks = sum(job.failed_tasks
-                           for job in self.batch_jobs.values())
+        counts = self._store.count_by("status")
+        total_jobs = sum(counts.values())
+        status_counts = {
+            status.value: counts.get(status.value, 0)
+            for status in ExecutionStatus
+        }
+
+        totals = self._store.sum("total_tasks", "completed_tasks",
+                                 "failed_tasks")
+        total_tasks = totals["total_tasks"]
+        completed_tasks = totals["completed_tasks"]
+        failed_tasks = totals["failed_tasks"]
 
         return {
             "total_jobs":
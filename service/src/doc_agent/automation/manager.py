@@ -15,9 +15,9 @@ from datetime import datetime
 from pathlib import Path
 from typing import Callable, Optional
 
-from .executor import AutomationExecutor, ExecutionStatus
-from .monitor import AlertLevel, AutomationMonitor
-from .scheduler import AutomationScheduler, TaskPriority, TaskStatus
+from .executor import AutomationExecutor, BatchJob, ExecutionStatus
+from .monitor import Alert, AlertLevel, AutomationMonitor, PerformanceMetrics
+from .scheduler import AutomationScheduler, AutomationTask, TaskPriority, TaskStatus
 
 
 class AutomationManager:
@@ -40,7 +40,8 @@ class AutomationManager:
 
         # 初始化组件
         self.scheduler = AutomationScheduler(
-            str(self.storage_path / "scheduler"))
+            str(self.storage_path / "scheduler"),
+            max_workers=max_concurrent_tasks)
         self.monitor = AutomationMonitor(self.scheduler,
                                          str(self.storage_path / "monitor"),
                                          alert_callbacks)
@@ -250,6 +251,8 @@ class AutomationManager:
             if "max_concurrent_tasks" in executor_config:
                 self.executor.max_concurrent_tasks = executor_config[
                     "max_concurrent_tasks"]
+                self.scheduler.set_max_workers(
+                    executor_config["max_concurrent_tasks"])
 
         self.logger.info("配置已更新")
 
@@ -277,36 +280,14 @@ class AutomationManager:
 
         cutoff_date = datetime.now() - timedelta(days=days)
 
-        # 清理旧的任务
-        old_tasks = [
-            task for task in self.scheduler.tasks.values()
-            if task.created_at < cutoff_date and task.status in
-            [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]
-        ]
-
-        for task in old_tasks:
-            self.scheduler.delete_task(task.id)
-
-        # 清理旧的告警
-        old_alerts = [
-            alert for alert in self.monitor.alerts
-            if alert.timestamp < cutoff_date and alert.resolved
-        ]
+        # 清理旧的已结束任务
+        old_tasks = self.scheduler.purge_tasks(cutoff_date)
 
-        for alert in old_alerts:
-            self.monitor.alerts.remove(alert)
-
-        # 清理旧的性能指标
-        old_metrics = [
-            metric for metric in self.monitor.metrics_history
-            if metric.timestamp < cutoff_date
-        ]
-
-        for metric in old_metrics:
-            self.monitor.metrics_history.remove(metric)
+        # 清理旧的告警和性能指标
+        old_alerts, old_metrics = self.monitor.prune_history(cutoff_date)
 
         self.logger.info(
-            f"清理了 {len(old_tasks)} 个旧任务, {len(old_alerts)} 个旧告警, {len(old_metrics)} 条旧指标"
+            f"清理了 {old_tasks} 个旧任务, {old_alerts} 个旧告警, {old_metrics} 条旧指标"
         )
 
     def export_data(self, export_path: str):
@@ -315,7 +296,7 @@ class AutomationManager:
         export_dir.mkdir(parents=True, exist_ok=True)
 
         # 导出任务数据
-        tasks_data = [task.to_dict() for task in self.scheduler.tasks.values()]
+        tasks_data = [task.to_dict() for task in self.scheduler.get_tasks()]
         with open(export_dir / "tasks.json", 'w', encoding='utf-8') as f:
             json.dump(tasks_data, f, ensure_ascii=False, indent=2)
 
@@ -332,9 +313,7 @@ class AutomationManager:
             json.dump(metrics_data, f, ensure_ascii=False, indent=2)
 
         # 导出批量作业数据
-        jobs_data = [
-            job.to_dict() for job in self.executor.batch_jobs.values()
-        ]
+        jobs_data = [job.to_dict() for job in self.executor.get_batch_jobs()]
         with open(export_dir / "batch_jobs.json", 'w', encoding='utf-8') as f:
             json.dump(jobs_data, f, ensure_ascii=False, indent=2)
 
@@ -349,56 +328,33 @@ class AutomationManager:
         if tasks_file.exists():
             with open(tasks_file, encoding='utf-8') as f:
                 tasks_data = json.load(f)
-                for task_data in tasks_data:
-                    task = self.scheduler.AutomationTask.from_dict(task_data)
-                    self.scheduler.tasks[task.id] = task
+            self.scheduler.import_tasks(
+                [AutomationTask.from_dict(task_data) for task_data in tasks_data])
 
         # 导入告警数据
         alerts_file = import_dir / "alerts.json"
         if alerts_file.exists():
             with open(alerts_file, encoding='utf-8') as f:
                 alerts_data = json.load(f)
-                for alert_data in alerts_data:
-                    alert = self.monitor.Alert(
-                        id=alert_data["id"],
-                        level=AlertLevel(alert_data["level"]),
-                        message=alert_data["message"],
-                        source=alert_data["source"],
-                        timestamp=datetime.fromisoformat(
-                            alert_data["timestamp"]),
-                        details=alert_data["details"],
-                        resolved=alert_data["resolved"],
-                        resolved_at=datetime.fromisoformat(
-                            alert_data["resolved_at"])
-                        if alert_data.get("resolved_at") else None)
-                    self.monitor.alerts.append(alert)
+            self.monitor.import_history(
+                alerts=[Alert.from_dict(alert_data) for alert_data in alerts_data])
 
         # 导入性能指标数据
         metrics_file = import_dir / "metrics.json"
         if metrics_file.exists():
             with open(metrics_file, encoding='utf-8') as f:
                 metrics_data = json.load(f)
-                for metric_data in metrics_data:
-                    metric = self.monitor.PerformanceMetrics(
-                        timestamp=datetime.fromisoformat(
-                            metric_data["timestamp"]),
-                        cpu_percent=metric_data["cpu_percent"],
-                        memory_percent=metric_data["memory_percent"],
-                        memory_used_mb=metric_data["memory_used_mb"],
-                        disk_usage_percent=metric_data["disk_usage_percent"],
-                        active_tasks=metric_data["active_tasks"],
-                        completed_tasks=metric_data["completed_tasks"],
-                        failed_tasks=metric_data["failed_tasks"],
-                        avg_task_duration=metric_data["avg_task_duration"])
-                    self.monitor.metrics_history.append(metric)
+            self.monitor.import_history(metrics=[
+                PerformanceMetrics.from_dict(metric_data)
+                for metric_data in metrics_data
+            ])
 
         # 导入批量作业数据
         jobs_file = import_dir / "batch_jobs.json"
         if jobs_file.exists():
             with open(jobs_file, encoding='utf-8') as f:
                 jobs_data = json.load(f)
-                for job_data in jobs_data:
-                    job = self.executor.BatchJob.from_dict(job_data)
-                    self.executor.batch_jobs[job.id] = job
+            self.executor.import_batch_jobs(
+                [BatchJob.from_dict(job_data) for job_data in jobs_data])
 
         self.logger.info(f"数据已从 {import_path} 导入")
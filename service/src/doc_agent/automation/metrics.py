@@ -0,0 +1,196 @@
+"""
+监控指标的数据结构
+
+- MetricsRingBuffer: 定长、基于 array 的性能指标环形缓冲区，追加为 O(1)，按时间查询为二分查找
+- DurationStats: 增量维护的任务时长统计（运行均值和滑动窗口分位数）
+- JobResourceUsage: 单个运行中任务的资源归因（CPU 时间和内存）
+"""
+
+import bisect
+import math
+import time
+from array import array
+from collections import deque
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Optional
+
+
+class MetricsRingBuffer:
+    """
+    性能指标环形缓冲区
+
+    每个指标字段一列，保存在预分配的 array('d') 中；写满后覆盖最早的记录，
+    不再通过列表切片裁剪历史。元素以 PerformanceMetrics 的形式读写
+
+    Args:
+        capacity: 最多保存的记录数
+        metrics_type: 记录类型（PerformanceMetrics），读取时据此重建对象
+        fields: 需要保存的数值字段，timestamp 始终保存
+    """
+
+    def __init__(self, capacity: int, metrics_type: type,
+                 fields: tuple[str, ...]):
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于 0")
+        self.capacity = capacity
+        self._type = metrics_type
+        self._fields = fields
+        # 整数字段读取时还原为 int
+        self._integer = [
+            isinstance(metrics_type.__dataclass_fields__[name].default, int)
+            for name in fields
+        ]
+        self._timestamps = array('d', [0.0]) * capacity
+        self._columns = [array('d', [0.0]) * capacity for _ in fields]
+        self._start = 0
+        self._size = 0
+
+    def append(self, metrics):
+        """追加一条记录，缓冲区已满时覆盖最早的记录"""
+        if self._size < self.capacity:
+            slot = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._timestamps[slot] = metrics.timestamp.timestamp()
+        for column, name in zip(self._columns, self._fields):
+            column[slot] = getattr(metrics, name)
+
+    def extend(self, metrics_list):
+        for metrics in metrics_list:
+            self.append(metrics)
+
+    def latest(self):
+        """最新的一条记录，缓冲区为空时返回 None"""
+        return self[-1] if self._size else None
+
+    def since(self, cutoff: datetime) -> list:
+        """返回时间晚于 cutoff 的记录（按时间升序）"""
+        return [self._record(i) for i in range(self._find(cutoff), self._size)]
+
+    def drop_before(self, cutoff: datetime) -> int:
+        """丢弃早于 cutoff 的记录，返回丢弃的数量"""
+        dropped = self._find(cutoff, inclusive=True)
+        self._start = (self._start + dropped) % self.capacity
+        self._size -= dropped
+        return dropped
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator:
+        for i in range(self._size):
+            yield self._record(i)
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("MetricsRingBuffer index out of range")
+        return self._record(index)
+
+    def _record(self, index: int):
+        slot = (self._start + index) % self.capacity
+        values = {
+            name: int(column[slot]) if integer else column[slot]
+            for column, name, integer in zip(self._columns, self._fields,
+                                             self._integer)
+        }
+        return self._type(timestamp=datetime.fromtimestamp(
+            self._timestamps[slot]),
+                          **values)
+
+    def _find(self, cutoff: datetime, inclusive: bool = False) -> int:
+        """第一条时间晚于 cutoff（inclusive 时为不早于）的逻辑下标，记录按时间追加"""
+        target = cutoff.timestamp()
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            value = self._timestamps[(self._start + middle) % self.capacity]
+            if value < target or (not inclusive and value == target):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+class DurationStats:
+    """
+    任务时长统计
+
+    全量的次数和均值增量更新；分位数基于最近 window 个样本的有序窗口，
+    插入和淘汰都是二分定位，查询为 O(1)
+
+    Args:
+        window: 计算分位数的样本窗口大小
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.count = 0
+        self.mean = 0.0
+        self.max = 0.0
+        self._recent: deque[float] = deque()
+        self._sorted: list[float] = []
+
+    def add(self, duration: float):
+        self.count += 1
+        self.mean += (duration - self.mean) / self.count
+        self.max = max(self.max, duration)
+
+        self._recent.append(duration)
+        bisect.insort(self._sorted, duration)
+        if len(self._recent) > self.window:
+            oldest = self._recent.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+
+    def percentile(self, percent: float) -> float:
+        """最近窗口内的分位数（最近秩法），没有样本时返回 0"""
+        if not self._sorted:
+            return 0.0
+        rank = math.ceil(percent / 100 * len(self._sorted))
+        return self._sorted[min(max(rank, 1), len(self._sorted)) - 1]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 3),
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3)
+        }
+
+
+class JobResourceUsage:
+    """
+    运行中任务的资源归因
+
+    所有任务在同一进程内并发执行，进程 CPU 时间按采样区间平均分摊给
+    该区间内正在运行的任务；内存记录任务开始时的进程 RSS 和运行期间的峰值
+    """
+
+    def __init__(self, rss_mb: float):
+        self.started_at = time.monotonic()
+        self.cpu_seconds = 0.0
+        self.start_rss_mb = rss_mb
+        self.peak_rss_mb = rss_mb
+
+    def observe(self, cpu_seconds: float, rss_mb: float):
+        self.cpu_seconds += cpu_seconds
+        self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+
+    def to_dict(self, now: Optional[float] = None) -> dict:
+        elapsed = (now or time.monotonic()) - self.started_at
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "rss_growth_mb": round(self.peak_rss_mb - self.start_rss_mb, 1)
+        }
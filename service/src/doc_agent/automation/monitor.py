@@ -6,10 +6,14 @@
 - 性能指标收集
 - 异常检测和告警
 - 资源使用监控
+
+告警和性能指标保存在 SQLite 存储中，每条告警或指标单独写入，超出保留上限的旧记录在压缩时删除
+
+采样不阻塞事件循环：CPU 使用率取两次采样之间的差值，指标历史保存在定长环形缓冲区中；
+任务时长统计和任务计数通过调度器的任务事件增量维护，并按运行中的任务归因进程 CPU 时间和内存
 """
 
 import asyncio
-import json
 import logging
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
@@ -19,6 +23,12 @@ from typing import Callable, Optional
 
 import psutil
 
+from .metrics import DurationStats, JobResourceUsage, MetricsRingBuffer
+from .scheduler import AutomationTask, TaskStatus
+from .storage import RecordStore
+
+_MB = 1024 * 1024
+
 
 class AlertLevel(Enum):
     """告警级别枚举"""
@@ -61,6 +71,19 @@ class Alert:
             self.resolved_at.isoformat() if self.resolved_at else None
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Alert':
+        """从字典创建告警"""
+        return cls(id=data["id"],
+                   level=AlertLevel(data["level"]),
+                   message=data["message"],
+                   source=data["source"],
+                   timestamp=datetime.fromisoformat(data["timestamp"]),
+                   details=data["details"],
+                   resolved=data["resolved"],
+                   resolved_at=datetime.fromisoformat(data["resolved_at"])
+                   if data.get("resolved_at") else None)
+
 
 @dataclass
 class PerformanceMetrics:
@@ -89,6 +112,19 @@ class PerformanceMetrics:
             "avg_task_duration": self.avg_task_duration
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PerformanceMetrics':
+        """从字典创建性能指标"""
+        return cls(timestamp=datetime.fromisoformat(data["timestamp"]),
+                   cpu_percent=data["cpu_percent"],
+                   memory_percent=data["memory_percent"],
+                   memory_used_mb=data["memory_used_mb"],
+                   disk_usage_percent=data["disk_usage_percent"],
+                   active_tasks=data["active_tasks"],
+                   completed_tasks=data["completed_tasks"],
+                   failed_tasks=data["failed_tasks"],
+                   avg_task_duration=data["avg_task_duration"])
+
 
 class AutomationMonitor:
     """自动化监控器"""
@@ -111,7 +147,6 @@ class AutomationMonitor:
 
         self.alert_callbacks = alert_callbacks or []
         self.alerts: list[Alert] = []
-        self.metrics_history: list[PerformanceMetrics] = []
         self.running = False
         self.logger = logging.getLogger(__name__)
 
@@ -119,6 +154,10 @@ class AutomationMonitor:
         self.monitoring_interval = 30  # 30秒监控间隔
         self.max_metrics_history = 1000  # 最多保存1000条指标记录
         self.max_alerts_history = 500  # 最多保存500条告警记录
+        self.metrics_history = MetricsRingBuffer(
+            self.max_metrics_history, PerformanceMetrics,
+            tuple(name for name in PerformanceMetrics.__dataclass_fields__
+                  if name != "timestamp"))
 
         # 阈值配置
         self.cpu_threshold = 80.0  # CPU使用率阈值
@@ -126,84 +165,108 @@ class AutomationMonitor:
         self.disk_threshold = 90.0  # 磁盘使用率阈值
         self.task_failure_threshold = 0.3  # 任务失败率阈值
 
+        db_path = self.storage_path / "automation.db"
+        self._alert_store = RecordStore(db_path,
+                                        "alerts",
+                                        indexes=("timestamp", "resolved"),
+                                        max_records=self.max_alerts_history)
+        self._metrics_store = RecordStore(db_path,
+                                          "metrics",
+                                          key="timestamp",
+                                          indexes=("timestamp", ),
+                                          max_records=self.max_metrics_history)
+
         # 加载历史数据
         self._load_monitor_data()
 
+        # 增量维护的任务统计和资源归因
+        self.task_durations = DurationStats()
+        self.job_usage: dict[str, JobResourceUsage] = {}
+        status_counts = scheduler.get_statistics()["status_counts"]
+        self._completed_tasks = status_counts.get(TaskStatus.COMPLETED.value, 0)
+        self._failed_tasks = status_counts.get(TaskStatus.FAILED.value, 0)
+        self._process = psutil.Process()
+        self._last_cpu_seconds = self._process_cpu_seconds()
+        # 首次调用只记录基准，之后每次返回与上次调用之间的 CPU 使用率
+        psutil.cpu_percent(interval=None)
+        scheduler.task_listeners.append(self._on_task_event)
+
     def _load_monitor_data(self):
         """加载监控数据"""
         # 加载告警历史
-        alerts_file = self.storage_path / "alerts.json"
-        if alerts_file.exists():
-            try:
-                with open(alerts_file, encoding='utf-8') as f:
-                    alerts_data = json.load(f)
-                    for alert_data in alerts_data:
-                        alert = Alert(id=alert_data["id"],
-                                      level=AlertLevel(alert_data["level"]),
-                                      message=alert_data["message"],
-                                      source=alert_data["source"],
-                                      timestamp=datetime.fromisoformat(
-                                          alert_data["timestamp"]),
-                                      details=alert_data["details"],
-                                      resolved=alert_data["resolved"],
-                                      resolved_at=datetime.fromisoformat(
-                                          alert_data["resolved_at"]) if
-                                      alert_data.get("resolved_at") else None)
-                        self.alerts.append(alert)
-                self.logger.info(f"加载了 {len(self.alerts)} 条告警记录")
-            except Exception as e:
-                self.logger.error(f"加载告警数据失败: {e}")
+        self._alert_store.migrate_json(self.storage_path / "alerts.json")
+        try:
+            self.alerts = [
+                Alert.from_dict(alert_data)
+                for alert_data in self._alert_store.query()
+            ][-self.max_alerts_history:]
+            self.logger.info(f"加载了 {len(self.alerts)} 条告警记录")
+        except Exception as e:
+            self.logger.error(f"加载告警数据失败: {e}")
 
         # 加载性能指标历史
-        metrics_file = self.storage_path / "metrics.json"
-        if metrics_file.exists():
-            try:
-                with open(metrics_file, encoding='utf-8') as f:
-                    metrics_data = json.load(f)
-                    for metric_data in metrics_data:
-                        metric = PerformanceMetrics(
-                            timestamp=datetime.fromisoformat(
-                                metric_data["timestamp"]),
-                            cpu_percent=metric_data["cpu_percent"],
-                            memory_percent=metric_data["memory_percent"],
-                            memory_used_mb=metric_data["memory_used_mb"],
-                            disk_usage_percent=metric_data[
-                                "disk_usage_percent"],
-                            active_tasks=metric_data["active_tasks"],
-                            completed_tasks=metric_data["completed_tasks"],
-                            failed_tasks=metric_data["failed_tasks"],
-                            avg_task_duration=metric_data["avg_task_duration"])
-                        self.metrics_history.append(metric)
-                self.logger.info(f"加载了 {len(self.metrics_history)} 条性能指标记录")
-            except Exception as e:
-                self.logger.error(f"加载性能指标失败: {e}")
+        self._metrics_store.migrate_json(self.storage_path / "metrics.json")
+        try:
+            self.metrics_history.extend(
+                PerformanceMetrics.from_dict(metric_data)
+                for metric_data in self._metrics_store.query())
+            self.logger.info(f"加载了 {len(self.metrics_history)} 条性能指标记录")
+        except Exception as e:
+            self.logger.error(f"加载性能指标失败: {e}")
 
-    def _save_monitor_data(self):
-        """保存监控数据"""
-        # 保存告警数据
-        alerts_file = self.storage_path / "alerts.json"
+    def _save_alert(self, alert: Alert):
+        """保存单条告警"""
         try:
-            alerts_data = [
-                alert.to_dict()
-                for alert in self.alerts[-self.max_alerts_history:]
-            ]
-            with open(alerts_file, 'w', encoding='utf-8') as f:
-                json.dump(alerts_data, f, ensure_ascii=False, indent=2)
+            self._alert_store.put(alert.to_dict())
         except Exception as e:
             self.logger.error(f"保存告警数据失败: {e}")
 
-        # 保存性能指标数据
-        metrics_file = self.storage_path / "metrics.json"
+    def _save_metrics(self, metrics: PerformanceMetrics):
+        """保存单条性能指标"""
         try:
-            metrics_data = [
-                metric.to_dict()
-                for metric in self.metrics_history[-self.max_metrics_history:]
-            ]
-            with open(metrics_file, 'w', encoding='utf-8') as f:
-                json.dump(metrics_data, f, ensure_ascii=False, indent=2)
+            self._metrics_store.put(metrics.to_dict())
         except Exception as e:
             self.logger.error(f"保存性能指标失败: {e}")
 
+    def prune_history(self, before: datetime) -> tuple[int, int]:
+        """
+        删除早于 before 的已解决告警和性能指标
+
+        Returns:
+            tuple[int, int]: (删除的告警数, 删除的指标数)
+        """
+        old_alerts = [
+            alert for alert in self.alerts
+            if alert.timestamp < before and alert.resolved
+        ]
+        old_alert_ids = {alert.id for alert in old_alerts}
+        self.alerts = [
+            alert for alert in self.alerts if alert.id not in old_alert_ids
+        ]
+        self._alert_store.delete(*old_alert_ids)
+
+        old_metrics = self._metrics_store.keys(
+            {"timestamp__lt": before.isoformat()})
+        self.metrics_history.drop_before(before)
+        self._metrics_store.delete(*old_metrics)
+        return len(old_alerts), len(old_metrics)
+
+    def import_history(self,
+                       alerts: Optional[list[Alert]] = None,
+                       metrics: Optional[list[PerformanceMetrics]] = None):
+        """批量导入告警和性能指标"""
+        if alerts:
+            self.alerts = (self.alerts + alerts)[-self.max_alerts_history:]
+            self._alert_store.put_many([alert.to_dict() for alert in alerts])
+        if metrics:
+            # 环形缓冲区按时间顺序保存，合并后重新写入
+            merged = sorted([*self.metrics_history, *metrics],
+                            key=lambda metric: metric.timestamp)
+            self.metrics_history.clear()
+            self.metrics_history.extend(merged)
+            self._metrics_store.put_many(
+                [metric.to_dict() for metric in metrics])
+
     def add_alert(self,
                   level: AlertLevel,
                   message: str,
@@ -224,7 +287,7 @@ class AutomationMonitor:
         if len(self.alerts) > self.max_alerts_history:
             self.alerts = self.alerts[-self.max_alerts_history:]
 
-        self._save_monitor_data()
+        self._save_alert(alert)
 
         # 调用告警回调函数
         for callback in self.alert_callbacks:
@@ -241,7 +304,7 @@ class AutomationMonitor:
             if alert.id == alert_id and not alert.resolved:
                 alert.resolved = True
                 alert.resolved_at = datetime.now()
-                self._save_monitor_data()
+                self._save_alert(alert)
                 self.logger.info(f"告警已解决: {alert.message}")
                 return True
         return False
@@ -263,48 +326,67 @@ class AutomationMonitor:
         return alerts
 
     def collect_metrics(self) -> PerformanceMetrics:
-        """收集性能指标"""
+        """收集性能指标（不阻塞，CPU 使用率为距上次采样的平均值）"""
         # 系统资源指标
-        cpu_percent = psutil.cpu_percent(interval=1)
+        self._attribute_resources()
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory = psutil.virtual_memory()
         disk = psutil.disk_usage('/')
 
-        # 任务统计
-        stats = self.scheduler.get_statistics()
-        active_tasks = stats["status_counts"].get("running", 0)
-        completed_tasks = stats["status_counts"].get("completed", 0)
-        failed_tasks = stats["status_counts"].get("failed", 0)
-
-        # 计算平均任务时长
-        avg_task_duration = 0.0
-        completed_tasks_list = self.scheduler.get_tasks(
-            status=self.scheduler.tasks.get("COMPLETED"))
-        if completed_tasks_list:
-            total_duration = sum([
-                (task.completed_at - task.started_at).total_seconds()
-                for task in completed_tasks_list
-                if task.completed_at and task.started_at
-            ])
-            avg_task_duration = total_duration / len(completed_tasks_list)
-
-        metrics = PerformanceMetrics(cpu_percent=cpu_percent,
-                                     memory_percent=memory.percent,
-                                     memory_used_mb=memory.used / 1024 / 1024,
-                                     disk_usage_percent=disk.percent,
-                                     active_tasks=active_tasks,
-                                     completed_tasks=completed_tasks,
-                                     failed_tasks=failed_tasks,
-                                     avg_task_duration=avg_task_duration)
-
+        metrics = PerformanceMetrics(
+            cpu_percent=cpu_percent,
+            memory_percent=memory.percent,
+            memory_used_mb=memory.used / _MB,
+            disk_usage_percent=disk.percent,
+            active_tasks=len(self.job_usage),
+            completed_tasks=self._completed_tasks,
+            failed_tasks=self._failed_tasks,
+            avg_task_duration=self.task_durations.mean)
+
+        # 环形缓冲区写满后自动覆盖最早的记录
         self.metrics_history.append(metrics)
-
-        # 限制历史记录数量
-        if len(self.metrics_history) > self.max_metrics_history:
-            self.metrics_history = self.metrics_history[-self.
-                                                        max_metrics_history:]
+        self._save_metrics(metrics)
 
         return metrics
 
+    def _on_task_event(self, event: str, task: AutomationTask):
+        """调度器任务事件：维护任务计数、时长统计和资源归因"""
+        rss_mb = self._attribute_resources()
+        if event == "start":
+            self.job_usage[task.id] = JobResourceUsage(rss_mb)
+            return
+
+        usage = self.job_usage.pop(task.id, None)
+        if usage is not None:
+            task.metadata["resources"] = usage.to_dict()
+        if task.status == TaskStatus.COMPLETED:
+            self._completed_tasks += 1
+            if task.started_at and task.completed_at:
+                self.task_durations.add(
+                    (task.completed_at - task.started_at).total_seconds())
+        elif task.status == TaskStatus.FAILED:
+            self._failed_tasks += 1
+
+    def _attribute_resources(self) -> float:
+        """把上次归因以来的进程 CPU 时间平均分摊给运行中的任务，返回当前 RSS（MB）"""
+        try:
+            cpu_seconds = self._process_cpu_seconds()
+            rss_mb = self._process.memory_info().rss / _MB
+        except psutil.Error as e:
+            self.logger.debug(f"读取进程资源失败: {e}")
+            return 0.0
+        delta = cpu_seconds - self._last_cpu_seconds
+        self._last_cpu_seconds = cpu_seconds
+        if self.job_usage:
+            share = delta / len(self.job_usage)
+            for usage in self.job_usage.values():
+                usage.observe(share, rss_mb)
+        return rss_mb
+
+    def _process_cpu_seconds(self) -> float:
+        cpu_times = self._process.cpu_times()
+        return cpu_times.user + cpu_times.system
+
     def check_thresholds(self, metrics: PerformanceMetrics):
         """检查阈值并生成告警"""
         # CPU使用率检查
@@ -370,9 +452,6 @@ class AutomationMonitor:
                 # 检查阈值
                 self.check_thresholds(metrics)
 
-                # 保存监控数据
-                self._save_monitor_data()
-
                 # 等待下次监控
                 await asyncio.sleep(self.monitoring_interval)
 
@@ -395,19 +474,22 @@ class AutomationMonitor:
                 self.get_alerts(level=level, resolved=False))
 
         # 性能指标统计
-        if self.metrics_history:
-            latest_metrics = self.metrics_history[-1]
-            metrics_stats = latest_metrics.to_dict()
-        else:
-            metrics_stats = {}
+        latest_metrics = self.metrics_history.latest()
+        metrics_stats = latest_metrics.to_dict() if latest_metrics else {}
 
+        self._attribute_resources()
         return {
             "alerts": alert_stats,
             "metrics": metrics_stats,
+            "task_duration": self.task_durations.to_dict(),
+            "running_jobs": {
+                task_id: usage.to_dict()
+                for task_id, usage in self.job_usage.items()
+            },
             "running": self.running
         }
 
     def get_metrics_history(self, hours: int = 24) -> list[PerformanceMetrics]:
         """获取历史性能指标"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        return [m for m in self.metrics_history if m.timestamp > cutoff_time]
+        return self.metrics_history.since(cutoff_time)
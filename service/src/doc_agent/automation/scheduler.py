@@ -6,17 +6,25 @@
 - 批量任务管理
 - 任务优先级控制
 - 失败重试机制
+
+任务进入 asyncio 优先级队列，由可配置数量的工作协程并发执行，
+新任务入队即被空闲工作协程取走；调用方通过 wait_for_task 等待完成，无需轮询
+
+任务状态保存在 SQLite 存储中，每次状态变更只写入该任务；
+内存中只保留未结束的任务，历史任务按需从存储查询
 """
 
 import asyncio
-import json
+import itertools
 import logging
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+
+from .storage import RecordStore
 
 
 class TaskStatus(Enum):
@@ -113,47 +121,77 @@ class AutomationTask:
         return task
 
 
+# 任务已结束的状态
+_FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED,
+                      TaskStatus.CANCELLED)
+# 任务未结束的状态
+_ACTIVE_STATUSES = (TaskStatus.PENDING, TaskStatus.RUNNING,
+                    TaskStatus.RETRYING)
+
+
 class AutomationScheduler:
     """自动化任务调度器"""
 
-    def __init__(self, storage_path: Optional[str] = None):
+    def __init__(self,
+                 storage_path: Optional[str] = None,
+                 max_workers: int = 3,
+                 retry_backoff: float = 5.0,
+                 max_retry_backoff: float = 300.0):
         """
         初始化调度器
         Args:
             storage_path: 任务存储路径，默认为 output/automation
+            max_workers: 并发执行任务的工作协程数量
+            retry_backoff: 首次重试前的等待时间（秒），之后按指数增长
+            max_retry_backoff: 重试等待时间上限（秒）
         """
         self.storage_path = Path(storage_path) if storage_path else Path(
             "output/automation")
         self.storage_path.mkdir(parents=True, exist_ok=True)
 
+        # 未结束的任务；已结束的任务只保存在存储中
         self.tasks: dict[str, AutomationTask] = {}
+        self._store = RecordStore(self.storage_path / "automation.db",
+                                  "tasks",
+                                  indexes=("status", "priority",
+                                           "created_at"))
         self.running = False
         self.logger = logging.getLogger(__name__)
 
+        self.max_workers = max_workers
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        # 队列元素: (-优先级, 入队序号, 任务ID)，优先级高、入队早的任务先执行
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._workers: list[asyncio.Task] = []
+        self._active_count = 0
+        # 任务ID -> 完成 future，由 wait_for_task 创建，任务结束时设置结果
+        self._futures: dict[str, asyncio.Future] = {}
+        self._retry_handles: dict[str, asyncio.TimerHandle] = {}
+        self._stopped: Optional[asyncio.Event] = None
+        # 任务执行监听器: (事件, 任务)，事件为 "start"（开始执行）或 "end"（本次执行结束）
+        self.task_listeners: list[Callable[[str, AutomationTask], None]] = []
+
         # 加载已存在的任务
         self._load_tasks()
 
     def _load_tasks(self):
-        """从存储加载任务"""
-        tasks_file = self.storage_path / "tasks.json"
-        if tasks_file.exists():
-            try:
-                with open(tasks_file, encoding='utf-8') as f:
-                    tasks_data = json.load(f)
-                    for task_data in tasks_data:
-                        task = AutomationTask.from_dict(task_data)
-                        self.tasks[task.id] = task
-                self.logger.info(f"加载了 {len(self.tasks)} 个任务")
-            except Exception as e:
-                self.logger.error(f"加载任务失败: {e}")
+        """从存储加载未结束的任务"""
+        self._store.migrate_json(self.storage_path / "tasks.json")
+        try:
+            for task_data in self._store.query(
+                    {"status": [status.value for status in _ACTIVE_STATUSES]}):
+                task = AutomationTask.from_dict(task_data)
+                self.tasks[task.id] = task
+            self.logger.info(f"加载了 {len(self.tasks)} 个未完成任务")
+        except Exception as e:
+            self.logger.error(f"加载任务失败: {e}")
 
-    def _save_tasks(self):
-        """保存任务到存储"""
-        tasks_file = self.storage_path / "tasks.json"
+    def _save_task(self, task: AutomationTask):
+        """保存单个任务到存储"""
         try:
-            tasks_data = [task.to_dict() for task in self.tasks.values()]
-            with open(tasks_file, 'w', encoding='utf-8') as f:
-                json.dump(tasks_data, f, ensure_ascii=False, indent=2)
+            self._store.put(task.to_dict())
         except Exception as e:
             self.logger.error(f"保存任务失败: {e}")
 
@@ -184,52 +222,104 @@ class AutomationScheduler:
                               metadata=metadata or {})
 
         self.tasks[task.id] = task
-        self._save_tasks()
+        self._save_task(task)
+        self._enqueue(task)
 
         self.logger.info(f"添加任务: {task.name} (ID: {task.id})")
         return task.id
 
     def get_task(self, task_id: str) -> Optional[AutomationTask]:
         """获取任务"""
-        return self.tasks.get(task_id)
-
-    def get_tasks(
-            self,
-            status: Optional[TaskStatus] = None,
-            priority: Optional[TaskPriority] = None) -> list[AutomationTask]:
-        """获取任务列表"""
-        tasks = list(self.tasks.values())
+        task = self.tasks.get(task_id)
+        if task is None:
+            task_data = self._store.get(task_id)
+            task = AutomationTask.from_dict(task_data) if task_data else None
+        return task
 
+    def get_tasks(self,
+                  status: Optional[TaskStatus] = None,
+                  priority: Optional[TaskPriority] = None,
+                  limit: Optional[int] = None) -> list[AutomationTask]:
+        """获取任务列表（按优先级和创建时间倒序，使用存储索引过滤）"""
+        filters = {}
         if status:
-            tasks = [t for t in tasks if t.status == status]
-
+            filters["status"] = status.value
         if priority:
-            tasks = [t for t in tasks if t.priority == priority]
-
-        # 按优先级和创建时间排序
-        tasks.sort(key=lambda t: (t.priority.value, t.created_at),
-                   reverse=True)
-        return tasks
+            filters["priority"] = priority.value
+
+        tasks_data = self._store.query(filters,
+                                       order_by=("-priority", "-created_at"),
+                                       limit=limit)
+        # 未结束的任务返回内存中的对象
+        return [
+            self.tasks.get(task_data["id"])
+            or AutomationTask.from_dict(task_data) for task_data in tasks_data
+        ]
+
+    def purge_tasks(self, before: datetime) -> int:
+        """删除创建时间早于 before 的已结束任务，返回删除数量"""
+        task_ids = self._store.keys({
+            "status": [status.value for status in _FINISHED_STATUSES],
+            "created_at__lt":
+            before.isoformat()
+        })
+        return self._store.delete(*task_ids)
+
+    def import_tasks(self, tasks: list[AutomationTask]):
+        """批量导入任务，未结束的任务进入执行队列"""
+        self._store.put_many([task.to_dict() for task in tasks])
+        for task in tasks:
+            if task.status in _ACTIVE_STATUSES:
+                self.tasks[task.id] = task
+                self._enqueue(task)
 
     def cancel_task(self, task_id: str) -> bool:
         """取消任务"""
         task = self.tasks.get(task_id)
         if task and task.status in [TaskStatus.PENDING, TaskStatus.RETRYING]:
             task.status = TaskStatus.CANCELLED
-            self._save_tasks()
+            self._save_task(task)
+            # 已在队列中的条目出队时会被跳过
+            self._resolve(task)
             self.logger.info(f"取消任务: {task.name} (ID: {task_id})")
             return True
         return False
 
     def delete_task(self, task_id: str) -> bool:
         """删除任务"""
-        if task_id in self.tasks:
-            task = self.tasks[task_id]
-            del self.tasks[task_id]
-            self._save_tasks()
-            self.logger.info(f"删除任务: {task.name} (ID: {task_id})")
-            return True
-        return False
+        task = self.get_task(task_id)
+        if task is None:
+            return False
+        self.tasks.pop(task_id, None)
+        self._store.delete(task_id)
+        self._resolve(task, deleted=True)
+        self.logger.info(f"删除任务: {task.name} (ID: {task_id})")
+        return True
+
+    async def wait_for_task(self, task_id: str) -> Optional[AutomationTask]:
+        """
+        等待任务结束（完成、失败或取消）
+
+        Returns:
+            Optional[AutomationTask]: 结束后的任务，任务不存在或被删除时返回 None
+
+        Raises:
+            RuntimeError: 任务结束前调度器已停止
+        """
+        task = self.tasks.get(task_id)
+        if task is None or task.status in _FINISHED_STATUSES:
+            return task or self.get_task(task_id)
+        future = self._futures.get(task_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._futures[task_id] = future
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # 等待方自身被取消
+                raise
+            raise RuntimeError(f"调度器已停止，任务未结束: {task_id}") from None
 
     async def start(self):
         """启动调度器"""
@@ -237,43 +327,127 @@ class AutomationScheduler:
             return
 
         self.running = True
-        self.logger.info("自动化调度器已启动")
-
-        try:
-            while self.running:
-                # 获取待执行的任务
-                pending_tasks = self.get_tasks(status=TaskStatus.PENDING)
+        self._queue = asyncio.PriorityQueue()
+        self._stopped = asyncio.Event()
 
-                if pending_tasks:
-                    # 执行最高优先级的任务
-                    task = pending_tasks[0]
-                    await self._execute_task(task)
+        # 恢复未完成的任务（包括上次退出时正在执行的任务）
+        for task in self.tasks.values():
+            if task.status == TaskStatus.RUNNING:
+                task.status = TaskStatus.PENDING
+            self._enqueue(task)
 
-                # 等待一段时间再检查
-                await asyncio.sleep(5)
+        self._ensure_workers()
+        self.logger.info(f"自动化调度器已启动，工作协程数: {self.max_workers}")
 
+        try:
+            await self._stopped.wait()
         except Exception as e:
             self.logger.error(f"调度器运行错误: {e}")
         finally:
             self.running = False
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers.clear()
+            for handle in self._retry_handles.values():
+                handle.cancel()
+            self._retry_handles.clear()
+            self._queue = None
 
     def stop(self):
-        """停止调度器"""
+        """停止调度器，未结束任务的等待方收到调度器已停止的错误"""
         self.running = False
+        if self._stopped is not None:
+            self._stopped.set()
+        # 未结束的任务保留在存储中，下次启动时恢复执行
+        futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if not future.done():
+                future.cancel()
         self.logger.info("自动化调度器已停止")
 
+    def set_max_workers(self, max_workers: int):
+        """调整并发工作协程数量，运行中立即生效"""
+        self.max_workers = max_workers
+        if self.running:
+            self._ensure_workers()
+
+    def _ensure_workers(self):
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_workers:
+            self._workers.append(
+                asyncio.create_task(self._worker(len(self._workers))))
+
+    async def _worker(self, index: int):
+        """工作协程：从优先级队列取任务执行，直到调度器停止或被缩容"""
+        while self.running:
+            item = await self._queue.get()
+            try:
+                if index >= self.max_workers:
+                    # 缩容：把任务放回队列后退出
+                    self._queue.put_nowait(item)
+                    return
+                task = self.tasks.get(item[2])
+                # 已取消、已删除或重复入队的条目直接跳过
+                if task is None or task.status not in (TaskStatus.PENDING,
+                                                       TaskStatus.RETRYING):
+                    continue
+                self._active_count += 1
+                try:
+                    await self._execute_task(task)
+                finally:
+                    self._active_count -= 1
+                self._after_execution(task)
+            finally:
+                self._queue.task_done()
+
+    def _enqueue(self, task: AutomationTask):
+        """任务入队（调度器未运行时由 start 统一入队）"""
+        if self._queue is None or task.status not in (TaskStatus.PENDING,
+                                                      TaskStatus.RETRYING):
+            return
+        self._queue.put_nowait(
+            (-task.priority.value, next(self._sequence), task.id))
+
+    def _after_execution(self, task: AutomationTask):
+        """任务执行后：需要重试的按退避时间重新入队，其余结束的任务通知等待方"""
+        if task.status == TaskStatus.RETRYING:
+            delay = min(self.retry_backoff * 2**(task.retry_count - 1),
+                        self.max_retry_backoff)
+            self.logger.info(f"任务将在 {delay:.1f} 秒后重试: {task.name}")
+            self._retry_handles[task.id] = asyncio.get_running_loop(
+            ).call_later(delay, self._requeue, task.id)
+        else:
+            self._resolve(task)
+
+    def _requeue(self, task_id: str):
+        self._retry_handles.pop(task_id, None)
+        task = self.tasks.get(task_id)
+        if task is not None:
+            self._enqueue(task)
+
+    def _resolve(self, task: AutomationTask, deleted: bool = False):
+        """任务结束，从内存中移除并唤醒 wait_for_task 的等待方"""
+        self.tasks.pop(task.id, None)
+        handle = self._retry_handles.pop(task.id, None)
+        if handle is not None:
+            handle.cancel()
+        future = self._futures.pop(task.id, None)
+        if future is not None and not future.done():
+            future.set_result(None if deleted else task)
+
     async def _execute_task(self, task: AutomationTask):
         """执行单个任务"""
         task.status = TaskStatus.RUNNING
         task.started_at = datetime.now()
-        self._save_tasks()
+        self._save_task(task)
+        self._notify("start", task)
 
         self.logger.info(f"开始执行任务: {task.name} (ID: {task.id})")
 
         try:
             # 这里调用实际的文档生成逻辑
-            from doc_agent.core.container import container
-            result = await self._run_document_generation(task.topic)
+            result = await self._run_document_generation(task.topic, task.id)
 
             task.status = TaskStatus.COMPLETED
             task.completed_at = datetime.now()
@@ -296,38 +470,59 @@ class AutomationScheduler:
                     f"任务失败: {task.name} (ID: {task.id}), 错误: {e}")
 
         finally:
-            self._save_tasks()
+            # 监听器可以在保存前把本次执行的统计写入任务元数据
+            self._notify("end", task)
+            self._save_task(task)
+
+    def _notify(self, event: str, task: AutomationTask):
+        for listener in self.task_listeners:
+            try:
+                listener(event, task)
+            except Exception as e:
+                self.logger.error(f"任务监听器执行失败: {e}")
 
-    async def _run_document_generation(self, topic: str) -> dict:
-        """运行文档生成"""
+    async def _run_document_generation(self, topic: str, job_id: str) -> dict:
+        """运行文档生成（以任务ID作为作业ID，各任务使用独立的作业存储）"""
         # 这里调用您的文档生成图
-        from doc_agent.core.container import container
+        from doc_agent.core.container import get_container
+        from doc_agent.graph.common import release_job_store
 
-        graph_input = {"topic": topic}
+        graph_input = {"topic": topic, "job_id": job_id}
         result = None
 
-        async for step in container.main_graph.astream(graph_input):
-            step_name = list(step.keys())[0]
-            step_output = list(step.values())[0]
+        container = get_container()
+        try:
+            async for step in container.main_graph.astream(graph_input):
+                step_name = list(step.keys())[0]
+                step_output = list(step.values())[0]
 
-            # 记录步骤执行
-            self.logger.info(f"执行步骤: {step_name}")
+                # 记录步骤执行
+                self.logger.info(f"执行步骤: {step_name}")
 
-            # 保存最终结果
-            if step_name == "finalize_document":
-                result = step_output
+                # 保存最终结果
+                if step_name == "finalize_document":
+                    result = step_output
+        finally:
+            # 作业结束（包括失败和取消）后释放作业存储，并取消未完成的检索预取
+            release_job_store(job_id)
+            container.retrieval_prefetcher.release(job_id)
 
         return result or {"status": "completed", "topic": topic}
 
     def get_statistics(self) -> dict:
         """获取调度器统计信息"""
-        total = len(self.tasks)
-        status_counts = {}
-        for status in TaskStatus:
-            status_counts[status.value] = len(self.get_tasks(status=status))
+        counts = self._store.count_by("status")
+        total = sum(counts.values())
+        status_counts = {
+            status.value: counts.get(status.value, 0)
+            for status in TaskStatus
+        }
 
         return {
             "total_tasks": total,
             "status_counts": status_counts,
-            "running": self.running
+            "running": self.running,
+            "max_workers": self.max_workers,
+            "active_workers": self._active_count,
+            "queue_size": self._queue.qsize() if self._queue else 0
         }
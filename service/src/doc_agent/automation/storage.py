@@ -0,0 +1,282 @@
+"""
+自动化模块状态存储
+
+基于 SQLite（WAL 模式）的记录存储，供调度器、执行器和监控器持久化状态：
+- 每次状态变更只写入变化的那一条记录，不再整体重写 JSON 文件
+- 写入在事务中完成，进程崩溃不会损坏已有数据
+- 常用过滤字段单独成列并建立索引，按状态、优先级等条件查询无需加载全部历史
+- 定期执行检查点并按上限裁剪旧记录，控制 WAL 文件和历史数据的大小
+- 首次打开时自动迁移旧版 JSON 存储文件
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Optional, Union
+
+# 过滤条件后缀 -> SQL 比较运算符
+_OPERATORS = {"lt": "<", "le": "<=", "gt": ">", "ge": ">="}
+
+
+class RecordStore:
+    """
+    单表记录存储
+
+    记录以 JSON 保存在 data 列，indexes 中的字段同时写入独立的索引列用于过滤和排序
+
+    Args:
+        db_path: 数据库文件路径
+        table: 表名
+        key: 记录主键字段
+        indexes: 需要建立索引的字段
+        max_records: 保留的最大记录数，超出时在压缩时删除最早写入的记录；None 表示不限制
+        compact_interval: 每写入多少次执行一次压缩
+    """
+
+    def __init__(self,
+                 db_path: Union[str, Path],
+                 table: str,
+                 key: str = "id",
+                 indexes: tuple[str, ...] = (),
+                 max_records: Optional[int] = None,
+                 compact_interval: int = 500):
+        for name in (table, key, *indexes):
+            if not name.isidentifier():
+                raise ValueError(f"非法的表名或字段名: {name}")
+
+        self.db_path = Path(db_path)
+        self.table = table
+        self.key = key
+        self.indexes = indexes
+        self.max_records = max_records
+        self.compact_interval = compact_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._writes = 0
+        self._lock = threading.RLock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path),
+                                     check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 已保证崩溃后数据库一致，只在检查点时同步磁盘
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_table()
+
+    def _create_table(self):
+        index_columns = "".join(f", {column}" for column in self.indexes)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            f"seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            f"record_key TEXT NOT NULL UNIQUE{index_columns}, data TEXT NOT NULL)"
+        )
+        for column in self.indexes:
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_{column} "
+                f"ON {self.table} ({column})")
+
+    def put(self, record: dict):
+        """写入（新增或覆盖）一条记录"""
+        self.put_many([record])
+
+    def put_many(self, records: list[dict]):
+        """在一个事务中写入多条记录"""
+        if not records:
+            return
+        columns = ", ".join(("record_key", *self.indexes, "data"))
+        placeholders = ", ".join("?" * (len(self.indexes) + 2))
+        updates = ", ".join(f"{column}=excluded.{column}"
+                            for column in (*self.indexes, "data"))
+        rows = [(str(record[self.key]),
+                 *(record.get(column) for column in self.indexes),
+                 json.dumps(record, ensure_ascii=False)) for record in records]
+        with self._lock:
+            with self._transaction():
+                self._conn.executemany(
+                    f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders}) "
+                    f"ON CONFLICT(record_key) DO UPDATE SET {updates}", rows)
+            self._after_write(len(rows))
+
+    def delete(self, *keys: str) -> int:
+        """删除记录，返回删除的数量"""
+        if not keys:
+            return 0
+        with self._lock:
+            with self._transaction():
+                cursor = self._conn.executemany(
+                    f"DELETE FROM {self.table} WHERE record_key = ?",
+                    [(str(key), ) for key in keys])
+            self._after_write(len(keys))
+            return cursor.rowcount
+
+    def get(self, key: str) -> Optional[dict]:
+        """按主键读取记录"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT data FROM {self.table} WHERE record_key = ?",
+                (str(key), )).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self,
+              filters: Optional[dict[str, Any]] = None,
+              order_by: tuple[str, ...] = (),
+              limit: Optional[int] = None) -> list[dict]:
+        """
+        按索引列查询记录
+
+        Args:
+            filters: 过滤条件。值为列表/元组时表示 IN，字段名带 __lt/__le/__gt/__ge 后缀时表示比较
+            order_by: 排序字段，字段名前加 "-" 表示倒序；默认按写入顺序
+            limit: 返回的最大记录数
+
+        Returns:
+            list[dict]: 记录列表
+        """
+        where, params = self._where(filters)
+        order = ", ".join(
+            f"{column.lstrip('-')} {'DESC' if column.startswith('-') else 'ASC'}"
+            for column in order_by) or "seq ASC"
+        for column in order_by:
+            self._check_column(column.lstrip("-"))
+        sql = f"SELECT data FROM {self.table}{where} ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def keys(self, filters: Optional[dict[str, Any]] = None) -> list[str]:
+        """返回满足条件的记录主键"""
+        where, params = self._where(filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT record_key FROM {self.table}{where} ORDER BY seq",
+                params).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, filters: Optional[dict[str, Any]] = None) -> int:
+        """统计满足条件的记录数"""
+        where, params = self._where(filters)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM {self.table}{where}",
+                params).fetchone()[0]
+
+    def count_by(self, column: str) -> dict[Any, int]:
+        """按索引列分组计数"""
+        self._check_column(column)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {column}, COUNT(*) FROM {self.table} GROUP BY {column}"
+            ).fetchall()
+        return dict(rows)
+
+    def sum(self, *columns: str) -> dict[str, float]:
+        """对索引列求和"""
+        for column in columns:
+            self._check_column(column)
+        if not columns:
+            return {}
+        selects = ", ".join(f"COALESCE(SUM({column}), 0)" for column in columns)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {selects} FROM {self.table}").fetchone()
+        return dict(zip(columns, row))
+
+    def compact(self):
+        """裁剪超出上限的旧记录，并把 WAL 内容写回主库后截断 WAL 文件"""
+        with self._lock:
+            if self.max_records is not None:
+                with self._transaction():
+                    self._conn.execute(
+                        f"DELETE FROM {self.table} WHERE seq <= "
+                        f"(SELECT seq FROM {self.table} ORDER BY seq DESC "
+                        f"LIMIT 1 OFFSET ?)", (self.max_records, ))
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._writes = 0
+
+    def migrate_json(self, json_file: Union[str, Path]) -> int:
+        """
+        导入旧版 JSON 存储文件（记录列表），导入后将文件重命名为 .migrated
+
+        Returns:
+            int: 导入的记录数
+        """
+        json_file = Path(json_file)
+        if not json_file.exists():
+            return 0
+        try:
+            with open(json_file, encoding='utf-8') as f:
+                records = json.load(f)
+            self.put_many(records)
+            json_file.rename(json_file.with_name(json_file.name + ".migrated"))
+            self.logger.info(
+                f"已将 {json_file} 中的 {len(records)} 条记录迁移到 {self.db_path}")
+            return len(records)
+        except Exception as e:
+            self.logger.error(f"迁移旧版存储文件失败 {json_file}: {e}")
+            return 0
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def _after_write(self, count: int):
+        self._writes += count
+        if self._writes >= self.compact_interval:
+            try:
+                self.compact()
+            except sqlite3.Error as e:
+                self.logger.error(f"压缩存储失败 {self.db_path}: {e}")
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    def _check_column(self, column: str):
+        if column not in self.indexes:
+            raise ValueError(f"字段 {column} 没有建立索引，无法用于查询")
+
+    def _where(self,
+               filters: Optional[dict[str, Any]]) -> tuple[str, list[Any]]:
+        clauses = []
+        params: list[Any] = []
+        for name, value in (filters or {}).items():
+            column, _, suffix = name.partition("__")
+            self._check_column(column)
+            if suffix:
+                if suffix not in _OPERATORS:
+                    raise ValueError(f"不支持的过滤条件: {name}")
+                clauses.append(f"{column} {_OPERATORS[suffix]} ?")
+                params.append(value)
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                values = list(value)
+                if not values:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            elif value is None:
+                clauses.append(f"{column} IS NULL")
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+
+class _Transaction:
+    """显式事务：正常退出时提交，异常时回滚"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -2,6 +2,7 @@
 Common utilities and components for the doc_agent package.
 """
 
+from doc_agent.common.prompt_registry import CompiledPrompt, PromptRegistry
 from doc_agent.common.prompt_selector import PromptSelector, get_prompt
 
 
@@ -77,4 +78,7 @@ def parse_planner_response(response: str):
         raise ValueError(f"Failed to parse planner response: {e}") from e
 
 
-__all__ = ['PromptSelector', 'get_prompt', 'parse_planner_response']
+__all__ = [
+    'CompiledPrompt', 'PromptRegistry', 'PromptSelector', 'get_prompt',
+    'parse_planner_response'
+]
@@ -0,0 +1,270 @@
+"""
+Prompt 模板注册表
+
+容器启动时按 (工作流, 节点, genre, 版本) 预编译所有 prompt 模板：
+- 模板只解析一次，渲染时直接拼接字面量片段和变量值，不再逐次解析格式串
+- 只允许 {name} 形式的占位符，拒绝属性访问、下标和格式说明，避免格式串注入
+- prompt 模块文件被修改后自动重新加载并重新编译，无需重启进程
+- 记录每个模板的渲染次数和耗时
+"""
+
+import importlib
+import os
+import string
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from doc_agent.core.logger import logger
+
+# 模板键：(工作流类型, 节点名称, genre, 版本)
+PromptKey = tuple[str, str, str, str]
+
+_FORMATTER = string.Formatter()
+
+
+class RenderStats:
+    """单个模板的渲染统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "avg_ms": round(self.total_seconds * 1000 / self.count, 3)
+            if self.count else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3)
+        }
+
+
+class CompiledPrompt(str):
+    """
+    预编译的 prompt 模板
+
+    继承 str，现有调用方可以继续把它当作模板字符串使用；
+    format 被替换为基于预解析片段的快速渲染，并记录渲染耗时
+    """
+
+    def __new__(cls, template: str, key: Optional[PromptKey] = None):
+        compiled = super().__new__(cls, template)
+        compiled.key = key
+        compiled.stats = RenderStats()
+        compiled._literals, compiled._fields = cls._compile(template)
+        return compiled
+
+    @staticmethod
+    def _compile(template: str) -> tuple[list[str], list[str]]:
+        """把模板拆成字面量片段和占位符名称，literals 比 fields 多一个"""
+        literals = [""]
+        fields = []
+        for literal, field_name, format_spec, conversion in _FORMATTER.parse(
+                template):
+            literals[-1] += literal
+            if field_name is None:
+                continue
+            if not field_name.isidentifier() or format_spec or conversion:
+                raise ValueError(
+                    f"prompt 模板只支持 {{name}} 形式的占位符，不支持: "
+                    f"{{{field_name}{'!' + conversion if conversion else ''}"
+                    f"{':' + format_spec if format_spec else ''}}}")
+            fields.append(field_name)
+            literals.append("")
+        return literals, fields
+
+    @property
+    def fields(self) -> list[str]:
+        """模板中的占位符名称（按出现顺序）"""
+        return list(self._fields)
+
+    def render(self, **values: Any) -> str:
+        """
+        渲染模板，多余的参数会被忽略
+
+        Raises:
+            KeyError: 缺少模板需要的变量
+        """
+        start = time.perf_counter()
+        literals = self._literals
+        pieces = [literals[0]]
+        for index, field_name in enumerate(self._fields, 1):
+            value = values[field_name]
+            pieces.append(value if isinstance(value, str) else str(value))
+            pieces.append(literals[index])
+        rendered = "".join(pieces)
+        self.stats.record(time.perf_counter() - start)
+        return rendered
+
+    def format(self, *args: Any, **kwargs: Any) -> str:
+        """与 str.format 兼容的入口（仅支持关键字参数）"""
+        if args:
+            raise TypeError("CompiledPrompt.format 只接受关键字参数")
+        return self.render(**kwargs)
+
+
+class PromptRegistry:
+    """
+    预编译 prompt 模板注册表
+
+    Args:
+        resolver: (工作流类型, 节点名称, genre) -> (版本, 模板, 模块路径) 的解析函数
+        reload_interval: 检查 prompt 模块文件是否变更的最小间隔（秒），None 表示不自动重载
+    """
+
+    def __init__(self,
+                 resolver: Callable[[str, str, str], tuple[str, str, str]],
+                 reload_interval: Optional[float] = 2.0):
+        self._resolver = resolver
+        self.reload_interval = reload_interval
+        # (工作流类型, 节点名称, genre) -> 编译后的模板
+        self._selected: dict[tuple[str, str, str], CompiledPrompt] = {}
+        # 模板键 -> 编译后的模板
+        self._compiled: dict[PromptKey, CompiledPrompt] = {}
+        # 模板键 -> 模块路径，用于模块重载后失效对应模板
+        self._key_modules: dict[PromptKey, str] = {}
+        # 模块路径 -> 文件修改时间
+        self._module_mtimes: dict[str, float] = {}
+        self._last_reload_check = time.monotonic()
+        self._lock = threading.RLock()
+
+    def get(self, workflow_type: str, node_name: str,
+            genre: str) -> CompiledPrompt:
+        """获取节点在指定 genre 下的编译模板，首次访问时解析并编译"""
+        self._maybe_reload()
+        selection = (workflow_type, node_name, genre)
+        compiled = self._selected.get(selection)
+        if compiled is not None:
+            return compiled
+
+        with self._lock:
+            version, template, module_path = self._resolver(
+                workflow_type, node_name, genre)
+            if not isinstance(template, str):
+                # 非字符串模板（如按风格分组的字典）原样返回，由调用方自行处理
+                return template
+            key = (workflow_type, node_name, genre, version)
+            compiled = self.compile(key, template, module_path)
+            self._selected[selection] = compiled
+            return compiled
+
+    def compile(self,
+                key: PromptKey,
+                template: str,
+                module_path: Optional[str] = None) -> CompiledPrompt:
+        """编译并登记一个模板；相同键且内容未变时直接返回已编译的模板"""
+        compiled = self._compiled.get(key)
+        if compiled is not None and str.__eq__(compiled, template):
+            return compiled
+
+        with self._lock:
+            compiled = template if isinstance(
+                template, CompiledPrompt) and template.key == key else \
+                CompiledPrompt(template, key)
+            self._compiled[key] = compiled
+            if module_path:
+                self._key_modules[key] = module_path
+                self._track_module(module_path)
+            logger.debug(f"编译 prompt 模板: {'.'.join(key)}")
+            return compiled
+
+    def build(self, selections: list[tuple[str, str, str]]) -> int:
+        """
+        预编译一组 (工作流类型, 节点名称, genre)，无法解析的组合跳过
+
+        Returns:
+            int: 成功编译的模板数量
+        """
+        built = 0
+        for workflow_type, node_name, genre in selections:
+            try:
+                self.get(workflow_type, node_name, genre)
+                built += 1
+            except Exception as e:
+                logger.debug(
+                    f"预编译 prompt 失败: {workflow_type}.{node_name} "
+                    f"(genre: {genre}): {e}")
+        return built
+
+    def invalidate(self):
+        """清空节点到模板的选择缓存（如 genre 策略变更后），已编译模板在下次访问时复用"""
+        with self._lock:
+            self._selected.clear()
+
+    def reload(self, force: bool = False) -> list[str]:
+        """
+        重新加载文件发生变化的 prompt 模块并失效相关模板
+
+        Args:
+            force: 为 True 时不比较修改时间，重新加载所有已登记的模块
+
+        Returns:
+            list[str]: 被重新加载的模块路径
+        """
+        reloaded = []
+        with self._lock:
+            for module_path, mtime in list(self._module_mtimes.items()):
+                current = self._module_mtime(module_path)
+                if not force and (current is None or current == mtime):
+                    continue
+                try:
+                    importlib.reload(importlib.import_module(module_path))
+                except Exception as e:
+                    logger.error(f"重新加载 prompt 模块 {module_path} 失败: {e}")
+                    continue
+                if current is not None:
+                    self._module_mtimes[module_path] = current
+                reloaded.append(module_path)
+
+            if reloaded:
+                stale = [
+                    key for key, module_path in self._key_modules.items()
+                    if module_path in reloaded
+                ]
+                for key in stale:
+                    self._compiled.pop(key, None)
+                    self._key_modules.pop(key, None)
+                self._selected.clear()
+                logger.info(f"prompt 模块已热重载: {reloaded}，失效 {len(stale)} 个模板")
+        return reloaded
+
+    def render_stats(self) -> dict[str, dict[str, float]]:
+        """按模板键返回渲染统计"""
+        return {
+            ".".join(key): compiled.stats.to_dict()
+            for key, compiled in self._compiled.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+    def _maybe_reload(self):
+        if self.reload_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_reload_check < self.reload_interval:
+            return
+        self._last_reload_check = now
+        self.reload()
+
+    def _track_module(self, module_path: str):
+        if module_path not in self._module_mtimes:
+            mtime = self._module_mtime(module_path)
+            if mtime is not None:
+                self._module_mtimes[module_path] = mtime
+
+    @staticmethod
+    def _module_mtime(module_path: str) -> Optional[float]:
+        try:
+            module_file = importlib.import_module(module_path).__file__
+            return os.stat(module_file).st_mtime if module_file else None
+        except (ImportError, OSError):
+            return None
@@ -10,6 +10,8 @@ from pathlib import Path
 from typing import Any, Optional
 
 import yaml
+
+from doc_agent.common.prompt_registry import CompiledPrompt, PromptRegistry
 from doc_agent.core.logger import logger
 
 
@@ -21,13 +23,17 @@ class PromptSelector:
     实现灵活的 prompt 管理。现在支持 genre-aware 功能。
     """
 
-    def __init__(self, genre_strategies: Optional[dict] = None):
+    def __init__(self,
+                 genre_strategies: Optional[dict] = None,
+                 reload_interval: Optional[float] = 2.0):
         """
         初始化 PromptSelector。
 
         Args:
             genre_strategies (Optional[Dict]): genre 策略字典，如果为 None 则从 genres.yaml 加载
+            reload_interval (Optional[float]): 检查 prompt 模块变更的间隔（秒），None 表示不自动热重载
         """
+        self.registry = PromptRegistry(self._resolve_prompt, reload_interval)
         if genre_strategies is None:
             self.genre_strategies = self._load_genre_strategies()
         else:
@@ -86,17 +92,94 @@ class PromptSelector:
     def get_prompt(self,
                    workflow_type: str,
                    node_name: str,
-                   genre: str = "default") -> str:
+                   genre: str = "default") -> CompiledPrompt:
         """
         基于工作流类型、节点名称和 genre 获取特定的 prompt。
 
+        模板在首次访问（或容器启动时 warm_up）时编译并缓存，之后直接返回编译结果。
+
         Args:
             workflow_type (str): 工作流类型（例如："chapter_workflow", "prompts"）
             node_name (str): 节点名称（例如："writer", "planner", "supervisor"）
             genre (str): genre 类型（例如："work_report", "speech_draft"），默认为 "default"
 
         Returns:
-            str: 请求的 prompt 模板
+            CompiledPrompt: 请求的 prompt 模板（str 子类，format 走预编译的快速渲染）
+
+        Raises:
+            ImportError: 如果模块无法导入
+            KeyError: 如果版本在模块中不存在
+            AttributeError: 如果模块中不存在 PROMPTS 字典
+            ValueError: 如果 genre 或节点在策略中不存在
+        """
+        return self.registry.get(workflow_type, node_name, genre)
+
+    def compile_prompt(self, workflow_type: str, node_name: str, genre: str,
+                       version: str, template: str) -> CompiledPrompt:
+        """编译调用方自行选定版本的模板（如按复杂度选择的 writer 模板），纳入注册表统计"""
+        return self.registry.compile((workflow_type, node_name, genre, version),
+                                     template)
+
+    def warm_up(self, workflow_types: Optional[list[str]] = None) -> int:
+        """
+        预编译所有 genre 中配置的节点模板，在容器启动时调用
+
+        Returns:
+            int: 成功编译的模板数量
+        """
+        workflow_types = workflow_types or ["chapter_workflow"]
+        selections = [(workflow_type, node_name, genre)
+                      for workflow_type in workflow_types
+                      for genre in self.genre_strategies
+                      for node_name in self.list_available_nodes_for_genre(genre)
+                      if self._has_prompt(workflow_type, node_name, genre)]
+        built = self.registry.build(selections)
+        logger.info(f"预编译 prompt 模板完成: {built}/{len(selections)}")
+        return built
+
+    def reload_prompts(self,
+                       genre_strategies: Optional[dict] = None) -> list[str]:
+        """
+        热重载 prompt：重新加载已修改的 prompt 模块，可选地替换 genre 策略（切换版本）
+
+        Returns:
+            list[str]: 被重新加载的模块路径
+        """
+        if genre_strategies is not None:
+            self.genre_strategies = genre_strategies
+            self.registry.invalidate()
+        return self.registry.reload(force=genre_strategies is None)
+
+    def render_stats(self) -> dict[str, dict[str, float]]:
+        """返回每个模板的渲染次数和耗时统计"""
+        return self.registry.render_stats()
+
+    def _has_prompt(self, workflow_type: str, node_name: str,
+                    genre: str) -> bool:
+        """预检查 genre 配置的版本是否存在，避免预编译时为未实现的版本刷错误日志"""
+        version = self.genre_strategies[genre].get('prompt_versions',
+                                                   {}).get(node_name)
+        try:
+            module = importlib.import_module(
+                self._module_path(workflow_type, node_name))
+        except ImportError:
+            return False
+        prompts_dict = getattr(module, 'PROMPTS', None)
+        return prompts_dict is None or version in prompts_dict
+
+    def _module_path(self, workflow_type: str, node_name: str) -> str:
+        if workflow_type == "chapter_workflow":
+            # chapter_workflow 的 prompt 模块在 prompts 目录下
+            return f"doc_agent.prompts.{node_name}"
+        return f"doc_agent.{workflow_type}.{node_name}"
+
+    def _resolve_prompt(self, workflow_type: str, node_name: str,
+                        genre: str) -> tuple[str, str, str]:
+        """
+        解析 genre 策略并从 prompt 模块中取出模板，只在模板首次编译或热重载后调用。
+
+        Returns:
+            tuple[str, str, str]: (版本, prompt 模板, 模块路径)
 
         Raises:
             ImportError: 如果模块无法导入
@@ -125,11 +208,7 @@ class PromptSelector:
             logger.debug(f"Genre '{genre}' 为节点 '{node_name}' 选择版本: {version}")
 
             # 3. 构建模块路径
-            if workflow_type == "chapter_workflow":
-                # chapter_workflow 的 prompt 模块在 prompts 目录下
-                module_path = f"doc_agent.prompts.{node_name}"
-            else:
-                module_path = f"doc_agent.{workflow_type}.{node_name}"
+            module_path = self._module_path(workflow_type, node_name)
 
             logger.debug(f"尝试导入模块: {module_path}")
 
@@ -152,12 +231,12 @@ class PromptSelector:
                 logger.debug(
                     f"成功获取 prompt: {workflow_type}.{node_name}.{version} (genre: {genre})"
                 )
-                return prompt
+                return version, prompt, module_path
             else:
                 # 备用方案：查找独立的 prompt 变量
                 prompt_vars = self._get_prompt_variables(module, version)
                 if prompt_vars:
-                    return prompt_vars
+                    return version, prompt_vars, module_path
                 else:
                     # 尝试从模块中获取任何可用的 prompt
                     available_prompts = self._get_all_prompt_variables(module)
@@ -167,7 +246,7 @@ class PromptSelector:
                         logger.debug(
                             f"为 {workflow_type}.{node_name} (genre: {genre}) 使用第一个可用的 prompt"
                         )
-                        return first_prompt
+                        return version, first_prompt, module_path
                     else:
                         raise AttributeError(
                             f"模块 {module_path} 不包含 PROMPTS 字典或兼容的 prompt 变量")
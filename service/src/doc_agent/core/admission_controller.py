@@ -0,0 +1,310 @@
+"""
+API 任务准入控制
+
+替代进程内固定的信号量，按任务类型（大纲、文档、编辑）分通道排队：
+- 每个通道有独立的并发上限和排队上限，排队已满时拒绝新任务（API 返回 429 + Retry-After）
+- 多个通道同时有排队任务时，按权重（步幅调度）分配空闲名额，批量的长文档不会堵住短的交互任务
+- 根据观测到的 LLM 端点首字节时延动态收缩总并发和通道并发，端点恢复后自动放开
+- 可以查询任务的排队位置和预计开始时间
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+from doc_agent.core.config import AdmissionConfig, AdmissionLaneConfig
+from doc_agent.core.logger import logger
+from doc_agent.llm_clients.latency import LatencyTracker, llm_latency
+
+
+class QueueFullError(Exception):
+    """通道排队已满"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"{lane} 任务排队已满，请 {retry_after} 秒后重试")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """一个排队或执行中的任务"""
+
+    def __init__(self, ticket_id: str, lane: str):
+        self.ticket_id = ticket_id
+        self.lane = lane
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.released = False
+        self._started = asyncio.get_running_loop().create_future()
+
+    @property
+    def running(self) -> bool:
+        return self.started_at is not None and not self.released
+
+
+class _Lane:
+    """单个通道的排队和执行状态"""
+
+    def __init__(self, name: str, config: AdmissionLaneConfig):
+        self.name = name
+        self.config = config
+        self.waiting: deque[AdmissionTicket] = deque()
+        self.running = 0
+        # 步幅调度的累计值，每启动一个任务增加 1 / weight，取最小者优先
+        self.pass_value = 0.0
+        # 任务耗时的滑动平均，用于估算排队时间
+        self.avg_duration = config.expected_duration
+
+
+class AdmissionController:
+    """
+    分通道、带权重的任务准入控制器
+
+    Args:
+        config: 准入控制配置
+        latency_tracker: LLM 端点时延统计，用于动态调整并发上限
+        duration_alpha: 任务耗时滑动平均中新样本的权重
+    """
+
+    def __init__(self,
+                 config: AdmissionConfig,
+                 latency_tracker: LatencyTracker = llm_latency,
+                 duration_alpha: float = 0.2):
+        if not config.lanes:
+            raise ValueError("准入控制至少需要配置一个通道")
+        self.config = config
+        self.latency_tracker = latency_tracker
+        self.duration_alpha = duration_alpha
+        self._lanes = {
+            name: _Lane(name, lane_config)
+            for name, lane_config in config.lanes.items()
+        }
+        self._tickets: dict[str, AdmissionTicket] = {}
+        # 持有后台任务的引用，避免执行中被垃圾回收
+        self._jobs: set[asyncio.Task] = set()
+        self._running = 0
+        self._virtual_time = 0.0
+        self.stats = {"admitted": 0, "rejected": 0, "completed": 0}
+
+    # ------------------------------------------------------------------
+    # 准入
+    # ------------------------------------------------------------------
+
+    def submit(self, lane: str, ticket_id: str,
+               job: Callable[[], Awaitable]) -> asyncio.Task:
+        """
+        提交后台任务：立即完成排队检查，获得名额后在后台执行
+
+        Raises:
+            QueueFullError: 通道排队已满
+        """
+        ticket = self._enqueue(lane, ticket_id)
+
+        async def run():
+            async with self._hold(ticket):
+                try:
+                    await job()
+                except Exception as e:
+                    logger.error(f"{lane} 任务 {ticket_id} 执行失败: {e}")
+
+        task = asyncio.create_task(run())
+        self._jobs.add(task)
+        task.add_done_callback(self._jobs.discard)
+        return task
+
+    async def acquire(self, lane: str, ticket_id: str) -> AdmissionTicket:
+        """
+        排队并等待获得执行名额，用完后必须调用 release
+
+        Raises:
+            QueueFullError: 通道排队已满
+        """
+        ticket = self._enqueue(lane, ticket_id)
+        await self._wait(ticket)
+        return ticket
+
+    @asynccontextmanager
+    async def slot(self, lane: str, ticket_id: str):
+        """排队获得执行名额，退出时释放"""
+        ticket = self._enqueue(lane, ticket_id)
+        async with self._hold(ticket):
+            yield ticket
+
+    def release(self, ticket: AdmissionTicket):
+        """释放名额（重复调用无影响），并把空闲名额分配给排队的任务"""
+        if ticket.released:
+            return
+        ticket.released = True
+        self._tickets.pop(ticket.ticket_id, None)
+        lane = self._lanes[ticket.lane]
+        if ticket.started_at is None:
+            # 尚未开始执行，直接移出队列
+            try:
+                lane.waiting.remove(ticket)
+            except ValueError:
+                pass
+            return
+
+        lane.running -= 1
+        self._running -= 1
+        self.stats["completed"] += 1
+        duration = time.monotonic() - ticket.started_at
+        lane.avg_duration += self.duration_alpha * (duration -
+                                                    lane.avg_duration)
+        self._dispatch()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def position(self, ticket_id: str) -> Optional[dict]:
+        """
+        查询任务的排队位置和预计开始时间
+
+        Returns:
+            Optional[dict]: 任务已结束或不存在时返回 None
+        """
+        ticket = self._tickets.get(ticket_id)
+        if ticket is None:
+            return None
+        lane = self._lanes[ticket.lane]
+        if ticket.running:
+            return {
+                "ticket_id": ticket_id,
+                "lane": ticket.lane,
+                "status": "running",
+                "position": 0,
+                "eta_seconds": 0
+            }
+
+        position = lane.waiting.index(ticket) + 1
+        # 排在前面的任务按通道并发分批执行，每批约需一个平均耗时
+        batches = math.ceil(position / self._lane_limit(lane))
+        return {
+            "ticket_id": ticket_id,
+            "lane": ticket.lane,
+            "status": "queued",
+            "position": position,
+            "eta_seconds": round(batches * lane.avg_duration)
+        }
+
+    def snapshot(self) -> dict:
+        """当前的并发上限、各通道排队情况和端点时延"""
+        return {
+            "max_concurrency": self._global_limit(),
+            "running": self._running,
+            "lanes": {
+                name: {
+                    "running": lane.running,
+                    "queued": len(lane.waiting),
+                    "max_concurrency": self._lane_limit(lane),
+                    "avg_duration_seconds": round(lane.avg_duration, 1)
+                }
+                for name, lane in self._lanes.items()
+            },
+            "llm_latency": self.latency_tracker.to_dict(),
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, lane_name: str, ticket_id: str) -> AdmissionTicket:
+        lane = self._lanes.get(lane_name)
+        if lane is None:
+            raise ValueError(f"未知的任务通道: {lane_name}")
+        if ticket_id in self._tickets:
+            raise ValueError(f"任务 {ticket_id} 已在排队或执行中")
+        # 端点时延回落后并发上限会放大，先把多出的名额分给已排队的任务
+        self._dispatch()
+
+        if not lane.waiting and lane.running == 0:
+            # 空闲通道重新开始排队时不能用积攒的步幅抢占其他通道
+            lane.pass_value = max(lane.pass_value, self._virtual_time)
+
+        ticket = AdmissionTicket(ticket_id, lane_name)
+        if not lane.waiting and self._can_start(lane):
+            self._start(lane, ticket)
+        elif len(lane.waiting) >= lane.config.max_queue:
+            self.stats["rejected"] += 1
+            retry_after = self._retry_after(lane)
+            logger.warning(f"{lane_name} 任务排队已满 ({len(lane.waiting)})，"
+                           f"拒绝任务 {ticket_id}，建议 {retry_after} 秒后重试")
+            raise QueueFullError(lane_name, retry_after)
+        else:
+            lane.waiting.append(ticket)
+            logger.info(f"任务 {ticket_id} 进入 {lane_name} 队列，"
+                        f"排在第 {len(lane.waiting)} 位")
+        self._tickets[ticket_id] = ticket
+        return ticket
+
+    async def _wait(self, ticket: AdmissionTicket):
+        try:
+            await ticket._started
+        except BaseException:
+            # 等待期间被取消：移出队列；若恰好已获得名额则归还
+            self.release(ticket)
+            raise
+
+    @asynccontextmanager
+    async def _hold(self, ticket: AdmissionTicket):
+        await self._wait(ticket)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def _can_start(self, lane: _Lane) -> bool:
+        return (self._running < self._global_limit()
+                and lane.running < self._lane_limit(lane))
+
+    def _start(self, lane: _Lane, ticket: AdmissionTicket):
+        lane.running += 1
+        self._running += 1
+        self._virtual_time = lane.pass_value
+        lane.pass_value += 1 / lane.config.weight
+        ticket.started_at = time.monotonic()
+        ticket._started.set_result(None)
+        self.stats["admitted"] += 1
+
+    def _dispatch(self):
+        """把空闲名额按步幅调度分配给各通道排队的任务"""
+        while self._running < self._global_limit():
+            candidates = [
+                lane for lane in self._lanes.values()
+                if lane.waiting and lane.running < self._lane_limit(lane)
+            ]
+            if not candidates:
+                return
+            lane = min(candidates, key=lambda item: item.pass_value)
+            self._start(lane, lane.waiting.popleft())
+
+    def _latency_scale(self) -> float:
+        """
+        首字节时延超出目标时的收缩比例（0~1]
+
+        只看流式调用的首字节时延：非流式调用的完整响应时延随输出长度增长，
+        长文档生成会被误判为端点过载
+        """
+        target = self.config.target_first_byte_latency
+        observed = self.latency_tracker.latency(streaming=True)
+        if observed and observed > target:
+            return target / observed
+        return 1.0
+
+    def _global_limit(self) -> int:
+        limit = math.floor(self.config.max_concurrency * self._latency_scale())
+        return max(self.config.min_concurrency, limit)
+
+    def _lane_limit(self, lane: _Lane) -> int:
+        limit = math.floor(lane.config.max_concurrency * self._latency_scale())
+        return max(1, limit)
+
+    def _retry_after(self, lane: _Lane) -> int:
+        """队首任务预计多久能开始执行（秒）"""
+        return max(1, math.ceil(lane.avg_duration / self._lane_limit(lane)))
@@ -34,6 +34,10 @@ class ElasticsearchConfig(BaseSettings):
     timeout: int = 30
     max_retries: int = 3
     retry_on_timeout: bool = True
+    metadata_ttl: float = 600.0  # 索引别名等元数据的后台刷新间隔（秒）
+    retrieval_mode: str = "rrf"  # 混合检索方式: rrf / knn_filter
+    knn_target_recall: float = 0.95  # kNN 候选数自适应的目标召回率
+    knn_target_latency_ms: float = 200.0  # kNN 候选数自适应的目标时延（毫秒）
 
 
 class TavilyConfig(BaseSettings):
@@ -150,6 +154,81 @@ class SearchConfig(BaseSettings):
     max_queries: int = 5
     max_results_per_query: int = 5
     max_search_rounds: int = 5
+    # 远程重排序时延预算（秒），超时改用本地BM25评分
+    rerank_latency_budget: Optional[float] = 3.0
+    # 远程重排序超时/失败后使用本地评分的冷却时间（秒）
+    rerank_degrade_cooldown: float = 30.0
+    # 只使用本地BM25评分（高负载下的低成本模式）
+    rerank_local_only: bool = False
+    # 批量重排序API地址，后端支持时一次请求处理多组查询
+    rerank_batch_url: Optional[str] = None
+    # 不支持批量接口时并行发送的最大重排序请求数
+    rerank_max_concurrency: int = 4
+    # 章节拆分后为后续章节在后台预取检索结果
+    prefetch_enabled: bool = True
+    # 后台预取的最大并发查询数
+    prefetch_concurrency: int = 4
+    # 每章最多预取的查询数（章节标题 + 子节标题）
+    prefetch_max_queries_per_chapter: int = 3
+
+
+class CodeExecuteConfig(BaseSettings):
+    """代码执行配置"""
+    # 使用预热的解释器池执行代码（仅 POSIX 系统），关闭时每次启动新的 python 子进程
+    pool_enabled: bool = True
+    # 工作进程数量（最大并发执行数）
+    pool_size: int = 2
+    # 工作进程启动时预先导入的模块，未安装的模块会被忽略
+    preload_modules: list[str] = [
+        "json", "math", "statistics", "datetime", "collections", "csv",
+        "numpy", "pandas"
+    ]
+    # 单个工作进程最多执行的次数，达到后回收重建
+    max_runs_per_worker: int = 50
+    # 工作进程内存上限（MB），超过后回收重建
+    max_worker_memory_mb: float = 512
+    # stdout/stderr 各自保留的最大字符数
+    max_output_chars: int = 20000
+
+
+class AdmissionLaneConfig(BaseSettings):
+    """准入控制单个通道的配置"""
+    # 多个通道同时有排队任务时按权重分配空闲的并发名额
+    weight: float = 1.0
+    # 通道内同时执行的最大任务数（端点时延升高时按比例收缩）
+    max_concurrency: int = 2
+    # 通道排队上限，超出时返回 429
+    max_queue: int = 20
+    # 单个任务的预估耗时（秒），在观测到实际耗时前用于估算排队时间
+    expected_duration: float = 60.0
+
+
+class AdmissionConfig(BaseSettings):
+    """API 任务准入控制配置"""
+    # 所有通道合计的最大并发任务数
+    max_concurrency: int = 6
+    # LLM 端点变慢时并发上限最低收缩到的值
+    min_concurrency: int = 1
+    # 流式调用的首字节时延目标（秒），超过时按比例收缩并发上限
+    # 非流式调用的完整响应时延随输出长度变化，不参与并发调整
+    target_first_byte_latency: float = 5.0
+    lanes: dict[str, AdmissionLaneConfig] = {
+        "outline":
+        AdmissionLaneConfig(weight=3.0,
+                            max_concurrency=2,
+                            max_queue=20,
+                            expected_duration=60.0),
+        "document":
+        AdmissionLaneConfig(weight=1.0,
+                            max_concurrency=2,
+                            max_queue=10,
+                            expected_duration=600.0),
+        "edit":
+        AdmissionLaneConfig(weight=6.0,
+                            max_concurrency=4,
+                            max_queue=50,
+                            expected_duration=15.0)
+    }
 
 
 class AppSettings(BaseSettings):
@@ -179,6 +258,8 @@ class AppSettings(BaseSettings):
         super().__init__(**kwargs)
         self._load_yaml_config()
         self._search_config = None  # 初始化搜索配置缓存
+        self._code_execute_config = None
+        self._admission_config = None
 
     def _load_yaml_config(self):
         """加载YAML配置文件"""
@@ -244,6 +325,28 @@ class AppSettings(BaseSettings):
                 self._search_config = SearchConfig()  # 使用默认配置
         return self._search_config
 
+    @property
+    def code_execute_config(self) -> CodeExecuteConfig:
+        """获取代码执行配置"""
+        if self._code_execute_config is None:
+            if self._yaml_config and 'code_execute' in self._yaml_config:
+                self._code_execute_config = CodeExecuteConfig(
+                    **self._yaml_config['code_execute'])
+            else:
+                self._code_execute_config = CodeExecuteConfig()
+        return self._code_execute_config
+
+    @property
+    def admission_config(self) -> AdmissionConfig:
+        """获取 API 任务准入控制配置"""
+        if self._admission_config is None:
+            if self._yaml_config and 'admission' in self._yaml_config:
+                self._admission_config = AdmissionConfig(
+                    **self._yaml_config['admission'])
+            else:
+                self._admission_config = AdmissionConfig()
+        return self._admission_config
+
     @property
     def tavily_config(self) -> TavilyConfig:
         """获取Tavily配置"""
@@ -383,7 +486,21 @@ class AppSettings(BaseSettings):
             'llm_timeout':
             level_config.get('llm_timeout', 180),
             'max_retries':
-            level_config.get('max_retries', 5)
+            level_config.get('max_retries', 5),
+            'rolling_context_chars':
+            level_config.get('rolling_context_chars', 3000),
+            'previous_tail_chars':
+            level_config.get('previous_tail_chars', 800),
+            'job_time_budget':
+            level_config.get('job_time_budget', -1),
+            'fusion_window_chapters':
+            level_config.get('fusion_window_chapters', 2),
+            'fusion_window_max_chars':
+            level_config.get('fusion_window_max_chars', 8000),
+            'fusion_max_concurrency':
+            level_config.get('fusion_max_concurrency', 4),
+            'fusion_tokens_per_second':
+            level_config.get('fusion_tokens_per_second', 40)
         }
 
     @property
@@ -405,6 +522,14 @@ class AppSettings(BaseSettings):
                 }
         return self._redis_config
 
+    @property
+    def output_dir(self) -> str:
+        """获取输出目录的绝对路径，相对路径以 service 目录为基准"""
+        output_dir = (self._yaml_config or {}).get('output_dir', 'output')
+        service_dir = os.path.abspath(
+            os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+        return os.path.join(service_dir, os.path.expanduser(output_dir))
+
     @property
     def redis_url(self) -> str:
         """获取Redis URL"""
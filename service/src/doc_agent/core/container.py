@@ -2,11 +2,11 @@ from functools import partial
 from pathlib import Path
 
 import yaml
-from doc_agent.core.logger import logger
 
 # 确保环境变量已加载
 from doc_agent.core.config import settings
 from doc_agent.core.env_loader import setup_environment
+from doc_agent.core.logger import logger
 
 setup_environment()
 
@@ -44,6 +44,7 @@ from doc_agent.tools import (
     get_all_tools,
     get_es_search_tool,
     get_reranker_tool,
+    get_retrieval_prefetcher,
     get_web_search_tool,
 )
 from doc_agent.tools.ai_editing_tool import AIEditingTool
@@ -150,10 +151,14 @@ class Container:
         self.web_search_tool = get_web_search_tool()
         self.es_search_tool = get_es_search_tool()
         self.reranker_tool = get_reranker_tool()
+        self.retrieval_prefetcher = get_retrieval_prefetcher(
+            self.es_search_tool, self.web_search_tool, self.reranker_tool)
         self.tools = get_all_tools()
 
         # 使用加载的 genre 策略初始化 PromptSelector
         self.prompt_selector = PromptSelector(self.genre_strategies)
+        # 启动时预编译所有 genre 的 prompt 模板
+        self.prompt_selector.warm_up()
 
         # 初始化 AI 编辑工具
         self.ai_editing_tool = AIEditingTool(
@@ -169,7 +174,8 @@ class Container:
         chapter_researcher_node = partial(async_researcher_node,
                                           web_search_tool=self.web_search_tool,
                                           es_search_tool=self.es_search_tool,
-                                          reranker_tool=self.reranker_tool)
+                                          reranker_tool=self.reranker_tool,
+                                          retrieval_prefetcher=self.retrieval_prefetcher)
         chapter_writer_node = partial(writer_node,
                                       llm_client=self.llm_client,
                                       prompt_selector=self.prompt_selector,
@@ -206,8 +212,10 @@ class Container:
             llm_client=self.llm_client,
             prompt_selector=self.prompt_selector,
             genre="default")
-        main_split_chapters_node = partial(split_chapters_node,
-                                           llm_client=self.llm_client)
+        main_split_chapters_node = partial(
+            split_chapters_node,
+            llm_client=self.llm_client,
+            retrieval_prefetcher=self.retrieval_prefetcher)
         main_fusion_editor_node = partial(fusion_editor_node,
                                           llm_client=self.llm_client)
 
@@ -285,7 +293,8 @@ class Container:
         chapter_researcher_node = partial(async_researcher_node,
                                           web_search_tool=self.web_search_tool,
                                           es_search_tool=self.es_search_tool,
-                                          reranker_tool=self.reranker_tool)
+                                          reranker_tool=self.reranker_tool,
+                                          retrieval_prefetcher=self.retrieval_prefetcher)
         chapter_graph = build_chapter_workflow_graph(
             planner_node=chapter_planner_node,
             researcher_node=chapter_researcher_node,
@@ -302,8 +311,10 @@ class Container:
             web_search_tool=self.web_search_tool,
             es_search_tool=self.es_search_tool,
             reranker_tool=self.reranker_tool)
-        main_split_chapters_node = partial(split_chapters_node,
-                                           llm_client=self.llm_client)
+        main_split_chapters_node = partial(
+            split_chapters_node,
+            llm_client=self.llm_client,
+            retrieval_prefetcher=self.retrieval_prefetcher)
         bibliography_node_func = partial(bibliography_node)
         fusion_editor_node_func = partial(fusion_editor_node,
                                           llm_client=self.llm_client)
@@ -387,15 +398,18 @@ class Container:
         chapter_researcher_node = partial(async_researcher_node,
                                           web_search_tool=self.web_search_tool,
                                           es_search_tool=self.es_search_tool,
-                                          reranker_tool=self.reranker_tool)
+                                          reranker_tool=self.reranker_tool,
+                                          retrieval_prefetcher=self.retrieval_prefetcher)
         chapter_graph = build_chapter_workflow_graph(
             planner_node=chapter_planner_node,
             researcher_node=chapter_researcher_node,
             writer_node=chapter_writer_node,
             supervisor_router_func=chapter_supervisor_router,
             reflection_node=reflection_node_func)
-        main_split_chapters_node = partial(split_chapters_node,
-                                           llm_client=self.llm_client)
+        main_split_chapters_node = partial(
+            split_chapters_node,
+            llm_client=self.llm_client,
+            retrieval_prefetcher=self.retrieval_prefetcher)
         bibliography_node_func = partial(bibliography_node)
         fusion_editor_node_func = partial(fusion_editor_node,
                                           llm_client=self.llm_client)
@@ -456,8 +470,10 @@ class Container:
 
     async def cleanup(self):
         """清理资源 (保持不变)"""
-        from doc_agent.tools import close_all_es_tools
+        from doc_agent.tools import close_all_es_tools, close_interpreter_pool
         await close_all_es_tools()
+        close_interpreter_pool()
+        await self.reranker_tool.aclose()
         print("🧹 Resources cleaned up.")
 
 
@@ -1,11 +1,13 @@
 """service/src/doc_agent/core/document_generator.py"""
 
+import time
 from typing import Optional
 
 from doc_agent.core.container import container
 from doc_agent.core.file_parser import parse_context_files
 from doc_agent.core.logger import logger
 from doc_agent.graph.callbacks import publish_event
+from doc_agent.graph.common import release_job_store
 from doc_agent.graph.state import ResearchState
 from doc_agent.tools.file_module import file_processor
 
@@ -51,6 +53,7 @@ def generate_initial_state(task_prompt: str,
 
     return ResearchState(
         job_id=task_id,
+        job_started_at=time.time(),
         task_prompt=task_prompt,
         topic=title,
         document_outline=document_outline,
@@ -72,9 +75,8 @@ def generate_initial_state(task_prompt: str,
         search_queries=[],
         gathered_sources=[],
         sources=[],
-        all_sources=[],
         current_citation_index=1,
-        cited_sources=[],
+        cited_source_ids=[],
         cited_sources_in_chapter=[],
         messages=[],
     )
@@ -147,3 +149,6 @@ async def generate_document_sync(task_id: str,
 
     except Exception as e:
         logger.error("Job {}: 后台文档生成任务失败。错误: {}", task_id, e, exc_info=True)
+    finally:
+        # 章节正文和引用源只在作业期间保留
+        release_job_store(task_id)
@@ -14,7 +14,7 @@ logger = get_logger(__name__)
 from doc_agent.common.prompt_selector import PromptSelector
 from doc_agent.core.config import settings
 from doc_agent.graph.callbacks import publish_event
-from doc_agent.graph.common import parse_planner_response
+from doc_agent.graph.common import get_job_store, parse_planner_response
 from doc_agent.graph.state import ResearchState
 from doc_agent.llm_clients.base import LLMClient
 
@@ -100,6 +100,8 @@ def planner_node(state: ResearchState,
                                     chapter_title=chapter_title,
                                     chapter_description=chapter_description,
                                     sub_sections_text=sub_sections_text)
+    if job_id:
+        get_job_store(job_id).prompt_prefixes.record("planner", prompt)
 
     logger.debug(f"Invoking LLM with prompt:\n{pprint(prompt)}")
 
@@ -14,9 +14,12 @@ logger = get_logger(__name__)
 from doc_agent.common.prompt_selector import PromptSelector
 from doc_agent.core.config import settings
 from doc_agent.graph.common import (
-    format_sources_to_text as _format_sources_to_text, )
+    format_sources_to_text as _format_sources_to_text,
+)
+from doc_agent.graph.common import get_job_store
 from doc_agent.graph.common import (
-    parse_reflection_response as _parse_reflection_response, )
+    parse_reflection_response as _parse_reflection_response,
+)
 from doc_agent.graph.state import ResearchState
 from doc_agent.llm_clients.base import LLMClient
 
@@ -127,6 +130,9 @@ async def reflection_node(state: ResearchState,
         chapter_description=chapter_description,
         original_queries=original_queries_text,
         gathered_data_summary=gathered_data_summary)
+    job_id = state.get("job_id")
+    if job_id:
+        get_job_store(job_id).prompt_prefixes.record("reflection", prompt)
 
     logger.debug(f"Invoking LLM with reflection prompt:\n{pprint(prompt)}")
 
@@ -199,6 +205,12 @@ def _get_simplified_prompt_template() -> str:
     return """
 你是研究专家。基于已收集的数据，生成2个更精确的搜索查询。
 
+**输出JSON格式:**
+{{
+  "new_queries": ["查询1", "查询2"],
+  "reasoning": "简要说明"
+}}
+
 **主题:** {topic}
 **章节:** {chapter_title}
 
@@ -207,31 +219,13 @@ def _get_simplified_prompt_template() -> str:
 
 **已收集数据摘要:**
 {gathered_data_summary}
-
-**输出JSON格式:**
-{{
-  "new_queries": ["查询1", "查询2"],
-  "reasoning": "简要说明"
-}}
 """
 
 
 def _get_fallback_prompt_template() -> str:
     """获取备用的提示词模板"""
     return """
-你是一个专业的研究专家和查询优化师。请分析现有的搜索查询和已收集的数据，生成更精确、更相关的搜索查询。
-
-**文档主题:** {topic}
-
-**当前章节信息:**
-- 章节标题: {chapter_title}
-- 章节描述: {chapter_description}
-
-**原始搜索查询:**
-{original_queries}
-
-**已收集的数据摘要:**
-{gathered_data_summary}
+你是一个专业的研究专家和查询优化师。请分析下方给出的原始搜索查询和已收集的数据，生成更精确、更相关的搜索查询。
 
 **任务要求:**
 1. 仔细分析已收集的数据，识别信息缺口、模糊之处或新的有趣方向
@@ -248,5 +242,17 @@ def _get_fallback_prompt_template() -> str:
 - new_queries: 新的搜索查询列表（数组，2-3个查询）
 - reasoning: 简要说明为什么需要这些新查询
 
+**文档主题:** {topic}
+
+**当前章节信息:**
+- 章节标题: {chapter_title}
+- 章节描述: {chapter_description}
+
+**原始搜索查询:**
+{original_queries}
+
+**已收集的数据摘要:**
+{gathered_data_summary}
+
 请立即开始分析并生成新的查询。
 """
@@ -4,7 +4,6 @@
 负责基于研究数据生成章节内容
 """
 
-import re
 from pprint import pformat as pprint
 from typing import Any
 
@@ -17,10 +16,17 @@ from doc_agent.common.prompt_selector import PromptSelector
 from doc_agent.core.config import settings
 from doc_agent.graph.callbacks import TokenStreamCallbackHandler
 from doc_agent.graph.common import (
-    format_requirements_to_text as _format_requirements_to_text, )
-from doc_agent.graph.common import format_sources_to_text as _format_sources_to_text
+    StreamingCitationTracker,
+    build_rolling_context,
+    get_job_store,
+    get_or_create_source_id,
+    load_completed_chapters,
+    require_job_id,
+)
 from doc_agent.graph.common import (
-    get_or_create_source_id, )
+    format_requirements_to_text as _format_requirements_to_text,
+)
+from doc_agent.graph.common import format_sources_to_text as _format_sources_to_text
 from doc_agent.graph.state import ResearchState
 from doc_agent.llm_clients.base import LLMClient
 from doc_agent.schemas import Source
@@ -48,18 +54,15 @@ def writer_node(state: ResearchState,
     """
     logger.info("--- WRITER NODE ---")
     logger.info(f"writer state keys: {list(state.keys())}")
-    job_id = state.get("job_id")
-    if not job_id:
-        logger.error("Writer node: job_id not found in state.")
-        # 即使没有 job_id 也可以继续，但无法发布事件
-        job_id = "unknown_job"
+    # 作业级的提示词片段缓存在作业存储中，缺少 job_id 时不能退回到共享的默认作业
+    job_id = require_job_id(state)
 
     # 获取基本信息
     topic = state.get("topic", "")
     current_chapter_index = state.get("current_chapter_index", 0)
     chapters_to_process = state.get("chapters_to_process", [])
-    completed_chapters_content = state.get("completed_chapters_content", [])
-    completed_chapters = state.get("completed_chapters", [])
+    # 已完成章节按引用从作业存储读取（摘要由后台任务陆续写入）
+    completed_chapters = load_completed_chapters(state)
 
     # 验证当前章节索引
     if current_chapter_index >= len(chapters_to_process):
@@ -98,10 +101,11 @@ def writer_node(state: ResearchState,
     logger.info(
         f"📋 user_requirement_sources 数量: {len(user_requirement_sources)}")
 
-    # 构建上下文
-    context_for_writing = _build_writing_context(completed_chapters)
-    previous_chapters_context = _build_previous_chapters_context(
-        completed_chapters_content)
+    # 构建有上限的滚动上下文，长度不随已完成章节数增长
+    previous_chapters_context = build_rolling_context(
+        completed_chapters,
+        max_chars=complexity_config.get('rolling_context_chars', 3000),
+        previous_tail_chars=complexity_config.get('previous_tail_chars', 800))
 
     # 获取文档生成器配置
     document_writer_config = settings.get_agent_component_config(
@@ -123,15 +127,25 @@ def writer_node(state: ResearchState,
                                            genre, style_guide_content,
                                            complexity_config)
 
+    # 作业级的提示词片段只构建一次，保证各章节提示词前缀逐字节一致
+    job_store = get_job_store(job_id)
+    shared_sections = job_store.prompt_sections.get("writer")
+    if shared_sections is None:
+        shared_sections = job_store.prompt_sections.setdefault(
+            "writer",
+            _build_shared_sections(topic, chapters_to_process,
+                                   user_requirement_sources,
+                                   user_style_guide_sources,
+                                   style_guide_content))
+
     # 构建提示词
     prompt = _build_prompt(prompt_template, topic, chapter_title,
                            chapter_description, current_chapter_index,
                            chapters_to_process, previous_chapters_context,
-                           gathered_sources, user_requirement_sources,
-                           user_style_guide_sources, chapter_word_count,
-                           context_for_writing,
-                           style_guide_content, sub_sections,
+                           gathered_sources, shared_sections,
+                           chapter_word_count, sub_sections,
                            state.get("current_citation_index", 1))
+    job_store.prompt_prefixes.record("writer", prompt)
 
     logger.debug(f"Invoking LLM with writer prompt:\n{pprint(prompt)}")
 
@@ -144,6 +158,11 @@ def writer_node(state: ResearchState,
 
         logger.info(f"开始为章节 '{chapter_title}' 流式调用 LLM...")
 
+        # 引用状态机：边生成边标准化引用标记，并实时通知新引用的信源
+        citation_tracker = StreamingCitationTracker(
+            on_cited=lambda source_ids: _on_sources_cited(
+                job_id, current_chapter_index, source_ids, gathered_sources))
+
         # 使用同步流式调用 LLM
         response_list = []
         # 仅监听第一次流式输出
@@ -154,14 +173,17 @@ def writer_node(state: ResearchState,
                                        **extra_params):
             # 累加 token 内容
             response_list.append(chunk)
-            # 使用 TokenStreamCallbackHandler 发送每个 token
-            streaming_handler.on_llm_new_token(
-                chunk, enable_listen_logger=enable_listen_logger)
-            enable_listen_logger = False
-
-        # 在一章生成结束时额外添加一个换行符
+            # 使用 TokenStreamCallbackHandler 发送标准化后的文本
+            normalized = citation_tracker.feed(chunk)
+            if normalized:
+                streaming_handler.on_llm_new_token(
+                    normalized, enable_listen_logger=enable_listen_logger)
+                enable_listen_logger = False
+
+        # 输出状态机扣留的末尾片段，并在一章生成结束时额外添加一个换行符
         streaming_handler.on_llm_new_token(
-            "\n", enable_listen_logger=enable_listen_logger)
+            citation_tracker.finish() + "\n",
+            enable_listen_logger=enable_listen_logger)
         logger.success(f"章节 '{chapter_title}' 内容流式生成完毕。")
 
         # 发送剩余缓冲
@@ -170,9 +192,10 @@ def writer_node(state: ResearchState,
         except Exception:
             pass
 
-        # 使用流式生成的完整响应
-        response = "".join(response_list)
-        logger.info(f"chapter raw response: {response}")
+        # 引用在流式过程中已完成标准化和信源标记
+        response = citation_tracker.text
+        logger.info(f"chapter raw response: {''.join(response_list)}")
+        logger.info(f"📚 识别到 {len(citation_tracker.cited_ids)} 个引用源")
 
         logger.info(f"实际生成 {len(response)} 字，目标 {chapter_word_count} 字")
         # 获取章节编号信息
@@ -196,13 +219,6 @@ def writer_node(state: ResearchState,
         #             lines[0] = f"## {chapter_number}. {chapter_title}"
         #             response = '\n'.join(lines)
 
-        # 处理引用标记
-        # 处理引用标记
-        _update_cited_sources_inplace(response, gathered_sources)
-
-        # 后处理
-        final_document = _response_postprocess(response)
-
         # 根据引用标记，对相关文献进行标记，并更新状态
         cited_sources = [source for source in gathered_sources if source.cited]
         logger.info(f"✅ 章节生成完成，引用了 {len(cited_sources)} 个信息源")
@@ -239,87 +255,19 @@ def writer_node(state: ResearchState,
         }
 
 
-def _build_writing_context(completed_chapters: list) -> str:
-    """构建滑动窗口 + 全局摘要上下文"""
-    context_for_writing = ""
-
-    if completed_chapters:
-        # 获取最后一章的完整内容（滑动窗口）
-        last_chapter = completed_chapters[-1]
-        if isinstance(last_chapter, dict) and "content" in last_chapter:
-            context_for_writing += f"**Context from the previous chapter (Full Text):**\n{last_chapter['content']}\n\n"
-            logger.info(
-                f"📖 添加前一章完整内容到上下文，长度: {len(last_chapter['content'])} 字符")
-
-        # 如果有更多章节，获取早期章节的摘要（全局摘要）
-        if len(completed_chapters) > 1:
-            earlier_summaries = []
-            for chapter in completed_chapters[:-1]:  # 除了最后一章的所有章节
-                if isinstance(chapter, dict) and "summary" in chapter:
-                    earlier_summaries.append(chapter["summary"])
-                elif isinstance(chapter, dict) and "content" in chapter:
-                    # 如果没有摘要，使用内容的前200字符作为摘要
-                    content = chapter["content"]
-                    summary = content[:200] + "..." if len(
-                        content) > 200 else content
-                    earlier_summaries.append(summary)
-
-            if earlier_summaries:
-                context_for_writing += "**Context from earlier chapters (Summaries):**\n" + "\n\n".join(
-                    earlier_summaries)
-                logger.info(f"📚 添加 {len(earlier_summaries)} 个早期章节摘要到上下文")
-
-    if not context_for_writing:
-        context_for_writing = "这是第一章，没有前置内容。"
-        logger.info("📝 这是第一章，使用默认上下文")
-
-    return context_for_writing
-
-
-def _build_previous_chapters_context(completed_chapters_content: list) -> str:
-    """构建已完成章节的上下文摘要"""
-    if not completed_chapters_content:
-        return ""
-
-    return "\n\n".join([
-        f"第{i+1}章摘要:\n{content[:500]}..."
-        if len(content) > 500 else f"第{i+1}章:\n{content}"
-        for i, content in enumerate(completed_chapters_content)
-    ])
-
-
 def _get_prompt_template(prompt_selector, prompt_version, genre,
                          style_guide_content, complexity_config):
     """获取合适的提示词模板"""
     try:
-        # 根据复杂度决定是否使用简化提示词
-        if complexity_config['use_simplified_prompts']:
-            # 使用快速提示词 - 现在从prompts模块获取
-            from doc_agent.prompts.writer import V4_FAST
-            return V4_FAST
-
-        # 根据指定的 prompt_version 获取模板
-        from doc_agent.prompts.writer import PROMPTS
-
-        # 如果有样式指南，优先使用 v4_with_style_guide 版本
-        if style_guide_content and style_guide_content.strip():
-            if "v4_with_style_guide" in PROMPTS:
-                logger.info("✅ 使用 v4_with_style_guide 版本，检测到样式指南")
-                return PROMPTS["v4_with_style_guide"]
-
-        # 使用指定版本
-        if prompt_version in PROMPTS:
-            logger.debug(f"✅ 成功获取 writer {prompt_version} prompt 模板")
-            return PROMPTS[prompt_version]
-
-        # 回退版本
-        if "v3_context_aware" in PROMPTS:
-            logger.debug("✅ 回退到 writer v3_context_aware prompt 模板")
-            return PROMPTS["v3_context_aware"]
-
-        if "v2_with_citations" in PROMPTS:
-            logger.debug("✅ 回退到 writer v2_with_citations prompt 模板")
-            return PROMPTS["v2_with_citations"]
+        version, template = _select_prompt_version(prompt_version,
+                                                   style_guide_content,
+                                                   complexity_config)
+        if template is not None:
+            if prompt_selector is None:
+                return template
+            # 纳入注册表：模板只编译一次，并记录渲染耗时
+            return prompt_selector.compile_prompt("chapter_workflow", "writer",
+                                                  genre, version, template)
 
     except Exception as e:
         logger.warning(f"⚠️  获取 prompt 失败: {e}")
@@ -328,19 +276,42 @@ def _get_prompt_template(prompt_selector, prompt_version, genre,
     return _get_fallback_prompt_template()
 
 
+def _select_prompt_version(prompt_version, style_guide_content,
+                           complexity_config):
+    """按复杂度、样式指南和指定版本选择 writer 模板，返回 (版本, 模板)"""
+    # 根据指定的 prompt_version 获取模板
+    from doc_agent.prompts.writer import PROMPTS
+
+    # 根据复杂度决定是否使用简化提示词
+    if complexity_config['use_simplified_prompts']:
+        # 使用快速提示词 - 现在从prompts模块获取
+        return "v4_fast", PROMPTS["v4_fast"]
+
+    # 如果有样式指南，优先使用 v4_with_style_guide 版本
+    if style_guide_content and style_guide_content.strip():
+        if "v4_with_style_guide" in PROMPTS:
+            logger.info("✅ 使用 v4_with_style_guide 版本，检测到样式指南")
+            return "v4_with_style_guide", PROMPTS["v4_with_style_guide"]
+
+    # 使用指定版本
+    if prompt_version in PROMPTS:
+        logger.debug(f"✅ 成功获取 writer {prompt_version} prompt 模板")
+        return prompt_version, PROMPTS[prompt_version]
+
+    # 回退版本
+    for fallback_version in ("v3_context_aware", "v2_with_citations"):
+        if fallback_version in PROMPTS:
+            logger.debug(f"✅ 回退到 writer {fallback_version} prompt 模板")
+            return fallback_version, PROMPTS[fallback_version]
+
+    return None, None
+
+
 def _get_fallback_prompt_template() -> str:
     """获取备用的提示词模板"""
     return """
 你是一个专业的文档写作专家。请基于提供的研究数据，为指定章节撰写内容。
 
-**文档主题:** {topic}
-**章节标题:** {chapter_title}
-**章节描述:** {chapter_description}
-**章节编号:** {chapter_number}/{total_chapters}
-
-**可用信息源:**
-{available_sources}
-
 **写作要求:**
 1. 基于研究数据撰写内容，确保信息准确性和完整性
 2. 保持章节结构清晰，逻辑连贯
@@ -349,10 +320,85 @@ def _get_fallback_prompt_template() -> str:
 5. 例如：<sources>[1]</sources> 这里使用了源1的信息
 6. 如果是自己的综合总结，使用：<sources>[]</sources>
 
+**文档主题:** {topic}
+
+**文档大纲（共{total_chapters}章）:**
+{document_outline}
+
+**章节标题:** {chapter_title}
+**章节描述:** {chapter_description}
+**章节编号:** {chapter_number}/{total_chapters}
+
+**可用信息源:**
+{available_sources_text}
+
 请立即开始撰写章节内容。
 """
 
 
+def _format_document_outline(chapters_to_process) -> str:
+    """格式化文档大纲（章节编号和标题）"""
+    return "\n".join(
+        f"{i}. {chapter.get('chapter_title', '')}"
+        for i, chapter in enumerate(chapters_to_process, 1))
+
+
+def _build_shared_sections(topic,
+                           chapters_to_process,
+                           user_requirement_sources,
+                           user_style_guide_sources,
+                           style_guide_content,
+                           max_length=30000) -> dict[str, str]:
+    """
+    构建同一作业内所有章节共用的提示词片段
+
+    这些片段位于提示词的稳定前缀中，只依赖作业级输入，长度预算按 max_length 固定分配，
+    不随章节变化
+    """
+    document_outline = _format_document_outline(chapters_to_process)
+
+    # 可变部分的剩余长度按作业级内容计算
+    remaining_length = max_length - len(topic) - len(document_outline)
+    # 优先级：可用信息源(60%，按章节分配) > 用户要求(25%) > 样式指南(15%)
+    requirements_max_length = int(remaining_length * 0.25)
+    style_max_length = int(remaining_length * 0.15)
+
+    # 1. 处理用户要求内容
+    prompt_requirements = ""
+    if user_requirement_sources:
+        # 直接处理字符串列表，不依赖 _format_requirements_to_text
+        prompt_requirements = _sample_format_source_list(
+            user_requirement_sources, requirements_max_length)
+        logger.info(f"📝 用户要求内容: {prompt_requirements}")
+
+    # 2. 处理样式指南内容
+    style_requirements = ""
+    if user_style_guide_sources:
+        style_requirements = _sample_format_source_list(
+            user_style_guide_sources, style_max_length)
+        logger.info(f"📝 样式指南内容: {style_requirements}")
+
+    # 3. 处理样式指南内容（如果有）
+    formatted_style_guide = ""
+    if style_guide_content and style_guide_content.strip():
+        # 为样式指南预留一些空间
+        style_guide_max_length = style_max_length - len(style_requirements)
+        if len(style_guide_content) > style_guide_max_length:
+            formatted_style_guide = _sample_format_source_list(
+                [style_guide_content], style_guide_max_length)
+        else:
+            formatted_style_guide = f"\n{style_guide_content}\n"
+
+        logger.info(f"📝 样式指南长度: {len(formatted_style_guide)} 字符")
+
+    return {
+        "document_outline": document_outline,
+        "prompt_requirements": prompt_requirements,
+        "style_requirements": style_requirements,
+        "style_guide_content": formatted_style_guide
+    }
+
+
 def _build_prompt(prompt_template,
                   topic,
                   chapter_title,
@@ -361,11 +407,8 @@ def _build_prompt(prompt_template,
                   chapters_to_process,
                   previous_chapters_context,
                   gathered_sources,
-                  user_requirement_sources,
-                  user_style_guide_sources,
+                  shared_sections,
                   chapter_word_count,
-                  context_for_writing,
-                  style_guide_content,
                   sub_sections,
                   source_begin_idx=1,
                   max_length=30000):
@@ -373,18 +416,16 @@ def _build_prompt(prompt_template,
 
     # 初始化各部分内容
     available_sources_text = ""
-    prompt_requirements = ""
-    style_requirements = ""
 
     # 计算基础内容的长度（不包括可变部分）
     base_content = f"""
 topic={topic}
+document_outline={shared_sections["document_outline"]}
 chapter_title={chapter_title}
 chapter_description={chapter_description}
 chapter_number={current_chapter_index + 1}
 total_chapters={len(chapters_to_process)}
 previous_chapters_context={previous_chapters_context or "这是第一章，没有前置内容。"}
-context_for_writing={context_for_writing}
 """
 
     # 格式化子节信息
@@ -407,17 +448,10 @@ context_for_writing={context_for_writing}
     used_length = len(base_content) + len(sub_sections_text)
     remaining_length = max_length - used_length
 
-    # 智能分配剩余长度
-    # 优先级：可用信息源 > 用户要求 > 样式指南
-    sources_ratio = 0.6  # 60% 给信息源
-    requirements_ratio = 0.25  # 25% 给用户要求
-    style_ratio = 0.15  # 15% 给样式指南
+    # 可用信息源占剩余长度的 60%（用户要求和样式指南已在作业级片段中分配）
+    sources_max_length = int(remaining_length * 0.6)
 
-    sources_max_length = int(remaining_length * sources_ratio)
-    requirements_max_length = int(remaining_length * requirements_ratio)
-    style_max_length = int(remaining_length * style_ratio)
-
-    # 1. 处理可用信息源
+    # 处理可用信息源
     if gathered_sources:
         available_sources_text = _format_sources_to_text(
             gathered_sources, source_begin_idx)
@@ -428,34 +462,7 @@ context_for_writing={context_for_writing}
                 gathered_sources, sources_max_length)
             logger.info(f"📚 信息源内容已截断至 {len(available_sources_text)} 字符")
 
-    # 2. 处理用户要求内容
-    if user_requirement_sources:
-        # 直接处理字符串列表，不依赖 _format_requirements_to_text
-        prompt_requirements = _sample_format_source_list(
-            user_requirement_sources, requirements_max_length)
-        logger.info(f"📝 用户要求内容: {prompt_requirements}")
-
-    # 3. 处理样式指南内容
-    if user_style_guide_sources:
-        # 直接处理字符串列表，不依赖 _format_requirements_to_text
-        style_requirements = _sample_format_source_list(
-            user_style_guide_sources, style_max_length)
-        logger.info(f"📝 样式指南内容: {style_requirements}")
-
-    # 4. 处理样式指南内容（如果有）
-    formatted_style_guide = ""
-    if style_guide_content and style_guide_content.strip():
-        # 为样式指南预留一些空间
-        style_guide_max_length = style_max_length - len(style_requirements)
-        if len(style_guide_content) > style_guide_max_length:
-            formatted_style_guide = _sample_format_source_list(
-                [style_guide_content], style_guide_max_length)
-        else:
-            formatted_style_guide = f"\n{style_guide_content}\n"
-
-        logger.info(f"📝 样式指南长度: {len(formatted_style_guide)} 字符")
-
-    # 构建最终prompt
+    # 构建最终prompt：模板前部只包含作业级内容，章节相关内容在末尾
     final_prompt = prompt_template.format(
         topic=topic,
         chapter_title=chapter_title,
@@ -465,107 +472,44 @@ context_for_writing={context_for_writing}
         previous_chapters_context=previous_chapters_context or "这是第一章，没有前置内容。",
         available_sources_text=available_sources_text,
         chapter_word_count=chapter_word_count,
-        prompt_requirements=prompt_requirements,
-        style_requirements=style_requirements,
-        context_for_writing=context_for_writing,
-        style_guide_content=formatted_style_guide,
-        sub_sections_info=sub_sections_text)
+        sub_sections_info=sub_sections_text,
+        **shared_sections)
 
     logger.info(f"📝 最终prompt长度: {len(final_prompt)} 字符 (限制: {max_length})")
     return final_prompt
 
 
-def _update_cited_sources_inplace(raw_text: str,
-                                  available_sources: list[Source]) -> None:
-    """ 根据 raw_text 中的内容，识别多种引用标记格式，并更新 available_sources 中 id 为 n 的 cited 字段
+def _on_sources_cited(job_id: str, chapter_index: int, source_ids: list[int],
+                      available_sources: list[Source]) -> None:
+    """ 流式生成中首次出现引用标记时，标记对应信源为已引用并发布事件
 
     Args:
-        raw_text: LLM的原始输出文本
+        job_id: 作业ID
+        chapter_index: 当前章节索引
+        source_ids: 新引用的信源ID
         available_sources: 可用的信息源列表
     """
     # 创建源ID映射
     source_map = {source.id: source for source in available_sources}
 
-    # 识别多种引用格式
-    cited_source_ids = set()
-
-    # 1. 识别 <[n]> 格式
-    pattern1 = r'<\[(\d+)\]>'
-    matches1 = re.findall(pattern1, raw_text)
-    for source_id in matches1:
-        cited_source_ids.add(int(source_id))
-
-    # 2. 识别 **<信息源 n>** 格式
-    pattern2 = r'\*\*<信息源\s*(\d+)>\*\*'
-    matches2 = re.findall(pattern2, raw_text)
-    for source_id in matches2:
-        cited_source_ids.add(int(source_id))
-
-    # 3. 识别 <[n], [m]> 格式
-    pattern3 = r'<\[(\d+)\],\s*\[(\d+)\]>'
-    matches3 = re.findall(pattern3, raw_text)
-    for match in matches3:
-        for source_id in match:
-            cited_source_ids.add(int(source_id))
-
-    # 4. 识别 [n] 格式（标准引用格式）
-    pattern4 = r'\[(\d+)\]'
-    matches4 = re.findall(pattern4, raw_text)
-    for source_id in matches4:
-        cited_source_ids.add(int(source_id))
-
-    # 5. 识别 <信息源 n> 格式
-    pattern5 = r'<信息源\s*(\d+)>'
-    matches5 = re.findall(pattern5, raw_text)
-    for source_id in matches5:
-        cited_source_ids.add(int(source_id))
-
-    # 更新引用状态
-    for source_id in cited_source_ids:
+    cited_sources = []
+    for source_id in source_ids:
         if source_id in source_map:
             source_map[source_id].cited = True
+            cited_sources.append(source_map[source_id])
             logger.debug(f"✅ 标记源 [{source_id}] 为已引用")
         else:
             logger.warning(f"⚠️  未找到源ID: {source_id}")
 
-    logger.info(f"📚 识别到 {len(cited_source_ids)} 个引用源")
-
-
-def _response_postprocess(response: str) -> str:
-    """ 对 LLM 的原始输出进行后处理，包括：
-    1. 删除前后的 ``` 标记
-    2. 标准化引用格式
-    3. 其他后处理
-    """
-    # 删除前后的 ``` 标记
-    response = re.sub(r'```.*?```', '', response, flags=re.DOTALL)
-
-    # 标准化引用格式
-    response = _standardize_citation_formats(response)
-
-    return response
-
-
-def _standardize_citation_formats(text: str) -> str:
-    """标准化引用格式，将各种引用格式统一转换为标准格式"""
-
-    # 1. 将 **<信息源 n>** 转换为 [n]
-    text = re.sub(r'\*\*<信息源\s*(\d+)>\*\*', r'[\1]', text)
-
-    # 2. 将 <信息源 n> 转换为 [n]
-    text = re.sub(r'<信息源\s*(\d+)>', r'[\1]', text)
-
-    # 3. 将 <[n], [m]> 转换为 [n][m]
-    text = re.sub(r'<\[(\d+)\],\s*\[(\d+)\]>', r'[\1][\2]', text)
-
-    # 4. 将 <[n]> 转换为 [n]
-    text = re.sub(r'<\[(\d+)\]>', r'[\1]', text)
-
-    # 5. 处理连续的引用，如 [1][2][3] 保持原样
-    # 这个正则表达式已经能正确处理
-
-    logger.debug(f"📝 引用格式标准化完成")
-    return text
+    if cited_sources:
+        answer_origins, webs = Source.batch_to_redis_fe(cited_sources)
+        publish_event(
+            job_id, "信源引用", "document_generation", "RUNNING", {
+                "chapterIndex": chapter_index,
+                "sourceIds": [source.id for source in cited_sources],
+                "answerOrigins": answer_origins,
+                "webs": webs
+            })
 
 
 def _truncate_sources_text(sources: list[Source], max_length: int) -> str:
@@ -661,12 +605,10 @@ def _sample_format_source_list(requirements_content: list[Source],
     sample_rate = max_length / len(whole_content)
     sample_count = max(1, int(sample_rate * len(requirements_content)))
 
-    # 随机抽取但保持顺序
+    # 等间隔抽取并保持顺序，相同输入总是得到相同结果
     if sample_rate < 1:
-        import random
-        # 生成所有索引，然后随机选择 sample_count 个，保持顺序
-        all_indices = list(range(len(requirements_content)))
-        selected_indices = sorted(random.sample(all_indices, sample_count))
+        step = len(requirements_content) / sample_count
+        selected_indices = [int(i * step) for i in range(sample_count)]
         sampled_sources = [requirements_content[i] for i in selected_indices]
         sampled_content = "... ".join(
             [source.content for source in sampled_sources])
@@ -4,18 +4,44 @@
 包含在不同节点之间共享的工具函数、源管理和解析器
 """
 
+from .chapter_summaries import (
+    build_rolling_context,
+    schedule_chapter_summary,
+)
+from .citations import (
+    CITATION_PATTERN,
+    StreamingCitationTracker,
+    rewrite_citations,
+)
+from .document_assembler import (
+    DocumentAssembler,
+    chapter_heading,
+    clean_chapter_content,
+    format_citation,
+)
 from .formatters import (
+    format_chapter_summary,
     format_requirements_to_text,
     format_sources_to_text,
     process_citations,
-    format_chapter_summary,
+)
+from .job_store import (
+    get_job_store,
+    load_cited_sources,
+    load_completed_chapters,
+    release_job_store,
+    require_job_id,
 )
 from .parsers import (
     parse_es_search_results,
+    parse_llm_json_response,
     parse_planner_response,
     parse_reflection_response,
     parse_web_search_results,
-    parse_llm_json_response,
+)
+from .prompt_prefix import (
+    PromptPrefixTracker,
+    common_prefix_length,
 )
 from .source_manager import (
     calculate_text_similarity,
@@ -24,10 +50,31 @@ from .source_manager import (
 )
 
 __all__ = [
+    # 章节滚动摘要
+    'build_rolling_context',
+    'schedule_chapter_summary',
+    # 引用标记引擎
+    'CITATION_PATTERN',
+    'StreamingCitationTracker',
+    'rewrite_citations',
+    # 增量文档组装
+    'DocumentAssembler',
+    'chapter_heading',
+    'clean_chapter_content',
+    'format_citation',
     # 源管理
     'calculate_text_similarity',
     'get_or_create_source_id',
     'merge_sources_with_deduplication',
+    # 作业存储
+    'get_job_store',
+    'load_cited_sources',
+    'load_completed_chapters',
+    'release_job_store',
+    'require_job_id',
+    # 提示词共享前缀统计
+    'PromptPrefixTracker',
+    'common_prefix_length',
     # 解析器
     'parse_web_search_results',
     'parse_es_search_results',
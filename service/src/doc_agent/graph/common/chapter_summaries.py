@@ -0,0 +1,140 @@
+"""
+章节滚动摘要
+
+章节完成后在后台生成摘要，与下一章的规划、检索并行，不占用章节处理的关键路径；
+写作节点只读取有上限的滚动上下文（上一章结尾 + 由近及远的章节摘要），
+提示词长度不再随已完成章节数增长
+"""
+
+import asyncio
+from typing import Any
+
+from doc_agent.core.logger import logger
+from doc_agent.graph.common.job_store import get_job_store
+from doc_agent.llm_clients.base import LLMClient
+
+SUMMARY_PROMPT = """请为以下章节内容生成一个简洁的摘要，控制在200字以内：
+
+章节标题：{chapter_title}
+
+章节内容：
+{chapter_content}
+
+请生成一个简洁的摘要，突出章节的主要观点和关键信息："""
+
+# 摘要尚未生成时，用章节开头代替
+EXCERPT_CHARS = 200
+
+DEFAULT_ROLLING_CONTEXT_CHARS = 3000
+DEFAULT_PREVIOUS_TAIL_CHARS = 800
+
+
+def schedule_chapter_summary(job_id: str, chapter_index: int,
+                             chapter_title: str, chapter_content: str,
+                             llm_client: LLMClient) -> asyncio.Task:
+    """
+    在后台为已完成章节生成摘要，完成后写入作业存储
+
+    Args:
+        job_id: 作业ID
+        chapter_index: 章节索引
+        chapter_title: 章节标题
+        chapter_content: 章节正文
+        llm_client: LLM客户端
+
+    Returns:
+        asyncio.Task: 摘要任务
+    """
+    store = get_job_store(job_id)
+    task = asyncio.create_task(
+        _summarize(job_id, chapter_index, chapter_title, chapter_content,
+                   llm_client))
+    store.summary_tasks[chapter_index] = task
+    return task
+
+
+async def _summarize(job_id: str, chapter_index: int, chapter_title: str,
+                     chapter_content: str, llm_client: LLMClient) -> str:
+    logger.info(f"📝 后台生成章节摘要: {chapter_title}")
+    prompt = SUMMARY_PROMPT.format(chapter_title=chapter_title,
+                                   chapter_content=chapter_content)
+    try:
+        summary = await asyncio.to_thread(llm_client.invoke,
+                                          prompt,
+                                          temperature=0.3,
+                                          max_tokens=300)
+    except Exception as e:
+        logger.warning(f"⚠️  章节摘要生成失败，写作时使用章节开头代替: {str(e)}")
+        return ""
+
+    get_job_store(job_id).chapters.update_summary(chapter_index, summary)
+    logger.info(f"✅ 章节摘要生成完成: {chapter_title}，长度: {len(summary)} 字符")
+    return summary
+
+
+def _chapter_digest(chapter: dict[str, Any]) -> str:
+    summary = chapter.get("summary", "")
+    if summary:
+        return summary
+    content = chapter.get("content", "")
+    return content[:EXCERPT_CHARS] + "..." if len(
+        content) > EXCERPT_CHARS else content
+
+
+def build_rolling_context(
+        completed_chapters: list[dict[str, Any]],
+        max_chars: int = DEFAULT_ROLLING_CONTEXT_CHARS,
+        previous_tail_chars: int = DEFAULT_PREVIOUS_TAIL_CHARS) -> str:
+    """
+    构建有上限的滚动上下文
+
+    上一章保留结尾片段用于衔接；所有已完成章节按由近及远加入摘要，
+    预算不足时较早的章节只保留标题
+
+    Args:
+        completed_chapters: 已完成章节 [{"title", "content", "summary"}, ...]
+        max_chars: 上下文总字符上限
+        previous_tail_chars: 上一章结尾片段的字符数
+
+    Returns:
+        str: 滚动上下文
+    """
+    chapters = [
+        chapter for chapter in completed_chapters if isinstance(chapter, dict)
+    ]
+    if not chapters:
+        return "这是第一章，没有前置内容。"
+
+    content = chapters[-1].get("content", "")
+    tail = content[-previous_tail_chars:] if previous_tail_chars > 0 else ""
+    budget = max_chars - len(tail)
+
+    # 先为所有章节标题预留预算，再由近及远把标题替换为摘要
+    titles = [
+        f"第{number}章 {chapter.get('title', '')}"
+        for number, chapter in enumerate(chapters, start=1)
+    ]
+    budget -= sum(len(title) for title in titles)
+    digests = list(titles)
+    for i in range(len(chapters) - 1, -1, -1):
+        line = f"{titles[i]}：{_chapter_digest(chapters[i])}"
+        extra = len(line) - len(titles[i])
+        if extra > budget:
+            break
+        digests[i] = line
+        budget -= extra
+    while digests and budget < 0:
+        # 标题本身超出预算时，丢弃最早的章节
+        budget += len(digests.pop(0))
+
+    parts = []
+    if digests:
+        parts.append("**Context from completed chapters (Summaries):**\n" +
+                     "\n".join(digests))
+    if tail:
+        parts.append(
+            f"**Context from the previous chapter (Ending):**\n{tail}")
+    logger.info(
+        f"📚 滚动上下文: {len(digests)}/{len(chapters)} 个章节摘要，"
+        f"总长度 {sum(len(part) for part in parts)} 字符")
+    return "\n\n".join(parts)
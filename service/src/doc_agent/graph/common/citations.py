@@ -0,0 +1,239 @@
+"""
+引用标记引擎
+
+用一个预编译的正则一次扫描识别所有引用格式：
+- <sources>[n, m]</sources>
+- **<信息源 n>** / <信息源 n>
+- <[n], [m]> / <[n]>
+- [n]
+按标记逐个生成替换文本完成格式改写，并在同一次扫描中收集被引用的信源ID
+"""
+
+import re
+from typing import Callable, Optional
+
+CITATION_PATTERN = re.compile(
+    r"""
+    (?P<marker>
+      <sources>\[(?P<sources>[^\]]*)\]</sources>
+    | \*\*<信息源\s*(?P<bold>\d+)>\*\*
+    | <信息源\s*(?P<info>\d+)>
+    | <\[(?P<pair_first>\d+)\],\s*\[(?P<pair_second>\d+)\]>
+    | <\[(?P<angle>\d+)\]>
+    | \[(?P<plain>\d+)\]
+    )
+    """, re.VERBOSE)
+
+# split 结果中每个匹配占用的列数（前一段文本 + 各分组）
+_STRIDE = CITATION_PATTERN.groups + 1
+
+# 标记类型
+SOURCES_TAG = "sources"
+MARKER = "marker"
+
+# 回调：(标记类型, 信源ID列表, 原始匹配文本) -> 替换文本
+CitationFormatter = Callable[[str, list[int], str], str]
+
+
+def _parse_sources_tag(sources: str) -> list[int]:
+    return [
+        int(source_id) for source_id in sources.split(",")
+        if source_id.strip().isdigit()
+    ]
+
+
+def rewrite_citations(
+        text: str,
+        formatter: Optional[CitationFormatter] = None,
+        kinds: Optional[frozenset[str]] = None) -> tuple[str, set[int]]:
+    """
+    单次扫描改写文本中的引用标记
+
+    用 CITATION_PATTERN.split 在一次扫描中切出普通文本和所有引用标记，
+    逐个标记调用 formatter 生成替换文本，同时收集信源ID
+
+    Args:
+        text: 原始文本
+        formatter: 替换回调，默认将引用标记统一为 [n][m]，<sources> 标签保持原样
+        kinds: 只把这些类型的标记交给 formatter，其他标记原样保留且不计入ID；
+            None 表示全部类型
+
+    Returns:
+        tuple[str, set[int]]: (改写后的文本, 出现过的信源ID集合)
+    """
+    parts = CITATION_PATTERN.split(text)
+    if len(parts) == 1:
+        return text, set()
+
+    columns = [parts[i::_STRIDE] for i in range(1, _STRIDE)]
+    if formatter is None:
+        replacements, cited_ids = _standardize(*columns)
+    else:
+        replacements, cited_ids = _format_each(formatter, kinds, *columns)
+
+    pieces = [None] * (len(replacements) * 2 + 1)
+    pieces[0::2] = parts[0::_STRIDE]
+    pieces[1::2] = replacements
+    return "".join(pieces), cited_ids
+
+
+def _standardize(originals, sources_column, bold_column, info_column,
+                 pair_first_column, pair_second_column, angle_column,
+                 plain_column) -> tuple[list[str], set[int]]:
+    """默认格式的快速路径：内联处理每个标记，避免逐个标记的函数调用"""
+    cited_ids: set[int] = set()
+    add = cited_ids.add
+    replacements = []
+    append = replacements.append
+    for original, sources, bold, info, pair_first, pair_second, angle, plain in zip(
+            originals, sources_column, bold_column, info_column,
+            pair_first_column, pair_second_column, angle_column,
+            plain_column):
+        # 数字分组匹配时必然非空，可直接用 or 取出
+        single = plain or bold or info or angle
+        if single:
+            add(int(single))
+            append(f"[{single}]")
+        elif pair_first:
+            add(int(pair_first))
+            add(int(pair_second))
+            append(f"[{pair_first}][{pair_second}]")
+        else:
+            cited_ids.update(_parse_sources_tag(sources))
+            append(original)
+    return replacements, cited_ids
+
+
+def _format_each(formatter: CitationFormatter,
+                 kinds: Optional[frozenset[str]], originals, sources_column,
+                 bold_column, info_column, pair_first_column,
+                 pair_second_column, angle_column,
+                 plain_column) -> tuple[list[str], set[int]]:
+    """自定义格式：逐个标记解析后交给 formatter"""
+    cited_ids: set[int] = set()
+    replacements = []
+    append = replacements.append
+    want_sources = kinds is None or SOURCES_TAG in kinds
+    want_markers = kinds is None or MARKER in kinds
+    for original, sources, bold, info, pair_first, pair_second, angle, plain in zip(
+            originals, sources_column, bold_column, info_column,
+            pair_first_column, pair_second_column, angle_column,
+            plain_column):
+        if not (want_sources if sources is not None else want_markers):
+            append(original)
+            continue
+        if sources is not None:
+            kind, source_ids = SOURCES_TAG, _parse_sources_tag(sources)
+        elif pair_first:
+            kind, source_ids = MARKER, [int(pair_first), int(pair_second)]
+        else:
+            kind, source_ids = MARKER, [int(plain or bold or info or angle)]
+        cited_ids.update(source_ids)
+        append(formatter(kind, source_ids, original))
+    return replacements, cited_ids
+
+
+# 各引用格式的组成片段：字符串为字面量，元组为可重复的字符类
+_MARKER_ATOMS = (
+    ("<sources>[", (r"[^\]]", ), "]</sources>"),
+    ("**<信息源", (r"\s", ), (r"\d", ), ">**"),
+    ("<信息源", (r"\s", ), (r"\d", ), ">"),
+    ("<[", (r"\d", ), "],", (r"\s", ), "[", (r"\d", ), "]>"),
+    ("<[", (r"\d", ), "]>"),
+    ("[", (r"\d", ), "]"),
+)
+
+
+def _prefix_pattern(atoms: tuple) -> str:
+    """生成匹配某个引用格式任意前缀（含完整标记）的正则"""
+    if not atoms:
+        return ""
+    head, rest = atoms[0], _prefix_pattern(atoms[1:])
+    tail = f"(?:{rest})?" if rest else ""
+    if isinstance(head, tuple):
+        return f"{head[0]}*{tail}"
+    pattern = tail
+    for char in reversed(head):
+        pattern = f"(?:{re.escape(char)}{pattern})?"
+    # 去掉最外层的可选，保证至少匹配第一个字符
+    return pattern[3:-2]
+
+
+# 匹配文本末尾尚未写完的引用标记
+_PARTIAL_MARKER_PATTERN = re.compile(
+    "|".join(f"(?:{_prefix_pattern(atoms)})" for atoms in _MARKER_ATOMS))
+_MARKER_START_CHARS = "<[*"
+
+
+class StreamingCitationTracker:
+    """
+    流式引用状态机
+
+    按 token 增量输入 LLM 输出，只扣留末尾可能是未写完引用标记的片段，
+    其余文本立即完成引用格式标准化并返回；首次出现的信源ID通过 on_cited 回调通知。
+    流结束时调用 finish 输出扣留的片段，不再需要对整章做引用后处理
+    """
+
+    def __init__(self,
+                 on_cited: Optional[Callable[[list[int]], None]] = None,
+                 max_pending_chars: int = 256):
+        self.on_cited = on_cited
+        self.max_pending_chars = max_pending_chars
+        self.cited_ids: set[int] = set()
+        self._pending = ""
+        self._output: list[str] = []
+
+    @property
+    def text(self) -> str:
+        """已输出的标准化文本"""
+        return "".join(self._output)
+
+    def feed(self, chunk: str) -> str:
+        """
+        输入一个 token 块
+
+        Returns:
+            str: 可以立即输出的标准化文本（可能为空）
+        """
+        if not chunk:
+            return ""
+        buffer = self._pending + chunk
+        split_at = self._partial_marker_start(buffer)
+        self._pending = buffer[split_at:]
+        return self._emit(buffer[:split_at])
+
+    def finish(self) -> str:
+        """流结束，输出所有扣留的文本"""
+        buffer, self._pending = self._pending, ""
+        return self._emit(buffer)
+
+    def _partial_marker_start(self, buffer: str) -> int:
+        """
+        返回末尾未写完引用标记的起始位置，没有时返回 len(buffer)
+
+        与整段处理的切分保持一致：位于缓冲区中已完整匹配的标记内部的位置不能作为起点，
+        否则相邻的 **<信息源 1>****<信息源 2>** 会从前一个标记的结尾 ** 处截断
+        """
+        window_start = max(0, len(buffer) - self.max_pending_chars)
+        complete = [(match.start(), match.end())
+                    for match in CITATION_PATTERN.finditer(buffer)
+                    if match.end() > window_start]
+        for index in range(window_start, len(buffer)):
+            if buffer[index] not in _MARKER_START_CHARS or any(
+                    start < index < end for start, end in complete):
+                continue
+            if _PARTIAL_MARKER_PATTERN.fullmatch(buffer, index):
+                return index
+        return len(buffer)
+
+    def _emit(self, text: str) -> str:
+        if not text:
+            return ""
+        text, cited_ids = rewrite_citations(text)
+        new_ids = sorted(cited_ids - self.cited_ids)
+        if new_ids:
+            self.cited_ids.update(new_ids)
+            if self.on_cited:
+                self.on_cited(new_ids)
+        self._output.append(text)
+        return text
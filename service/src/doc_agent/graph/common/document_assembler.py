@@ -0,0 +1,202 @@
+"""
+增量文档组装
+
+每章完成时清理章节正文、登记新引用源并追加到作业的文档组装器中，
+最终化和参考文献节点只需拼接已组装好的部分，不再在最后一次性重建整篇文档
+"""
+
+import re
+import threading
+from typing import Any, Optional
+
+from doc_agent.schemas import Source
+
+_CODE_FENCE_START = re.compile(r'^```(?:markdown)?')
+_CHAPTER_HEADING = re.compile(r'^## .*$', re.MULTILINE)
+_EXTRA_BLANK_LINES = re.compile(r'\n{3,}')
+
+SECTION_SEPARATOR = "\n---\n"
+
+
+def clean_chapter_content(content: str,
+                          chapter_number: int = None,
+                          chapter_title: str = "") -> str:
+    """
+    清理章节内容格式
+
+    Args:
+        content: 原始章节内容
+        chapter_number: 章节编号
+        chapter_title: 章节标题
+
+    Returns:
+        str: 清理后的内容
+    """
+    if not content:
+        return content
+
+    # 1. 移除开头的 ```markdown / ``` 和结尾的 ``` 标记
+    content = _CODE_FENCE_START.sub("", content.strip(), count=1)
+    if content.endswith("```"):
+        content = content[:-3]
+
+    # 2. 章节标题（二级标题）统一为 "## 编号. 章节标题"，其余标题层级保持不变
+    if chapter_number and chapter_title:
+        heading = f"## {chapter_number}. {chapter_title}"
+        content = _CHAPTER_HEADING.sub(lambda _: heading, content)
+
+    # 3. 将连续的空行压缩为最多两个空行
+    content = _EXTRA_BLANK_LINES.sub('\n\n', content)
+
+    return content.strip()
+
+
+def format_citation(source_id: int, source: Source) -> str:
+    """格式化单个引用"""
+    citation = f"[{source_id}] {source.title}"
+
+    # 添加作者信息
+    if source.author:
+        citation += f", {source.author}"
+
+    # 添加日期信息
+    if source.date:
+        citation += f", {source.date}"
+
+    # 添加URL信息
+    if source.url:
+        citation += f" - {source.url}"
+
+    # 添加页码信息
+    if source.page_number is not None:
+        citation += f" (第{source.page_number}页)"
+
+    citation += f" ({source.source_type})"
+
+    return citation
+
+
+def chapter_heading(document_outline: dict[str, Any],
+                    chapter_index: int) -> tuple[int, str]:
+    """从大纲中获取章节编号和标题（兼容新旧格式）"""
+    chapters = document_outline.get("chapters", []) if document_outline else []
+    chapter_info = chapters[chapter_index] if chapter_index < len(
+        chapters) else {}
+    chapter_number = chapter_info.get(
+        'number', chapter_info.get('chapter_number', chapter_index + 1))
+    chapter_title = chapter_info.get(
+        'title', chapter_info.get('chapter_title', f'第{chapter_index + 1}章'))
+    return chapter_number, chapter_title
+
+
+class DocumentAssembler:
+    """单个作业的增量文档：文档头、已清理的章节和引用编号表"""
+
+    def __init__(self):
+        self._header = ""
+        # 章节索引 -> (编号, 标题, 清理后的正文)
+        self._sections: dict[int, tuple[int, str, str]] = {}
+        # 信源ID -> 参考文献条目，按首次引用（登记）顺序排列
+        self._citations: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def has_header(self) -> bool:
+        return bool(self._header)
+
+    def set_header(self, topic: str, document_outline: dict[str, Any]) -> str:
+        """根据大纲生成文档标题、摘要和目录"""
+        document_outline = document_outline or {}
+        doc_title = document_outline.get("title", topic)
+        doc_summary = document_outline.get("summary", "")
+
+        parts = [f"# {doc_title}\n"]
+        if doc_summary:
+            parts.append(f"## 摘要\n\n{doc_summary}\n")
+        parts.append("\n## 目录\n")
+        for i in range(len(document_outline.get("chapters", []))):
+            chapter_number, chapter_title = chapter_heading(
+                document_outline, i)
+            parts.append(f"{chapter_number}. {chapter_title}\n")
+        parts.append(SECTION_SEPARATOR)
+
+        self._header = "\n".join(parts)
+        return self._header
+
+    def has_chapter(self, chapter_index: int) -> bool:
+        return chapter_index in self._sections
+
+    def append_chapter(self, chapter_index: int, content: str,
+                       chapter_number: int, chapter_title: str) -> str:
+        """
+        清理并登记一个已完成章节
+
+        Returns:
+            str: 追加到文档中的片段（清理后的章节 + 分隔线）
+        """
+        cleaned = clean_chapter_content(content, chapter_number,
+                                        chapter_title)
+        with self._lock:
+            self._sections[chapter_index] = (chapter_number, chapter_title,
+                                             cleaned)
+        return self._section_text(cleaned)
+
+    def refresh_chapter(self, chapter_index: int, content: str):
+        """章节正文被修改（如融合编辑）后重新清理该章节"""
+        section = self._sections.get(chapter_index)
+        if section is not None:
+            chapter_number, chapter_title, _ = section
+            self.append_chapter(chapter_index, content, chapter_number,
+                                chapter_title)
+
+    def add_sources(self, sources: list[Source]) -> list[str]:
+        """
+        登记引用源，已登记的信源ID不会重复添加
+
+        Returns:
+            list[str]: 本次新增的参考文献条目
+        """
+        new_citations = []
+        with self._lock:
+            for source in sources:
+                if source.id not in self._citations:
+                    citation = format_citation(source.id, source)
+                    self._citations[source.id] = citation
+                    new_citations.append(citation)
+        return new_citations
+
+    def document(self) -> str:
+        """按章节顺序拼接已组装的文档（不含参考文献）"""
+        body = "".join(
+            self._section_text(self._sections[index][2])
+            for index in sorted(self._sections))
+        return self._header + body
+
+    def bibliography(self, source_ids: Optional[list[int]] = None) -> str:
+        """
+        生成参考文献部分
+
+        Args:
+            source_ids: 按此顺序列出已登记的条目（如状态中的 cited_source_ids），
+                None 时按首次登记的顺序列出全部条目
+        """
+        if source_ids is None:
+            source_ids = list(self._citations)
+        citations = [
+            self._citations[source_id] for source_id in source_ids
+            if source_id in self._citations
+        ]
+        if not citations:
+            return "\n## 参考文献\n\n暂无参考文献。\n"
+        return "\n".join(["\n## 参考文献\n", *citations])
+
+    @property
+    def citation_count(self) -> int:
+        return len(self._citations)
+
+    @staticmethod
+    def _section_text(cleaned: str) -> str:
+        return f"\n\n{cleaned}\n\n{SECTION_SEPARATOR}"
+
+    def __len__(self) -> int:
+        return len(self._sections)
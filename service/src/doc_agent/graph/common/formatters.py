@@ -10,6 +10,7 @@ import re
 from typing import Optional
 
 from doc_agent.core.logger import logger
+from doc_agent.graph.common.citations import SOURCES_TAG, rewrite_citations
 from doc_agent.schemas import Source
 
 
@@ -80,7 +81,6 @@ def process_citations(
     Returns:
         tuple[str, list[Source]]: (处理后的文本, 引用的源列表)
     """
-    processed_text = raw_text
     cited_sources = []
 
     if global_cited_sources is None:
@@ -89,61 +89,54 @@ def process_citations(
     try:
         # 创建源ID到源对象的映射
         source_map = {source.id: source for source in available_sources}
+        # 全局编号即信源在 global_cited_sources 中的插入顺序
+        global_numbers = {
+            source_id: number
+            for number, source_id in enumerate(global_cited_sources, 1)
+        }
+        tag_count = 0
+
+        def _format_sources_tag(kind: str, source_ids: list[int],
+                                original: str) -> str:
+            nonlocal tag_count
+            tag_count += 1
+            if not source_ids:  # 空标签 <sources>[]</sources>
+                # 替换为空字符串（综合分析，不需要引用）
+                logger.debug("  📝 处理空引用标记（综合分析）")
+                return ""
 
-        # 查找所有 <sources>[...]</sources> 标签
-        sources_pattern = r'<sources>\[([^\]]*)\]</sources>'
-        matches = re.findall(sources_pattern, processed_text)
+            logger.debug(f"  📚 解析到源ID: {source_ids}")
 
-        logger.debug(f"🔍 找到 {len(matches)} 个引用标记")
+            # 收集引用的源并分配全局编号
+            citation_markers = []
+            for source_id in source_ids:
+                if source_id in source_map:
+                    source = source_map[source_id]
+                    cited_sources.append(source)
 
-        for match in matches:
-            if not match.strip():  # 空标签 <sources>[]</sources>
-                # 替换为空字符串（综合分析，不需要引用）
-                processed_text = processed_text.replace(
-                    f'<sources>[{match}]</sources>', '', 1)
-                logger.debug("  📝 处理空引用标记（综合分析）")
-                continue
-
-            # 解析源ID列表
-            try:
-                source_ids = [
-                    int(id.strip()) for id in match.split(',')
-                    if id.strip().isdigit()
-                ]
-                logger.debug(f"  📚 解析到源ID: {source_ids}")
-
-                # 收集引用的源并分配全局编号
-                citation_markers = []
-                for source_id in source_ids:
-                    if source_id in source_map:
-                        source = source_map[source_id]
-                        cited_sources.append(source)
-
-                        # 分配全局编号
-                        if source_id not in global_cited_sources:
-                            global_cited_sources[source_id] = source
-
-                        # 使用全局编号
-                        global_number = list(
-                            global_cited_sources.keys()).index(source_id) + 1
-                        citation_markers.append(f"[{global_number}]")
-
-                        logger.debug(
-                            f"    ✅ 添加引用源: [{global_number}] {source.title}")
-                    else:
-                        logger.warning(f"    ⚠️  未找到源ID: {source_id}")
-
-                # 替换为格式化的引用标记
-                formatted_citation = "".join(citation_markers)
-                processed_text = processed_text.replace(
-                    f'<sources>[{match}]</sources>', formatted_citation, 1)
-
-            except ValueError as e:
-                logger.error(f"❌ 解析源ID失败: {e}")
-                # 移除无效的标签
-                processed_text = processed_text.replace(
-                    f'<sources>[{match}]</sources>', '', 1)
+                    # 分配全局编号
+                    if source_id not in global_cited_sources:
+                        global_cited_sources[source_id] = source
+                        global_numbers[source_id] = len(global_numbers) + 1
+
+                    # 使用全局编号
+                    global_number = global_numbers[source_id]
+                    citation_markers.append(f"[{global_number}]")
+
+                    logger.debug(
+                        f"    ✅ 添加引用源: [{global_number}] {source.title}")
+                else:
+                    logger.warning(f"    ⚠️  未找到源ID: {source_id}")
+
+            # 替换为格式化的引用标记
+            return "".join(citation_markers)
+
+        # 单次扫描完成所有 <sources>[...]</sources> 标签的替换，其他引用标记保持原样
+        processed_text, _ = rewrite_citations(raw_text,
+                                              _format_sources_tag,
+                                              kinds=frozenset({SOURCES_TAG}))
 
+        logger.debug(f"🔍 找到 {tag_count} 个引用标记")
         logger.info(f"✅ 引用处理完成，引用了 {len(cited_sources)} 个信息源")
 
     except Exception as e:
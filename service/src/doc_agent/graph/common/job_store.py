@@ -0,0 +1,206 @@
+"""
+作业级存储
+
+章节正文和被引用的信源只保存一份在作业存储中，ResearchState 里只保留引用：
+- completed_chapters: [{"chapter_index": .., "title": .., "summary": ..}]
+- cited_source_ids: [信源ID, ...]
+节点需要正文或信源详情时再按引用读取，状态更新不再随章节数增长而复制大对象
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Optional
+
+from doc_agent.core.logger import logger
+from doc_agent.graph.common.document_assembler import DocumentAssembler
+from doc_agent.graph.common.prompt_prefix import PromptPrefixTracker
+from doc_agent.schemas import Source
+
+
+class SourceRegistry:
+    """信源注册表：信源ID -> Source（同一ID以首次注册为准）"""
+
+    def __init__(self):
+        self._sources: dict[int, Source] = {}
+        self._lock = threading.Lock()
+
+    def register(self, sources: list[Source]) -> list[int]:
+        """
+        注册信源
+
+        Args:
+            sources: 信源列表
+
+        Returns:
+            list[int]: 本次新注册的信源ID（已存在的ID不会重复返回）
+        """
+        new_ids = []
+        with self._lock:
+            for source in sources:
+                if source.id not in self._sources:
+                    self._sources[source.id] = source
+                    new_ids.append(source.id)
+        return new_ids
+
+    def get(self, source_id: int) -> Optional[Source]:
+        """按ID获取信源"""
+        return self._sources.get(source_id)
+
+    def resolve(self, source_ids: list[int]) -> list[Source]:
+        """按ID列表获取信源，忽略不存在的ID"""
+        return [
+            self._sources[source_id] for source_id in source_ids
+            if source_id in self._sources
+        ]
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+
+class ChapterStore:
+    """章节存储：章节索引 -> 章节标题、正文和摘要"""
+
+    def __init__(self):
+        self._chapters: dict[int, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put(self,
+            chapter_index: int,
+            title: str,
+            content: str,
+            summary: str = "") -> dict[str, Any]:
+        """
+        保存章节正文
+
+        Returns:
+            dict: 写入状态的章节引用 {"chapter_index", "title", "summary"}
+        """
+        with self._lock:
+            self._chapters[chapter_index] = {
+                "title": title,
+                "content": content,
+                "summary": summary
+            }
+        return {
+            "chapter_index": chapter_index,
+            "title": title,
+            "summary": summary
+        }
+
+    def content(self, chapter_index: int) -> str:
+        """获取章节正文"""
+        chapter = self._chapters.get(chapter_index)
+        return chapter["content"] if chapter else ""
+
+    def update_content(self, chapter_index: int, content: str):
+        """更新章节正文（如融合编辑后）"""
+        with self._lock:
+            if chapter_index in self._chapters:
+                self._chapters[chapter_index]["content"] = content
+
+    def update_summary(self, chapter_index: int, summary: str):
+        """更新章节摘要"""
+        with self._lock:
+            if chapter_index in self._chapters:
+                self._chapters[chapter_index]["summary"] = summary
+
+    def get(self, chapter_index: int) -> Optional[dict[str, Any]]:
+        """获取完整章节（副本）"""
+        chapter = self._chapters.get(chapter_index)
+        return dict(chapter) if chapter else None
+
+    def __len__(self) -> int:
+        return len(self._chapters)
+
+
+class JobStore:
+    """单个作业的信源注册表、章节存储和增量文档"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.created_at = time.time()
+        self.sources = SourceRegistry()
+        self.chapters = ChapterStore()
+        self.document = DocumentAssembler()
+        # 章节索引 -> 后台摘要任务
+        self.summary_tasks: dict[int, asyncio.Task] = {}
+        # 各章节共用的提示词片段（大纲、写作要求、风格参考），保证作业内逐字节一致
+        self.prompt_sections: dict[str, Any] = {}
+        # 发往 LLM 的提示词共享前缀统计
+        self.prompt_prefixes = PromptPrefixTracker()
+
+
+_job_stores: dict[str, JobStore] = {}
+_job_stores_lock = threading.Lock()
+
+
+def require_job_id(state: dict[str, Any]) -> str:
+    """
+    读取状态中的作业ID
+
+    Raises:
+        ValueError: 状态中没有 job_id（不能退回到共享的默认作业存储）
+    """
+    job_id = state.get("job_id")
+    if not job_id:
+        raise ValueError("状态中缺少 job_id，无法定位作业存储")
+    return str(job_id)
+
+
+def get_job_store(job_id: str) -> JobStore:
+    """获取（必要时创建）作业存储"""
+    if not job_id:
+        raise ValueError("job_id 不能为空，作业存储不能在作业之间共享")
+    with _job_stores_lock:
+        store = _job_stores.get(job_id)
+        if store is None:
+            store = _job_stores[job_id] = JobStore(job_id)
+        return store
+
+
+def release_job_store(job_id: str):
+    """作业结束后释放作业存储"""
+    with _job_stores_lock:
+        store = _job_stores.pop(job_id, None)
+    if store is not None:
+        for task in store.summary_tasks.values():
+            if not task.done():
+                task.cancel()
+        logger.info(
+            f"🧹 释放作业存储 {job_id}：章节 {len(store.chapters)} 个，信源 {len(store.sources)} 个")
+        if len(store.prompt_prefixes):
+            logger.info(
+                f"🧩 作业 {job_id} 提示词共享前缀: {store.prompt_prefixes.report()}")
+
+
+def load_completed_chapters(state: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    按状态中的章节引用读取完整章节
+
+    Args:
+        state: 研究状态
+
+    Returns:
+        list[dict]: [{"title": .., "content": .., "summary": ..}, ...]，与引用一一对应
+    """
+    store = get_job_store(require_job_id(state))
+    chapters = []
+    for ref in state.get("completed_chapters", []):
+        if not isinstance(ref, dict) or "content" in ref or "chapter_index" not in ref:
+            # 兼容直接携带正文的旧格式
+            chapters.append(ref)
+            continue
+        chapter = store.chapters.get(ref["chapter_index"]) or {
+            "title": ref.get("title", ""),
+            "content": "",
+            "summary": ref.get("summary", "")
+        }
+        chapters.append(chapter)
+    return chapters
+
+
+def load_cited_sources(state: dict[str, Any]) -> list[Source]:
+    """按状态中的 cited_source_ids 读取被引用的信源"""
+    store = get_job_store(require_job_id(state))
+    return store.sources.resolve(state.get("cited_source_ids", []))
@@ -0,0 +1,88 @@
+"""
+提示词共享前缀统计
+
+按节点记录同一作业发往 LLM 的提示词，统计它们的公共前缀长度，
+用于验证提示词布局能否命中推理服务的前缀缓存（prefix caching）
+"""
+
+import threading
+from typing import Optional
+
+
+def common_prefix_length(first: str, second: str) -> int:
+    """两个字符串的最长公共前缀长度"""
+    limit = min(len(first), len(second))
+    if first[:limit] == second[:limit]:
+        return limit
+    # 二分查找第一个不同的位置，比逐字符比较快得多
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class PromptPrefixStats:
+    """单个节点的提示词前缀统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_chars = 0
+        # 所有提示词共同的前缀长度
+        self.shared_prefix_chars = 0
+        # 每个提示词与上一个提示词的公共前缀长度之和（可被缓存复用的预填充量）
+        self.reusable_chars = 0
+        self._first: Optional[str] = None
+        self._previous: Optional[str] = None
+
+    def record(self, prompt: str):
+        if self._first is None:
+            self._first = prompt
+            self.shared_prefix_chars = len(prompt)
+        else:
+            self.shared_prefix_chars = common_prefix_length(
+                self._first[:self.shared_prefix_chars], prompt)
+            self.reusable_chars += common_prefix_length(self._previous, prompt)
+        self._previous = prompt
+        self.count += 1
+        self.total_chars += len(prompt)
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "prompts": self.count,
+            "avg_prompt_chars": round(self.total_chars / self.count)
+            if self.count else 0,
+            "shared_prefix_chars": self.shared_prefix_chars,
+            "reusable_ratio": round(self.reusable_chars / self.total_chars, 3)
+            if self.total_chars else 0.0
+        }
+
+
+class PromptPrefixTracker:
+    """作业级提示词前缀统计：节点名称 -> 统计"""
+
+    def __init__(self):
+        self._stats: dict[str, PromptPrefixStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, node_name: str, prompt: str):
+        """记录一次发往 LLM 的提示词"""
+        with self._lock:
+            stats = self._stats.get(node_name)
+            if stats is None:
+                stats = self._stats[node_name] = PromptPrefixStats()
+            stats.record(prompt)
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """按节点返回共享前缀统计"""
+        with self._lock:
+            return {
+                node_name: stats.to_dict()
+                for node_name, stats in self._stats.items()
+            }
+
+    def __len__(self) -> int:
+        return len(self._stats)
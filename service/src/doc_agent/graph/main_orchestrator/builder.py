@@ -4,11 +4,21 @@ import pprint
 from langgraph.graph import END, StateGraph
 
 from doc_agent.core.logger import logger
-from doc_agent.graph.main_orchestrator.nodes import (bibliography_node,
-                                                     fusion_editor_node,
-                                                     initial_research_node,
-                                                     outline_generation_node,
-                                                     split_chapters_node)
+from doc_agent.graph.callbacks import publish_event
+from doc_agent.graph.common import (
+    chapter_heading,
+    get_job_store,
+    load_completed_chapters,
+    require_job_id,
+    schedule_chapter_summary,
+)
+from doc_agent.graph.main_orchestrator.nodes import (
+    bibliography_node,
+    fusion_editor_node,
+    initial_research_node,
+    outline_generation_node,
+    split_chapters_node,
+)
 from doc_agent.graph.state import ResearchState
 from doc_agent.llm_clients import get_llm_client
 
@@ -55,19 +65,14 @@ def create_chapter_processing_node(chapter_workflow_graph):
         )
 
         # 准备子工作流的输入状态
-        # 关键：传递已完成章节的内容以保持连贯性
-        # 将新的 completed_chapters 结构转换为旧的 completed_chapters_content 格式以保持兼容性
-        completed_chapters_content = []
-        for chapter in completed_chapters:
-            if isinstance(chapter, dict):
-                completed_chapters_content.append(chapter.get("content", ""))
-            else:
-                completed_chapters_content.append(str(chapter))
+        # 关键：传递已完成章节的引用以保持连贯性，正文由 writer 按需从作业存储读取
+        job_id = require_job_id(state)
+        job_store = get_job_store(job_id)
         current_citation_index = state.get('current_citation_index', 0)
 
         chapter_workflow_input = {
             "job_id":
-            state.get("job_id", ""),
+            job_id,
             "topic":
             topic,
             "is_online":
@@ -82,8 +87,8 @@ def create_chapter_processing_node(chapter_workflow_graph):
             current_chapter_index,
             "chapters_to_process":
             chapters_to_process,
-            "completed_chapters_content":
-            completed_chapters_content,  # 关键：传递上下文
+            "completed_chapters":
+            completed_chapters,  # 关键：传递上下文（章节引用）
             "search_queries": [],  # 初始化搜索查询，planner节点会生成
             "research_plan":
             "",  # 初始化研究计划，planner节点会生成
@@ -149,9 +154,10 @@ def create_chapter_processing_node(chapter_workflow_graph):
             else:
                 max_citation_index = 0  # 如果没有引用源，使用默认值
 
-            # 从结果中提取章节内容和引用源
+            # 从结果中提取章节内容，引用源登记到作业存储，状态中只保留ID
             chapter_content = chapter_result.get("final_document", "")
-            state["all_sources"].extend(cited_sources_in_chapter)
+            new_cited_source_ids = job_store.sources.register(
+                cited_sources_in_chapter)
 
             if not chapter_content:
                 logger.warning("⚠️  章节工作流未返回内容，使用默认内容")
@@ -162,48 +168,19 @@ def create_chapter_processing_node(chapter_workflow_graph):
                 f"📚 章节引用源数量: {len(chapter_result.get('cited_sources_in_chapter', []))}"
             )
 
-            # 生成章节摘要
-            logger.info(f"📝 开始生成章节摘要: {chapter_title}")
-            try:
-                # 获取 LLM 客户端
-                llm_client = get_llm_client()
-
-                # 创建摘要提示
-                summary_prompt = f"""请为以下章节内容生成一个简洁的摘要，控制在200字以内：
-
-章节标题：{chapter_title}
-
-章节内容：
-{chapter_content}
-
-请生成一个简洁的摘要，突出章节的主要观点和关键信息："""
-
-                # 调用 LLM 生成摘要
-                current_chapter_summary = llm_client.invoke(summary_prompt,
-                                                            temperature=0.3,
-                                                            max_tokens=300)
-
-                logger.info(
-                    f"✅ 章节摘要生成完成，长度: {len(current_chapter_summary)} 字符")
-
-            except Exception as e:
-                logger.warning(f"⚠️  章节摘要生成失败: {str(e)}")
-                current_chapter_summary = f"章节摘要生成失败: {str(e)}"
-
             # 更新章节索引
             state['current_citation_index'] = max_citation_index
 
-            # 创建新完成的章节字典
-            newly_completed_chapter = {
-                "title": chapter_title,
-                "content": chapter_content,
-                "summary": current_chapter_summary
-            }
+            # 章节正文写入作业存储，状态中只追加章节引用
+            newly_completed_chapter = job_store.chapters.put(
+                current_chapter_index, chapter_title, chapter_content)
+            _append_to_document(state, current_chapter_index, chapter_content,
+                                cited_sources_in_chapter)
 
-            # 获取现有的已完成章节列表
-            completed_chapters = state.get("completed_chapters", [])
-            updated_completed_chapters = completed_chapters.copy()
-            updated_completed_chapters.append(newly_completed_chapter)
+            # 章节摘要在后台生成，与下一章的规划和检索并行
+            schedule_chapter_summary(job_id, current_chapter_index,
+                                     chapter_title, chapter_content,
+                                     get_llm_client())
 
             # 更新 writer_steps 计数器
             current_writer_steps = state.get("writer_steps", 0)
@@ -212,15 +189,15 @@ def create_chapter_processing_node(chapter_workflow_graph):
             logger.info(
                 f"📊 进度: {state['current_chapter_index']}/{len(chapters_to_process)} 章节已完成"
             )
-            logger.info(f"📚 全局引用源总数: {len(state['all_sources'])}")
+            logger.info(f"📚 全局引用源总数: {len(job_store.sources)}")
             logger.info(f"✍️  Writer步骤计数: {updated_writer_steps}")
 
             return {
-                "completed_chapters": updated_completed_chapters,
+                "completed_chapters": [newly_completed_chapter],
                 "current_citation_index": state['current_citation_index'],
                 "current_chapter_index":
                 state['current_chapter_index'] + 1,  # 🔧 修复：递增章节索引
-                "cited_sources": state["all_sources"],
+                "cited_source_ids": new_cited_source_ids,
                 "writer_steps": updated_writer_steps
             }
 
@@ -231,24 +208,20 @@ def create_chapter_processing_node(chapter_workflow_graph):
             current_writer_steps = state.get("writer_steps", 0)
             updated_writer_steps = current_writer_steps + 1
 
-            # 创建失败章节的字典
-            failed_chapter = {
-                "title": chapter_title,
-                "content": f"## {chapter_title}\n\n章节处理失败: {str(e)}",
-                "summary": f"章节处理失败: {str(e)}"
-            }
-
-            # 获取现有的已完成章节列表
-            completed_chapters = state.get("completed_chapters", [])
-            updated_completed_chapters = completed_chapters.copy()
-            updated_completed_chapters.append(failed_chapter)
+            # 记录失败章节
+            failed_chapter = job_store.chapters.put(
+                current_chapter_index, chapter_title,
+                f"## {chapter_title}\n\n章节处理失败: {str(e)}",
+                f"章节处理失败: {str(e)}")
+            _append_to_document(state, current_chapter_index,
+                                job_store.chapters.content(current_chapter_index),
+                                [])
 
             return {
-                "completed_chapters": updated_completed_chapters,
+                "completed_chapters": [failed_chapter],
                 "current_citation_index": state['current_citation_index'],
                 "current_chapter_index":
                 state['current_chapter_index'] + 1,  # 🔧 修复：失败时也要递增索引
-                "cited_sources": state["all_sources"],
                 "writer_steps": updated_writer_steps
             }
 
@@ -279,11 +252,47 @@ def chapter_decision_function(state: ResearchState) -> str:
         return "finalize_document"
 
 
+def _append_to_document(state: ResearchState, chapter_index: int,
+                        chapter_content: str, cited_sources: list) -> None:
+    """
+    将刚完成的章节追加到作业的增量文档，并发布文档增量事件
+
+    Args:
+        state: 研究状态
+        chapter_index: 章节索引
+        chapter_content: 章节正文
+        cited_sources: 本章引用的信源
+    """
+    job_id = require_job_id(state)
+    assembler = get_job_store(job_id).document
+    document_outline = state.get("document_outline", {})
+
+    header = ""
+    if not assembler.has_header:
+        header = assembler.set_header(state.get("topic", ""),
+                                      document_outline)
+
+    chapter_number, chapter_title = chapter_heading(document_outline,
+                                                    chapter_index)
+    section = assembler.append_chapter(chapter_index, chapter_content,
+                                       chapter_number, chapter_title)
+    new_citations = assembler.add_sources(cited_sources)
+
+    publish_event(
+        job_id, "文档更新", "document_generation", "RUNNING", {
+            "chapterIndex": chapter_index,
+            "delta": header + section,
+            "citations": new_citations,
+            "description": f"第{chapter_number}章已加入文档"
+        })
+
+
 def finalize_document_node(state: ResearchState) -> dict:
     """
     文档最终化节点
     
-    将所有章节内容合并为最终文档，并进行格式清理
+    章节在完成时已清理并追加到作业的增量文档，这里只拼接已组装的部分；
+    未经增量组装的章节（如旧格式的状态）在此补充
     
     Args:
         state: 研究状态
@@ -291,156 +300,49 @@ def finalize_document_node(state: ResearchState) -> dict:
     Returns:
         dict: 包含 final_document 的字典
     """
-    topic = state.get("topic", "")
-    document_outline = state.get("document_outline", {})
-    completed_chapters = state.get("completed_chapters", [])
+    assembler = get_job_store(require_job_id(state)).document
+    chapter_refs = state.get("completed_chapters", [])
 
     logger.info(f"\n📑 开始生成最终文档")
 
-    # 获取文档标题和摘要
-    doc_title = document_outline.get("title", topic)
-    doc_summary = document_outline.get("summary", "")
-
-    # 从新的 completed_chapters 结构中提取内容
-    completed_chapters_content = []
-    logger.info(
-        f"📊 finalize_document_node: completed_chapters 数量: {len(completed_chapters)}"
-    )
-
-    for i, chapter in enumerate(completed_chapters):
-        if isinstance(chapter, dict):
-            content = chapter.get("content", "")
-            title = chapter.get("title", f"第{i+1}章")
-            logger.info(
-                f"📖 finalize_document_node: 第{i+1}章 '{title}' 内容长度: {len(content)} 字符"
-            )
-            completed_chapters_content.append(content)
-        else:
-            logger.warning(
-                f"⚠️ finalize_document_node: 第{i+1}章格式异常: {type(chapter)}")
-            completed_chapters_content.append(str(chapter))
-
-    # 构建最终文档
-    final_document_parts = []
-
-    # 添加标题
-    final_document_parts.append(f"# {doc_title}\n")
-
-    # 添加摘要
-    if doc_summary:
-        final_document_parts.append(f"## 摘要\n\n{doc_summary}\n")
-
-    # 添加目录
-    final_document_parts.append("\n## 目录\n")
-    chapters = document_outline.get("chapters", [])
-    for i, chapter in enumerate(chapters):
-        # 兼容新旧格式
-        chapter_title = chapter.get('title',
-                                    chapter.get('chapter_title', f'第{i+1}章'))
-        chapter_number = chapter.get('number',
-                                     chapter.get('chapter_number', i + 1))
-        final_document_parts.append(f"{chapter_number}. {chapter_title}\n")
-
-    final_document_parts.append("\n---\n")
-
-    # 添加所有章节内容（进行格式清理）
-    for i, chapter_content in enumerate(completed_chapters_content):
-        # 获取章节信息用于标题编号
-        chapter_info = chapters[i] if i < len(chapters) else {}
-        chapter_number = chapter_info.get(
-            'number', chapter_info.get('chapter_number', i + 1))
-        chapter_title = chapter_info.get(
-            'title', chapter_info.get('chapter_title', f'第{i+1}章'))
-
-        cleaned_content = _clean_chapter_content(chapter_content,
-                                                 chapter_number, chapter_title)
-        final_document_parts.append(f"\n{cleaned_content}\n")
-        final_document_parts.append("\n---\n")
+    if not assembler.has_header:
+        assembler.set_header(state.get("topic", ""),
+                             state.get("document_outline", {}))
+
+    # 补充未增量组装的章节
+    missing = [
+        i for i, ref in enumerate(chapter_refs) if not assembler.has_chapter(
+            ref.get("chapter_index", i) if isinstance(ref, dict) else i)
+    ]
+    if missing:
+        logger.info(f"📎 补充组装 {len(missing)} 个章节")
+        completed_chapters = load_completed_chapters(state)
+        document_outline = state.get("document_outline", {})
+        for i in missing:
+            chapter = completed_chapters[i]
+            if isinstance(chapter, dict):
+                content = chapter.get("content", "")
+            else:
+                logger.warning(
+                    f"⚠️ finalize_document_node: 第{i+1}章格式异常: {type(chapter)}")
+                content = str(chapter)
+            ref = chapter_refs[i]
+            chapter_index = ref.get("chapter_index", i) if isinstance(
+                ref, dict) else i
+            chapter_number, chapter_title = chapter_heading(
+                document_outline, i)
+            assembler.append_chapter(chapter_index, content, chapter_number,
+                                     chapter_title)
 
     # 参考文献将由 bibliography_node 在后续步骤中添加
     logger.info("📚 参考文献将在后续步骤中由 bibliography_node 添加")
 
-    # 合并为最终文档
-    final_document = "\n".join(final_document_parts)
+    final_document = assembler.document()
 
     logger.info(f"✅ 最终文档生成完成，总长度: {len(final_document)} 字符")
-    logger.info(f"📖 包含 {len(completed_chapters_content)} 个章节")
+    logger.info(f"📖 包含 {len(assembler)} 个章节")
 
-    # 获取 cited_sources 并传递给下一个节点
-    cited_sources = state.get("cited_sources", [])
-    logger.info(
-        f"📚 finalize_document_node: 传递 cited_sources，数量: {len(cited_sources)}")
-
-    return {"final_document": final_document, "cited_sources": cited_sources}
-
-
-def _clean_chapter_content(content: str,
-                           chapter_number: int = None,
-                           chapter_title: str = "") -> str:
-    """
-    清理章节内容格式
-    
-    Args:
-        content: 原始章节内容
-        chapter_number: 章节编号
-        chapter_title: 章节标题
-        
-    Returns:
-        str: 清理后的内容
-    """
-    if not content:
-        return content
-
-    # 1. 移除 markdown 代码块标记
-    # 移除开头的 ```markdown 或 ``` 标记
-    content = content.strip()
-    if content.startswith("```markdown"):
-        content = content[11:]  # 移除 ```markdown
-    elif content.startswith("```"):
-        content = content[3:]  # 移除 ```
-
-    # 移除结尾的 ``` 标记
-    if content.endswith("```"):
-        content = content[:-3]
-
-    # 2. 调整标题层级
-    lines = content.split('\n')
-    cleaned_lines = []
-
-    for line in lines:
-        # 处理章节标题：将 ## 章节标题 转换为 ## 编号. 章节标题
-        if line.startswith('## ') and not line.startswith('### '):
-            # 这是章节标题，需要添加编号
-            if chapter_number and chapter_title:
-                # 如果标题已经包含编号，保持不变
-                if line.strip() == f"## {chapter_title}":
-                    line = f"## {chapter_number}. {chapter_title}"
-                else:
-                    # 否则使用提供的编号和标题
-                    line = f"## {chapter_number}. {chapter_title}"
-            # 保持二级标题层级不变
-
-        # 处理子节标题：将 ### 子节标题 转换为 ### 编号. 子节标题
-        elif line.startswith('### ') and not line.startswith('#### '):
-            # 这是子节标题，保持三级标题层级
-            pass
-
-        # 处理子节的子节标题：将 #### 子节标题 转换为 #### 编号. 子节标题
-        elif line.startswith('#### ') and not line.startswith('##### '):
-            # 这是子节的子节标题，保持四级标题层级
-            pass
-
-        cleaned_lines.append(line)
-
-    # 重新组合内容
-    cleaned_content = '\n'.join(cleaned_lines)
-
-    # 3. 移除多余的空行
-    # 将连续的空行压缩为最多两个空行
-    import re
-    cleaned_content = re.sub(r'\n{3,}', '\n\n', cleaned_content)
-
-    return cleaned_content.strip()
+    return {"final_document": final_document}
 
 
 def build_main_orchestrator_graph(initial_research_node,
@@ -3,13 +3,25 @@
 
 负责融合编辑器功能，对生成的文档进行润色和优化
 """
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 from doc_agent.core.config import settings
 from doc_agent.core.logger import logger
+from doc_agent.graph.common import (
+    get_job_store,
+    load_completed_chapters,
+    require_job_id,
+)
 from doc_agent.graph.state import ResearchState
 from doc_agent.llm_clients.base import LLMClient
 
+# 输入（prefill）的处理速度远快于输出，估算耗时时按输出速度的倍数计
+PREFILL_SPEEDUP = 10
+
 
 def fusion_editor_node(state: ResearchState,
                        llm_client: LLMClient) -> dict[str, Any]:
@@ -17,6 +29,10 @@ def fusion_editor_node(state: ResearchState,
     融合编辑器节点
     对已完成的所有章节进行整体润色和优化
 
+    全文不超过 fusion_window_max_chars 时整体编辑；否则按相邻章节组成的
+    重叠窗口并行编辑，再按窗口顺序合并编辑建议。预计耗时超过作业剩余
+    时间预算时跳过融合编辑
+
     Args:
         state: 研究状态
         llm_client: LLM客户端
@@ -24,7 +40,8 @@ def fusion_editor_node(state: ResearchState,
     Returns:
         dict: 包含编辑后内容的字典
     """
-    completed_chapters = state.get("completed_chapters", [])
+    chapter_refs = state.get("completed_chapters", [])
+    completed_chapters = load_completed_chapters(state)
     topic = state.get("topic", "")
 
     # 获取复杂度配置
@@ -40,10 +57,7 @@ def fusion_editor_node(state: ResearchState,
     # 快速模式跳过融合编辑
     if complexity_config['level'] == 'fast':
         logger.info("🚀 快速模式，跳过融合编辑")
-        return {
-            "fusion_edited": False,
-            "completed_chapters": completed_chapters
-        }
+        return {"fusion_edited": False}
 
     try:
         # 提取所有章节内容
@@ -54,33 +68,80 @@ def fusion_editor_node(state: ResearchState,
             else:
                 all_chapter_contents.append(str(chapter))
 
-        # 合并内容进行分析
-        combined_content = "\n\n---\n\n".join(all_chapter_contents)
-
-        # 构建融合编辑提示词
-        prompt = _build_fusion_editing_prompt(topic, combined_content,
-                                              complexity_config)
+        # 构建编辑窗口和对应的提示词
+        max_chars = complexity_config.get('fusion_window_max_chars', 8000)
+        windows = _build_editing_windows(
+            all_chapter_contents,
+            window_size=complexity_config.get('fusion_window_chapters', 2),
+            max_chars=max_chars)
+        prompts = [
+            _build_fusion_editing_prompt(
+                topic,
+                _combine_window_content(all_chapter_contents, window,
+                                        max_chars), complexity_config)
+            for window in windows
+        ]
 
         # 根据复杂度调整参数
         temperature = 0.6  # 较低温度确保编辑的一致性
         max_tokens = complexity_config.get('chapter_target_words', 2000)
+        max_workers = max(
+            1, min(complexity_config.get('fusion_max_concurrency', 4),
+                   len(prompts)))
+
+        # 时间预算检查
+        estimated_seconds = _estimate_editing_seconds(
+            prompts, max_tokens, max_workers,
+            complexity_config.get('fusion_tokens_per_second', 40))
+        remaining_seconds = _remaining_time_budget(
+            state, complexity_config.get('job_time_budget', -1))
+        if remaining_seconds is not None and estimated_seconds > remaining_seconds:
+            logger.warning(f"⏱️ 融合编辑预计耗时 {estimated_seconds:.0f}s，"
+                           f"超过作业剩余时间预算 {remaining_seconds:.0f}s，跳过融合编辑")
+            return {"fusion_edited": False}
+
+        logger.info(f"🎯 开始LLM融合编辑: {len(windows)} 个窗口，"
+                    f"并发 {max_workers}，预计耗时 {estimated_seconds:.0f}s")
+
+        def edit_window(prompt: str) -> str:
+            try:
+                return llm_client.invoke(prompt,
+                                         temperature=temperature,
+                                         max_tokens=max_tokens)
+            except Exception as e:
+                if len(prompts) == 1:
+                    raise
+                logger.warning(f"融合编辑窗口失败，忽略该窗口的建议: {str(e)}")
+                return ""
+
+        # 调用LLM进行融合编辑（多个窗口并行）
+        if len(prompts) == 1:
+            window_suggestions = [edit_window(prompts[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                window_suggestions = list(executor.map(edit_window, prompts))
 
-        logger.info("🎯 开始LLM融合编辑...")
-
-        # 调用LLM进行融合编辑
-        edited_suggestions = llm_client.invoke(prompt,
-                                               temperature=temperature,
-                                               max_tokens=max_tokens)
-
-        # 应用编辑建议
+        # 按窗口顺序合并编辑建议，再统一应用
+        edited_suggestions = _merge_editing_suggestions(window_suggestions)
         updated_chapters = _apply_editing_suggestions(completed_chapters,
                                                       edited_suggestions,
                                                       complexity_config)
 
+        # 编辑后的正文写回作业存储，状态中的章节引用保持不变
+        # 并重新清理增量文档中对应的章节
+        job_store = get_job_store(require_job_id(state))
+        for ref, chapter in zip(chapter_refs, updated_chapters):
+            if isinstance(ref, dict) and "chapter_index" in ref and isinstance(
+                    chapter, dict):
+                content = chapter.get("content", "")
+                job_store.chapters.update_content(ref["chapter_index"],
+                                                  content)
+                job_store.document.refresh_chapter(ref["chapter_index"],
+                                                   content)
+
         logger.info("✅ 融合编辑完成")
 
         return {
-            "completed_chapters": updated_chapters,
             "fusion_edited": True,
             "editing_suggestions": edited_suggestions
         }
@@ -91,6 +152,87 @@ def fusion_editor_node(state: ResearchState,
         return {"fusion_edited": False}
 
 
+def _build_editing_windows(chapter_contents: list[str], window_size: int,
+                           max_chars: int) -> list[list[int]]:
+    """
+    构建编辑窗口
+
+    全文不超过 max_chars 时只有一个包含全部章节的窗口；否则按 window_size
+    个相邻章节滑动，相邻窗口重叠一章，保证每个章节衔接处都被编辑到
+
+    Returns:
+        list[list[int]]: 每个窗口包含的章节索引
+    """
+    count = len(chapter_contents)
+    combined_length = sum(len(content) for content in chapter_contents)
+    window_size = max(2, window_size)
+    if count <= window_size or combined_length <= max_chars:
+        return [list(range(count))]
+
+    stride = window_size - 1
+    windows = []
+    for start in range(0, count - 1, stride):
+        windows.append(list(range(start, min(start + window_size, count))))
+        if start + window_size >= count:
+            break
+    return windows
+
+
+def _combine_window_content(chapter_contents: list[str], window: list[int],
+                            max_chars: int) -> str:
+    """合并窗口内的章节内容，按章节平均分配长度上限"""
+    per_chapter = max(1, max_chars // len(window))
+    parts = []
+    for index in window:
+        content = chapter_contents[index]
+        if len(window) > 1 and len(content) > per_chapter:
+            content = content[:per_chapter]
+        parts.append(f"【章节{index + 1}】\n{content}")
+    return "\n\n---\n\n".join(parts)[:max_chars]
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估算token数：中文按每字一个token，其余按每4个字符一个token"""
+    cjk = len(re.findall(r'[\u4e00-\u9fff]', text))
+    return cjk + (len(text) - cjk) // 4
+
+
+def _estimate_editing_seconds(prompts: list[str], max_tokens: int,
+                              max_workers: int,
+                              tokens_per_second: float) -> float:
+    """估算融合编辑耗时：窗口按并发数分批执行，每批耗时取最长的窗口"""
+    if not prompts or tokens_per_second <= 0:
+        return 0.0
+    window_seconds = max(
+        (_estimate_tokens(prompt) / PREFILL_SPEEDUP + max_tokens) /
+        tokens_per_second for prompt in prompts)
+    return math.ceil(len(prompts) / max_workers) * window_seconds
+
+
+def _remaining_time_budget(state: ResearchState,
+                           job_time_budget: float) -> float | None:
+    """作业剩余时间预算（秒），未配置预算时返回None"""
+    if job_time_budget is None or job_time_budget <= 0:
+        return None
+    started_at = state.get("job_started_at")
+    if not started_at:
+        started_at = get_job_store(require_job_id(state)).created_at
+    return job_time_budget - (time.time() - started_at)
+
+
+def _merge_editing_suggestions(window_suggestions: list[str]) -> str:
+    """按窗口顺序合并编辑建议，重叠窗口给出的相同建议只保留一次"""
+    merged = []
+    seen = set()
+    for suggestions in window_suggestions:
+        for block in re.split(r'\n\s*\n', suggestions or ""):
+            block = block.strip()
+            if block and block not in seen:
+                seen.add(block)
+                merged.append(block)
+    return "\n\n".join(merged)
+
+
 def _build_fusion_editing_prompt(topic: str, combined_content: str,
                                  complexity_config) -> str:
     """构建融合编辑提示词"""
@@ -120,7 +262,7 @@ def _build_fusion_editing_prompt(topic: str, combined_content: str,
 {editing_depth}
 
 **原始文档内容：**
-{combined_content[:8000]}  # 限制长度避免超出token限制
+{combined_content}
 
 **编辑要求：**
 - 保持原有的技术准确性和引用完整性
@@ -160,7 +302,6 @@ def _apply_editing_suggestions(completed_chapters, suggestions: str,
                 content = updated_chapter["content"]
 
                 # 清理多余空行
-                import re
                 content = re.sub(r'\n{3,}', '\n\n', content)
 
                 # 确保标题格式统一
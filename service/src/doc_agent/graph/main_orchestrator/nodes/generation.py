@@ -4,20 +4,28 @@
 负责大纲生成、章节拆分、参考文献生成等功能
 """
 
+import asyncio
 import json
 import os
 import re
 import tempfile
+from typing import Optional
 
 from doc_agent.common.prompt_selector import PromptSelector
 from doc_agent.core.config import settings
 from doc_agent.core.logger import logger
 from doc_agent.graph.callbacks import publish_event
-from doc_agent.graph.common import format_sources_to_text
+from doc_agent.graph.common import (
+    format_sources_to_text,
+    get_job_store,
+    load_cited_sources,
+    require_job_id,
+)
 from doc_agent.graph.state import ResearchState
 from doc_agent.llm_clients.base import LLMClient
 from doc_agent.schemas import Source
 from doc_agent.tools.file_module import FileProcessor
+from doc_agent.utils.retrieval_prefetch import RetrievalPrefetcher
 
 
 def outline_generation_node(state: ResearchState,
@@ -139,11 +147,15 @@ def outline_generation_node(state: ResearchState,
         return _generate_default_outline(topic, complexity_config)
 
 
-def split_chapters_node(state: ResearchState, llm_client: LLMClient) -> dict:
+async def split_chapters_node(
+        state: ResearchState,
+        llm_client: LLMClient,
+        retrieval_prefetcher: Optional[RetrievalPrefetcher] = None) -> dict:
     """
     章节拆分节点 - 统一版本
     将文档大纲拆分为独立的章节任务列表
     根据配置限制章节数量
+    拆分完成后立即在后台为后续章节预取检索结果
     """
 
     document_outline = state.get("document_outline", {})
@@ -207,6 +219,20 @@ def split_chapters_node(state: ResearchState, llm_client: LLMClient) -> dict:
             "research_data": ""
         })
 
+    # 第一章马上开始自行检索，后续章节在后台预取
+    if retrieval_prefetcher and settings.search_config.prefetch_enabled:
+        retrieval_prefetcher.start(
+            state.get("job_id", ""),
+            state.get("topic", ""),
+            chapters_to_process,
+            start_index=1,
+            search_options={
+                "initial_top_k": complexity_config.get('vector_recall_size', 10),
+                "final_top_k": complexity_config.get('rerank_size', 5),
+                "min_score": complexity_config.get('min_score', 0.3)
+            },
+            is_online=state.get("is_online", True))
+
     # 获取一句话研究计划告知
     plan_prompt1 = """
 你是一位经验丰富的总编辑和写作规划师。
@@ -291,7 +317,10 @@ def split_chapters_node(state: ResearchState, llm_client: LLMClient) -> dict:
         word_count=state.get("word_count", 0))
 
     plan_prompt = plan_prompt1 + plan_prompt2
-    response = llm_client.invoke(plan_prompt, temperature=0.5, max_tokens=2000)
+    response = await asyncio.to_thread(llm_client.invoke,
+                                       plan_prompt,
+                                       temperature=0.5,
+                                       max_tokens=2000)
 
     logger.info(f"plan_prompt: {plan_prompt}")
     logger.info(f"response: {response}")
@@ -371,8 +400,13 @@ def bibliography_node(state: ResearchState) -> dict:
     """
     参考文献生成节点
     根据全局引用源生成参考文献列表
+
+    引用条目在每章完成时已登记到作业的增量文档中，这里只补充尚未登记的信源，
+    参考文献按 cited_source_ids 的顺序（首次引用顺序）列出
     """
-    cited_sources = state.get("cited_sources", [])  # 🔧 修复：改为列表而不是字典
+    job_id = require_job_id(state)
+    cited_sources = load_cited_sources(state)
+    assembler = get_job_store(job_id).document
 
     logger.info(f"📚 开始生成参考文献，共 {len(cited_sources)} 个引用源")
 
@@ -380,47 +414,27 @@ def bibliography_node(state: ResearchState) -> dict:
     answer_origins, webs = Source.batch_to_redis_fe(cited_sources)
 
     publish_event(
-        state.get("job_id", ""), "参考文献生成", "document_generation", "RUNNING", {
+        job_id, "参考文献生成", "document_generation", "RUNNING", {
             "answerOrigins": answer_origins,
             "webs": webs,
             "description": f"开始生成参考文献，共 {len(cited_sources)} 个引用源"
         })
 
+    # 🔧 修复：使用 source.id 作为引用编号，保持与文档内容一致
+    assembler.add_sources(cited_sources)
+    bibliography = assembler.bibliography(
+        [source.id for source in cited_sources])
     if not cited_sources:
         logger.warning("没有引用源，生成空的参考文献")
-        bibliography = "\n## 参考文献\n\n暂无参考文献。\n"
     else:
-        # 生成参考文献
-        bibliography_lines = ["\n## 参考文献\n"]
-
-        # 🔧 修复：使用 source.id 作为引用编号，保持与文档内容一致
-        for source in cited_sources:
-            citation = _format_citation(source.id, source)
-            bibliography_lines.append(citation)
-
-        bibliography = "\n".join(bibliography_lines)
-
-        logger.info(f"✅ 参考文献生成完成，包含 {len(cited_sources)} 条引用")
+        logger.info(f"✅ 参考文献生成完成，包含 {assembler.citation_count} 条引用")
 
     # 获取现有的 final_document
     final_document = state.get("final_document", "")
 
-    # 检查 completed_chapters 状态
-    completed_chapters = state.get("completed_chapters", [])
-    logger.info(f"📊 completed_chapters 数量: {len(completed_chapters)}")
-
-    for i, chapter in enumerate(completed_chapters):
-        if isinstance(chapter, dict):
-            content = chapter.get("content", "")
-            title = chapter.get("title", f"第{i+1}章")
-            logger.info(f"📖 第{i+1}章 '{title}' 内容长度: {len(content)} 字符")
-            if len(content) < 50:
-                logger.warning(f"⚠️ 第{i+1}章内容过短: {content[:100]}...")
-        else:
-            logger.warning(f"⚠️ 第{i+1}章格式异常: {type(chapter)}")
+    logger.info(f"📊 completed_chapters 数量: {len(state.get('completed_chapters', []))}")
 
     # 检查 cited_sources 状态
-    cited_sources = state.get("cited_sources", [])
     logger.info(f"📚 bibliography_node: cited_sources 数量: {len(cited_sources)}")
 
     if cited_sources:
@@ -827,28 +841,3 @@ def _generate_default_outline(topic: str, complexity_config) -> dict:
         "summary": f"本文档深入探讨了{topic}的相关内容，包括问题分析和解决方案。",
         "chapters": chapters[:max_chapters]  # 确保不超过最大章节数
     }
-
-
-def _format_citation(source_id: int, source: Source) -> str:
-    """格式化单个引用"""
-    citation = f"[{source_id}] {source.title}"
-
-    # 添加作者信息
-    if source.author:
-        citation += f", {source.author}"
-
-    # 添加日期信息
-    if source.date:
-        citation += f", {source.date}"
-
-    # 添加URL信息
-    if source.url:
-        citation += f" - {source.url}"
-
-    # 添加页码信息
-    if source.page_number is not None:
-        citation += f" (第{source.page_number}页)"
-
-    citation += f" ({source.source_type})"
-
-    return citation
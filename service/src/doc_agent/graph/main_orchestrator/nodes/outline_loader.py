@@ -106,30 +106,20 @@ async def outline_loader_node(state: ResearchState, llm_client: LLMClient,
     logger.info(f"主题: {topic}")
 
     try:
-        # 1. 从ES中获取大纲文件内容
+        # 1. 从ES中按切片顺序流式读取大纲文件的全部内容，避免大文档被单页 size 截断
         logger.info("🔍 从ES中查询大纲文件内容...")
-        es_results = await es_search_tool.search_by_file_token(
-            file_token=user_outline_file,
-            top_k=1000  # 获取足够的内容
-        )
+        outline_slices = []
+        async for chunk in es_search_tool.iter_file_token_chunks(
+                user_outline_file):
+            outline_slices.append(chunk.original_content)
 
-        if not es_results:
+        if not outline_slices:
             logger.error(f"❌ 未找到file_token为 {user_outline_file} 的文档")
             raise ValueError(f"未找到大纲文件: {user_outline_file}")
 
-        # 2. 直接使用ES返回的内容
-        logger.info(f"📄 找到 {len(es_results)} 个文档片段")
-
-        if not es_results:
-            logger.error("❌ 未找到大纲文件内容")
-            raise ValueError("未找到大纲文件内容")
-
-        # 拼接所有结果
-        logger.info(f"📝 大纲文件内容: {es_results} ")
-        # 用 metadata.slice_id 为顺序排序后拼接
-        es_results.sort(key=lambda x: x.metadata.get("slice_id", 0))
-        outline_content = "\n".join(
-            [result.original_content for result in es_results])
+        # 2. 直接使用ES返回的内容（已按 meta_data.slice_id 排序）
+        logger.info(f"📄 找到 {len(outline_slices)} 个文档片段")
+        outline_content = "\n".join(outline_slices)
         logger.info(f"📝 大纲文件内容长度: {len(outline_content)} 字符")
         logger.info(f"📝 大纲文件内容预览: {outline_content[:200]}...")
 
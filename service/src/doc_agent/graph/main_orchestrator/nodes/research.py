@@ -17,7 +17,8 @@ from doc_agent.graph.state import ResearchState
 from doc_agent.llm_clients.base import LLMClient
 from doc_agent.llm_clients.providers import EmbeddingClient
 from doc_agent.tools.es_search import ESSearchTool
-from doc_agent.tools.reranker import RerankerTool
+from doc_agent.tools.reranker import RerankerTool, RerankScoreCache
+from doc_agent.tools.web_cache import CacheStatsScope, WebSearchCache
 from doc_agent.tools.web_search import WebSearchTool
 from doc_agent.utils.search_utils import search_and_rerank
 
@@ -333,112 +334,124 @@ JSON
             logger.warning(f"⚠️  Embedding客户端初始化失败: {str(e)}")
             embedding_client = None
 
-    # 执行搜索
-    for i, query in enumerate(initial_queries, 1):
-        logger.info(f"执行初始搜索 {i}/{len(initial_queries)}: {query}")
+    # 只统计本次调用的缓存命中，并发执行的其他任务不计入
+    with CacheStatsScope() as cache_scope:
+        # 执行搜索
+        for i, query in enumerate(initial_queries, 1):
+            logger.info(f"执行初始搜索 {i}/{len(initial_queries)}: {query}")
 
-        # 网络搜索
-        web_raw_results = []
-        web_str_results = ""
-        if is_online:
-            try:
-                # 使用异步搜索方法
-                web_raw_results, web_str_results = await web_search_tool.search_async(
-                    query)
-                if "模拟" in web_str_results or "mock" in web_str_results.lower(
-                ):
+            # 网络搜索
+            web_raw_results = []
+            web_str_results = ""
+            if is_online:
+                try:
+                    # 使用异步搜索方法
+                    web_raw_results, web_str_results = await web_search_tool.search_async(
+                        query)
+                    if "模拟" in web_str_results or "mock" in web_str_results.lower(
+                    ):
+                        web_str_results = ""
+                        web_raw_results = []
+                except Exception as e:
+                    logger.error(f"网络搜索失败: {str(e)}")
                     web_str_results = ""
                     web_raw_results = []
-            except Exception as e:
-                logger.error(f"网络搜索失败: {str(e)}")
-                web_str_results = ""
-                web_raw_results = []
 
-        # ES搜索
-        es_raw_results = []
-        es_str_results = ""
-        try:
-            if embedding_client:
-                # 尝试向量检索
-                try:
-                    embedding_response = embedding_client.invoke(query)
-                    embedding_data = json.loads(embedding_response)
-
-                    # 解析向量
-                    if isinstance(embedding_data, list):
-                        query_vector = embedding_data[0] if len(
-                            embedding_data) > 0 and isinstance(
-                                embedding_data[0], list) else embedding_data
-                    elif isinstance(embedding_data,
-                                    dict) and 'data' in embedding_data:
-                        query_vector = embedding_data['data']
-                    else:
-                        query_vector = None
-
-                    if query_vector:
-                        # 使用向量检索
-                        _, es_raw_results, es_str_results = await search_and_rerank(
-                            es_search_tool, query, query_vector, reranker_tool)
-                        logger.info(
-                            f"✅ 向量检索+重排序执行成功，结果长度: {len(es_raw_results)}")
-                    else:
-                        # 回退到文本搜索
+            # ES搜索
+            es_raw_results = []
+            es_str_results = ""
+            try:
+                if embedding_client:
+                    # 尝试向量检索
+                    try:
+                        embedding_response = embedding_client.invoke(query)
+                        embedding_data = json.loads(embedding_response)
+
+                        # 解析向量
+                        if isinstance(embedding_data, list):
+                            query_vector = embedding_data[0] if len(
+                                embedding_data) > 0 and isinstance(
+                                    embedding_data[0], list) else embedding_data
+                        elif isinstance(embedding_data,
+                                        dict) and 'data' in embedding_data:
+                            query_vector = embedding_data['data']
+                        else:
+                            query_vector = None
+
+                        if query_vector:
+                            # 使用向量检索
+                            _, es_raw_results, es_str_results = await search_and_rerank(
+                                es_search_tool, query, query_vector, reranker_tool)
+                            logger.info(
+                                f"✅ 向量检索+重排序执行成功，结果长度: {len(es_raw_results)}")
+                        else:
+                            # 回退到文本搜索
+                            es_raw_results = await es_search_tool.search(
+                                query, query_vector or [0.0] * 1536)
+                            logger.info(f"✅ 文本搜索执行成功，结果长度: {len(es_raw_results)}")
+
+                    except Exception as e:
+                        logger.warning(f"⚠️  向量检索失败，使用文本搜索: {str(e)}")
                         es_raw_results = await es_search_tool.search(
                             query, query_vector or [0.0] * 1536)
-                        logger.info(f"✅ 文本搜索执行成功，结果长度: {len(es_raw_results)}")
-
-                except Exception as e:
-                    logger.warning(f"⚠️  向量检索失败，使用文本搜索: {str(e)}")
+                else:
+                    # 直接使用文本搜索
                     es_raw_results = await es_search_tool.search(
                         query, query_vector or [0.0] * 1536)
-            else:
-                # 直接使用文本搜索
-                es_raw_results = await es_search_tool.search(
-                    query, query_vector or [0.0] * 1536)
 
-        except Exception as e:
-            logger.error(f"ES搜索失败: {str(e)}")
-            es_raw_results = []
-
-        # 处理搜索结果并创建Source对象
-        if web_str_results and web_str_results.strip():
-            try:
-                current_web_sources = parse_web_search_results(
-                    web_raw_results, query, source_id_counter)
-                web_sources.extend(current_web_sources)
-                all_sources.extend(current_web_sources)
-                source_id_counter += len(current_web_sources)
-                logger.info(f"✅ 从网络搜索中提取到 {len(current_web_sources)} 个源")
-            except Exception as e:
-                logger.error(f"❌ 解析网络搜索结果失败: {str(e)}")
-
-        if es_raw_results and len(es_raw_results) > 0:
-            try:
-                current_es_sources = parse_es_search_results(
-                    es_raw_results, query, source_id_counter)
-                es_sources.extend(current_es_sources)
-                all_sources.extend(current_es_sources)
-                source_id_counter += len(current_es_sources)
-                logger.info(f"✅ 从ES搜索中提取到 {len(current_es_sources)} 个源")
             except Exception as e:
-                logger.error(f"❌ 解析ES搜索结果失败: {str(e)}")
+                logger.error(f"ES搜索失败: {str(e)}")
+                es_raw_results = []
 
-    # 根据配置决定是否截断数据
-    truncate_length = complexity_config.get('data_truncate_length', -1)
-    if truncate_length > 0:
-        # 限制每个源的内容长度
-        for source in all_sources:
-            if len(source.content) > truncate_length // len(all_sources):
-                source.content = source.content[:truncate_length //
-                                                len(all_sources
-                                                    )] + "... (内容已截断)"
+            # 处理搜索结果并创建Source对象
+            if web_str_results and web_str_results.strip():
+                try:
+                    current_web_sources = parse_web_search_results(
+                        web_raw_results, query, source_id_counter)
+                    web_sources.extend(current_web_sources)
+                    all_sources.extend(current_web_sources)
+                    source_id_counter += len(current_web_sources)
+                    logger.info(f"✅ 从网络搜索中提取到 {len(current_web_sources)} 个源")
+                except Exception as e:
+                    logger.error(f"❌ 解析网络搜索结果失败: {str(e)}")
 
-    logger.info(f"✅ 初始研究完成，收集到 {len(all_sources)} 个信息源")
+            if es_raw_results and len(es_raw_results) > 0:
+                try:
+                    current_es_sources = parse_es_search_results(
+                        es_raw_results, query, source_id_counter)
+                    es_sources.extend(current_es_sources)
+                    all_sources.extend(current_es_sources)
+                    source_id_counter += len(current_es_sources)
+                    logger.info(f"✅ 从ES搜索中提取到 {len(current_es_sources)} 个源")
+                except Exception as e:
+                    logger.error(f"❌ 解析ES搜索结果失败: {str(e)}")
+
+        # 根据配置决定是否截断数据
+        truncate_length = complexity_config.get('data_truncate_length', -1)
+        if truncate_length > 0:
+            # 限制每个源的内容长度
+            for source in all_sources:
+                if len(source.content) > truncate_length // len(all_sources):
+                    source.content = source.content[:truncate_length //
+                                                    len(all_sources
+                                                        )] + "... (内容已截断)"
+
+        logger.info(f"✅ 初始研究完成，收集到 {len(all_sources)} 个信息源")
+
+    web_cache_stats = cache_scope.snapshot(
+        (WebSearchCache.SEARCH_NAMESPACE, WebSearchCache.PAGE_NAMESPACE))
+    if web_cache_stats:
+        logger.info(f"📊 网络搜索缓存命中统计: {web_cache_stats}")
+    rerank_cache_stats = cache_scope.snapshot((RerankScoreCache.NAMESPACE, ))
+    if rerank_cache_stats:
+        logger.info(f"📊 重排序分数缓存命中统计: {rerank_cache_stats}")
 
     publish_event(
         job_id, "初步调研", "outline_generation", "SUCCESS", {
             "web_sources": [safe_serialize(source) for source in web_sources],
             "es_sources": [safe_serialize(source) for source in es_sources],
+            "web_cache_stats": web_cache_stats,
+            "rerank_cache_stats": rerank_cache_stats,
             "description":
             f"初步调研完成，收集到信息源：内部搜索结果 {len(es_sources)} 个，网络搜索结果 {len(web_sources)} 个..."
         })
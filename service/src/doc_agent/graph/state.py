@@ -1,4 +1,5 @@
 # service/src/doc_agent/graph/state.py
+import operator
 from typing import Annotated, Any, Optional, TypedDict
 
 from langgraph.graph.message import add_messages
@@ -17,6 +18,7 @@ class ResearchState(TypedDict):
 
     task_prompt: str  # 用户的核心指令
     job_id: str  # 任务ID
+    job_started_at: Optional[float]  # 作业开始时间（time.time()），用于时间预算
 
     # 研究主题
     topic: str
@@ -39,9 +41,9 @@ class ResearchState(TypedDict):
     current_chapter_index: int  # 当前处理的章节索引
 
     # 上下文积累 - 保持连贯性
-    completed_chapters: list[dict[
-        str,
-        Any]]  # e.g., [{"title": "...", "content": "...", "summary": "..."}]
+    # 只保存章节引用，正文在作业存储中（graph.common.job_store），节点只需返回新完成的章节
+    completed_chapters: Annotated[list[dict[str, Any]], operator.add]
+    # e.g., [{"chapter_index": 0, "title": "...", "summary": "..."}]
 
     # 最终输出
     final_document: str  # 完整的、拼接的文档
@@ -53,14 +55,14 @@ class ResearchState(TypedDict):
     gathered_sources: list[Source]  # 当前章节收集的数据
 
     # 源追踪
-    sources: list[Source]  # 当前章节收集的所有信息源，章节生成后并入 all_sources
-    all_sources: list[Source]  # 所有章节收集的所有信息源
+    sources: list[Source]  # 当前章节收集的所有信息源
     user_requirement_sources: list[Source]  # 用户上传的需求源
     user_style_guide_sources: list[Source]  # 用户上传的样式指南源
     current_citation_index: int = 1  # 当前章节引用源的索引编号
 
     # 全局引用源追踪 - 用于最终参考文献
-    cited_sources: list[Source]  # 🔧 修复：改为列表以保持一致性
+    # 信源本体保存在作业存储的信源注册表中，节点只需返回新引用的ID
+    cited_source_ids: Annotated[list[int], operator.add]
     cited_sources_in_chapter: list[Source]  # 当前章节引用源
 
     # 用户上传文件
@@ -0,0 +1,73 @@
+"""
+LLM 端点时延统计
+
+各客户端在收到响应头时记录请求耗时，供准入控制器根据端点的实际负载调整并发上限。
+流式调用记录的是首字节时延，非流式调用记录的是完整响应时延，两者分别统计；
+完整响应时延随输出长度变化，只用于观测，并发调整只依据首字节时延
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class LatencyTracker:
+    """
+    指数滑动平均的时延统计
+
+    Args:
+        alpha: 新样本的权重，越大对时延变化越敏感
+        stale_after: 超过该时间（秒）没有新样本时视为没有观测数据
+    """
+
+    def __init__(self, alpha: float = 0.2, stale_after: float = 300.0):
+        self.alpha = alpha
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._ewma: dict[bool, float] = {}
+        self._updated_at: dict[bool, float] = {}
+        self._count: dict[bool, int] = {True: 0, False: 0}
+
+    def observe(self, seconds: float, streaming: bool):
+        with self._lock:
+            previous = self._ewma.get(streaming)
+            self._ewma[streaming] = seconds if previous is None else (
+                previous + self.alpha * (seconds - previous))
+            self._updated_at[streaming] = time.monotonic()
+            self._count[streaming] += 1
+
+    def latency(self, streaming: bool) -> Optional[float]:
+        """平滑后的时延（秒），没有近期样本时返回 None"""
+        with self._lock:
+            updated_at = self._updated_at.get(streaming)
+            if updated_at is None or time.monotonic(
+            ) - updated_at > self.stale_after:
+                return None
+            return self._ewma[streaming]
+
+    def reset(self):
+        with self._lock:
+            self._ewma.clear()
+            self._updated_at.clear()
+            self._count = {True: 0, False: 0}
+
+    def to_dict(self) -> dict:
+        first_byte = self.latency(streaming=True)
+        response = self.latency(streaming=False)
+        return {
+            "first_byte_seconds":
+            round(first_byte, 3) if first_byte is not None else None,
+            "response_seconds":
+            round(response, 3) if response is not None else None,
+            "streaming_samples": self._count[True],
+            "response_samples": self._count[False]
+        }
+
+
+# 进程内所有 LLM 客户端共享
+llm_latency = LatencyTracker()
+
+
+def record_llm_latency(seconds: float, streaming: bool):
+    """记录一次 LLM 请求从发出到收到响应头的耗时"""
+    llm_latency.observe(seconds, streaming)
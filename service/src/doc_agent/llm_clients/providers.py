@@ -1,15 +1,17 @@
 # service/src/doc_agent/llm_clients/providers.py
-import re
 import asyncio
 import json
-import time
 import pprint
-from typing import Any, Dict, List, Optional, Union, AsyncGenerator, Generator
+import re
+import time
+from collections.abc import AsyncGenerator, Generator
+from typing import Any, Dict, List, Optional, Union
 
 import httpx
 
-from doc_agent.llm_clients.base import BaseOutputParser, LLMClient
 from doc_agent.core.logger import logger
+from doc_agent.llm_clients.base import BaseOutputParser, LLMClient
+from doc_agent.llm_clients.latency import record_llm_latency
 
 
 class ReasoningParser(BaseOutputParser):
@@ -122,8 +124,11 @@ class GeminiClient(LLMClient):
             )
 
             with httpx.Client(timeout=60.0) as client:
+                request_start = time.perf_counter()
                 response = client.post(url, json=data, headers=headers)
                 response.raise_for_status()
+                record_llm_latency(time.perf_counter() - request_start,
+                                   streaming=False)
 
                 result = response.json()
 
@@ -207,11 +212,14 @@ class GeminiClient(LLMClient):
                 f"Gemini 流式API请求:\nURL: {url}\nData: {pprint.pformat(data)}")
 
             async with httpx.AsyncClient(timeout=60.0) as client:
+                request_start = time.perf_counter()
                 async with client.stream("POST",
                                          url,
                                          json=data,
                                          headers=headers) as response:
                     response.raise_for_status()
+                    record_llm_latency(time.perf_counter() - request_start,
+                                       streaming=True)
 
                     if "chataiapi.com" in self.base_url:
                         # ChatAI API 流式格式
@@ -304,8 +312,11 @@ class DeepSeekClient(LLMClient):
             headers = {"Authorization": f"Bearer {self.api_key}"}
 
             with httpx.Client(timeout=60.0) as client:
+                request_start = time.perf_counter()
                 response = client.post(url, json=data, headers=headers)
                 response.raise_for_status()
+                record_llm_latency(time.perf_counter() - request_start,
+                                   streaming=False)
 
                 result = response.json()
 
@@ -357,11 +368,14 @@ class DeepSeekClient(LLMClient):
             headers = {"Authorization": f"Bearer {self.api_key}"}
 
             async with httpx.AsyncClient(timeout=60.0) as client:
+                request_start = time.perf_counter()
                 async with client.stream("POST",
                                          url,
                                          json=data,
                                          headers=headers) as response:
                     response.raise_for_status()
+                    record_llm_latency(time.perf_counter() - request_start,
+                                       streaming=True)
 
                     async for line in response.aiter_lines():
                         if line.startswith("data: "):
@@ -444,8 +458,11 @@ class MoonshotClient(LLMClient):
             http_client = httpx.Client(timeout=60.0)
 
             with http_client as client:
+                request_start = time.perf_counter()
                 response = client.post(url, json=data, headers=headers)
                 response.raise_for_status()
+                record_llm_latency(time.perf_counter() - request_start,
+                                   streaming=False)
 
                 result = response.json()
 
@@ -503,11 +520,14 @@ class MoonshotClient(LLMClient):
             }
 
             async with httpx.AsyncClient(timeout=60.0) as client:
+                request_start = time.perf_counter()
                 async with client.stream("POST",
                                          url,
                                          json=data,
                                          headers=headers) as response:
                     response.raise_for_status()
+                    record_llm_latency(time.perf_counter() - request_start,
+                                       streaming=True)
 
                     async for line in response.aiter_lines():
                         if line.startswith("data: "):
@@ -588,8 +608,11 @@ class InternalLLMClient(LLMClient):
             } if self.api_key != "EMPTY" else {}
 
             with httpx.Client(timeout=180.0) as client:  # 内部模型可能需要更长时间
+                request_start = time.perf_counter()
                 response = client.post(url, json=data, headers=headers)
                 response.raise_for_status()
+                record_llm_latency(time.perf_counter() - request_start,
+                                   streaming=False)
 
                 result = response.json()
 
@@ -642,9 +665,12 @@ class InternalLLMClient(LLMClient):
             } if self.api_key != "EMPTY" else {}
 
             with httpx.Client(timeout=180.0) as client:  # 内部模型可能需要更长时间
+                request_start = time.perf_counter()
                 with client.stream("POST", url, json=data,
                                    headers=headers) as response:
                     response.raise_for_status()
+                    record_llm_latency(time.perf_counter() - request_start,
+                                       streaming=True)
 
                     for line in response.iter_lines():
                         # line 已经是字符串，不需要解码
@@ -707,11 +733,14 @@ class InternalLLMClient(LLMClient):
 
             async with httpx.AsyncClient(
                     timeout=180.0) as client:  # 内部模型可能需要更长时间
+                request_start = time.perf_counter()
                 async with client.stream("POST",
                                          url,
                                          json=data,
                                          headers=headers) as response:
                     response.raise_for_status()
+                    record_llm_latency(time.perf_counter() - request_start,
+                                       streaming=True)
 
                     async for line in response.aiter_lines():
                         if line.startswith("data: "):
@@ -756,41 +785,78 @@ class InternalLLMClient(LLMClient):
 
 class RerankerClient(LLMClient):
 
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self,
+                 base_url: str,
+                 api_key: str,
+                 batch_url: Optional[str] = None,
+                 max_concurrency: int = 4,
+                 timeout: float = 60.0):
         """
         初始化Reranker客户端
         Args:
             base_url: Reranker API地址
             api_key: API密钥
+            batch_url: 批量重排序API地址（后端支持时配置，一次请求处理多组查询）
+            max_concurrency: 不支持批量接口时的最大并行请求数
+            timeout: 请求超时时间（秒）
         """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
-
-    def invoke(self, prompt: str, **kwargs) -> dict:
+        self.batch_url = batch_url.rstrip('/') if batch_url else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        # 异步连接池按事件循环复用，httpx.AsyncClient 不能跨事件循环使用
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}"
+        } if self.api_key != "EMPTY" else {}
+
+    @staticmethod
+    def _build_payload(prompt: str, **kwargs) -> dict:
+        documents = kwargs.get("documents", [])
+        doc_objs = [{"text": doc} for doc in documents]
+        size = kwargs.get("size", len(doc_objs))
+        return {"query": prompt, "doc_list": doc_objs, "size": size}
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环上的池化异步客户端"""
+        loop = asyncio.get_running_loop()
+        if (self._async_client is None or self._async_client.is_closed
+                or self._async_client_loop is not loop):
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency * 2,
+                    max_keepalive_connections=self.max_concurrency))
+            self._async_client_loop = loop
+        return self._async_client
+
+    def invoke(self,
+               prompt: str,
+               timeout: Optional[float] = None,
+               **kwargs) -> dict:
         """
         调用Reranker API
         Args:
             prompt: 输入提示
+            timeout: 本次请求的超时时间（秒），None 时使用客户端默认值
             **kwargs: 其他参数
         Returns:
             dict: 重排序结果
         """
         try:
-            documents = kwargs.get("documents", [])
-            doc_objs = [{"text": doc} for doc in documents]
-            size = kwargs.get("size", len(doc_objs))
-            data = {"query": prompt, "doc_list": doc_objs, "size": size}
+            data = self._build_payload(prompt, **kwargs)
             url = f"{self.base_url}"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}"
-            } if self.api_key != "EMPTY" else {}
 
             logger.debug(
                 f"Reranker API request:\nURL: {url}\nData: {pprint.pformat(data)}"
             )
 
-            with httpx.Client(timeout=60.0) as client:
-                response = client.post(url, json=data, headers=headers)
+            with httpx.Client(timeout=timeout or self.timeout) as client:
+                response = client.post(url, json=data, headers=self._headers())
                 response.raise_for_status()
                 result = response.json()
                 return result
@@ -798,6 +864,91 @@ class RerankerClient(LLMClient):
             logger.error(f"Reranker API调用失败: {str(e)}")
             raise Exception(f"Reranker API调用失败: {str(e)}") from e
 
+    async def ainvoke(self, prompt: str, **kwargs) -> dict:
+        """
+        异步调用Reranker API（复用连接池）
+        Args:
+            prompt: 查询文本
+            **kwargs: documents, size
+        Returns:
+            dict: 重排序结果
+        """
+        try:
+            data = self._build_payload(prompt, **kwargs)
+            logger.debug(
+                f"Reranker 异步API请求: URL: {self.base_url}, 文档数: {len(data['doc_list'])}"
+            )
+            client = self._get_async_client()
+            response = await client.post(self.base_url,
+                                         json=data,
+                                         headers=self._headers())
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Reranker 异步API调用失败: {str(e)}")
+            raise Exception(f"Reranker 异步API调用失败: {str(e)}") from e
+
+    async def abatch_invoke(
+            self, requests: list[dict[str, Any]]) -> list[Union[dict, Exception]]:
+        """
+        批量重排序多组 (query, documents)
+        配置了 batch_url 时一次请求完成；否则（或批量接口失败时）按
+        max_concurrency 有界并行发送单独请求
+
+        Args:
+            requests: [{"query": str, "documents": list[str], "size": int}, ...]
+        Returns:
+            list: 与 requests 一一对应的结果，单组失败时对应位置为异常对象
+        """
+        if not requests:
+            return []
+
+        if self.batch_url:
+            try:
+                payload = {
+                    "batch": [
+                        self._build_payload(item["query"],
+                                            documents=item.get("documents", []),
+                                            size=item.get(
+                                                "size",
+                                                len(item.get("documents",
+                                                             []))))
+                        for item in requests
+                    ]
+                }
+                client = self._get_async_client()
+                response = await client.post(self.batch_url,
+                                             json=payload,
+                                             headers=self._headers())
+                response.raise_for_status()
+                results = response.json().get("results", [])
+                if len(results) == len(requests):
+                    return results
+                logger.warning(
+                    f"批量重排序返回数量不匹配: {len(results)} != {len(requests)}，改用并行请求")
+            except Exception as e:
+                logger.warning(f"批量重排序接口调用失败，改用并行请求: {str(e)}")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _invoke_one(item: dict[str, Any]) -> dict:
+            async with semaphore:
+                return await self.ainvoke(item["query"],
+                                          documents=item.get("documents", []),
+                                          size=item.get(
+                                              "size",
+                                              len(item.get("documents", []))))
+
+        return await asyncio.gather(*(_invoke_one(item) for item in requests),
+                                    return_exceptions=True)
+
+    async def aclose(self):
+        """关闭异步连接池"""
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_client_loop = None
+
     def stream(self, prompt: str, **kwargs) -> Generator[str, None, None]:
         """
         Reranker客户端不支持流式输出，返回空生成器
@@ -809,10 +960,10 @@ class RerankerClient(LLMClient):
     async def astream(self, prompt: str,
                       **kwargs) -> AsyncGenerator[str, None]:
         """
-        Reranker客户端不支持流式输出
+        Reranker没有增量输出，异步调用完成后以单个JSON片段返回完整结果
         """
-        raise NotImplementedError("Reranker客户端不支持流式输出")
-        yield  # 这行永远不会执行，只是为了满足类型注解
+        result = await self.ainvoke(prompt, **kwargs)
+        yield json.dumps(result, ensure_ascii=False)
 
 
 class EmbeddingClient(LLMClient):
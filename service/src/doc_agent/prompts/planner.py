@@ -1,6 +1,8 @@
 # service/src/doc_agent/prompts/planner.py
 """
 规划器提示词模板
+
+固定的任务要求和输出格式在前、章节信息在后，同一作业内各章节的请求共享前缀
 """
 
 V1_DEFAULT = """
@@ -62,15 +64,7 @@ V1_SIMPLE = """
 
 # 从 nodes.py 提取的备用模板
 V1_FALLBACK = """
-你是一个专业的研究规划专家。请为以下章节制定详细的研究计划和搜索策略。
-
-**文档主题:** {topic}
-
-**当前章节信息:**
-- 章节标题: {chapter_title}
-- 章节描述: {chapter_description}
-
-{sub_sections_text}
+你是一个专业的研究规划专家。请为下面给出的章节制定详细的研究计划和搜索策略。
 
 **任务要求:**
 1. 分析章节主题和子节结构，确定研究重点和方向
@@ -84,16 +78,20 @@ V1_FALLBACK = """
 - research_plan: 详细的研究计划
 - search_queries: 搜索查询列表（数组）
 
+**文档主题:** {topic}
+
+**当前章节信息:**
+- 章节标题: {chapter_title}
+- 章节描述: {chapter_description}
+
+{sub_sections_text}
+
 请立即开始制定研究计划。
 """
 
 # 快速版本的规划器prompt
 V2_FAST = """
-你是一个专业的研究规划专家。请为以下章节制定简化的研究计划和搜索策略。
-
-**文档主题:** {topic}
-**当前章节:** {chapter_title}
-**章节描述:** {chapter_description}
+你是一个专业的研究规划专家。请为下面给出的章节制定简化的研究计划和搜索策略。
 
 请严格按照以下 JSON 格式输出，不要包含任何其他内容：
 
@@ -108,15 +106,15 @@ V2_FAST = """
 3. 必须严格按照 JSON 格式输出，确保 JSON 格式正确
 4. 搜索查询应该使用通用关键词，确保能在知识库中找到相关内容
 5. 搜索查询应该针对当前章节的核心内容
-"""
-
-# 快速版本的规划器prompt（来自fast_prompts）
-V3_FAST = """
-你是一个专业的研究规划专家。请为以下章节制定简化的研究计划和搜索策略。
 
 **文档主题:** {topic}
 **当前章节:** {chapter_title}
 **章节描述:** {chapter_description}
+"""
+
+# 快速版本的规划器prompt（来自fast_prompts）
+V3_FAST = """
+你是一个专业的研究规划专家。请为下面给出的章节制定简化的研究计划和搜索策略。
 
 请严格按照以下 JSON 格式输出，不要包含任何其他内容：
 
@@ -131,6 +129,10 @@ V3_FAST = """
 3. 必须严格按照 JSON 格式输出，确保 JSON 格式正确
 4. 搜索查询应该使用通用关键词，确保能在知识库中找到相关内容
 5. 搜索查询应该针对当前章节的核心内容
+
+**文档主题:** {topic}
+**当前章节:** {chapter_title}
+**章节描述:** {chapter_description}
 """
 
 # 支持版本选择的PROMPTS字典
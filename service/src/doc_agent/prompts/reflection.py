@@ -2,23 +2,12 @@
 """
 Reflection 节点的提示词模板
 
-用于智能查询扩展，分析现有数据和查询，生成更精确的搜索查询
+用于智能查询扩展，分析现有数据和查询，生成更精确的搜索查询。
+固定的分析要求和输出格式在前，章节信息、原始查询和数据摘要在后
 """
 
 V1_DEFAULT = """
-你是一个专业的研究专家和查询优化师。请分析现有的搜索查询和已收集的数据，生成更精确、更相关的搜索查询。
-
-**文档主题:** {topic}
-
-**当前章节信息:**
-- 章节标题: {chapter_title}
-- 章节描述: {chapter_description}
-
-**原始搜索查询:**
-{original_queries}
-
-**已收集的数据摘要:**
-{gathered_data_summary}
+你是一个专业的研究专家和查询优化师。请分析下方给出的原始搜索查询和已收集的数据，生成更精确、更相关的搜索查询。
 
 **任务要求:**
 1. 仔细分析已收集的数据，识别信息缺口、模糊之处或新的有趣方向
@@ -35,12 +24,6 @@ V1_DEFAULT = """
 - new_queries: 新的搜索查询列表（数组，2-3个查询）
 - reasoning: 简要说明为什么需要这些新查询
 
-请立即开始分析并生成新的查询。
-"""
-
-V1_ANALYTICAL = """
-你是一个高级研究分析师和查询优化专家。请基于深度分析现有数据和查询，生成更精确、更有针对性的搜索查询。
-
 **文档主题:** {topic}
 
 **当前章节信息:**
@@ -53,6 +36,12 @@ V1_ANALYTICAL = """
 **已收集的数据摘要:**
 {gathered_data_summary}
 
+请立即开始分析并生成新的查询。
+"""
+
+V1_ANALYTICAL = """
+你是一个高级研究分析师和查询优化专家。请基于深度分析现有数据和查询，生成更精确、更有针对性的搜索查询。
+
 **分析要求:**
 1. 深度分析已收集数据的质量和覆盖范围
 2. 识别数据中的关键信息、趋势和模式
@@ -71,12 +60,6 @@ V1_ANALYTICAL = """
 - reasoning: 详细说明分析过程和为什么需要这些新查询
 - data_insights: 从现有数据中发现的关键洞察
 
-请立即开始深度分析并生成新的查询。
-"""
-
-V1_EXPLORATORY = """
-你是一个创新研究专家和查询探索师。请基于现有数据发现新的研究方向和探索机会，生成创新性的搜索查询。
-
 **文档主题:** {topic}
 
 **当前章节信息:**
@@ -89,6 +72,12 @@ V1_EXPLORATORY = """
 **已收集的数据摘要:**
 {gathered_data_summary}
 
+请立即开始深度分析并生成新的查询。
+"""
+
+V1_EXPLORATORY = """
+你是一个创新研究专家和查询探索师。请基于现有数据发现新的研究方向和探索机会，生成创新性的搜索查询。
+
 **探索要求:**
 1. 分析现有数据中隐藏的模式和趋势
 2. 识别与主题相关但尚未充分探索的新角度
@@ -107,16 +96,11 @@ V1_EXPLORATORY = """
 - reasoning: 详细说明探索过程和创新思路
 - exploration_insights: 从探索中发现的新视角和机会
 
-请立即开始探索性分析并生成新的查询。
-"""
-
-# 简化版本的 reflection prompt
-V2_FAST = """
-你是一个专业的研究专家和查询优化师。请快速分析现有的搜索查询和已收集的数据，生成更精确的搜索查询。
-
 **文档主题:** {topic}
-**当前章节:** {chapter_title}
-**章节描述:** {chapter_description}
+
+**当前章节信息:**
+- 章节标题: {chapter_title}
+- 章节描述: {chapter_description}
 
 **原始搜索查询:**
 {original_queries}
@@ -124,6 +108,13 @@ V2_FAST = """
 **已收集的数据摘要:**
 {gathered_data_summary}
 
+请立即开始探索性分析并生成新的查询。
+"""
+
+# 简化版本的 reflection prompt
+V2_FAST = """
+你是一个专业的研究专家和查询优化师。请快速分析下方给出的原始搜索查询和已收集的数据，生成更精确的搜索查询。
+
 **任务要求:**
 1. 快速分析已收集的数据，识别主要信息缺口
 2. 生成2个新的、更具体的搜索查询
@@ -142,6 +133,16 @@ V2_FAST = """
 2. reasoning 应该简要说明查询的目的
 3. 必须严格按照 JSON 格式输出，确保 JSON 格式正确
 4. 搜索查询应该使用通用关键词，确保能在知识库中找到相关内容
+
+**文档主题:** {topic}
+**当前章节:** {chapter_title}
+**章节描述:** {chapter_description}
+
+**原始搜索查询:**
+{original_queries}
+
+**已收集的数据摘要:**
+{gathered_data_summary}
 """
 
 # 支持版本选择的PROMPTS字典
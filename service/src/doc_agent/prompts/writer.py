@@ -1,24 +1,15 @@
 # service/src/doc_agent/prompts/writer.py
 """
 写作器提示词模板
+
+所有模板采用"稳定前缀"布局：角色、写作规则、文档主题、文档大纲、写作要求和风格参考
+在前，同一作业内各章节逐字节一致；已完成章节、当前章节信息和本章信息源放在最后。
+推理服务的前缀缓存（KV cache）因此可以在同一作业的所有章节之间复用前缀的预填充结果
 """
 
 V1_DEFAULT = """
 **角色:** 你是一位专业的研究员和文档撰写专家，负责撰写高质量的章节内容。
 
-**文档主题:** {topic}
-
-**当前章节信息:**
-- 章节标题: {chapter_title}
-- 章节描述: {chapter_description}
-- 章节序号: 第{chapter_number}章（共{total_chapters}章）
-
-**已完成的章节内容（用于保持连贯性）:**
-{previous_chapters_context}
-
-**本章可用信息源**
-{available_sources_text}
-
 **写作任务:**
 基于提供的研究数据，为当前章节撰写内容。请遵循以下要求：
 
@@ -47,54 +38,57 @@ V1_DEFAULT = """
    - 根据研究数据的丰富程度调整篇幅
    - 一般每章2000-4000字为宜
 
-请立即开始撰写当前章节的内容。
-"""
+**文档主题:** {topic}
 
-# 简化版本的写作器prompt（用于长度限制时）
-V1_SIMPLE = """
-**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写高质量的章节内容。
+**文档大纲（共{total_chapters}章）:**
+{document_outline}
 
-**文档主题:** {topic}
+**已完成的章节内容（用于保持连贯性）:**
+{previous_chapters_context}
 
 **当前章节信息:**
 - 章节标题: {chapter_title}
 - 章节描述: {chapter_description}
 - 章节序号: 第{chapter_number}章（共{total_chapters}章）
 
-**已完成的章节内容（摘要）:**
-{previous_chapters_context}
-
-**当前章节的研究数据:**
+**本章可用信息源**
 {available_sources_text}
 
-**写作任务:**
-基于研究数据撰写当前章节，确保与前面章节连贯，使用Markdown格式，以##开始章节标题。
+请立即开始撰写当前章节的内容。
 """
 
-# 支持引用的高级写作器prompt
-V2_WITH_CITATIONS = """
-**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写高质量的章节内容，并严格按照引用规范进行写作。
+# 简化版本的写作器prompt（用于长度限制时）
+V1_SIMPLE = """
+**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写高质量的章节内容。
+
+**写作任务:**
+基于研究数据撰写当前章节，确保与前面章节连贯，使用Markdown格式，以##开始章节标题。
 
 **文档主题:** {topic}
 
+**文档大纲（共{total_chapters}章）:**
+{document_outline}
+
+**已完成的章节内容（摘要）:**
+{previous_chapters_context}
+
 **当前章节信息:**
 - 章节标题: {chapter_title}
 - 章节描述: {chapter_description}
 - 章节序号: 第{chapter_number}章（共{total_chapters}章）
 
-**已完成的章节内容（用于保持连贯性）:**
-{previous_chapters_context}
-
 **当前章节的研究数据:**
 {available_sources_text}
+"""
 
-**可用信息源列表:**
-{available_sources}
+# 支持引用的高级写作器prompt
+V2_WITH_CITATIONS = """
+**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写高质量的章节内容，并严格按照引用规范进行写作。
 
 **重要引用规则:**
 在撰写每个段落或关键陈述时，你必须严格遵循以下规则：
 
-1. **引用格式:** 在段落中适当位置使用后面的引用格式，如 `<[1]>`、`<[2]>` 等，对应可用信息源列表中的源ID。
+1. **引用格式:** 在段落中适当位置使用后面的引用格式，如 `<[1]>`、`<[2]>` 等，对应本章可用信息源列表中的源ID。
 
 2. **专业论文引用原则:**
    - **引用密度控制:** 每个段落最多引用2-3个信息源，避免过度引用
@@ -145,27 +139,29 @@ V2_WITH_CITATIONS = """
 在具体的技术实现方面，现代水电站采用了先进的计算机监控系统，能够实时监测设备运行状态，及时发现和处理潜在问题 <[2]>。根据行业标准，这些系统的可靠性已达到99.5%以上 <[3]>。
 ```
 
-请严格按照上述格式要求撰写当前章节的内容。
-"""
+**文档主题:** {topic}
 
-# 支持子节结构的写作器prompt
-V3_WITH_SUBSECTIONS = """
-**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写高质量的章节内容，并严格按照引用规范进行写作。
+**文档大纲（共{total_chapters}章）:**
+{document_outline}
 
-**文档主题:** {topic}
+**已完成的章节内容（用于保持连贯性）:**
+{previous_chapters_context}
 
 **当前章节信息:**
 - 章节标题: {chapter_title}
 - 章节描述: {chapter_description}
 - 章节序号: 第{chapter_number}章（共{total_chapters}章）
-- 子章节编排：{sub_sections_info}
-
-**已完成的章节内容（用于保持连贯性）:**
-{previous_chapters_context}
 
 **本章可用信息源列表**
 {available_sources_text}
 
+请严格按照上述格式要求撰写当前章节的内容。
+"""
+
+# 支持子节结构的写作器prompt
+V3_WITH_SUBSECTIONS = """
+**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写高质量的章节内容，并严格按照引用规范进行写作。
+
 **重要引用规则:**
 在撰写每个段落或关键陈述时，你必须严格遵循以下规则：
 
@@ -220,28 +216,30 @@ V3_WITH_SUBSECTIONS = """
 在具体的技术实现方面，现代水电站采用了先进的计算机监控系统，能够实时监测设备运行状态，及时发现和处理潜在问题 <[2]>。根据行业标准，这些系统的可靠性已达到99.5%以上 <[3]>。
 ```
 
-请严格按照上述格式要求撰写当前章节的内容。
-"""
+**文档主题:** {topic}
 
-# 快速版本的写作器prompt（来自fast_prompts）
-V4_FAST = """
-**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写简洁的章节内容，并严格按照引用规范进行写作。
+**文档大纲（共{total_chapters}章）:**
+{document_outline}
 
-**文档主题:** {topic}
+**已完成的章节内容（用于保持连贯性）:**
+{previous_chapters_context}
 
 **当前章节信息:**
 - 章节标题: {chapter_title}
 - 章节描述: {chapter_description}
 - 章节序号: 第{chapter_number}章（共{total_chapters}章）
-- 章节字数：{chapter_word_count}
 - 子章节编排：{sub_sections_info}
 
-**已完成的章节内容（用于保持连贯性）:**
-{previous_chapters_context}
-
 **本章可用信息源列表**
 {available_sources_text}
 
+请严格按照上述格式要求撰写当前章节的内容。
+"""
+
+# 快速版本的写作器prompt（来自fast_prompts）
+V4_FAST = """
+**角色:** 你是一位专业的研究员和文档撰写专家，负责撰写简洁的章节内容，并严格按照引用规范进行写作。
+
 **重要引用规则:**
 在撰写每个段落或关键陈述时，你必须严格遵循以下规则：
 
@@ -280,13 +278,12 @@ V4_FAST = """
    - 重要观点使用粗体强调
 
 5. **篇幅控制:**
-   - 字数必须严格控制在{chapter_word_count}字，不要超过
+   - 字数必须严格控制在当前章节信息给出的章节字数以内，不要超过
    - 章节内容应该简洁但完整
    - 重点突出，避免冗余
 
 6. **其他要求**
-   - 写作要求：{prompt_requirements}
-   - 行文风格参考：{style_requirements}
+   - 遵循下方给出的写作要求和行文风格参考
 
 **输出格式示例:**
 
@@ -298,7 +295,29 @@ V4_FAST = """
 
 在具体的技术实现方面，现代水电站采用了先进的计算机监控系统，能够实时监测设备运行状态，及时发现和处理潜在问题 <[2]>。根据行业标准，这些系统的可靠性已达到99.5%以上 <[3]>。
 
+**文档主题:** {topic}
+
+**文档大纲（共{total_chapters}章）:**
+{document_outline}
+
+**写作要求:**
+{prompt_requirements}
 
+**行文风格参考:**
+{style_requirements}
+
+**已完成的章节内容（用于保持连贯性）:**
+{previous_chapters_context}
+
+**当前章节信息:**
+- 章节标题: {chapter_title}
+- 章节描述: {chapter_description}
+- 章节序号: 第{chapter_number}章（共{total_chapters}章）
+- 章节字数：{chapter_word_count}
+- 子章节编排：{sub_sections_info}
+
+**本章可用信息源列表**
+{available_sources_text}
 
 请严格按照上述格式要求撰写当前章节的内容。
 """
@@ -22,6 +22,22 @@ class TaskCreationResponse(BaseModel):
     session_id: str = Field(..., alias="sessionId", description="会话ID，用于追踪")
 
 
+class QueuePositionResponse(BaseModel):
+    """
+    任务的排队位置和预计开始时间
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    task_id: str = Field(..., alias="taskId", description="任务ID")
+    lane: str = Field(..., description="任务所在的通道：outline、document 或 edit")
+    status: Literal["queued", "running"] = Field(...,
+                                                 description="排队中或执行中")
+    position: int = Field(..., description="在通道队列中的位置，从1开始；执行中为0")
+    eta_seconds: int = Field(...,
+                             alias="etaSeconds",
+                             description="预计多少秒后开始执行；执行中为0")
+
+
 # --- Unified Source Model ---
 class Source(BaseModel):
     """
@@ -1,15 +1,22 @@
 # service/src/doc_agent/tools/__init__.py
+import os
+from typing import Optional
+
 # 导入配置
 from doc_agent.core.config import settings
 
 from .code_execute import CodeExecuteTool
 from .es_search import ESSearchTool
+from .interpreter_pool import InterpreterPool
 from .reranker import RerankerTool
 from .web_search import WebSearchTool
 
 # 全局工具注册表，用于跟踪需要关闭的ES工具
 _es_tools_registry: set[ESSearchTool] = set()
 
+# 进程内共享的代码执行解释器池
+_interpreter_pool: Optional[InterpreterPool] = None
+
 
 def register_es_tool(tool: ESSearchTool):
     """注册ES工具到全局注册表"""
@@ -62,7 +69,11 @@ def get_es_search_tool() -> ESSearchTool:
                         username=es_config.username,
                         password=es_config.password,
                         index_prefix=es_config.index_prefix,
-                        timeout=es_config.timeout)
+                        timeout=es_config.timeout,
+                        metadata_ttl=es_config.metadata_ttl,
+                        retrieval_mode=es_config.retrieval_mode,
+                        knn_target_recall=es_config.knn_target_recall,
+                        knn_target_latency_ms=es_config.knn_target_latency_ms)
 
     # 注册到全局注册表
     register_es_tool(tool)
@@ -79,20 +90,91 @@ def get_reranker_tool() -> RerankerTool:
     # 从配置中获取reranker配置
     reranker_config = settings.get_model_config("reranker")
     if reranker_config:
-        return RerankerTool(base_url=reranker_config.url,
-                            api_key=reranker_config.api_key)
+        search_config = settings.search_config
+        return RerankerTool(
+            base_url=reranker_config.url,
+            api_key=reranker_config.api_key,
+            batch_url=search_config.rerank_batch_url,
+            max_concurrency=search_config.rerank_max_concurrency,
+            latency_budget=search_config.rerank_latency_budget,
+            degrade_cooldown=search_config.rerank_degrade_cooldown,
+            local_only=search_config.rerank_local_only)
     else:
         raise ValueError("未找到reranker配置")
 
 
+def get_retrieval_prefetcher(es_search_tool: ESSearchTool,
+                             web_search_tool: WebSearchTool,
+                             reranker_tool: RerankerTool):
+    """
+    获取跨章节检索预取器
+
+    Args:
+        es_search_tool: ES搜索工具
+        web_search_tool: 网络搜索工具
+        reranker_tool: 重排序工具
+
+    Returns:
+        RetrievalPrefetcher: 与给定工具共享连接和缓存的预取器
+    """
+    # 预取器依赖 utils.search_utils，延迟导入避免循环依赖
+    from doc_agent.llm_clients.providers import EmbeddingClient
+    from doc_agent.utils.retrieval_prefetch import RetrievalPrefetcher
+
+    embedding_client = None
+    embedding_config = settings.supported_models.get("gte_qwen")
+    if embedding_config:
+        embedding_client = EmbeddingClient(base_url=embedding_config.url,
+                                           api_key=embedding_config.api_key)
+
+    search_config = settings.search_config
+    return RetrievalPrefetcher(
+        es_search_tool=es_search_tool,
+        web_search_tool=web_search_tool,
+        reranker_tool=reranker_tool,
+        embedding_client=embedding_client,
+        max_concurrency=search_config.prefetch_concurrency,
+        max_queries_per_chapter=search_config.prefetch_max_queries_per_chapter)
+
+
+def get_interpreter_pool() -> Optional[InterpreterPool]:
+    """
+    获取进程内共享的代码执行解释器池，未启用或当前系统不支持时返回 None
+    工作进程在第一次执行代码时才启动，只构建工具列表不会创建进程
+
+    Returns:
+        Optional[InterpreterPool]: 解释器池
+    """
+    global _interpreter_pool
+    config = settings.code_execute_config
+    if not config.pool_enabled or os.name != "posix":
+        return None
+    if _interpreter_pool is None:
+        _interpreter_pool = InterpreterPool(
+            size=config.pool_size,
+            preload_modules=tuple(config.preload_modules),
+            max_runs_per_worker=config.max_runs_per_worker,
+            max_worker_memory_mb=config.max_worker_memory_mb,
+            max_output_chars=config.max_output_chars)
+    return _interpreter_pool
+
+
+def close_interpreter_pool():
+    """关闭共享的代码执行解释器池"""
+    global _interpreter_pool
+    if _interpreter_pool is not None:
+        _interpreter_pool.close()
+        _interpreter_pool = None
+
+
 def get_code_execute_tool() -> CodeExecuteTool:
     """
     获取代码执行工具实例
     
     Returns:
-        CodeExecuteTool: 配置好的代码执行工具
+        CodeExecuteTool: 配置好的代码执行工具（启用时使用共享的解释器池）
     """
-    return CodeExecuteTool()
+    return CodeExecuteTool(pool=get_interpreter_pool())
 
 
 def get_all_tools():
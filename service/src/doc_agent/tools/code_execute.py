@@ -1,19 +1,25 @@
+import asyncio
 import subprocess
 import tempfile
+from typing import Optional
 
 from doc_agent.core.logger import logger
 
+from .interpreter_pool import InterpreterPool, WorkerTimeoutError
+
 
 class CodeExecuteTool:
     """
     代码执行工具类
     用于执行代码并返回执行结果
     目前仅支持 Python 代码。
+    传入 InterpreterPool 时在预热的工作进程中执行，否则每次启动新的 python 子进程。
     TODO: 后续升级为更安全的沙箱环境（如 Docker、nsjail 等）
     """
 
-    def __init__(self):
-        logger.info("初始化代码执行工具")
+    def __init__(self, pool: Optional[InterpreterPool] = None):
+        self.pool = pool
+        logger.info(f"初始化代码执行工具{'（解释器池）' if pool else ''}")
 
     def execute(self, code: str, timeout: int = 5) -> str:
         """
@@ -29,6 +35,9 @@ class CodeExecuteTool:
         logger.info(f"开始执行代码，超时时间: {timeout}秒")
         logger.debug(f"待执行代码: {code}")
 
+        if self.pool is not None:
+            return self._execute_in_pool(code, timeout)
+
         with tempfile.NamedTemporaryFile(mode='w', suffix='.py',
                                          delete=False) as f:
             f.write(code)
@@ -53,3 +62,24 @@ class CodeExecuteTool:
             output = f"执行出错: {e}"
 
         return output
+
+    async def aexecute(self, code: str, timeout: int = 5) -> str:
+        """异步执行 Python 代码，等待期间不阻塞事件循环"""
+        return await asyncio.to_thread(self.execute, code, timeout)
+
+    def _execute_in_pool(self, code: str, timeout: int) -> str:
+        try:
+            result = self.pool.run(code, timeout)
+            output = result.output
+            if result.truncated:
+                output += "\n[输出过长，已截断]"
+            logger.debug(f"执行结果 - stdout: {result.stdout}")
+            logger.debug(f"执行结果 - stderr: {result.stderr}")
+            logger.info(f"代码执行完成，耗时: {result.duration:.3f}秒")
+        except WorkerTimeoutError:
+            logger.error(f"代码执行超时 (timeout={timeout}秒)")
+            output = "代码执行超时"
+        except Exception as e:
+            logger.error(f"代码执行出错: {e}")
+            output = f"执行出错: {e}"
+        return output
@@ -27,44 +27,20 @@ class ESDiscovery:
     async def discover_knowledge_indices(self) -> list[dict[str, Any]]:
         """
         发现可用的知识库索引
+        索引列表和向量维度来自进程内共享的元数据快照，不再每个实例单独查询
         Returns:
             List[Dict[str, Any]]: 可用索引列表
         """
         logger.info("开始发现知识库索引")
         try:
-            # 连接ES服务
-            if not await self.es_service.connect():
-                logger.error("无法连接ES服务")
+            snapshot = await self.es_service.get_metadata()
+            if snapshot is None:
+                logger.error("无法获取ES索引元数据")
                 return []
 
-            # 获取所有索引
-            indices = await self.es_service.get_indices()
-            logger.debug(f"获取到 {len(indices)} 个索引")
-
-            # 筛选知识库索引
-            knowledge_indices = []
-            for idx in indices:
-                index_name = idx.get('index', '')
-                docs_count = idx.get('docs.count', '0')
-
-                # 查找包含知识库关键词的索引
-                if any(keyword in index_name.lower()
-                       for keyword in ['knowledge', 'base', 'index']):
-                    if docs_count and docs_count != '0' and docs_count != 'None':
-                        knowledge_indices.append({
-                            'name':
-                            index_name,
-                            'docs_count':
-                            int(docs_count) if docs_count != 'None' else 0
-                        })
-
-            # 按文档数量排序，优先使用文档数量多的索引
-            knowledge_indices.sort(key=lambda x: x['docs_count'], reverse=True)
+            knowledge_indices = list(snapshot.knowledge_indices)
             self._available_indices = knowledge_indices
-
-            # 检测向量维度
-            if knowledge_indices:
-                await self._detect_vector_dims(knowledge_indices[0]['name'])
+            self._vector_dims = snapshot.vector_dims
 
             logger.info(f"发现 {len(knowledge_indices)} 个可用知识库索引")
             for idx in knowledge_indices[:5]:  # 只显示前5个
@@ -76,27 +52,6 @@ class ESDiscovery:
             logger.error(f"发现索引失败: {str(e)}")
             return []
 
-    async def _detect_vector_dims(self, index_name: str):
-        """检测向量维度"""
-        logger.debug(f"检测索引 {index_name} 的向量维度")
-        try:
-            mapping = await self.es_service.get_index_mapping(index_name)
-            if mapping:
-                properties = mapping.get('properties', {})
-                if 'context_vector' in properties:
-                    vector_config = properties['context_vector']
-                    if 'dims' in vector_config:
-                        self._vector_dims = vector_config['dims']
-                        logger.info(f"检测到向量维度: {self._vector_dims}")
-                    else:
-                        logger.debug("向量配置中未找到dims字段")
-                else:
-                    logger.debug("索引映射中未找到context_vector字段")
-            else:
-                logger.warning(f"无法获取索引 {index_name} 的映射信息")
-        except Exception as e:
-            logger.warning(f"检测向量维度失败: {str(e)}")
-
     def get_best_index(self) -> Optional[str]:
         """获取最佳索引名称"""
         if self._available_indices:
@@ -0,0 +1,238 @@
+"""
+ES索引元数据注册表
+在进程内共享索引别名、域名映射、知识库索引和向量维度：
+- 首次使用时加载一次，并发调用共享同一次加载
+- 超过TTL后在后台刷新，刷新期间搜索继续使用旧快照
+- 刷新完成后整体替换快照引用，读取方不会看到半更新的状态
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from doc_agent.core.logger import logger
+
+DEFAULT_METADATA_TTL = 600.0
+DEFAULT_VECTOR_DIMS = 1536
+
+# 知识库索引名称关键词
+KNOWLEDGE_INDEX_KEYWORDS = ("knowledge", "base", "index")
+
+MetadataKey = tuple[tuple[str, ...], str]
+MetadataLoader = Callable[[], Awaitable["ESMetadataSnapshot"]]
+
+
+@dataclass(frozen=True)
+class ESMetadataSnapshot:
+    """某个ES集群的索引元数据快照（只读）"""
+    index_aliases: dict[str, list[str]]
+    augmented_index_domain_map: dict[str, str]
+    valid_indices: list[str]
+    knowledge_indices: list[dict[str, Any]]
+    vector_dims: int = DEFAULT_VECTOR_DIMS
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+def build_alias_metadata(
+    aliases_info: dict[str, Any], domain_index_map: dict[str, str]
+) -> tuple[dict[str, list[str]], dict[str, str], list[str]]:
+    """
+    根据 indices.get_alias 的结果构建别名映射
+
+    Args:
+        aliases_info: indices.get_alias(index="*") 的返回值
+        domain_index_map: domain_id -> 索引/别名 的已知映射
+
+    Returns:
+        tuple: (索引别名映射, 索引/别名到domain_id的扩展映射, 有效索引列表)
+    """
+    index_aliases = {
+        index_name: list(info.get("aliases", {}).keys())
+        for index_name, info in aliases_info.items()
+    }
+
+    augmented_index_domain_map = {}
+    valid_indices = []
+    seen = set()
+    for idx, alias_list in index_aliases.items():
+        # 查找匹配的域名
+        matched_domain_id = None
+        for domain_id, domain_idx in domain_index_map.items():
+            if domain_idx == idx or domain_idx in alias_list:
+                matched_domain_id = domain_id
+                break
+        if not matched_domain_id:
+            continue
+
+        augmented_index_domain_map[idx] = matched_domain_id
+        for alias_idx in alias_list:
+            augmented_index_domain_map[alias_idx] = matched_domain_id
+            # 添加所有匹配domain_index_map的索引到有效索引列表
+            if alias_idx not in seen and alias_idx != "personal_knowledge_base":
+                seen.add(alias_idx)
+                valid_indices.append(alias_idx)
+
+    return index_aliases, augmented_index_domain_map, valid_indices
+
+
+def select_knowledge_indices(
+        indices: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    从 cat.indices 结果中筛选非空的知识库索引，按文档数量降序排列
+
+    Args:
+        indices: cat.indices(format="json") 的返回值
+
+    Returns:
+        List[Dict[str, Any]]: [{"name": 索引名, "docs_count": 文档数}, ...]
+    """
+    knowledge_indices = []
+    for idx in indices:
+        index_name = idx.get("index", "")
+        docs_count = idx.get("docs.count", "0")
+        if not any(keyword in index_name.lower()
+                   for keyword in KNOWLEDGE_INDEX_KEYWORDS):
+            continue
+        if docs_count and docs_count not in ("0", "None"):
+            knowledge_indices.append({
+                "name": index_name,
+                "docs_count": int(docs_count)
+            })
+    knowledge_indices.sort(key=lambda x: x["docs_count"], reverse=True)
+    return knowledge_indices
+
+
+def parse_vector_dims(mappings: Optional[dict[str, Any]]) -> Optional[int]:
+    """从索引映射中读取 context_vector 的维度"""
+    if not mappings:
+        return None
+    vector_config = mappings.get("properties", {}).get("context_vector", {})
+    return vector_config.get("dims")
+
+
+async def load_es_metadata(
+        client, domain_index_map: dict[str, str]) -> ESMetadataSnapshot:
+    """
+    从ES集群加载一次完整的索引元数据
+
+    Args:
+        client: AsyncElasticsearch 客户端
+        domain_index_map: domain_id -> 索引/别名 的已知映射
+
+    Returns:
+        ESMetadataSnapshot: 元数据快照
+    """
+    aliases_info = await client.indices.get_alias(index="*")
+    index_aliases, augmented_index_domain_map, valid_indices = build_alias_metadata(
+        aliases_info, domain_index_map)
+
+    knowledge_indices = []
+    vector_dims = DEFAULT_VECTOR_DIMS
+    try:
+        knowledge_indices = select_knowledge_indices(await
+                                                     client.cat.indices(
+                                                         format="json"))
+        if knowledge_indices:
+            best_index = knowledge_indices[0]["name"]
+            mapping = await client.indices.get_mapping(index=best_index)
+            vector_dims = parse_vector_dims(
+                mapping.get(best_index, {}).get("mappings")) or vector_dims
+    except Exception as e:
+        logger.warning(f"获取知识库索引或向量维度失败: {str(e)}")
+
+    return ESMetadataSnapshot(
+        index_aliases=index_aliases,
+        augmented_index_domain_map=augmented_index_domain_map,
+        valid_indices=valid_indices,
+        knowledge_indices=knowledge_indices,
+        vector_dims=vector_dims)
+
+
+class ESMetadataRegistry:
+    """进程级ES元数据注册表，按 (hosts, username) 区分集群"""
+
+    def __init__(self):
+        self._snapshots: dict[MetadataKey, ESMetadataSnapshot] = {}
+        self._loading: dict[MetadataKey, asyncio.Task] = {}
+
+    def peek(self, key: MetadataKey) -> Optional[ESMetadataSnapshot]:
+        """获取当前快照，不触发加载"""
+        return self._snapshots.get(key)
+
+    async def get(
+            self,
+            key: MetadataKey,
+            loader: MetadataLoader,
+            ttl: float = DEFAULT_METADATA_TTL) -> Optional[ESMetadataSnapshot]:
+        """
+        获取元数据快照
+        没有快照时等待首次加载；快照过期时在后台刷新并立即返回旧快照
+
+        Args:
+            key: 集群标识
+            loader: 加载元数据的协程函数
+            ttl: 快照有效期（秒）
+
+        Returns:
+            Optional[ESMetadataSnapshot]: 快照，首次加载失败时返回 None
+        """
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            task = self._running_task(key) or self._start(key, loader)
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"加载ES索引元数据失败: {str(e)}")
+                return None
+
+        if time.monotonic() - snapshot.loaded_at > ttl and self._running_task(
+                key) is None:
+            logger.debug("ES索引元数据已过期，后台刷新")
+            self._start(key, loader).add_done_callback(self._log_failure)
+        return snapshot
+
+    def invalidate(self, key: Optional[MetadataKey] = None):
+        """丢弃快照，下次获取时重新加载"""
+        if key is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(key, None)
+
+    def _running_task(self, key: MetadataKey) -> Optional[asyncio.Task]:
+        """当前事件循环中正在进行的加载任务"""
+        task = self._loading.get(key)
+        if task is None or task.done():
+            return None
+        if task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+
+    def _start(self, key: MetadataKey, loader: MetadataLoader) -> asyncio.Task:
+        task = asyncio.create_task(self._load(key, loader))
+        self._loading[key] = task
+        return task
+
+    async def _load(self, key: MetadataKey,
+                    loader: MetadataLoader) -> ESMetadataSnapshot:
+        started = time.monotonic()
+        snapshot = await loader()
+        # 整体替换引用，正在进行的搜索继续使用旧快照
+        self._snapshots[key] = snapshot
+        logger.info(
+            f"ES索引元数据已加载，耗时 {time.monotonic() - started:.2f}秒，"
+            f"索引 {len(snapshot.index_aliases)} 个，有效别名 {len(snapshot.valid_indices)} 个"
+        )
+        return snapshot
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"后台刷新ES索引元数据失败，继续使用旧快照: {task.exception()}")
+
+
+# 进程内共享的元数据注册表
+es_metadata_registry = ESMetadataRegistry()
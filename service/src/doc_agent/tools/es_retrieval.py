@@ -0,0 +1,140 @@
+"""
+混合检索辅助模块
+- reciprocal_rank_fusion: 在客户端按倒数排名融合 kNN 与 BM25 的结果
+- AdaptiveNumCandidates: 按观测到的召回率和时延自适应调节 kNN num_candidates
+"""
+
+import threading
+from typing import Any, Optional
+
+from doc_agent.core.logger import logger
+
+DEFAULT_RANK_CONSTANT = 60
+
+
+def reciprocal_rank_fusion(
+        ranked_hits: list[list[dict[str, Any]]],
+        rank_constant: int = DEFAULT_RANK_CONSTANT
+) -> list[tuple[dict[str, Any], float]]:
+    """
+    倒数排名融合（RRF）：score(d) = Σ 1 / (rank_constant + rank_i(d))
+
+    Args:
+        ranked_hits: 多个按相关性排好序的ES命中列表
+        rank_constant: 平滑常数，越大越弱化头部排名的优势
+
+    Returns:
+        list: [(命中, 融合分数), ...]，按融合分数降序；同一文档保留首次出现的命中
+    """
+    fused: dict[tuple[str, str], list] = {}
+    for hits in ranked_hits:
+        for rank, hit in enumerate(hits, 1):
+            key = (hit["_index"], hit["_id"])
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = [hit, 1.0 / (rank_constant + rank)]
+            else:
+                entry[1] += 1.0 / (rank_constant + rank)
+    return sorted(((hit, score) for hit, score in fused.values()),
+                  key=lambda item: item[1],
+                  reverse=True)
+
+
+class AdaptiveNumCandidates:
+    """
+    kNN num_candidates 自适应调节器
+    num_candidates = top_k × multiplier；每隔 probe_every 次查询用最大候选数做一次
+    影子查询估计召回率，再按"时延超标先降、召回不足再升、两者都满足时缓慢回收"的规则调节
+    """
+
+    def __init__(self,
+                 initial_multiplier: float = 4.0,
+                 min_multiplier: float = 1.5,
+                 max_multiplier: float = 20.0,
+                 target_recall: float = 0.95,
+                 target_latency_ms: float = 200.0,
+                 probe_every: int = 20,
+                 max_candidates: int = 10000,
+                 smoothing: float = 0.3):
+        self.multiplier = initial_multiplier
+        self.min_multiplier = min_multiplier
+        self.max_multiplier = max_multiplier
+        self.target_recall = target_recall
+        self.target_latency_ms = target_latency_ms
+        self.probe_every = probe_every
+        self.max_candidates = max_candidates
+        self.smoothing = smoothing
+        self.latency_ms: Optional[float] = None
+        self.recall: Optional[float] = None
+        self._queries = 0
+        self._lock = threading.Lock()
+
+    def num_candidates(self, top_k: int) -> int:
+        """当前 top_k 对应的 num_candidates"""
+        return max(top_k, min(int(top_k * self.multiplier),
+                              self.max_candidates))
+
+    def probe_candidates(self, top_k: int) -> int:
+        """影子查询使用的 num_candidates（近似精确召回的基准）"""
+        return max(top_k, min(int(top_k * self.max_multiplier),
+                              self.max_candidates))
+
+    def should_probe(self) -> bool:
+        """本次查询是否需要附带影子查询"""
+        with self._lock:
+            self._queries += 1
+            return self.probe_every > 0 and self._queries % self.probe_every == 1
+
+    def observe(self, latency_ms: Optional[float], recall: Optional[float] = None):
+        """
+        记录一次查询的观测值并调节 multiplier
+
+        Args:
+            latency_ms: kNN 子查询的服务端耗时（毫秒）
+            recall: 影子查询估计的召回率（仅探测时提供）
+        """
+        with self._lock:
+            if latency_ms is not None:
+                self.latency_ms = self._ewma(self.latency_ms, latency_ms)
+            if recall is not None:
+                self.recall = self._ewma(self.recall, recall)
+
+            previous = self.multiplier
+            if self.latency_ms is not None and self.latency_ms > self.target_latency_ms:
+                self.multiplier *= 0.8
+            elif recall is not None and self.recall < self.target_recall:
+                self.multiplier += 1.0
+            elif recall is not None:
+                # 召回率与时延都达标，逐步回收候选数以降低成本
+                self.multiplier -= 0.25
+            self.multiplier = min(max(self.multiplier, self.min_multiplier),
+                                  self.max_multiplier)
+
+        if self.multiplier != previous:
+            logger.debug(
+                f"调整 num_candidates 倍数: {previous:.2f} -> {self.multiplier:.2f}"
+                f"（时延 {self.latency_ms}ms，召回率 {self.recall}）")
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return (1 - self.smoothing) * current + self.smoothing * value
+
+    def stats(self) -> dict[str, Any]:
+        """当前调节状态"""
+        return {
+            "multiplier": round(self.multiplier, 2),
+            "latency_ms": self.latency_ms,
+            "recall": self.recall,
+            "queries": self._queries
+        }
+
+
+def overlap_recall(hits: list[dict[str, Any]],
+                   reference_hits: list[dict[str, Any]]) -> Optional[float]:
+    """以 reference_hits 为基准计算 hits 的召回率"""
+    reference = {(hit["_index"], hit["_id"]) for hit in reference_hits}
+    if not reference:
+        return None
+    found = sum(1 for hit in hits if (hit["_index"], hit["_id"]) in reference)
+    return found / len(reference)
@@ -4,11 +4,14 @@ Elasticsearch搜索工具
 """
 
 import json
-from typing import Any, Dict, List, Optional
+from collections.abc import AsyncIterator
+from typing import Any, Dict, List, Optional, Union
 
 from doc_agent.core.logger import logger
 
 from .es_discovery import ESDiscovery
+from .es_metadata import DEFAULT_METADATA_TTL
+from .es_retrieval import AdaptiveNumCandidates
 from .es_service import ESSearchResult, ESService
 
 
@@ -23,7 +26,11 @@ class ESSearchTool:
                  username: str = "",
                  password: str = "",
                  index_prefix: str = "doc_gen",
-                 timeout: int = 30):
+                 timeout: int = 30,
+                 metadata_ttl: float = DEFAULT_METADATA_TTL,
+                 retrieval_mode: str = "rrf",
+                 knn_target_recall: float = 0.95,
+                 knn_target_latency_ms: float = 200.0):
         """
         初始化Elasticsearch搜索工具
         Args:
@@ -32,6 +39,10 @@ class ESSearchTool:
             password: 密码
             index_prefix: 索引前缀
             timeout: 超时时间
+            metadata_ttl: 索引元数据后台刷新间隔（秒），同进程内所有实例共享
+            retrieval_mode: 混合检索方式，"rrf"（kNN/BM25 融合）或 "knn_filter"
+            knn_target_recall: kNN 候选数自适应调节的目标召回率
+            knn_target_latency_ms: kNN 候选数自适应调节的目标时延（毫秒）
         """
         self.hosts = hosts
         self.username = username
@@ -40,7 +51,16 @@ class ESSearchTool:
         self.timeout = timeout
 
         # 初始化底层服务
-        self._es_service = ESService(hosts, username, password, timeout)
+        self._es_service = ESService(
+            hosts,
+            username,
+            password,
+            timeout,
+            metadata_ttl=metadata_ttl,
+            retrieval_mode=retrieval_mode,
+            candidate_tuner=AdaptiveNumCandidates(
+                target_recall=knn_target_recall,
+                target_latency_ms=knn_target_latency_ms))
         self._discovery = ESDiscovery(self._es_service)
         self._current_index = None
         self._indices_list = []
@@ -260,6 +280,25 @@ class ESSearchTool:
             logger.error(f"file_token查询失败: {str(e)}")
             return []
 
+    async def iter_file_token_chunks(
+            self,
+            file_tokens: Union[str, list[str]],
+            page_size: int = 500) -> AsyncIterator[ESSearchResult]:
+        """
+        按切片顺序流式读取一个或多个文件的全部内容（PIT + search_after）
+
+        Args:
+            file_tokens: 文件token或其列表
+            page_size: 每页切片数量
+
+        Yields:
+            ESSearchResult: 按切片顺序返回的文档切片
+        """
+        await self._ensure_initialized()
+        async for chunk in self._es_service.iter_file_token_chunks(
+                file_tokens, index="*", page_size=page_size):
+            yield chunk
+
     async def search_within_documents(
             self,
             query: str,
@@ -320,6 +359,11 @@ class ESSearchTool:
         logger.debug(f"获取当前索引: {self._current_index}")
         return self._current_index
 
+    async def get_vector_dims(self) -> int:
+        """获取知识库索引映射中的向量维度"""
+        await self._ensure_initialized()
+        return self._vector_dims
+
     async def __aenter__(self):
         """异步上下文管理器入口"""
         logger.debug("进入ES搜索工具异步上下文")
@@ -4,15 +4,52 @@ Elasticsearch 底层服务模块
 """
 
 import asyncio
+import sys
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
 from elasticsearch import AsyncElasticsearch
 
 from doc_agent.core.logger import logger
 
-
-@dataclass
+from .es_metadata import (
+    DEFAULT_METADATA_TTL,
+    DEFAULT_VECTOR_DIMS,
+    ESMetadataSnapshot,
+    es_metadata_registry,
+    load_es_metadata,
+)
+from .es_retrieval import (
+    DEFAULT_RANK_CONSTANT,
+    AdaptiveNumCandidates,
+    overlap_recall,
+    reciprocal_rank_fusion,
+)
+
+try:
+    # orjson 解析大响应体明显快于标准库 json（可选依赖）
+    from elasticsearch.serializer import OrjsonSerializer
+except ImportError:
+    OrjsonSerializer = None
+
+# 单个文件内切片的稳定顺序：按切片序号，PIT 下以 _shard_doc 作为唯一的决胜字段
+# 多个文件的切片序号会交错，因此按文件逐个查询
+CHUNK_SORT = [{
+    "meta_data.slice_id": {
+        "order": "asc",
+        "unmapped_type": "long",
+        "missing": "_last"
+    }
+}, {
+    "_shard_doc": "asc"
+}]
+
+# Python 3.10+ 使用 __slots__，每个命中结果不再携带 __dict__
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class ESSearchResult:
     """ES搜索结果"""
     id: str
@@ -40,7 +77,11 @@ class ESService:
                  hosts: list[str],
                  username: str = "",
                  password: str = "",
-                 timeout: int = 30):
+                 timeout: int = 30,
+                 metadata_ttl: float = DEFAULT_METADATA_TTL,
+                 retrieval_mode: str = "rrf",
+                 rrf_rank_constant: int = DEFAULT_RANK_CONSTANT,
+                 candidate_tuner: Optional[AdaptiveNumCandidates] = None):
         """
         初始化ES服务
 
@@ -49,11 +90,22 @@ class ESService:
             username: 用户名
             password: 密码
             timeout: 超时时间
+            metadata_ttl: 索引元数据（别名、域名映射）的后台刷新间隔（秒）
+            retrieval_mode: 有文本和向量时的检索方式，"rrf" 为 kNN 与 BM25 分别检索后倒数排名融合，
+                "knn_filter" 为旧的"文本作为kNN过滤条件"方式
+            rrf_rank_constant: RRF 平滑常数
+            candidate_tuner: kNN num_candidates 自适应调节器
         """
         self.hosts = hosts
         self.username = username
         self.password = password
         self.timeout = timeout
+        self.metadata_ttl = metadata_ttl
+        self._metadata_key = (tuple(hosts), username)
+        self._metadata: Optional[ESMetadataSnapshot] = None
+        self.retrieval_mode = retrieval_mode
+        self.rrf_rank_constant = rrf_rank_constant
+        self.candidate_tuner = candidate_tuner or AdaptiveNumCandidates()
         self._client: Optional[AsyncElasticsearch] = None
         self._initialized = False
         logger.info("初始化ES服务")
@@ -72,6 +124,22 @@ class ESService:
         self.index_aliases = {}
         self.augmented_index_domain_map = {}
         self.valid_indeces = []
+        # 索引/别名 -> domain_id 的扁平查找表，别名加载后整体替换
+        self._index_domain_lookup: dict[str, str] = {}
+        self._rebuild_domain_lookup()
+
+    def _rebuild_domain_lookup(self):
+        """
+        预计算索引/别名到 domain_id 的映射，命中解码时只需一次字典查找
+        优先级与逐个比对 domain_index_map 时一致：扩展映射表 > domain_index_map 顺序
+        """
+        lookup = {}
+        for domain_id, known_index in self.domain_index_map.items():
+            lookup.setdefault(known_index, domain_id)
+            for alias in self.index_aliases.get(known_index, []):
+                lookup.setdefault(alias, domain_id)
+        lookup.update(self.augmented_index_domain_map)
+        self._index_domain_lookup = lookup
 
     async def connect(self) -> bool:
         """连接ES服务"""
@@ -90,53 +158,25 @@ class ESService:
                 es_kwargs["basic_auth"] = (self.username, self.password)
                 logger.debug("使用基本认证连接ES")
 
+            if OrjsonSerializer is not None:
+                try:
+                    es_kwargs["serializer"] = OrjsonSerializer()
+                except ImportError:
+                    logger.debug("orjson 不可用，使用默认JSON序列化")
+
+            if self._client:
+                # 上次连接失败遗留的客户端
+                await self._client.close()
             self._client = AsyncElasticsearch(**es_kwargs)
 
             # 测试连接
             await self._client.ping()
             logger.info("ES连接成功")
 
-            # 获取索引别名
-            aliases_info = await self._client.indices.get_alias(index="*")
-            for index_name, info in aliases_info.items():
-                if 'aliases' in info:
-                    self.index_aliases[index_name] = list(
-                        info['aliases'].keys())
-                else:
-                    self.index_aliases[index_name] = []
-
-            logger.info(f"成功获取索引别名映射，共 {len(self.index_aliases)} 个索引")
-
-            # 构建索引到域名的映射
-            for idx, alias_list in self.index_aliases.items():
-                print(f"{idx}: {alias_list}")
-
-                # 查找匹配的域名
-                matched_domain_id = None
-                for domain_id, domain_idx in self.domain_index_map.items():
-                    if (domain_idx == idx or domain_idx in alias_list):
-                        matched_domain_id = domain_id
-                        break
-
-                # 如果找到匹配的域名，添加到映射表
-                if matched_domain_id:
-                    self.augmented_index_domain_map[idx] = matched_domain_id
-                    for alias_idx in alias_list:
-                        self.augmented_index_domain_map[
-                            alias_idx] = matched_domain_id
-
-                # 添加所有匹配domain_index_map的索引到有效索引列表
-                if matched_domain_id:
-                    for alias_idx in alias_list:
-                        if (alias_idx not in self.valid_indeces
-                                and alias_idx != "personal_knowledge_base"):
-                            self.valid_indeces.append(alias_idx)
-
-            logger.info(f"🔍 索引别名: {self.index_aliases}")
-            logger.info(f"扩展映射表: {self.augmented_index_domain_map}")
-            logger.info(f"有效索引: {self.valid_indeces}")
-
             self._initialized = True
+
+            # 索引元数据在进程内共享，只有首次连接需要等待加载
+            await self._sync_metadata()
             return True
 
         except Exception as e:
@@ -145,10 +185,60 @@ class ESService:
             return False
 
     async def _ensure_connected(self):
-        """确保已连接"""
+        """确保已连接，并切换到最新的索引元数据快照"""
         if not self._initialized or not self._client:
             logger.debug("ES客户端未连接，尝试连接")
             await self.connect()
+        else:
+            await self._sync_metadata()
+
+    async def _sync_metadata(self):
+        """
+        从进程级注册表获取元数据快照，有新快照时整体替换本实例引用
+        快照过期时由注册表在后台刷新，这里不会等待
+        """
+        snapshot = await es_metadata_registry.get(
+            self._metadata_key,
+            lambda: load_es_metadata(self._client, self.domain_index_map),
+            ttl=self.metadata_ttl)
+        if snapshot is not None and snapshot is not self._metadata:
+            self._apply_metadata(snapshot)
+
+    def _apply_metadata(self, snapshot: ESMetadataSnapshot):
+        """应用元数据快照"""
+        self.index_aliases = snapshot.index_aliases
+        self.augmented_index_domain_map = snapshot.augmented_index_domain_map
+        self.valid_indeces = snapshot.valid_indices
+        self._rebuild_domain_lookup()
+        self._metadata = snapshot
+        logger.debug(
+            f"应用ES索引元数据，索引 {len(self.index_aliases)} 个，有效索引: {self.valid_indeces}"
+        )
+
+    @property
+    def vector_dims(self) -> int:
+        """索引映射中 context_vector 的维度（来自共享元数据快照）"""
+        return self._metadata.vector_dims if self._metadata else DEFAULT_VECTOR_DIMS
+
+    def _fit_vector(self, query_vector: list[float]) -> list[float]:
+        """按索引向量维度截断或补零，返回新列表，不修改调用方的向量"""
+        dims = self.vector_dims
+        if len(query_vector) == dims:
+            return query_vector
+        logger.debug(f"调整向量维度 {len(query_vector)} -> {dims}")
+        if len(query_vector) > dims:
+            return query_vector[:dims]
+        return query_vector + [0.0] * (dims - len(query_vector))
+
+    async def get_metadata(self) -> Optional[ESMetadataSnapshot]:
+        """
+        获取当前索引元数据快照（包含知识库索引和向量维度）
+
+        Returns:
+            Optional[ESMetadataSnapshot]: 快照，连接或加载失败时返回 None
+        """
+        await self._ensure_connected()
+        return self._metadata
 
     async def search(
             self,
@@ -177,6 +267,12 @@ class ESService:
         if filters:
             logger.debug(f"过滤条件: {filters}")
 
+        await self._ensure_connected()
+
+        if not self._client:
+            logger.error("ES客户端未连接")
+            return []
+
         # 验证索引是否在有效范围内（允许通配符索引用于文档范围搜索）
         if index != "*" and index not in self.valid_indeces:
             logger.warning(f"索引 {index} 不在有效索引范围内: {self.valid_indeces}")
@@ -184,11 +280,9 @@ class ESService:
         if index == "*":
             index = self.valid_indeces
 
-        await self._ensure_connected()
-
-        if not self._client:
-            logger.error("ES客户端未连接")
-            return []
+        if query and query_vector and self.retrieval_mode == "rrf":
+            return await self._hybrid_rrf_search(index, query, query_vector,
+                                                 top_k, filters)
 
         try:
             # 构建搜索查询
@@ -198,68 +292,10 @@ class ESService:
 
             # 执行搜索
             response = await self._client.search(index=index, body=search_body)
+            if "knn" in search_body:
+                self.candidate_tuner.observe(response.get("took"))
 
-            # 解析结果
-            results = []
-            for hit in response['hits']['hits']:
-                doc_data = hit['_source']
-
-                # 获取原始内容和切分后的内容
-                original_content = (doc_data.get('content_view')
-                                    or doc_data.get('content')
-                                    or doc_data.get('text')
-                                    or doc_data.get('title') or '')
-
-                div_content = (doc_data.get('content') or doc_data.get('text')
-                               or doc_data.get('title') or '')
-
-                # 灵活获取来源字段
-                source = (doc_data.get('meta_data', {}).get('file_name')
-                          or doc_data.get('file_name') or doc_data.get('name')
-                          or '')
-
-                # 安全获取 doc_id，如果不存在则使用 _id
-                doc_id = doc_data.get('doc_id', "")
-                index = hit["_index"]
-                domain_id = self.augmented_index_domain_map.get(index, "")
-
-                # 如果找不到domain_id，尝试从索引名称推断
-                if not domain_id:
-                    # 尝试从索引名称推断域名
-                    for known_domain, known_index in self.domain_index_map.items(
-                    ):
-                        if index == known_index or index in self.index_aliases.get(
-                                known_index, []):
-                            domain_id = known_domain
-                            break
-
-                    # 如果还是找不到，使用索引名称作为domain_id
-                    if not domain_id:
-                        domain_id = index
-                        logger.debug(f"未找到索引 {index} 的域名映射，使用索引名称作为domain_id")
-
-                doc_from = "self" if domain_id == "documentUploadAnswer" else "data_platform"
-
-                logger.debug(
-                    f"搜索结果 - 索引: {index}, domain_id: {domain_id}, doc_from: {doc_from}"
-                )
-
-                result = ESSearchResult(id=hit['_id'],
-                                        doc_id=doc_id,
-                                        index=index,
-                                        domain_id=domain_id,
-                                        doc_from=doc_from,
-                                        file_token=doc_data.get(
-                                            'file_token', ""),
-                                        original_content=original_content,
-                                        div_content=div_content,
-                                        source=source,
-                                        score=hit['_score'],
-                                        metadata=doc_data.get('meta_data', {}),
-                                        alias_name=index)
-                # 修改 metadata.source = doc_from
-                result.metadata["source"] = doc_from
-                results.append(result)
+            results = self._decode_hits(response['hits']['hits'])
 
             logger.info(f"ES搜索成功，返回 {len(results)} 个文档")
             return results
@@ -268,6 +304,146 @@ class ESService:
             logger.error(f"ES搜索失败: {str(e)}")
             return []
 
+    async def _hybrid_rrf_search(
+            self,
+            index: Union[str, list[str]],
+            query: str,
+            query_vector: list[float],
+            top_k: int = 10,
+            filters: Optional[dict[str, Any]] = None) -> list[ESSearchResult]:
+        """
+        混合检索：kNN 与 BM25 作为两个独立子查询放在同一个 msearch 中，客户端RRF融合
+        文本不再作为kNN的过滤条件，只被其中一路召回的相关文档也能保留
+
+        Args:
+            index: 索引名称或列表
+            query: 文本查询
+            query_vector: 查询向量
+            top_k: 返回结果数量
+            filters: 过滤条件
+
+        Returns:
+            List[ESSearchResult]: 融合后的结果，score 为归一化到 0~1 的RRF分数
+        """
+        window = top_k * 2
+        query_vector = self._fit_vector(query_vector)
+        probe = self.candidate_tuner.should_probe()
+        header = {"index": index}
+        msearch_body = [
+            header,
+            self._build_knn_query(query_vector, window,
+                                  self.candidate_tuner.num_candidates(window),
+                                  filters), header,
+            dict(self._build_text_search_body(query, filters, window),
+                 _source={"excludes": ["context_vector"]})
+        ]
+        if probe:
+            # 影子查询：用最大候选数估计当前 num_candidates 下的召回率
+            msearch_body += [
+                header,
+                self._build_knn_query(
+                    query_vector, window,
+                    self.candidate_tuner.probe_candidates(window), filters)
+            ]
+
+        try:
+            response = await self._client.msearch(body=msearch_body)
+        except Exception as e:
+            logger.error(f"混合检索失败: {str(e)}")
+            return []
+
+        responses = response["responses"]
+        ranked_hits = []
+        for sub_response in responses[:2]:
+            if "error" in sub_response:
+                logger.warning(f"混合检索子查询失败: {sub_response['error']}")
+            ranked_hits.append(sub_response.get("hits", {}).get("hits", []))
+
+        recall = None
+        if probe and len(responses) > 2 and "error" not in responses[2]:
+            recall = overlap_recall(ranked_hits[0],
+                                    responses[2].get("hits", {}).get("hits", []))
+        self.candidate_tuner.observe(responses[0].get("took"), recall)
+
+        fused = reciprocal_rank_fusion(ranked_hits,
+                                       self.rrf_rank_constant)[:top_k]
+        results = self._decode_hits([hit for hit, _ in fused])
+        # 按理论最大值（每一路都排第一）归一化，使 min_score 过滤仍然有意义
+        max_score = len(ranked_hits) / (self.rrf_rank_constant + 1)
+        for result, (_, rrf_score) in zip(results, fused):
+            result.metadata["rrf_score"] = rrf_score
+            result.score = rrf_score / max_score
+
+        logger.info(
+            f"混合检索成功，kNN {len(ranked_hits[0])} 个，BM25 {len(ranked_hits[1])} 个，"
+            f"融合后返回 {len(results)} 个文档")
+        return results
+
+    def _build_knn_query(self, query_vector: list[float], size: int,
+                         num_candidates: int,
+                         filters: Optional[dict[str, Any]]) -> dict[str, Any]:
+        """构建RRF中的kNN子查询"""
+        knn = {
+            "field": "context_vector",
+            "query_vector": query_vector,
+            "k": size,
+            "num_candidates": max(num_candidates, size)
+        }
+        if filters:
+            knn["filter"] = self._build_filter_conditions(filters)
+        return {
+            "size": size,
+            "_source": {
+                "excludes": ["context_vector"]
+            },
+            "knn": knn
+        }
+
+    def _decode_hits(self,
+                     hits: list[dict[str, Any]],
+                     alias_name: Optional[str] = None) -> list[ESSearchResult]:
+        """
+        将ES命中列表解码为 ESSearchResult（所有搜索接口共用的快速路径）
+
+        Args:
+            hits: response["hits"]["hits"]
+            alias_name: 结果来源的索引别名，None 时使用命中的实际索引名
+
+        Returns:
+            List[ESSearchResult]: 解码后的结果列表
+        """
+        domain_lookup = self._index_domain_lookup
+        results = []
+        append = results.append
+        for hit in hits:
+            doc_data = hit["_source"]
+            get = doc_data.get
+            div_content = get("content") or get("text") or get("title") or ""
+            metadata = get("meta_data") or {}
+            index = hit["_index"]
+            # 找不到域名映射时使用索引名称作为domain_id
+            domain_id = domain_lookup.get(index) or index
+            doc_from = "self" if domain_id == "documentUploadAnswer" else "data_platform"
+            # 修改 metadata.source = doc_from
+            metadata["source"] = doc_from
+            append(
+                ESSearchResult(id=hit["_id"],
+                               doc_id=get("doc_id", ""),
+                               index=index,
+                               domain_id=domain_id,
+                               doc_from=doc_from,
+                               file_token=get("file_token", ""),
+                               original_content=get("content_view")
+                               or div_content,
+                               div_content=div_content,
+                               source=metadata.get("file_name")
+                               or get("file_name") or get("name") or "",
+                               score=hit["_score"] or 0.0,
+                               metadata=metadata,
+                               alias_name=alias_name
+                               if alias_name is not None else index))
+        return results
+
     def _build_search_body(self,
                            query: str,
                            query_vector: Optional[list[float]] = None,
@@ -311,14 +487,8 @@ class ESService:
         Returns:
             Dict[str, Any]: KNN搜索查询体
         """
-        # 确保向量维度正确
-        if len(query_vector) != 1536:
-            if len(query_vector) > 1536:
-                query_vector = query_vector[:1536]
-                logger.debug("截断向量维度到 1536")
-            else:
-                query_vector.extend([0.0] * (1536 - len(query_vector)))
-                logger.debug("扩展向量维度到 1536")
+        # 按索引映射的向量维度调整
+        query_vector = self._fit_vector(query_vector)
 
         # 构建基础KNN查询
         search_body = {
@@ -330,7 +500,7 @@ class ESService:
                 "field": "context_vector",
                 "query_vector": query_vector,
                 "k": top_k,
-                "num_candidates": top_k * 2
+                "num_candidates": self.candidate_tuner.num_candidates(top_k)
             }
         }
 
@@ -515,6 +685,12 @@ class ESService:
             logger.warning("索引列表为空")
             return []
 
+        await self._ensure_connected()
+
+        if not self._client:
+            logger.error("ES客户端未连接")
+            return []
+
         # 过滤出有效的索引
         valid_indices = [idx for idx in indices if idx in self.valid_indeces]
         if not valid_indices:
@@ -527,12 +703,6 @@ class ESService:
             ]
             logger.warning(f"过滤掉无效索引: {invalid_indices}")
 
-        await self._ensure_connected()
-
-        if not self._client:
-            logger.error("ES客户端未连接")
-            return []
-
         try:
             # 构建msearch请求体
             msearch_body = []
@@ -551,72 +721,12 @@ class ESService:
             # 处理结果
             all_results = []
             for i, search_response in enumerate(response["responses"]):
-                if "hits" in search_response and "hits" in search_response[
-                        "hits"]:
-                    for hit in search_response["hits"]["hits"]:
-                        doc_data = hit["_source"]
-
-                        # 获取内容
-                        original_content = (doc_data.get('content_view')
-                                            or doc_data.get('content')
-                                            or doc_data.get('text')
-                                            or doc_data.get('title') or '')
-
-                        div_content = (doc_data.get('content')
-                                       or doc_data.get('text')
-                                       or doc_data.get('title') or '')
-
-                        # 获取来源
-                        source = (doc_data.get('meta_data',
-                                               {}).get('file_name')
-                                  or doc_data.get('file_name')
-                                  or doc_data.get('name') or '')
-
-                        # 安全获取 doc_id，如果不存在则使用 _id
-                        doc_id = doc_data.get('doc_id', "")
-                        index = hit["_index"]
-                        domain_id = self.augmented_index_domain_map.get(
-                            index, "")
-
-                        # 如果找不到domain_id，尝试从索引名称推断
-                        if not domain_id:
-                            # 尝试从索引名称推断域名
-                            for known_domain, known_index in self.domain_index_map.items(
-                            ):
-                                if index == known_index or index in self.index_aliases.get(
-                                        known_index, []):
-                                    domain_id = known_domain
-                                    break
-
-                            # 如果还是找不到，使用索引名称作为domain_id
-                            if not domain_id:
-                                domain_id = index
-                                logger.debug(
-                                    f"未找到索引 {index} 的域名映射，使用索引名称作为domain_id")
-
-                        doc_from = "self" if domain_id == "documentUploadAnswer" else "data_platform"
-
-                        logger.debug(
-                            f"多索引搜索结果 - 索引: {index}, domain_id: {domain_id}, doc_from: {doc_from}"
-                        )
-
-                        result = ESSearchResult(
-                            id=hit["_id"],
-                            doc_id=doc_id,
-                            index=index,
-                            domain_id=domain_id,
-                            doc_from=doc_from,
-                            file_token=doc_data.get('file_token', ""),
-                            original_content=original_content,
-                            div_content=div_content,
-                            source=source,
-                            score=hit["_score"],
-                            metadata=doc_data.get('meta_data', {}),
-                            alias_name=valid_indices[i]
-                            if i < len(valid_indices) else "")
-                        # 修改 metadata.source = doc_from
-                        result.metadata["source"] = doc_from
-                        all_results.append(result)
+                hits = search_response.get("hits", {}).get("hits")
+                if hits:
+                    all_results.extend(
+                        self._decode_hits(
+                            hits, valid_indices[i]
+                            if i < len(valid_indices) else ""))
 
             logger.info(f"多索引搜索成功，返回 {len(all_results)} 个文档")
             return all_results
@@ -625,16 +735,24 @@ class ESService:
             logger.error(f"多索引搜索失败: {str(e)}")
             return []
 
+    @staticmethod
+    def _file_token_query(file_token: Union[str, list[str]]) -> dict[str, Any]:
+        """单个 file_token 使用 term 查询，多个使用一次 terms 查询"""
+        if isinstance(file_token, str):
+            return {"term": {"doc_id": file_token}}
+        return {"terms": {"doc_id": list(file_token)}}
+
     async def search_by_file_token(self,
                                    index: str,
-                                   file_token: str,
+                                   file_token: Union[str, list[str]],
                                    top_k: int = 100) -> list[ESSearchResult]:
         """
-        根据file_token查询文档内容
+        根据file_token查询文档内容（单页，最多 top_k*2 个切片）
+        需要完整文档时使用 iter_file_token_chunks
         
         Args:
             index: 索引名称
-            file_token: 文件token
+            file_token: 文件token，或多个文件token的列表
             top_k: 返回结果数量
             
         Returns:
@@ -642,25 +760,21 @@ class ESService:
         """
         logger.info(f"开始按file_token查询，索引: {index}, file_token: {file_token}")
 
-        # 验证索引是否在有效范围内（允许通配符索引用于文档范围搜索）
-        if index != "*" and index not in self.valid_indeces:
-            logger.warning(f"索引 {index} 不在有效索引范围内: {self.valid_indeces}")
-            return []
-
         await self._ensure_connected()
 
         if not self._client:
             logger.error("ES客户端未连接")
             return []
 
+        # 验证索引是否在有效范围内（允许通配符索引用于文档范围搜索）
+        if index != "*" and index not in self.valid_indeces:
+            logger.warning(f"索引 {index} 不在有效索引范围内: {self.valid_indeces}")
+            return []
+
         try:
             search_body = {
                 "size": top_k * 2,  # 设置更大的size
-                "query": {
-                    "term": {
-                        "doc_id": file_token
-                    }
-                }
+                "query": self._file_token_query(file_token)
                 # 移除排序，避免字段不存在的问题
             }
 
@@ -669,67 +783,7 @@ class ESService:
             # 执行搜索
             response = await self._client.search(index=index, body=search_body)
 
-            # 解析结果
-            results = []
-            for hit in response['hits']['hits']:
-                doc_data = hit['_source']
-
-                # 获取原始内容和切分后的内容
-                original_content = (doc_data.get('content_view')
-                                    or doc_data.get('content')
-                                    or doc_data.get('text')
-                                    or doc_data.get('title') or '')
-
-                div_content = (doc_data.get('content') or doc_data.get('text')
-                               or doc_data.get('title') or '')
-
-                # 灵活获取来源字段
-                source = (doc_data.get('meta_data', {}).get('file_name')
-                          or doc_data.get('file_name') or doc_data.get('name')
-                          or '')
-
-                # 安全获取 doc_id
-                doc_id = doc_data.get('doc_id', "")
-                index = hit["_index"]
-                domain_id = self.augmented_index_domain_map.get(index, "")
-
-                # 如果找不到domain_id，尝试从索引名称推断
-                if not domain_id:
-                    # 尝试从索引名称推断域名
-                    for known_domain, known_index in self.domain_index_map.items(
-                    ):
-                        if index == known_index or index in self.index_aliases.get(
-                                known_index, []):
-                            domain_id = known_domain
-                            break
-
-                    # 如果还是找不到，使用索引名称作为domain_id
-                    if not domain_id:
-                        domain_id = index
-                        logger.debug(f"未找到索引 {index} 的域名映射，使用索引名称作为domain_id")
-
-                doc_from = "self" if domain_id == "documentUploadAnswer" else "data_platform"
-
-                logger.debug(
-                    f"file_token查询结果 - 索引: {index}, domain_id: {domain_id}, doc_from: {doc_from}"
-                )
-
-                result = ESSearchResult(id=hit['_id'],
-                                        doc_id=doc_id,
-                                        index=index,
-                                        domain_id=domain_id,
-                                        doc_from=doc_from,
-                                        file_token=doc_data.get(
-                                            'file_token', ""),
-                                        original_content=original_content,
-                                        div_content=div_content,
-                                        source=source,
-                                        score=hit['_score'],
-                                        metadata=doc_data.get('meta_data', {}),
-                                        alias_name=index)
-                # 修改 metadata.source = doc_from
-                result.metadata["source"] = doc_from
-                results.append(result)
+            results = self._decode_hits(response['hits']['hits'])
 
             logger.info(f"file_token查询成功，返回 {len(results)} 个文档")
             return results
@@ -738,6 +792,80 @@ class ESService:
             logger.error(f"file_token查询失败: {str(e)}")
             return []
 
+    async def iter_file_token_chunks(
+            self,
+            file_tokens: Union[str, list[str]],
+            index: str = "*",
+            page_size: int = 500,
+            keep_alive: str = "1m") -> AsyncIterator[ESSearchResult]:
+        """
+        按切片顺序流式读取一个或多个文件的全部切片
+        使用 point-in-time + search_after 分页，内存占用只与 page_size 有关，
+        不会因 size 上限截断大文档；多个文件共用一个 PIT，按传入顺序逐个文件读取
+
+        Args:
+            file_tokens: 文件token或其列表
+            index: 索引名称（允许通配符）
+            page_size: 每页切片数量
+            keep_alive: PIT 保持时间
+
+        Yields:
+            ESSearchResult: 按文件顺序、文件内按 meta_data.slice_id 升序的切片
+        """
+        if isinstance(file_tokens, str):
+            file_tokens = [file_tokens]
+        if not file_tokens:
+            return
+        logger.info(f"开始流式读取文档切片，文件数: {len(file_tokens)}, 索引: {index}")
+
+        await self._ensure_connected()
+
+        if not self._client:
+            logger.error("ES客户端未连接")
+            return
+
+        if index != "*" and index not in self.valid_indeces:
+            logger.warning(f"索引 {index} 不在有效索引范围内: {self.valid_indeces}")
+            return
+
+        pit = await self._client.open_point_in_time(index=index,
+                                                    keep_alive=keep_alive,
+                                                    ignore_unavailable=True)
+        pit_id = pit["id"]
+        total = 0
+        try:
+            for file_token in file_tokens:
+                search_after = None
+                while True:
+                    response = await self._client.search(
+                        query=self._file_token_query(file_token),
+                        size=page_size,
+                        sort=CHUNK_SORT,
+                        pit={
+                            "id": pit_id,
+                            "keep_alive": keep_alive
+                        },
+                        search_after=search_after,
+                        track_total_hits=False)
+                    # 每次响应可能返回新的 PIT id
+                    pit_id = response.get("pit_id", pit_id)
+                    hits = response["hits"]["hits"]
+                    for result in self._decode_hits(hits):
+                        yield result
+                    total += len(hits)
+                    if len(hits) < page_size:
+                        break
+                    search_after = hits[-1]["sort"]
+        except Exception as e:
+            logger.error(f"流式读取文档切片失败: {str(e)}")
+            raise
+        finally:
+            try:
+                await self._client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"关闭PIT失败: {str(e)}")
+            logger.info(f"流式读取文档切片结束，共 {total} 个切片")
+
     async def close(self):
         """关闭连接"""
         logger.info("开始关闭ES连接")
@@ -777,17 +905,17 @@ class ESService:
         """获取索引映射"""
         logger.debug(f"获取索引 {index} 的映射信息")
 
-        # 验证索引是否在有效范围内
-        if index not in self.valid_indeces:
-            logger.warning(f"索引 {index} 不在有效索引范围内: {self.valid_indeces}")
-            return None
-
         await self._ensure_connected()
 
         if not self._client:
             logger.error("ES客户端未连接")
             return None
 
+        # 验证索引是否在有效范围内
+        if index not in self.valid_indeces:
+            logger.warning(f"索引 {index} 不在有效索引范围内: {self.valid_indeces}")
+            return None
+
         try:
             mapping = await self._client.indices.get_mapping(index=index)
             logger.debug(f"成功获取索引 {index} 的映射")
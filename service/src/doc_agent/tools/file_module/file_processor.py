@@ -45,6 +45,12 @@ except ImportError:
         WordParser,
     )
 
+# 尝试导入快速HTML提取引擎，独立运行时回退到BeautifulSoup
+try:
+    from doc_agent.utils.html_extractor import DOCUMENT_STRIP_TAGS, html_to_text
+except ImportError:
+    html_to_text = None
+
 # 尝试导入Source类
 try:
     from doc_agent.schemas import Source
@@ -914,6 +920,8 @@ class FileProcessor:
 
     def _html_to_text(self, raw: bytes) -> str:
         """将HTML转换为纯文本"""
+        if html_to_text is not None:
+            return html_to_text(raw, strip_tags=DOCUMENT_STRIP_TAGS)
         soup = BeautifulSoup(raw, "lxml")
         # 移除script/style
         for tag in soup(["script", "style"]):
@@ -5,8 +5,15 @@ HTML文件解析器 - 解析.html文件内容
 import os
 import re
 from typing import List
+
 from bs4 import BeautifulSoup
 
+# 尝试导入快速HTML提取引擎，独立运行时回退到BeautifulSoup
+try:
+    from doc_agent.utils.html_extractor import DOCUMENT_STRIP_TAGS, html_to_text
+except ImportError:
+    html_to_text = None
+
 class HtmlParser:
     """
     HTML文件解析器，支持.html和.htm格式
@@ -58,21 +65,26 @@ class HtmlParser:
             解析后的内容列表
         """
         try:
-            # 使用BeautifulSoup解析HTML
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # 移除script和style标签
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # 提取文本内容
-            text_content = soup.get_text()
-            
-            # 清理文本
-            cleaned_text = self._clean_text(text_content)
-            
-            # 按段落分割
-            paragraphs = self._split_into_paragraphs(cleaned_text)
+            if html_to_text is not None:
+                # 提取引擎已按块级元素分段，上传文件只剥离脚本、样式和导航
+                paragraphs = self._split_into_paragraphs(html_to_text(
+                    content, strip_tags=DOCUMENT_STRIP_TAGS))
+            else:
+                # 使用BeautifulSoup解析HTML
+                soup = BeautifulSoup(content, 'html.parser')
+
+                # 移除script和style标签
+                for script in soup(["script", "style"]):
+                    script.decompose()
+
+                # 提取文本内容
+                text_content = soup.get_text()
+
+                # 清理文本
+                cleaned_text = self._clean_text(text_content)
+
+                # 按段落分割
+                paragraphs = self._split_into_paragraphs(cleaned_text)
             
             result = []
             for paragraph in paragraphs:
@@ -0,0 +1,263 @@
+"""
+预热解释器池
+
+预先启动若干个已导入常用数据处理库的 Python 工作进程，代码通过管道发送给空闲进程执行，
+省去每次执行都要启动解释器、导入模块的开销：
+- 每次执行在工作进程 fork 出的子进程中进行，用户代码修改的模块状态不会带到下一次执行
+- 每次执行有独立的超时，由工作进程终止超时的子进程；工作进程无响应时才被终止并补充新进程
+- 工作进程内限制 stdout/stderr 的长度
+- 工作进程执行 N 次后或内存超过上限时回收重建
+- 同时提供同步（run）和异步（arun）接口
+"""
+
+import asyncio
+import json
+import os
+import queue
+import select
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+from doc_agent.core.logger import logger
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__),
+                             "interpreter_worker.py")
+_HEADER = struct.Struct(">I")
+# 工作进程自行处理超时，额外等待这段时间仍无响应才视为工作进程卡死
+_TIMEOUT_GRACE = 2.0
+
+
+class WorkerTimeoutError(TimeoutError):
+    """代码执行超时"""
+
+
+@dataclass
+class ExecutionResult:
+    """一次代码执行的结果"""
+    stdout: str = ""
+    stderr: str = ""
+    truncated: bool = False
+    duration: float = 0.0
+
+    @property
+    def output(self) -> str:
+        """与子进程方式一致的输出：stdout + stderr"""
+        return self.stdout + self.stderr
+
+
+class _Worker:
+    """单个工作进程及其请求/响应管道"""
+
+    def __init__(self, preload_modules: tuple[str, ...],
+                 max_output_chars: int):
+        request_read, self._request_fd = os.pipe()
+        self._response_fd, response_write = os.pipe()
+        self._workdir = tempfile.TemporaryDirectory(prefix="code_worker_")
+        try:
+            self.process = subprocess.Popen(
+                [
+                    sys.executable, WORKER_SCRIPT,
+                    str(request_read),
+                    str(response_write),
+                    str(max_output_chars), *preload_modules
+                ],
+                pass_fds=(request_read, response_write),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=self._workdir.name,
+                # 独立进程组，关闭时连同正在执行的子进程一起终止
+                start_new_session=True)
+        finally:
+            os.close(request_read)
+            os.close(response_write)
+        self.runs = 0
+        self.rss_mb = 0.0
+        self.ready = False
+        self._buffer = b""
+
+    def wait_ready(self, timeout: float):
+        """等待工作进程完成预加载"""
+        if not self.ready:
+            hello = self._read_frame(time.monotonic() + timeout)
+            self.rss_mb = hello.get("rss_mb", 0.0)
+            self.ready = True
+
+    def execute(self, code: str, timeout: float) -> dict:
+        request = {"code": code, "timeout": timeout}
+        body = json.dumps(request, ensure_ascii=False).encode("utf-8")
+        data = _HEADER.pack(len(body)) + body
+        while data:
+            data = data[os.write(self._request_fd, data):]
+        response = self._read_frame(time.monotonic() + timeout +
+                                    _TIMEOUT_GRACE)
+        self.runs += 1
+        self.rss_mb = response.get("rss_mb", self.rss_mb)
+        return response
+
+    def _read_frame(self, deadline: float) -> dict:
+        header = self._read_exact(_HEADER.size, deadline)
+        (length, ) = _HEADER.unpack(header)
+        return json.loads(self._read_exact(length, deadline))
+
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        while len(self._buffer) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeoutError()
+            readable, _, _ = select.select([self._response_fd], [], [],
+                                           remaining)
+            if not readable:
+                raise WorkerTimeoutError()
+            chunk = os.read(self._response_fd, 65536)
+            if not chunk:
+                raise RuntimeError(
+                    f"代码执行工作进程异常退出 (returncode={self.process.poll()})")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        """终止工作进程并释放管道"""
+        for fd in (self._request_fd, self._response_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        self._workdir.cleanup()
+
+
+class InterpreterPool:
+    """
+    预热的 Python 解释器池
+
+    Args:
+        size: 工作进程数量，即最大并发执行数
+        preload_modules: 工作进程启动时预先导入的模块，导入失败的模块被忽略
+        max_runs_per_worker: 单个工作进程最多执行的次数，达到后回收重建
+        max_worker_memory_mb: 工作进程内存（RSS）上限，超过后回收重建
+        max_output_chars: stdout 和 stderr 各自保留的最大字符数
+        startup_timeout: 等待工作进程完成预加载的最长时间（秒）
+    """
+
+    def __init__(self,
+                 size: int = 2,
+                 preload_modules: tuple[str, ...] = (),
+                 max_runs_per_worker: int = 50,
+                 max_worker_memory_mb: float = 512,
+                 max_output_chars: int = 20000,
+                 startup_timeout: float = 30.0):
+        self.size = size
+        self.preload_modules = tuple(preload_modules)
+        self.max_runs_per_worker = max_runs_per_worker
+        self.max_worker_memory_mb = max_worker_memory_mb
+        self.max_output_chars = max_output_chars
+        self.startup_timeout = startup_timeout
+
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._workers: set[_Worker] = set()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self.stats = {"runs": 0, "timeouts": 0, "recycled": 0, "crashed": 0}
+
+    def start(self):
+        """启动所有工作进程（预加载在后台进行，不等待完成），首次执行时自动调用"""
+        with self._lock:
+            if self._started:
+                return
+            if self._closed:
+                raise RuntimeError("解释器池已关闭")
+            self._started = True
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+        logger.info(f"代码执行解释器池已启动: {self.size} 个工作进程, "
+                    f"预加载模块: {list(self.preload_modules)}")
+
+    def run(self, code: str, timeout: float = 5) -> ExecutionResult:
+        """
+        在空闲的工作进程中执行代码
+
+        Raises:
+            WorkerTimeoutError: 执行超时
+            RuntimeError: 工作进程异常退出或解释器池已关闭
+        """
+        self.start()
+        worker = self._idle.get()
+        start = time.perf_counter()
+        healthy = False
+        try:
+            worker.wait_ready(self.startup_timeout)
+            response = worker.execute(code, timeout)
+            healthy = True
+        except WorkerTimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        except Exception:
+            self.stats["crashed"] += 1
+            raise
+        finally:
+            self.stats["runs"] += 1
+            self._release(worker, healthy)
+
+        if response.get("timeout"):
+            # 工作进程已终止超时的子进程，工作进程本身继续复用
+            self.stats["timeouts"] += 1
+            raise WorkerTimeoutError()
+        return ExecutionResult(stdout=response["stdout"],
+                               stderr=response["stderr"],
+                               truncated=response["truncated"],
+                               duration=time.perf_counter() - start)
+
+    async def arun(self, code: str, timeout: float = 5) -> ExecutionResult:
+        """异步执行代码，等待期间不阻塞事件循环"""
+        return await asyncio.to_thread(self.run, code, timeout)
+
+    def close(self):
+        """终止所有工作进程"""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = list(self._workers), set()
+        for worker in workers:
+            worker.close()
+        logger.info("代码执行解释器池已关闭")
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self.preload_modules, self.max_output_chars)
+        self._workers.add(worker)
+        return worker
+
+    def _release(self, worker: _Worker, healthy: bool):
+        """归还工作进程；超时、异常或达到回收条件的进程被替换为新进程"""
+        recycle = healthy and (
+            worker.runs >= self.max_runs_per_worker
+            or worker.rss_mb > self.max_worker_memory_mb)
+        if healthy and not recycle:
+            self._idle.put(worker)
+            return
+
+        if recycle:
+            self.stats["recycled"] += 1
+            logger.debug(f"回收代码执行工作进程: 已执行 {worker.runs} 次, "
+                         f"内存 {worker.rss_mb:.1f}MB")
+        with self._lock:
+            self._workers.discard(worker)
+            replacement = None if self._closed else self._spawn()
+        worker.close()
+        if replacement is not None:
+            self._idle.put(replacement)
@@ -0,0 +1,217 @@
+"""
+代码执行工作进程
+
+由 InterpreterPool 以独立脚本方式启动（不导入 doc_agent），启动时预先导入常用模块，
+之后通过管道循环接收代码、执行并返回输出。协议为 4 字节长度前缀 + UTF-8 JSON。
+
+每个请求在 fork 出的子进程中执行：子进程继承已预加载的模块，用户代码对模块、
+内置对象的修改随子进程退出而丢弃，不影响后续请求。超时由工作进程终止子进程，
+工作进程本身继续复用。分帧使用启动时保存的 json/os 私有引用，不受用户代码修改影响。
+
+用法: python interpreter_worker.py <请求fd> <响应fd> <输出字符上限> [预加载模块...]
+"""
+
+import importlib
+import io
+import select
+import signal
+import struct
+import sys
+import time
+import traceback
+from json import dumps as _json_dumps
+from json import loads as _json_loads
+from os import WEXITSTATUS, WIFEXITED, WTERMSIG, _exit, getcwd, sysconf
+from os import close as _close
+from os import fork as _fork
+from os import kill as _kill
+from os import pipe as _pipe
+from os import read as _read
+from os import waitpid as _waitpid
+from os import write as _write
+from typing import Optional
+
+_HEADER = struct.Struct(">I")
+
+
+class _LimitedBuffer(io.TextIOBase):
+    """超出上限后丢弃后续输出的文本缓冲区"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size = 0
+        self.truncated = False
+        self._parts = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        remaining = self.limit - self.size
+        if len(text) > remaining:
+            self.truncated = True
+            text_to_keep = text[:max(remaining, 0)]
+        else:
+            text_to_keep = text
+        if text_to_keep:
+            self._parts.append(text_to_keep)
+            self.size += len(text_to_keep)
+        return len(text)
+
+    def getvalue(self) -> str:
+        return "".join(self._parts)
+
+
+def _read_exact(fd: int, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = _read(fd, size)
+        if not chunk:
+            raise EOFError
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _read_frame(fd: int):
+    try:
+        (length, ) = _HEADER.unpack(_read_exact(fd, _HEADER.size))
+        return _json_loads(_read_exact(fd, length))
+    except EOFError:
+        return None
+
+
+def _write_frame(fd: int, payload: dict):
+    body = _json_dumps(payload, ensure_ascii=False).encode("utf-8")
+    data = _HEADER.pack(len(body)) + body
+    while data:
+        data = data[_write(fd, data):]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+        return pages * sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        import resource
+        # Linux 下 ru_maxrss 单位为 KB（峰值）
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _execute(code: str, max_output_chars: int) -> dict:
+    stdout = _LimitedBuffer(max_output_chars)
+    stderr = _LimitedBuffer(max_output_chars)
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        # 每次执行使用全新的全局命名空间，预加载的模块已在 sys.modules 中，import 无需重新加载
+        exec(compile(code, "<code>", "exec"), {
+            "__name__": "__main__",
+            "__builtins__": __builtins__
+        })
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(e.code, file=stderr)
+    except BaseException as e:
+        # 跳过工作进程自身的栈帧，只保留用户代码部分
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    finally:
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "truncated": stdout.truncated or stderr.truncated
+    }
+
+
+def _read_child(fd: int, deadline: float) -> Optional[bytes]:
+    """读取子进程的全部输出直到其关闭管道，超过截止时间返回 None"""
+    chunks = []
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        readable, _, _ = select.select([fd], [], [], remaining)
+        if not readable:
+            return None
+        chunk = _read(fd, 65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def _run_isolated(request: dict, fds: tuple[int, int],
+                  max_output_chars: int) -> dict:
+    """fork 子进程执行一次请求，返回结果或超时/异常退出的说明"""
+    result_read, result_write = _pipe()
+    pid = _fork()
+    if pid == 0:
+        # 子进程：关闭与解释器池通信的管道，用户代码无法写入协议流
+        try:
+            _close(result_read)
+            for fd in fds:
+                _close(fd)
+            _write_frame(result_write,
+                         _execute(request["code"], max_output_chars))
+        finally:
+            _exit(0)
+
+    _close(result_write)
+    try:
+        data = _read_child(result_read,
+                           time.monotonic() + request.get("timeout", 5))
+    finally:
+        _close(result_read)
+    if data is None:
+        _kill(pid, signal.SIGKILL)
+        _waitpid(pid, 0)
+        return {"timeout": True}
+
+    _, status = _waitpid(pid, 0)
+    if len(data) >= _HEADER.size:
+        (length, ) = _HEADER.unpack(data[:_HEADER.size])
+        if len(data) == _HEADER.size + length:
+            return _json_loads(data[_HEADER.size:])
+
+    # 用户代码调用 os._exit 或进程崩溃，没有写出完整结果
+    reason = (f"exit code {WEXITSTATUS(status)}"
+              if WIFEXITED(status) else f"signal {WTERMSIG(status)}")
+    return {
+        "stdout": "",
+        "stderr": f"代码执行进程异常退出 ({reason})\n",
+        "truncated": False
+    }
+
+
+def main():
+    # 与直接运行临时脚本一致，sys.path[0] 指向工作目录而不是工具包目录
+    sys.path[0] = getcwd()
+    request_fd, response_fd = int(sys.argv[1]), int(sys.argv[2])
+    max_output_chars = int(sys.argv[3])
+
+    preloaded = []
+    for module_name in sys.argv[4:]:
+        try:
+            importlib.import_module(module_name)
+            preloaded.append(module_name)
+        except Exception:
+            pass
+    _write_frame(response_fd, {
+        "ready": True,
+        "preloaded": preloaded,
+        "rss_mb": _rss_mb()
+    })
+
+    while True:
+        request = _read_frame(request_fd)
+        if request is None:
+            break
+        response = _run_isolated(request, (request_fd, response_fd),
+                                 max_output_chars)
+        # 用户状态随子进程丢弃，上报的是工作进程自身的内存
+        response["rss_mb"] = _rss_mb()
+        _write_frame(response_fd, response)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+本地词法相关性评分
+纯 CPU 的 BM25 实现，用于远程重排序服务超时或不可用时的兜底排序，
+以及重排序效果分析中的查询词覆盖率计算
+"""
+
+import math
+import re
+from collections import Counter
+
+# 拉丁字母/数字按词切分，中日韩字符按连续片段切分后再生成二元组
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[㐀-䶿一-鿿]+")
+_CJK_START = "㐀"
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    将文本切分为词项：英文/数字按单词，中文按相邻二元组（单字片段保留单字）
+
+    Args:
+        text: 输入文本
+
+    Returns:
+        list[str]: 词项列表
+    """
+    tokens = []
+    for piece in _TOKEN_PATTERN.findall(text.lower()):
+        if piece[0] < _CJK_START or len(piece) == 1:
+            tokens.append(piece)
+        else:
+            tokens.extend(piece[i:i + 2] for i in range(len(piece) - 1))
+    return tokens
+
+
+def term_coverage(query: str, text: str) -> tuple[int, float]:
+    """
+    计算查询词项在文本中的覆盖情况
+
+    Returns:
+        tuple: (命中的查询词项数, 覆盖率 0~1)
+    """
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return 0, 0.0
+    matched = len(query_terms & set(tokenize(text)))
+    return matched, matched / len(query_terms)
+
+
+class BM25Scorer:
+    """
+    Okapi BM25 评分器
+    以候选文档集合本身作为语料统计 IDF，适合对一次检索返回的几十个片段做重排序
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, documents: list[str]) -> list[float]:
+        """
+        计算每个文档相对查询的 BM25 分数
+
+        Args:
+            query: 查询文本
+            documents: 文档文本列表
+
+        Returns:
+            list[float]: 与 documents 一一对应的分数
+        """
+        if not documents:
+            return []
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return [0.0] * len(documents)
+
+        term_counts = [Counter(tokenize(doc)) for doc in documents]
+        lengths = [sum(counts.values()) for counts in term_counts]
+        avg_length = sum(lengths) / len(lengths) or 1.0
+
+        doc_count = len(documents)
+        idf = {}
+        for term in query_terms:
+            df = sum(1 for counts in term_counts if term in counts)
+            if df:
+                idf[term] = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+        scores = []
+        for counts, length in zip(term_counts, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            score = 0.0
+            for term, weight in idf.items():
+                tf = counts.get(term)
+                if tf:
+                    score += weight * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
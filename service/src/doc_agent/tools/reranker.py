@@ -3,7 +3,14 @@ RerankerTool 重排序工具
 接收 ESSearchResult 列表，调用 RerankerClient 进行重排序
 """
 
+import asyncio
+import hashlib
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
@@ -11,6 +18,8 @@ from doc_agent.core.logger import logger
 
 from ..llm_clients.providers import RerankerClient
 from .es_service import ESSearchResult
+from .lexical_scorer import BM25Scorer, term_coverage
+from .web_cache import CacheStats, normalize_query
 
 
 @dataclass
@@ -34,26 +43,235 @@ class RerankedSearchResult:
             self.metadata = {}
 
 
+class RerankScoreCache:
+    """
+    重排序分数缓存
+    以 (规范化查询, 文档ID) 为键的有界LRU缓存，反思重跑和重叠查询时复用分数
+    """
+
+    NAMESPACE = "rerank"
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._scores: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    @staticmethod
+    def make_key(query: str, result: ESSearchResult,
+                 doc_text: str) -> tuple[str, str]:
+        """文档ID缺失时退化为内容哈希"""
+        doc_key = f"{result.index}/{result.id}" if result.id else hashlib.sha1(
+            doc_text.encode("utf-8")).hexdigest()
+        return normalize_query(query), doc_key
+
+    def get(self, key: tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+        self.stats.record(self.NAMESPACE,
+                          "hits" if score is not None else "misses")
+        return score
+
+    def set(self, key: tuple[str, str], score: float):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
 class RerankerTool:
     """重排序工具类"""
 
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self,
+                 base_url: str,
+                 api_key: str,
+                 batch_url: Optional[str] = None,
+                 max_concurrency: int = 4,
+                 score_cache_size: int = 50000,
+                 latency_budget: Optional[float] = None,
+                 degrade_cooldown: float = 30.0,
+                 local_only: bool = False):
         """
         初始化重排序工具
         Args:
-            reranker_client: RerankerClient 实例
+            base_url: Reranker API地址
+            api_key: API密钥
+            batch_url: 批量重排序API地址（可选）
+            max_concurrency: 批量重排序时的最大并行请求数
+            score_cache_size: 重排序分数缓存的最大条目数，0 表示不缓存
+            latency_budget: 远程重排序的时延预算（秒），超时即改用本地BM25评分，None 表示不限制
+            degrade_cooldown: 远程重排序超时或失败后，直接使用本地评分的冷却时间（秒）
+            local_only: 是否只使用本地BM25评分（高负载时的低成本模式）
         """
         self.reranker_client = RerankerClient(base_url=base_url,
-                                              api_key=api_key)
+                                              api_key=api_key,
+                                              batch_url=batch_url,
+                                              max_concurrency=max_concurrency)
+        # 同步重排序在线程中请求远程服务，latency_budget 作为整个调用的截止时间
+        self._sync_executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrency),
+            thread_name_prefix="reranker")
+        self.score_cache = RerankScoreCache(
+            score_cache_size) if score_cache_size > 0 else None
+        self.lexical_scorer = BM25Scorer()
+        self.latency_budget = latency_budget
+        self.degrade_cooldown = degrade_cooldown
+        self.local_only = local_only
+        self._degraded_until = 0.0
         logger.info("初始化重排序工具")
 
+    def _remote_available(self) -> bool:
+        """是否应请求远程重排序服务（未处于本地模式或降级冷却期）"""
+        return not self.local_only and time.monotonic() >= self._degraded_until
+
+    def _mark_degraded(self, reason: str):
+        """远程重排序超时或失败，在冷却期内改用本地评分"""
+        self._degraded_until = time.monotonic() + self.degrade_cooldown
+        logger.warning(
+            f"远程重排序{reason}，{self.degrade_cooldown:.0f}秒内使用本地BM25评分")
+
+    def _local_rerank(self, query: str, search_results: list[ESSearchResult],
+                      top_k: Optional[int]) -> list[RerankedSearchResult]:
+        """
+        本地BM25重排序，分数相同时保持ES原始评分顺序
+        """
+        candidates = [
+            result for result in search_results if self._doc_text(result)
+        ]
+        scores = self.lexical_scorer.score(
+            query, [self._doc_text(result) for result in candidates])
+        ranked = sorted(zip(scores, candidates),
+                        key=lambda item: (item[0], item[1].score),
+                        reverse=True)
+        if top_k is not None:
+            ranked = ranked[:top_k]
+        logger.info(f"本地BM25重排序完成，返回 {len(ranked)} 个结果")
+        return [
+            self._to_reranked_result(result, round(score, 4))
+            for score, result in ranked
+        ]
+
+    @staticmethod
+    def _doc_text(result: ESSearchResult) -> str:
+        """待重排序的文档文本，优先使用 div_content"""
+        return result.div_content if result.div_content else result.original_content
+
+    @staticmethod
+    def _extract_documents(search_results: list[ESSearchResult]) -> list[str]:
+        """提取待重排序的文档文本"""
+        documents = []
+        for result in search_results:
+            doc_text = RerankerTool._doc_text(result)
+            if doc_text:
+                documents.append(doc_text)
+            else:
+                logger.warning(f"文档 {result.id} 内容为空，跳过")
+        return documents
+
+    def _plan_group(
+        self, query: str, search_results: list[ESSearchResult]
+    ) -> tuple[dict[int, float], list[ESSearchResult]]:
+        """
+        将一组结果拆分为缓存命中和需要请求重排序服务的部分
+
+        Returns:
+            tuple: ({结果下标: 缓存分数}, 未命中的结果列表)
+        """
+        cached_scores: dict[int, float] = {}
+        unseen: list[ESSearchResult] = []
+        for position, result in enumerate(search_results):
+            doc_text = self._doc_text(result)
+            if not doc_text:
+                logger.warning(f"文档 {result.id} 内容为空，跳过")
+                continue
+            if self.score_cache is not None:
+                score = self.score_cache.get(
+                    RerankScoreCache.make_key(query, result, doc_text))
+                if score is not None:
+                    cached_scores[position] = score
+                    continue
+            unseen.append(result)
+        return cached_scores, unseen
+
+    def _merge_group(self, query: str, search_results: list[ESSearchResult],
+                     cached_scores: dict[int, float],
+                     unseen: list[ESSearchResult], rerank_result: Any,
+                     top_k: Optional[int]) -> list[RerankedSearchResult]:
+        """合并缓存分数与本次重排序分数，写回缓存并按分数排序截断"""
+        fresh_scores: dict[str, float] = {}
+        if unseen:
+            if not isinstance(rerank_result,
+                              dict) or 'sorted_doc_list' not in rerank_result:
+                logger.error(f"重排序结果格式异常: {rerank_result}")
+                return self._local_rerank(query, search_results, top_k)
+            for reranked_doc in rerank_result['sorted_doc_list']:
+                try:
+                    fresh_scores[reranked_doc.get(
+                        'text', '')] = reranked_doc.get('rerank_score', 0.0)
+                except AttributeError:
+                    continue
+
+        scored: list[tuple[float, ESSearchResult]] = []
+        unseen_ids = {id(result) for result in unseen}
+        for position, result in enumerate(search_results):
+            if position in cached_scores:
+                scored.append((cached_scores[position], result))
+            elif id(result) in unseen_ids:
+                doc_text = self._doc_text(result)
+                if doc_text not in fresh_scores:
+                    logger.warning(f"重排序文档在返回结果中未找到: {doc_text[:50]}...")
+                    continue
+                score = fresh_scores[doc_text]
+                if self.score_cache is not None:
+                    self.score_cache.set(
+                        RerankScoreCache.make_key(query, result, doc_text),
+                        score)
+                scored.append((score, result))
+
+        if not scored:
+            logger.warning("重排序结果解析失败，回退到本地BM25评分")
+            return self._local_rerank(query, search_results, top_k)
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        if top_k is not None:
+            scored = scored[:top_k]
+        logger.info(
+            f"重排序完成，缓存命中 {len(cached_scores)} 个，新评分 {len(fresh_scores)} 个，返回 {len(scored)} 个结果"
+        )
+        return [
+            self._to_reranked_result(result, score) for score, result in scored
+        ]
+
+    @staticmethod
+    def _to_reranked_result(result: ESSearchResult,
+                            rerank_score: float) -> RerankedSearchResult:
+        return RerankedSearchResult(id=result.id,
+                                    doc_id=result.doc_id,
+                                    index=result.index,
+                                    domain_id=result.domain_id,
+                                    doc_from=result.doc_from,
+                                    original_content=result.original_content,
+                                    div_content=result.div_content,
+                                    source=result.source,
+                                    score=result.score,
+                                    rerank_score=rerank_score,
+                                    metadata=result.metadata,
+                                    alias_name=result.alias_name)
+
     def rerank_search_results(
             self,
             query: str,
             search_results: list[ESSearchResult],
             top_k: Optional[int] = None) -> list[RerankedSearchResult]:
         """
-        对搜索结果进行重排序
+        对搜索结果进行重排序（已缓存分数的文档不再请求重排序服务）
+        远程服务超出时延预算或失败时使用本地BM25评分
         Args:
             query: 查询文本
             search_results: ESSearchResult 列表
@@ -70,142 +288,161 @@ class RerankerTool:
             return []
 
         try:
-            # 提取文档文本
-            documents = []
-            for result in search_results:
-                # 优先使用 div_content，如果没有则使用 original_content
-                doc_text = result.div_content if result.div_content else result.original_content
-                if doc_text:
-                    documents.append(doc_text)
-                else:
-                    logger.warning(f"文档 {result.id} 内容为空，跳过")
-
-            if not documents:
+            cached_scores, unseen = self._plan_group(query, search_results)
+            if not cached_scores and not unseen:
                 logger.warning("所有文档内容都为空，无法进行重排序")
                 return []
 
-            logger.info(f"准备重排序，文档数量: {len(documents)}")
-
-            # 调用 RerankerClient 进行重排序
-            size = top_k if top_k is not None else len(documents)
-            logger.debug(f"调用重排序客户端，size: {size}")
-            rerank_result = self.reranker_client.invoke(prompt=query,
-                                                        documents=documents,
-                                                        size=size)
+            rerank_result = None
+            if unseen:
+                if not self._remote_available():
+                    return self._local_rerank(query, search_results, top_k)
+                documents = self._extract_documents(unseen)
+                logger.info(f"准备重排序，文档数量: {len(documents)}")
+                # 需要所有未命中文档的分数才能与缓存分数合并排序
+                rerank_result = self._invoke_with_deadline(query, documents)
+
+            return self._merge_group(query, search_results, cached_scores,
+                                     unseen, rerank_result, top_k)
+
+        except FuturesTimeoutError:
+            self._mark_degraded(f"超出时延预算 {self.latency_budget}秒")
+            return self._local_rerank(query, search_results, top_k)
+        except Exception as e:
+            logger.error(f"重排序失败: {str(e)}")
+            self._mark_degraded("失败")
+            return self._local_rerank(query, search_results, top_k)
 
-            # 解析重排序结果
-            reranked_results = self._parse_rerank_result(
-                rerank_result, search_results, query)
+    def _invoke_with_deadline(self, query: str, documents: list[str]) -> dict:
+        """
+        同步请求远程重排序，整个调用（连接、发送、等待响应、读取）不超过 latency_budget
 
-            logger.info(f"重排序完成，返回 {len(reranked_results)} 个结果")
-            return reranked_results
+        httpx 的 timeout 只限制单个阶段，慢速分块返回的响应可以远超预算，
+        因此请求放在线程中执行，调用方只等待到截止时间
 
-        except Exception as e:
-            logger.error(f"重排序失败: {str(e)}")
-            # 如果重排序失败，返回原始结果（按原始评分排序）
-            return self._fallback_to_original_results(search_results)
+        Raises:
+            concurrent.futures.TimeoutError: 超出时延预算
+        """
+        if self.latency_budget is None:
+            return self.reranker_client.invoke(prompt=query,
+                                               documents=documents,
+                                               size=len(documents))
+        future = self._sync_executor.submit(self.reranker_client.invoke,
+                                            prompt=query,
+                                            timeout=self.latency_budget,
+                                            documents=documents,
+                                            size=len(documents))
+        try:
+            return future.result(timeout=self.latency_budget)
+        except FuturesTimeoutError:
+            # 未开始的请求直接取消，已发出的请求由 httpx 超时自行结束
+            future.cancel()
+            raise
 
-    def _parse_rerank_result(self, rerank_result: dict[str, Any],
-                             original_results: list[ESSearchResult],
-                             query: str) -> list[RerankedSearchResult]:
+    async def arerank_search_results(
+            self,
+            query: str,
+            search_results: list[ESSearchResult],
+            top_k: Optional[int] = None) -> list[RerankedSearchResult]:
         """
-        解析重排序结果
+        异步重排序，不阻塞事件循环，可与ES/网络检索并发
         Args:
-            rerank_result: RerankerClient 返回的结果
-            original_results: 原始搜索结果
             query: 查询文本
+            search_results: ESSearchResult 列表
+            top_k: 返回结果数量，None表示返回全部
         Returns:
-            List[RerankedSearchResult]: 解析后的重排序结果
+            List[RerankedSearchResult]: 重排序后的结果列表
         """
-        logger.debug("开始解析重排序结果")
-        reranked_results = []
-
-        if not isinstance(rerank_result,
-                          dict) or 'sorted_doc_list' not in rerank_result:
-            logger.error(f"重排序结果格式异常: {rerank_result}")
-            return self._fallback_to_original_results(original_results)
-
-        sorted_docs = rerank_result['sorted_doc_list']
-        logger.info(f"重排序返回 {len(sorted_docs)} 个文档")
-
-        # 创建原始文档的映射，用于快速查找
-        original_doc_map = {}
-        for result in original_results:
-            doc_text = result.div_content if result.div_content else result.original_content
-            if doc_text:
-                original_doc_map[doc_text] = result
-
-        logger.debug(f"创建原始文档映射，包含 {len(original_doc_map)} 个文档")
-
-        # 处理重排序结果
-        for _i, reranked_doc in enumerate(sorted_docs):
+        results = await self.arerank_batch([(query, search_results)], top_k)
+        return results[0]
+
+    async def arerank_batch(
+        self,
+        groups: list[tuple[str, list[ESSearchResult]]],
+        top_k: Optional[int] = None
+    ) -> list[list[RerankedSearchResult]]:
+        """
+        批量异步重排序多组 (query, search_results)
+        后端支持批量接口时一次请求完成，否则有界并行；单组失败只回退该组
+        每组只把未命中分数缓存的文档发给重排序服务，整批超出时延预算时全部改用本地BM25评分
+        Args:
+            groups: [(查询文本, ESSearchResult 列表), ...]
+            top_k: 每组返回结果数量，None表示返回全部
+        Returns:
+            list: 与 groups 一一对应的重排序结果列表
+        """
+        outputs: list[list[RerankedSearchResult]] = [[] for _ in groups]
+        plans = {}
+        requests = []
+        request_positions = []
+        for position, (query, search_results) in enumerate(groups):
+            if not search_results:
+                continue
+            cached_scores, unseen = self._plan_group(query, search_results)
+            if not cached_scores and not unseen:
+                logger.warning("所有文档内容都为空，无法进行重排序")
+                continue
+            plans[position] = (cached_scores, unseen)
+            if unseen:
+                documents = self._extract_documents(unseen)
+                requests.append({
+                    "query": query,
+                    "documents": documents,
+                    "size": len(documents)
+                })
+                request_positions.append(position)
+
+        if requests and not self._remote_available():
+            responses = [None] * len(requests)
+        elif requests:
+            logger.info(
+                f"开始批量异步重排序，共 {len(requests)} 组，文档总数: {sum(len(r['documents']) for r in requests)}"
+            )
             try:
-                doc_text = reranked_doc.get('text', '')
-                rerank_score = reranked_doc.get('rerank_score', 0.0)
-
-                # 查找对应的原始结果
-                original_result = original_doc_map.get(doc_text)
-                if original_result:
-                    # 创建重排序结果
-                    reranked_result = RerankedSearchResult(
-                        id=original_result.id,
-                        doc_id=original_result.doc_id,
-                        index=original_result.index,
-                        domain_id=original_result.domain_id,
-                        doc_from=original_result.doc_from,
-                        original_content=original_result.original_content,
-                        div_content=original_result.div_content,
-                        source=original_result.source,
-                        score=original_result.score,  # 保留原始评分
-                        rerank_score=rerank_score,  # 添加重排序评分
-                        metadata=original_result.metadata,
-                        alias_name=original_result.alias_name)
-                    reranked_results.append(reranked_result)
-                else:
-                    logger.warning(f"重排序文档在原始结果中未找到: {doc_text[:50]}...")
-
+                responses = await asyncio.wait_for(
+                    self.reranker_client.abatch_invoke(requests),
+                    timeout=self.latency_budget)
+            except asyncio.TimeoutError:
+                self._mark_degraded(f"超出时延预算 {self.latency_budget}秒")
+                responses = [None] * len(requests)
             except Exception as e:
-                logger.error(f"解析重排序文档失败: {str(e)}")
-                continue
-
-        # 如果没有成功解析任何结果，回退到原始结果
-        if not reranked_results:
-            logger.warning("重排序结果解析失败，回退到原始结果")
-            return self._fallback_to_original_results(original_results)
-
-        logger.info(f"成功解析 {len(reranked_results)} 个重排序结果")
-        return reranked_results
-
-    def _fallback_to_original_results(
-            self, original_results: list[ESSearchResult]
-    ) -> list[RerankedSearchResult]:
+                logger.error(f"批量重排序失败: {str(e)}")
+                self._mark_degraded("失败")
+                responses = [e] * len(requests)
+        else:
+            responses = []
+        response_map = dict(zip(request_positions, responses))
+
+        for position, (cached_scores, unseen) in plans.items():
+            query, search_results = groups[position]
+            response = response_map.get(position)
+            if unseen and (response is None
+                           or isinstance(response, Exception)):
+                if response is not None:
+                    logger.error(f"重排序失败: {str(response)}")
+                outputs[position] = self._local_rerank(query, search_results,
+                                                       top_k)
+            else:
+                outputs[position] = self._merge_group(query, search_results,
+                                                      cached_scores, unseen,
+                                                      response, top_k)
+
+        return outputs
+
+    def cache_stats(self) -> dict[str, dict[str, Any]]:
         """
-        回退到原始结果（当重排序失败时）
-        Args:
-            original_results: 原始搜索结果
+        获取重排序分数缓存的命中统计快照
+
         Returns:
-            List[RerankedSearchResult]: 转换后的结果
+            dict: {"rerank": {"hits", "misses", "hit_rate"}}，未启用缓存时返回空字典
         """
-        logger.info("回退到原始结果")
-        fallback_results = []
-        for result in original_results:
-            fallback_result = RerankedSearchResult(
-                id=result.id,
-                doc_id=result.doc_id,
-                index=result.index,
-                domain_id=result.domain_id,
-                doc_from=result.doc_from,
-                original_content=result.original_content,
-                div_content=result.div_content,
-                source=result.source,
-                score=result.score,
-                rerank_score=result.score,  # 使用原始评分作为重排序评分
-                metadata=result.metadata,
-                alias_name=result.alias_name)
-            fallback_results.append(fallback_result)
-
-        logger.info(f"回退到原始结果，返回 {len(fallback_results)} 个结果")
-        return fallback_results
+        if self.score_cache is None:
+            return {}
+        return self.score_cache.stats.snapshot()
+
+    async def aclose(self):
+        """释放重排序客户端的连接池"""
+        await self.reranker_client.aclose()
 
     def get_top_results(self, reranked_results: list[RerankedSearchResult],
                         top_k: int) -> list[RerankedSearchResult]:
@@ -280,13 +517,8 @@ class RerankerTool:
         # 检查最相关文档是否排在前面
         first_doc = reranked_results[0].div_content if reranked_results[
             0].div_content else reranked_results[0].original_content
-        query_keywords = query.lower().split()
-        first_doc_lower = first_doc.lower()
-
-        keyword_match_count = sum(1 for keyword in query_keywords
-                                  if keyword in first_doc_lower)
-        relevance_score = keyword_match_count / len(
-            query_keywords) if query_keywords else 0.0
+        # 按词项（中文二元组/英文单词）计算查询覆盖率，中文查询不依赖空格切分
+        keyword_match_count, relevance_score = term_coverage(query, first_doc)
 
         logger.debug(
             f"相关性分析 - 关键词匹配数: {keyword_match_count}, 相关性分数: {relevance_score}")
@@ -0,0 +1,415 @@
+# service/src/doc_agent/tools/web_cache.py
+"""
+网络搜索缓存
+为外部搜索接口响应和网页正文提供带TTL的两级缓存：
+本地磁盘层（有容量上限）+ 可选的 Redis 层
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Optional
+
+from doc_agent.core.logger import logger
+
+
+def normalize_query(query: str) -> str:
+    """
+    规范化搜索查询，使仅有大小写、全半角或空白差异的查询命中同一缓存
+
+    Args:
+        query: 原始查询
+
+    Returns:
+        str: 规范化后的查询
+    """
+    query = unicodedata.normalize("NFKC", query or "").casefold()
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def make_cache_key(namespace: str, *parts: Any) -> str:
+    """根据命名空间和若干组成部分生成稳定的缓存键"""
+    raw = "\x1f".join(str(part) for part in parts)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+# 当前上下文中生效的统计范围，asyncio 任务和 to_thread 会继承
+_active_scopes: contextvars.ContextVar[tuple["CacheStats", ...]] = \
+    contextvars.ContextVar("cache_stats_scopes", default=())
+
+
+class CacheStats:
+    """按命名空间统计缓存命中情况（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def record(self, namespace: str, event: str, count: int = 1):
+        """
+        记录一次事件，event 取值如 hits / misses / revalidated
+
+        同时计入当前上下文中所有生效的 CacheStatsScope
+        """
+        self._add(namespace, event, count)
+        for scope in _active_scopes.get():
+            if scope is not self:
+                scope._add(namespace, event, count)
+
+    def _add(self, namespace: str, event: str, count: int):
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {
+                "hits": 0,
+                "misses": 0
+            })
+            counters[event] = counters.get(event, 0) + count
+
+    def snapshot(
+            self,
+            namespaces: Optional[tuple[str, ...]] = None
+    ) -> dict[str, dict[str, Any]]:
+        """
+        获取当前统计快照
+
+        Args:
+            namespaces: 只返回这些命名空间，默认全部
+
+        Returns:
+            dict: {namespace: {"hits": .., "misses": .., "hit_rate": ..}}
+        """
+        with self._lock:
+            snapshot = {
+                namespace: dict(counters)
+                for namespace, counters in self._counters.items()
+                if namespaces is None or namespace in namespaces
+            }
+        for counters in snapshot.values():
+            counters["hit_rate"] = self._hit_rate(counters)
+        return snapshot
+
+    @staticmethod
+    def _hit_rate(counters: dict[str, Any]) -> float:
+        total = counters.get("hits", 0) + counters.get("misses", 0)
+        return round(counters.get("hits", 0) / total, 4) if total else 0.0
+
+
+class CacheStatsScope(CacheStats):
+    """
+    单次调用范围内的缓存统计
+
+    start() 之后、stop() 之前，当前上下文（包括其中创建的 asyncio 任务）
+    记录到任何 CacheStats 的事件都会同时计入本范围。并发执行的多个节点
+    各自持有独立的范围，互不干扰
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._token: Optional[contextvars.Token] = None
+
+    def start(self) -> "CacheStatsScope":
+        self._token = _active_scopes.set(_active_scopes.get() + (self, ))
+        return self
+
+    def stop(self):
+        if self._token is None:
+            return
+        try:
+            _active_scopes.reset(self._token)
+        except ValueError:
+            # 在其他上下文中结束（例如跨任务），只移除本范围
+            _active_scopes.set(
+                tuple(scope for scope in _active_scopes.get()
+                      if scope is not self))
+        self._token = None
+
+    def __enter__(self) -> "CacheStatsScope":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class DiskCacheTier:
+    """
+    本地磁盘缓存层
+    每个条目一个JSON文件，按访问时间近似LRU淘汰，总大小不超过 max_bytes
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        digest = key.split(":", 1)[-1]
+        return self.cache_dir / digest[:2] / f"{key.replace(':', '_')}.json"
+
+    def _scan_total_bytes(self) -> int:
+        total = 0
+        if self.cache_dir.exists():
+            for path in self.cache_dir.rglob("*.json"):
+                try:
+                    total += path.stat().st_size
+                except OSError:
+                    continue
+        return total
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        """读取条目（不判断过期，由调用方决定）"""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            # 更新访问时间，作为LRU淘汰依据
+            os.utime(path, None)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取磁盘缓存失败 {path}: {e}")
+            self.delete(key)
+            return None
+
+    def set(self, key: str, entry: dict[str, Any]):
+        """原子写入条目，超出容量时淘汰最久未访问的条目"""
+        path = self._path(key)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total_bytes()
+            try:
+                old_size = path.stat().st_size
+            except OSError:
+                old_size = 0
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                if self._total_bytes is not None:
+                    self._total_bytes -= size
+            except OSError:
+                pass
+
+    def _evict(self):
+        """淘汰到容量的 90% 以下（调用方需持有锁）"""
+        files = []
+        for path in self.cache_dir.rglob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_atime, stat.st_mtime, stat.st_size, path))
+        files.sort(key=lambda item: max(item[0], item[1]))
+
+        target = int(self.max_bytes * 0.9)
+        total = sum(item[2] for item in files)
+        evicted = 0
+        for _, _, size, path in files:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                evicted += 1
+            except OSError:
+                continue
+        self._total_bytes = total
+        logger.debug(f"磁盘缓存淘汰 {evicted} 个条目，当前大小 {total} 字节")
+
+
+class RedisCacheTier:
+    """Redis 缓存层（基于 redis.asyncio 客户端）"""
+
+    def __init__(self, redis_client, key_prefix: str = "aidoc:web_cache:"):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        try:
+            raw = await self.redis_client.get(self.key_prefix + key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"读取Redis缓存失败 {key}: {e}")
+            return None
+
+    async def set(self, key: str, entry: dict[str, Any], retention: int):
+        try:
+            await self.redis_client.set(self.key_prefix + key,
+                                        json.dumps(entry, ensure_ascii=False),
+                                        ex=max(int(retention), 1))
+        except Exception as e:
+            logger.warning(f"写入Redis缓存失败 {key}: {e}")
+
+
+class WebSearchCache:
+    """
+    网络搜索两级缓存
+    - 搜索响应：以规范化查询为键，过期即失效
+    - 网页正文：以URL为键并记录 ETag/Last-Modified，过期后可用于条件请求复验
+    """
+
+    SEARCH_NAMESPACE = "search"
+    PAGE_NAMESPACE = "page"
+
+    def __init__(self,
+                 disk_tier: Optional[DiskCacheTier] = None,
+                 redis_tier: Optional[RedisCacheTier] = None,
+                 search_ttl: int = 3600,
+                 page_ttl: int = 86400,
+                 page_stale_ttl: int = 7 * 86400):
+        self.disk_tier = disk_tier
+        self.redis_tier = redis_tier
+        self.search_ttl = search_ttl
+        self.page_ttl = page_ttl
+        self.page_stale_ttl = page_stale_ttl
+        self.stats = CacheStats()
+
+    @classmethod
+    def from_config(cls, config) -> Optional["WebSearchCache"]:
+        """
+        根据 WebSearchConfig 创建缓存，未启用时返回 None
+
+        Args:
+            config: WebSearchConfig 实例
+        """
+        if not config.cache_enabled:
+            return None
+
+        disk_tier = None
+        if config.cache_dir:
+            disk_tier = DiskCacheTier(config.cache_dir,
+                                      config.cache_max_bytes)
+
+        redis_tier = None
+        if config.cache_redis_url:
+            try:
+                import redis.asyncio as aredis
+                redis_tier = RedisCacheTier(
+                    aredis.from_url(config.cache_redis_url,
+                                    encoding="utf-8",
+                                    decode_responses=True))
+            except Exception as e:
+                logger.warning(f"Redis缓存层初始化失败，仅使用磁盘缓存: {e}")
+
+        return cls(disk_tier=disk_tier,
+                   redis_tier=redis_tier,
+                   search_ttl=config.search_cache_ttl,
+                   page_ttl=config.page_cache_ttl)
+
+    async def _get_entry(self, key: str) -> Optional[dict[str, Any]]:
+        if self.disk_tier:
+            entry = await asyncio.to_thread(self.disk_tier.get, key)
+            if entry is not None:
+                return entry
+        if self.redis_tier:
+            entry = await self.redis_tier.get(key)
+            if entry is not None and self.disk_tier:
+                # 回填磁盘层，下次直接本地命中
+                await asyncio.to_thread(self.disk_tier.set, key, entry)
+            return entry
+        return None
+
+    async def _set_entry(self, key: str, entry: dict[str, Any],
+                         retention: int):
+        if self.disk_tier:
+            try:
+                await asyncio.to_thread(self.disk_tier.set, key, entry)
+            except OSError as e:
+                logger.warning(f"写入磁盘缓存失败 {key}: {e}")
+        if self.redis_tier:
+            await self.redis_tier.set(key, entry, retention)
+
+    async def _delete_entry(self, key: str):
+        if self.disk_tier:
+            await asyncio.to_thread(self.disk_tier.delete, key)
+
+    # --- 搜索响应 ---
+
+    def _search_key(self, query: str, count: int) -> str:
+        return make_cache_key(self.SEARCH_NAMESPACE, normalize_query(query),
+                              count)
+
+    async def get_search(self, query: str,
+                         count: int) -> Optional[list[dict[str, Any]]]:
+        """获取未过期的搜索响应，未命中返回 None"""
+        key = self._search_key(query, count)
+        entry = await self._get_entry(key)
+        if entry is not None and entry.get("expires_at", 0) > time.time():
+            self.stats.record(self.SEARCH_NAMESPACE, "hits")
+            return entry.get("value")
+        if entry is not None:
+            await self._delete_entry(key)
+        self.stats.record(self.SEARCH_NAMESPACE, "misses")
+        return None
+
+    async def set_search(self, query: str, count: int,
+                         results: list[dict[str, Any]]):
+        """缓存搜索响应"""
+        entry = {
+            "value": results,
+            "expires_at": time.time() + self.search_ttl,
+        }
+        await self._set_entry(self._search_key(query, count), entry,
+                              self.search_ttl)
+
+    # --- 网页正文 ---
+
+    def _page_key(self, url: str) -> str:
+        return make_cache_key(self.PAGE_NAMESPACE, url)
+
+    async def get_page(self, url: str) -> Optional[dict[str, Any]]:
+        """
+        获取网页缓存条目（可能已过期）
+
+        Returns:
+            dict: {"text", "etag", "last_modified", "expires_at", "fresh"}，未命中返回 None
+        """
+        entry = await self._get_entry(self._page_key(url))
+        if entry is None or entry.get("url") != url:
+            return None
+        entry["fresh"] = entry.get("expires_at", 0) > time.time()
+        return entry
+
+    async def set_page(self,
+                       url: str,
+                       text: str,
+                       etag: Optional[str] = None,
+                       last_modified: Optional[str] = None):
+        """缓存网页正文及其校验头"""
+        entry = {
+            "url": url,
+            "text": text,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires_at": time.time() + self.page_ttl,
+        }
+        await self._set_entry(self._page_key(url), entry,
+                              self.page_ttl + self.page_stale_ttl)
+
+    async def touch_page(self, entry: dict[str, Any]):
+        """条件请求返回 304 时刷新条目的有效期"""
+        await self.set_page(entry["url"], entry["text"], entry.get("etag"),
+                            entry.get("last_modified"))
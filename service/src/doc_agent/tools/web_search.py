@@ -11,8 +11,11 @@ import time
 from typing import Any, Optional
 
 import aiohttp
-from bs4 import BeautifulSoup
+
+from doc_agent.core.config import settings
 from doc_agent.core.logger import logger
+from doc_agent.tools.web_cache import WebSearchCache
+from doc_agent.utils.html_extractor import get_html_extractor
 
 
 def timer(func=None, *, log_level="info"):
@@ -52,14 +55,28 @@ def timer(func=None, *, log_level="info"):
 class WebScraper:
     """网页内容抓取器"""
 
-    def __init__(self):
+    def __init__(self,
+                 cache: Optional[WebSearchCache] = None,
+                 html_extractor: Optional[str] = None,
+                 main_content: bool = False):
+        """
+        Args:
+            cache: 网页正文缓存（可选）
+            html_extractor: HTML提取引擎名称，None 时使用默认引擎（lxml）
+            main_content: 是否启用正文密度启发式，只保留页面主体内容
+        """
         self.logger = logger.bind(name="web_scraper")
+        self.cache = cache
+        self.html_extractor = get_html_extractor(html_extractor)
+        self.main_content = main_content
 
     async def fetch_full_content(self,
                                  url: str,
                                  timeout: int = 10) -> Optional[str]:
         """
         异步获取网页完整内容
+        启用缓存时：新鲜条目直接返回；过期条目携带 ETag/Last-Modified 发起条件请求，
+        服务端返回 304 时复用缓存正文
 
         Args:
             url: 网页URL
@@ -68,15 +85,47 @@ class WebScraper:
         Returns:
             网页的文本内容，失败时返回None
         """
+        cached = None
+        if self.cache:
+            cached = await self.cache.get_page(url)
+            if cached and cached["fresh"]:
+                self.cache.stats.record(WebSearchCache.PAGE_NAMESPACE, "hits")
+                return cached["text"]
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
         try:
             timeout_obj = aiohttp.ClientTimeout(total=timeout)
             async with aiohttp.ClientSession(timeout=timeout_obj) as session:
-                async with session.get(url) as response:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and cached:
+                        self.cache.stats.record(WebSearchCache.PAGE_NAMESPACE,
+                                                "hits")
+                        self.cache.stats.record(WebSearchCache.PAGE_NAMESPACE,
+                                                "revalidated")
+                        await self.cache.touch_page(cached)
+                        return cached["text"]
                     response.raise_for_status()
                     html = await response.text()
-                    return self.extract_text_from_html(html)
+                    text = self.extract_text_from_html(html)
+                    if self.cache:
+                        self.cache.stats.record(WebSearchCache.PAGE_NAMESPACE,
+                                                "misses")
+                        if text:
+                            await self.cache.set_page(
+                                url, text, response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"))
+                    return text
         except Exception as e:
             self.logger.error(f"获取网页内容失败 {url}: {e}")
+            if self.cache:
+                self.cache.stats.record(WebSearchCache.PAGE_NAMESPACE,
+                                        "misses")
             return None
 
     def extract_text_from_html(self, html: str) -> str:
@@ -90,25 +139,11 @@ class WebScraper:
             提取的文本内容
         """
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # 移除script和style标签
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # 获取文本
-            text = soup.get_text()
+            text = self.html_extractor.extract(html,
+                                               main_content=self.main_content)
 
-            # 清理文本
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines
-                      for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-
-            # 移除多余的空白字符
-            text = re.sub(r'\s+', ' ', text)
-
-            return text
+            # 合并为单行文本，移除多余的空白字符
+            return re.sub(r'\s+', ' ', text).strip()
         except Exception as e:
             self.logger.error(f"HTML文本提取失败: {e}")
             return ""
@@ -130,7 +165,17 @@ class WebSearchConfig:
             "timeout": 15,
             "retries": 3,
             "delay": 1,
-            "fetch_full_content": True
+            "fetch_full_content": True,
+            # 网页正文提取配置
+            "html_extractor": None,
+            "html_main_content": False,
+            # 缓存配置，相对的 cache_dir 位于配置的 output_dir 下
+            "cache_enabled": True,
+            "cache_dir": "cache/web_search",
+            "cache_max_bytes": 256 * 1024 * 1024,
+            "cache_redis_url": None,
+            "search_cache_ttl": 3600,
+            "page_cache_ttl": 86400
         }
 
         # 合并配置
@@ -144,6 +189,16 @@ class WebSearchConfig:
         self.retries = default_config["retries"]
         self.delay = default_config["delay"]
         self.fetch_full_content = default_config["fetch_full_content"]
+        self.html_extractor = default_config["html_extractor"]
+        self.html_main_content = default_config["html_main_content"]
+        self.cache_enabled = default_config["cache_enabled"]
+        self.cache_dir = default_config["cache_dir"]
+        if self.cache_dir and not os.path.isabs(self.cache_dir):
+            self.cache_dir = os.path.join(settings.output_dir, self.cache_dir)
+        self.cache_max_bytes = default_config["cache_max_bytes"]
+        self.cache_redis_url = default_config["cache_redis_url"]
+        self.search_cache_ttl = default_config["search_cache_ttl"]
+        self.page_cache_ttl = default_config["page_cache_ttl"]
 
 
 class WebSearchTool:
@@ -163,7 +218,11 @@ class WebSearchTool:
             config: 配置字典
         """
         self.config = WebSearchConfig(config)
-        self.web_scraper = WebScraper()
+        self.cache = WebSearchCache.from_config(self.config)
+        self.web_scraper = WebScraper(
+            cache=self.cache,
+            html_extractor=self.config.html_extractor,
+            main_content=self.config.html_main_content)
         self.logger = logger.bind(name="web_search")
 
         logger.info("初始化网络搜索工具")
@@ -184,6 +243,20 @@ class WebSearchTool:
         Returns:
             如果请求成功，返回响应的数据；否则返回None
         """
+        if self.cache:
+            cached = await self.cache.get_search(query, self.config.count)
+            if cached is not None:
+                self.logger.debug(f"搜索缓存命中: {query}")
+                return cached
+
+        data = await self._request_web_search(query)
+        if data and self.cache:
+            await self.cache.set_search(query, self.config.count, data)
+        return data
+
+    async def _request_web_search(
+            self, query: str) -> Optional[list[dict[str, Any]]]:
+        """请求外部搜索接口（含重试），不经过缓存"""
         headers = {"X-API-KEY-AUTH": f"Bearer {self.config.token}"}
         params = {"queryStr": query, "count": self.config.count}
 
@@ -303,6 +376,15 @@ class WebSearchTool:
         """
         return await self.web_scraper.fetch_full_content(url)
 
+    def cache_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        获取搜索/网页缓存的命中统计快照
+
+        Returns:
+            dict: 按命名空间划分的统计，未启用缓存时返回空字典
+        """
+        return self.cache.stats.snapshot() if self.cache else {}
+
     def search(self, query: str) -> str:
         """
         同步搜索接口（用于兼容性）
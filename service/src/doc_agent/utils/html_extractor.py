@@ -0,0 +1,253 @@
+# service/src/doc_agent/utils/html_extractor.py
+"""
+HTML正文提取引擎
+提供可插拔的 HTML -> 纯文本 提取实现：
+- lxml: 默认实现，C 层解析 + 一次性剥离样板标签（nav/footer/script/style 等）
+  剥离哪些标签由 strip_tags 指定：网页抓取用 BOILERPLATE_TAGS，
+  用户上传的文档用更保守的 DOCUMENT_STRIP_TAGS
+- bs4: BeautifulSoup 基线实现，兼容旧行为
+可选的正文密度启发式（main_content=True）只保留文本密度最高的内容块
+"""
+
+import re
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+
+from doc_agent.core.logger import logger
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:  # pragma: no cover - lxml 为可选依赖
+    etree = None
+    lxml_html = None
+    LXML_AVAILABLE = False
+
+# 网页抓取时整体移除（连同内容）的样板标签
+# 不包含 form：ASP.NET 等页面会用 <form> 包住整个正文
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "svg",
+                    "canvas", "iframe", "object", "embed", "nav", "footer",
+                    "aside", "button", "select", "head")
+
+# 解析用户上传的 HTML 文件时只移除的标签，尽量不丢正文
+DOCUMENT_STRIP_TAGS = ("script", "style", "noscript", "template", "nav",
+                       "footer")
+
+# 块级标签：在其后插入换行，保证段落边界
+BLOCK_TAGS = ("p", "div", "section", "article", "main", "header", "li",
+              "ul", "ol", "dl", "dt", "dd", "table", "tr", "pre",
+              "blockquote", "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr",
+              "figure", "figcaption", "address", "caption")
+
+# 表格单元格：在其后插入空白，同一行的单元格不会粘在一起
+CELL_TAGS = ("td", "th")
+
+# 正文密度启发式中作为"段落"计分的标签
+_SCORED_TAGS = ("p", "pre", "td", "li", "blockquote", "h2", "h3", "dd")
+
+_NEGATIVE_HINT = re.compile(
+    r"comment|footer|footnote|masthead|menu|nav|sidebar|sponsor|share|"
+    r"related|breadcrumb|advert|banner|popup|widget|copyright", re.I)
+_POSITIVE_HINT = re.compile(r"article|body|content|entry|main|post|text|blog",
+                            re.I)
+_INLINE_SPACES = re.compile(r"[ \t\r\f\v 　]+")
+_META_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([\w-]+)", re.I)
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+HtmlInput = Union[str, bytes]
+StripTags = Optional[tuple[str, ...]]
+
+
+def _decode_html(raw: bytes) -> str:
+    """按 meta 声明的编码解码，失败时依次尝试 utf-8 / gb18030 / latin-1"""
+    match = _META_CHARSET.search(raw[:4096])
+    encodings = [match.group(1).decode("ascii", "ignore")] if match else []
+    for encoding in encodings + ["utf-8", "gb18030"]:
+        try:
+            return raw.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    # latin-1 能解码任意字节，西文页面的字符不会被丢弃
+    return raw.decode("latin-1")
+
+
+def _normalize_lines(text: str) -> str:
+    """压缩行内空白并去掉空行"""
+    lines = (_INLINE_SPACES.sub(" ", line).strip()
+             for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class HtmlExtractor(ABC):
+    """HTML正文提取引擎基类"""
+
+    name = "base"
+
+    @abstractmethod
+    def extract(self,
+                html: HtmlInput,
+                main_content: bool = False,
+                strip_tags: StripTags = None) -> str:
+        """
+        从HTML中提取纯文本
+
+        Args:
+            html: HTML字符串或原始字节（字节输入会按页面声明的编码解码）
+            main_content: 是否启用正文密度启发式，只保留主体内容
+            strip_tags: 连同内容整体移除的标签，None 时使用 BOILERPLATE_TAGS
+
+        Returns:
+            str: 按段落换行的纯文本，失败时返回空字符串
+        """
+        pass
+
+
+class LxmlHtmlExtractor(HtmlExtractor):
+    """基于 lxml 的快速提取实现"""
+
+    name = "lxml"
+
+    def extract(self,
+                html: HtmlInput,
+                main_content: bool = False,
+                strip_tags: StripTags = None) -> str:
+        if strip_tags is None:
+            strip_tags = BOILERPLATE_TAGS
+        if not html or not html.strip():
+            return ""
+        if isinstance(html, bytes):
+            html = _decode_html(html)
+        try:
+            # lxml 不接受带编码声明的 unicode 字符串
+            root = lxml_html.fromstring(_XML_DECLARATION.sub("", html, 1))
+        except (etree.ParserError, ValueError) as e:
+            logger.debug(f"lxml 解析HTML失败: {e}")
+            return ""
+        if not isinstance(root.tag, str) or root.tag in strip_tags:
+            return ""
+
+        # 一次遍历剥离注释、处理指令和所有样板标签
+        etree.strip_elements(root,
+                             etree.Comment,
+                             etree.ProcessingInstruction,
+                             *strip_tags,
+                             with_tail=False)
+
+        if main_content:
+            root = self._select_main_content(root)
+
+        for element in root.iter(*BLOCK_TAGS):
+            element.tail = "\n" + element.tail if element.tail else "\n"
+        for element in root.iter(*CELL_TAGS):
+            element.tail = "\t" + element.tail if element.tail else "\t"
+
+        return _normalize_lines("".join(root.itertext()))
+
+    def _select_main_content(self, root):
+        """
+        正文密度启发式：按段落文本长度给父/祖父节点计分，
+        依据 class/id 提示和链接密度修正后选出得分最高的容器
+        """
+        scores: dict = {}
+        for paragraph in root.iter(*_SCORED_TAGS):
+            text = paragraph.text_content().strip()
+            if len(text) < 25:
+                continue
+            score = 1 + len(text) / 100 + text.count("，") + text.count(",")
+            parent = paragraph.getparent()
+            if parent is None:
+                continue
+            scores[parent] = scores.get(parent, 0.0) + score
+            grandparent = parent.getparent()
+            if grandparent is not None:
+                scores[grandparent] = scores.get(grandparent, 0.0) + score / 2
+
+        best, best_score = None, 0.0
+        for candidate, score in scores.items():
+            hint = f"{candidate.get('class', '')} {candidate.get('id', '')}"
+            if _NEGATIVE_HINT.search(hint):
+                score *= 0.2
+            if _POSITIVE_HINT.search(hint) or candidate.tag in ("article",
+                                                                "main"):
+                score *= 1.25
+            score *= 1 - self._link_density(candidate)
+            if score > best_score:
+                best, best_score = candidate, score
+
+        return best if best is not None else root
+
+    @staticmethod
+    def _link_density(element) -> float:
+        text_length = len(element.text_content())
+        if not text_length:
+            return 0.0
+        link_length = sum(
+            len(link.text_content()) for link in element.iter("a"))
+        return min(link_length / text_length, 1.0)
+
+
+class BeautifulSoupHtmlExtractor(HtmlExtractor):
+    """基于 BeautifulSoup 的基线实现（不支持正文密度启发式）"""
+
+    name = "bs4"
+
+    def extract(self,
+                html: HtmlInput,
+                main_content: bool = False,
+                strip_tags: StripTags = None) -> str:
+        from bs4 import BeautifulSoup
+
+        if not html:
+            return ""
+        soup = BeautifulSoup(html, "html.parser")
+        # 基线实现默认只移除 script/style，与旧行为一致
+        for tag in soup(list(strip_tags or ("script", "style"))):
+            tag.decompose()
+        return _normalize_lines(soup.get_text("\n"))
+
+
+_EXTRACTORS: dict[str, type[HtmlExtractor]] = {
+    LxmlHtmlExtractor.name: LxmlHtmlExtractor,
+    BeautifulSoupHtmlExtractor.name: BeautifulSoupHtmlExtractor,
+}
+_INSTANCES: dict[str, HtmlExtractor] = {}
+
+
+def register_html_extractor(name: str, extractor_cls: type[HtmlExtractor]):
+    """注册自定义提取引擎"""
+    _EXTRACTORS[name] = extractor_cls
+    _INSTANCES.pop(name, None)
+
+
+def get_html_extractor(name: Optional[str] = None) -> HtmlExtractor:
+    """
+    获取提取引擎实例（按名称缓存）
+
+    Args:
+        name: 引擎名称，None 时 lxml 可用则用 lxml，否则回退到 bs4
+
+    Returns:
+        HtmlExtractor: 提取引擎
+    """
+    if name is None:
+        name = (LxmlHtmlExtractor.name
+                if LXML_AVAILABLE else BeautifulSoupHtmlExtractor.name)
+    if name == LxmlHtmlExtractor.name and not LXML_AVAILABLE:
+        logger.warning("lxml 不可用，HTML提取回退到 BeautifulSoup")
+        name = BeautifulSoupHtmlExtractor.name
+    if name not in _EXTRACTORS:
+        raise ValueError(f"未知的HTML提取引擎: {name}")
+    if name not in _INSTANCES:
+        _INSTANCES[name] = _EXTRACTORS[name]()
+    return _INSTANCES[name]
+
+
+def html_to_text(html: HtmlInput,
+                 main_content: bool = False,
+                 engine: Optional[str] = None,
+                 strip_tags: StripTags = None) -> str:
+    """便捷函数：使用指定（或默认）引擎提取HTML文本"""
+    return get_html_extractor(engine).extract(html,
+                                              main_content=main_content,
+                                              strip_tags=strip_tags)
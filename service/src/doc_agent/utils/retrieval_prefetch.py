@@ -0,0 +1,324 @@
+"""
+跨章节检索预取
+章节拆分完成后，按后续章节的标题和子节标题在后台预先完成向量化、ES检索+重排序和网络搜索，
+结果写入作业级检索缓存；章节的 researcher 节点检索相同查询时直接复用，
+正在预取中的查询则等待同一个任务完成，不会重复请求
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from doc_agent.core.logger import logger
+from doc_agent.tools.reranker import RerankedSearchResult
+from doc_agent.tools.web_cache import CacheStats, normalize_query
+from doc_agent.utils.search_utils import search_and_rerank
+
+NAMESPACE = "prefetch"
+
+
+def parse_embedding_response(response: str) -> Optional[list[float]]:
+    """
+    解析 Embedding 接口返回的向量
+
+    Args:
+        response: EmbeddingClient.invoke 的返回值
+
+    Returns:
+        Optional[list[float]]: 查询向量，无法解析时返回 None
+    """
+    try:
+        embedding_data = json.loads(response)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning("⚠️  JSON解析失败！无法进行 ES 检索")
+        return None
+
+    if isinstance(embedding_data, list):
+        if embedding_data and isinstance(embedding_data[0], list):
+            return embedding_data[0]
+        return embedding_data
+    if isinstance(embedding_data, dict) and 'data' in embedding_data:
+        return embedding_data['data']
+    logger.warning(f"⚠️  无法解析embedding响应格式: {type(embedding_data)}")
+    return None
+
+
+def build_chapter_queries(topic: str,
+                          chapter: dict[str, Any],
+                          max_queries: int = 3) -> list[str]:
+    """
+    根据章节标题和子节标题生成预取查询
+
+    Args:
+        topic: 文档主题
+        chapter: chapters_to_process 中的章节
+        max_queries: 每章最多生成的查询数
+
+    Returns:
+        list[str]: 去重后的查询列表，章节标题查询在前
+    """
+    chapter_title = chapter.get("chapter_title", "").strip()
+    candidates = []
+    if chapter_title:
+        candidates.append(f"{topic} {chapter_title}".strip())
+    for sub_section in chapter.get("sub_sections", []):
+        section_title = sub_section.get("section_title", "").strip()
+        if section_title:
+            candidates.append(f"{chapter_title} {section_title}".strip())
+
+    queries, seen = [], set()
+    for query in candidates:
+        key = normalize_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            queries.append(query)
+    return queries[:max_queries]
+
+
+@dataclass
+class _JobEntry:
+    """单个作业的检索缓存"""
+    vectors: dict[str, asyncio.Task] = field(default_factory=dict)
+    searches: dict[tuple, asyncio.Task] = field(default_factory=dict)
+    chapter_queries: dict[int, list[str]] = field(default_factory=dict)
+    prefetch_task: Optional[asyncio.Task] = None
+
+
+class RetrievalPrefetcher:
+    """
+    作业级检索缓存 + 后台预取器
+    缓存中保存的是任务对象：已完成的任务直接取结果，未完成的任务被多个调用方共享；
+    失败的任务会从缓存中移除，下次调用重新检索
+    """
+
+    def __init__(self,
+                 es_search_tool,
+                 web_search_tool=None,
+                 reranker_tool=None,
+                 embedding_client=None,
+                 max_concurrency: int = 4,
+                 max_queries_per_chapter: int = 3,
+                 max_jobs: int = 16):
+        """
+        初始化预取器
+
+        Args:
+            es_search_tool: ES搜索工具
+            web_search_tool: 网络搜索工具（其自带缓存负责保存预取结果）
+            reranker_tool: 重排序工具
+            embedding_client: Embedding客户端，为空时不做向量检索
+            max_concurrency: 后台预取的最大并发查询数
+            max_queries_per_chapter: 每章最多预取的查询数
+            max_jobs: 同时保留检索缓存的作业数，超出后淘汰最久未使用的作业（不取消其进行中的检索）
+        """
+        self.es_search_tool = es_search_tool
+        self.web_search_tool = web_search_tool
+        self.reranker_tool = reranker_tool
+        self.embedding_client = embedding_client
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queries_per_chapter = max_queries_per_chapter
+        self.max_jobs = max_jobs
+        self._jobs: OrderedDict[str, _JobEntry] = OrderedDict()
+        self._stats = CacheStats()
+
+    # ------------------------------------------------------------------
+    # 后台预取
+    # ------------------------------------------------------------------
+
+    def start(self,
+              job_id: str,
+              topic: str,
+              chapters: list[dict[str, Any]],
+              start_index: int = 1,
+              search_options: Optional[dict[str, Any]] = None,
+              is_online: bool = True) -> Optional[asyncio.Task]:
+        """
+        为 chapters[start_index:] 启动后台预取，立即返回
+
+        Args:
+            job_id: 作业ID
+            topic: 文档主题
+            chapters: chapters_to_process
+            start_index: 从第几章开始预取（当前章节马上会自行检索）
+            search_options: 传给 search 的参数（initial_top_k / final_top_k / min_score）
+            is_online: 是否同时预取网络搜索
+
+        Returns:
+            Optional[asyncio.Task]: 后台任务；没有需要预取的章节时返回 None
+        """
+        entry = self._job(job_id)
+        plan = []
+        for index in range(start_index, len(chapters)):
+            queries = build_chapter_queries(topic, chapters[index],
+                                            self.max_queries_per_chapter)
+            entry.chapter_queries[index] = queries
+            plan.extend(queries)
+        if not plan:
+            return None
+
+        if entry.prefetch_task and not entry.prefetch_task.done():
+            entry.prefetch_task.cancel()
+        entry.prefetch_task = asyncio.create_task(
+            self._prefetch(job_id, plan, search_options or {}, is_online))
+        logger.info(
+            f"🚀 启动检索预取：{len(chapters) - start_index} 个章节，{len(plan)} 个查询，"
+            f"并发上限 {self.max_concurrency}")
+        return entry.prefetch_task
+
+    async def _prefetch(self, job_id: str, queries: list[str],
+                        search_options: dict[str, Any], is_online: bool):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def prefetch_one(query: str):
+            async with semaphore:
+                web_task = asyncio.create_task(
+                    self.web_search_tool.search_async(query)
+                ) if is_online and self.web_search_tool else None
+                try:
+                    query_vector = await self.embed(job_id, query)
+                    await self.search(job_id, query, query_vector,
+                                      **search_options)
+                finally:
+                    if web_task:
+                        await asyncio.gather(web_task, return_exceptions=True)
+
+        results = await asyncio.gather(*(prefetch_one(query)
+                                         for query in queries),
+                                       return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning(f"检索预取部分失败 {len(failed)}/{len(queries)}: {failed[0]}")
+        logger.info(f"✅ 检索预取完成：{len(queries) - len(failed)}/{len(queries)} 个查询")
+
+    def chapter_queries(self, job_id: str, chapter_index: int) -> list[str]:
+        """获取为某章节预取的查询（作为章节的基础证据查询）"""
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return []
+        return list(entry.chapter_queries.get(chapter_index, []))
+
+    # ------------------------------------------------------------------
+    # 带缓存的检索
+    # ------------------------------------------------------------------
+
+    async def embed(self, job_id: str, query: str) -> Optional[list[float]]:
+        """
+        获取查询向量（作业内缓存）
+
+        Returns:
+            Optional[list[float]]: 查询向量；没有Embedding客户端或解析失败时为 None
+        """
+        if self.embedding_client is None:
+            return None
+        entry = self._job(job_id)
+        return await self._single_flight(entry.vectors, normalize_query(query),
+                                         lambda: self._embed(query))
+
+    async def _embed(self, query: str) -> Optional[list[float]]:
+        response = await asyncio.to_thread(self.embedding_client.invoke, query)
+        return parse_embedding_response(response)
+
+    async def search(
+        self,
+        job_id: str,
+        query: str,
+        query_vector: Optional[list[float]],
+        initial_top_k: int = 10,
+        final_top_k: int = 5,
+        min_score: float = 0.3
+    ) -> tuple[list[RerankedSearchResult], str]:
+        """
+        ES检索+重排序（作业内缓存）
+
+        Raises:
+            ValueError: 查询向量维度与索引映射中的向量维度不一致
+
+        Returns:
+            tuple: (重排序后的结果, 格式化文本)
+        """
+        if not query_vector or len(
+                query_vector) != await self.es_search_tool.get_vector_dims():
+            raise ValueError("向量维度不正确")
+        entry = self._job(job_id)
+        key = (normalize_query(query), initial_top_k, final_top_k, min_score)
+        return await self._single_flight(
+            entry.searches, key, lambda: self._search(
+                query, query_vector, initial_top_k, final_top_k, min_score))
+
+    async def _search(self, query, query_vector, initial_top_k, final_top_k,
+                      min_score):
+        _, reranked, formatted = await search_and_rerank(
+            es_search_tool=self.es_search_tool,
+            query=query if query.strip() else "相关文档",
+            query_vector=query_vector,
+            reranker_tool=self.reranker_tool,
+            initial_top_k=initial_top_k,
+            final_top_k=final_top_k,
+            config={'min_score': min_score})
+        return reranked, formatted
+
+    async def _single_flight(self, tasks: dict, key,
+                             factory: Callable[[], Awaitable[Any]]):
+        task = tasks.get(key)
+        if task is not None and task.done() and not task.cancelled(
+        ) and task.exception() is None:
+            self._stats.record(NAMESPACE, "hits")
+            return task.result()
+        if task is not None and (task.done() or task.get_loop()
+                                 is not asyncio.get_running_loop()):
+            # 已失败/取消的任务，或上一次事件循环遗留的任务，重新检索
+            task = None
+        if task is None:
+            self._stats.record(NAMESPACE, "misses")
+            task = asyncio.create_task(factory())
+            tasks[key] = task
+        else:
+            self._stats.record(NAMESPACE, "hits")
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if tasks.get(key) is task:
+                del tasks[key]
+            raise
+
+    # ------------------------------------------------------------------
+    # 作业管理
+    # ------------------------------------------------------------------
+
+    def _job(self, job_id: str) -> _JobEntry:
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            entry = self._jobs[job_id] = _JobEntry()
+            while len(self._jobs) > self.max_jobs:
+                # 被淘汰的作业可能仍在执行：只停止后台预取，共享的检索任务
+                # 可能有调用方正在等待，让其自然完成
+                _, evicted = self._jobs.popitem(last=False)
+                if evicted.prefetch_task and not evicted.prefetch_task.done():
+                    evicted.prefetch_task.cancel()
+        else:
+            self._jobs.move_to_end(job_id)
+        return entry
+
+    def release(self, job_id: str):
+        """丢弃作业的检索缓存并取消未完成的预取"""
+        entry = self._jobs.pop(job_id, None)
+        if entry is not None:
+            self._cancel(entry)
+
+    @staticmethod
+    def _cancel(entry: _JobEntry):
+        tasks = [entry.prefetch_task, *entry.vectors.values(),
+                 *entry.searches.values()]
+        for task in tasks:
+            if task is not None and not task.done():
+                task.cancel()
+
+    def cache_stats(self) -> dict[str, dict[str, Any]]:
+        """预取缓存命中统计"""
+        return self._stats.snapshot()
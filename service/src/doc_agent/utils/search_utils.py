@@ -6,7 +6,6 @@
 from typing import Any, Optional
 
 from doc_agent.core.logger import logger
-
 from doc_agent.tools.es_service import ESSearchResult
 from doc_agent.tools.reranker import RerankedSearchResult, RerankerTool
 
@@ -91,8 +90,8 @@ async def rerank_search_results(search_results: list[ESSearchResult],
     try:
         logger.info(f"开始重排序，原始结果数量: {len(search_results)}")
 
-        # 执行重排序
-        reranked_results = reranker_tool.rerank_search_results(
+        # 执行异步重排序，避免阻塞事件循环
+        reranked_results = await reranker_tool.arerank_search_results(
             query=query, search_results=search_results, top_k=top_k)
 
         logger.info(f"重排序完成，返回 {len(reranked_results)} 个结果")
@@ -0,0 +1,116 @@
+"""
+自动化监控器测试
+验证非阻塞采样、环形缓冲区历史、增量任务时长统计和运行中任务的资源归因
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from doc_agent.automation.metrics import DurationStats, MetricsRingBuffer
+from doc_agent.automation.monitor import AutomationMonitor, PerformanceMetrics
+from doc_agent.automation.scheduler import AutomationScheduler, TaskStatus
+
+FIELDS = ("cpu_percent", "active_tasks")
+
+
+def _metrics(seconds: int, cpu: float = 0.0) -> PerformanceMetrics:
+    return PerformanceMetrics(timestamp=datetime(2025, 1, 1) +
+                              timedelta(seconds=seconds),
+                              cpu_percent=cpu,
+                              active_tasks=seconds)
+
+
+class TestMetricsRingBuffer:
+    """指标环形缓冲区测试类"""
+
+    def test_overwrites_oldest(self):
+        """测试写满后覆盖最早的记录，读取时还原字段类型"""
+        buffer = MetricsRingBuffer(3, PerformanceMetrics, FIELDS)
+        for i in range(5):
+            buffer.append(_metrics(i, cpu=i * 1.5))
+
+        assert len(buffer) == 3
+        assert [m.active_tasks for m in buffer] == [2, 3, 4]
+        assert buffer[-1].cpu_percent == 6.0
+        assert isinstance(buffer.latest().active_tasks, int)
+        assert buffer.latest().timestamp == datetime(2025, 1, 1, 0, 0, 4)
+
+    def test_time_queries(self):
+        """测试按时间二分查询和丢弃旧记录"""
+        buffer = MetricsRingBuffer(4, PerformanceMetrics, FIELDS)
+        for i in range(6):
+            buffer.append(_metrics(i))
+
+        cutoff = datetime(2025, 1, 1, 0, 0, 3)
+        assert [m.active_tasks for m in buffer.since(cutoff)] == [4, 5]
+        assert buffer.drop_before(cutoff) == 1
+        assert [m.active_tasks for m in buffer] == [3, 4, 5]
+
+
+class TestDurationStats:
+    """任务时长统计测试类"""
+
+    def test_running_mean_and_window_percentiles(self):
+        """测试均值覆盖全部样本，分位数只基于最近窗口"""
+        stats = DurationStats(window=100)
+        for value in range(1, 201):
+            stats.add(float(value))
+
+        assert stats.count == 200
+        assert stats.mean == pytest.approx(100.5)
+        assert stats.percentile(50) == 150.0
+        assert stats.percentile(95) == 195.0
+        assert stats.to_dict()["max"] == 200.0
+
+
+class TestAutomationMonitor:
+    """自动化监控器测试类"""
+
+    def test_collect_metrics_does_not_block(self, tmp_path):
+        """测试采样不再阻塞一秒，历史长度受环形缓冲区限制"""
+        scheduler = AutomationScheduler(str(tmp_path))
+        monitor = AutomationMonitor(scheduler, str(tmp_path / "monitor"))
+
+        start = time.perf_counter()
+        for _ in range(5):
+            monitor.collect_metrics()
+        assert time.perf_counter() - start < 0.5
+        assert len(monitor.get_metrics_history()) == 5
+
+    @pytest.mark.asyncio
+    async def test_task_events_update_aggregates(self, tmp_path,
+                                                 monkeypatch):
+        """测试任务完成后增量更新计数和时长统计，并记录任务的资源占用"""
+        scheduler = AutomationScheduler(str(tmp_path))
+        monitor = AutomationMonitor(scheduler, str(tmp_path / "monitor"))
+        observed = {}
+
+        async def fake_generation(topic: str, job_id: str) -> dict:
+            observed.update(monitor.get_statistics()["running_jobs"])
+            sum(range(200000))
+            await asyncio.sleep(0.01)
+            return {"topic": topic}
+
+        monkeypatch.setattr(scheduler, "_run_document_generation",
+                            fake_generation)
+        runner = asyncio.create_task(scheduler.start())
+        task_id = scheduler.add_task("任务", "主题")
+        task = await scheduler.wait_for_task(task_id)
+
+        assert task.status == TaskStatus.COMPLETED
+        assert list(observed) == [task_id]
+        assert monitor.job_usage == {}
+        assert task.metadata["resources"]["cpu_seconds"] >= 0
+        assert scheduler.get_task(task_id).metadata["resources"]
+
+        metrics = monitor.collect_metrics()
+        assert metrics.completed_tasks == 1
+        assert metrics.active_tasks == 0
+        assert metrics.avg_task_duration > 0
+        assert monitor.get_statistics()["task_duration"]["count"] == 1
+
+        scheduler.stop()
+        await runner
@@ -0,0 +1,193 @@
+"""
+自动化调度器测试
+验证优先级队列、并发工作协程、完成通知、失败重试退避和停止时唤醒等待方
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from doc_agent.automation.executor import AutomationExecutor, ExecutionStatus
+from doc_agent.automation.scheduler import (
+    AutomationScheduler,
+    TaskPriority,
+    TaskStatus,
+)
+
+
+class _FakeGeneration:
+    """记录执行顺序和并发度的文档生成替身"""
+
+    def __init__(self, delay: float = 0.0, failures: int = 0):
+        self.delay = delay
+        self.failures = failures
+        self.order = []
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, topic: str, job_id: str) -> dict:
+        self.order.append(topic)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures > 0:
+                self.failures -= 1
+                raise RuntimeError("生成失败")
+            return {"topic": topic}
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def scheduler_factory(tmp_path, monkeypatch):
+
+    def factory(generation: _FakeGeneration, **kwargs) -> AutomationScheduler:
+        scheduler = AutomationScheduler(str(tmp_path / "scheduler"), **kwargs)
+        monkeypatch.setattr(scheduler, "_run_document_generation", generation)
+        return scheduler
+
+    return factory
+
+
+class TestAutomationScheduler:
+    """自动化调度器测试类"""
+
+    @pytest.mark.asyncio
+    async def test_workers_run_tasks_concurrently(self, scheduler_factory):
+        """测试工作协程池按配置并发执行，任务完成时直接唤醒等待方"""
+        generation = _FakeGeneration(delay=0.1)
+        scheduler = scheduler_factory(generation, max_workers=3)
+        runner = asyncio.create_task(scheduler.start())
+
+        start = time.perf_counter()
+        task_ids = [
+            scheduler.add_task(name=f"任务{i}", topic=f"主题{i}")
+            for i in range(6)
+        ]
+        tasks = await asyncio.gather(
+            *(scheduler.wait_for_task(task_id) for task_id in task_ids))
+        elapsed = time.perf_counter() - start
+
+        assert all(task.status == TaskStatus.COMPLETED for task in tasks)
+        assert generation.peak == 3
+        assert elapsed < 0.5
+
+        scheduler.stop()
+        await runner
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self, scheduler_factory):
+        """测试高优先级任务先执行，同优先级按提交顺序执行"""
+        generation = _FakeGeneration()
+        scheduler = scheduler_factory(generation, max_workers=1)
+        last_id = None
+        for topic, priority in (("低", TaskPriority.LOW),
+                                ("普通1", TaskPriority.NORMAL),
+                                ("紧急", TaskPriority.URGENT),
+                                ("普通2", TaskPriority.NORMAL)):
+            last_id = scheduler.add_task(name=topic,
+                                         topic=topic,
+                                         priority=priority)
+        runner = asyncio.create_task(scheduler.start())
+
+        await scheduler.wait_for_task(last_id)
+        await asyncio.sleep(0)
+        assert generation.order[:3] == ["紧急", "普通1", "普通2"]
+
+        scheduler.stop()
+        await runner
+
+    @pytest.mark.asyncio
+    async def test_retry_with_backoff(self, scheduler_factory):
+        """测试失败任务按退避时间重新入队，重试成功后才通知等待方"""
+        generation = _FakeGeneration(failures=2)
+        scheduler = scheduler_factory(generation, retry_backoff=0.01)
+        runner = asyncio.create_task(scheduler.start())
+
+        task_id = scheduler.add_task(name="重试", topic="主题", max_retries=3)
+        task = await asyncio.wait_for(scheduler.wait_for_task(task_id), 2)
+
+        assert task.status == TaskStatus.COMPLETED
+        assert task.retry_count == 2
+        assert len(generation.order) == 3
+
+        scheduler.stop()
+        await runner
+
+    @pytest.mark.asyncio
+    async def test_cancel_wakes_waiter(self, scheduler_factory):
+        """测试取消排队中的任务会唤醒等待方且任务不再执行"""
+        generation = _FakeGeneration()
+        scheduler = scheduler_factory(generation)
+        task_id = scheduler.add_task(name="取消", topic="主题")
+
+        waiter = asyncio.create_task(scheduler.wait_for_task(task_id))
+        await asyncio.sleep(0)
+        assert scheduler.cancel_task(task_id)
+        task = await asyncio.wait_for(waiter, 1)
+
+        assert task.status == TaskStatus.CANCELLED
+        assert generation.order == []
+
+    @pytest.mark.asyncio
+    async def test_stop_wakes_waiter(self, scheduler_factory):
+        """测试停止调度器时未结束任务的等待方收到错误，而不是一直挂起"""
+        scheduler = scheduler_factory(_FakeGeneration(delay=10))
+        runner = asyncio.create_task(scheduler.start())
+        task_id = scheduler.add_task(name="停止", topic="主题")
+
+        waiter = asyncio.create_task(scheduler.wait_for_task(task_id))
+        await asyncio.sleep(0.01)
+        scheduler.stop()
+
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(waiter, 1)
+        await runner
+
+
+class TestAutomationExecutor:
+    """自动化执行器测试类"""
+
+    @pytest.mark.asyncio
+    async def test_batch_job_without_polling(self, scheduler_factory,
+                                             tmp_path):
+        """测试批量作业的子任务以调度器的全部并发度执行"""
+        generation = _FakeGeneration(delay=0.05)
+        scheduler = scheduler_factory(generation, max_workers=4)
+        executor = AutomationExecutor(scheduler, str(tmp_path / "executor"))
+        runner = asyncio.create_task(scheduler.start())
+
+        job_id = executor.create_batch_job("批量", [f"主题{i}" for i in range(8)])
+        start = time.perf_counter()
+        await executor.execute_batch_job(job_id)
+        elapsed = time.perf_counter() - start
+
+        job = executor.get_batch_job(job_id)
+        assert job.status == ExecutionStatus.COMPLETED
+        assert job.completed_tasks == 8
+        assert generation.peak == 4
+        assert elapsed < 1.0
+
+        scheduler.stop()
+        await runner
+
+    @pytest.mark.asyncio
+    async def test_stopped_scheduler_fails_pending_tasks(
+            self, scheduler_factory, tmp_path):
+        """测试调度器停止后批量作业结束，未完成的子任务计为失败"""
+        scheduler = scheduler_factory(_FakeGeneration(delay=10), max_workers=1)
+        executor = AutomationExecutor(scheduler, str(tmp_path / "executor"))
+        runner = asyncio.create_task(scheduler.start())
+
+        job_id = executor.create_batch_job("批量", ["主题1", "主题2"])
+        execution = asyncio.create_task(executor.execute_batch_job(job_id))
+        await asyncio.sleep(0.01)
+        scheduler.stop()
+        await asyncio.wait_for(execution, 1)
+        await runner
+
+        job = executor.get_batch_job(job_id)
+        assert job.completed_tasks == 0
+        assert job.failed_tasks == 2
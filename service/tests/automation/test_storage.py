@@ -0,0 +1,156 @@
+"""
+自动化状态存储测试
+验证增量写入、索引查询、压缩裁剪、旧版 JSON 迁移以及调度器/执行器的按需加载
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from doc_agent.automation.executor import AutomationExecutor, ExecutionStatus
+from doc_agent.automation.monitor import AlertLevel, AutomationMonitor
+from doc_agent.automation.scheduler import (
+    AutomationScheduler,
+    TaskPriority,
+    TaskStatus,
+)
+from doc_agent.automation.storage import RecordStore
+
+
+def _task(task_id: str, status: str, priority: int, created_at: str) -> dict:
+    return {
+        "id": task_id,
+        "status": status,
+        "priority": priority,
+        "created_at": created_at
+    }
+
+
+class TestRecordStore:
+    """记录存储测试类"""
+
+    def test_upsert_and_indexed_query(self, tmp_path):
+        """测试覆盖写入只保留一条记录，按索引列过滤和排序"""
+        store = RecordStore(tmp_path / "state.db",
+                            "tasks",
+                            indexes=("status", "priority", "created_at"))
+        store.put_many([
+            _task("a", "pending", 2, "2025-01-01T00:00:00"),
+            _task("b", "completed", 4, "2025-01-02T00:00:00"),
+            _task("c", "completed", 2, "2025-01-03T00:00:00"),
+        ])
+        store.put(_task("a", "running", 2, "2025-01-01T00:00:00"))
+
+        assert store.count() == 3
+        assert store.get("a")["status"] == "running"
+        assert store.get("missing") is None
+        assert [
+            record["id"]
+            for record in store.query(order_by=("-priority", "-created_at"))
+        ] == ["b", "c", "a"]
+        assert [
+            record["id"] for record in store.query(
+                {"status": ["running", "pending"]})
+        ] == ["a"]
+        assert store.keys({
+            "status": "completed",
+            "created_at__lt": "2025-01-03T00:00:00"
+        }) == ["b"]
+        assert store.count_by("status") == {"running": 1, "completed": 2}
+        assert store.sum("priority") == {"priority": 8}
+
+        with pytest.raises(ValueError):
+            store.query({"name": "x"})
+
+    def test_compaction_trims_oldest(self, tmp_path):
+        """测试写入达到间隔后压缩，只保留最近写入的记录"""
+        store = RecordStore(tmp_path / "state.db",
+                            "metrics",
+                            key="timestamp",
+                            indexes=("timestamp", ),
+                            max_records=3,
+                            compact_interval=5)
+        for i in range(5):
+            store.put({"timestamp": f"t{i}", "value": i})
+
+        assert [record["value"] for record in store.query()] == [2, 3, 4]
+        assert not (tmp_path / "state.db-wal").stat().st_size
+
+    def test_migrate_legacy_json(self, tmp_path):
+        """测试首次打开时导入旧版 JSON 文件"""
+        legacy = tmp_path / "tasks.json"
+        legacy.write_text(json.dumps(
+            [_task("a", "pending", 2, "2025-01-01T00:00:00")]),
+                          encoding="utf-8")
+        store = RecordStore(tmp_path / "state.db", "tasks",
+                            indexes=("status", ))
+
+        assert store.migrate_json(legacy) == 1
+        assert store.get("a")["status"] == "pending"
+        assert not legacy.exists()
+        assert (tmp_path / "tasks.json.migrated").exists()
+
+
+class TestAutomationPersistence:
+    """调度器、执行器和监控器持久化测试类"""
+
+    def test_scheduler_keeps_only_active_tasks_in_memory(self, tmp_path):
+        """测试重启后只加载未结束任务，历史任务仍可按状态和优先级查询"""
+        scheduler = AutomationScheduler(str(tmp_path))
+        pending_id = scheduler.add_task("待执行", "主题",
+                                        priority=TaskPriority.HIGH)
+        done_id = scheduler.add_task("已完成", "主题")
+        done = scheduler.get_task(done_id)
+        done.status = TaskStatus.COMPLETED
+        scheduler._save_task(done)
+        scheduler._resolve(done)
+
+        reloaded = AutomationScheduler(str(tmp_path))
+        assert list(reloaded.tasks) == [pending_id]
+        assert reloaded.get_task(done_id).status == TaskStatus.COMPLETED
+        assert [
+            task.id for task in reloaded.get_tasks(status=TaskStatus.COMPLETED)
+        ] == [done_id]
+        assert [task.id for task in reloaded.get_tasks()] == [
+            pending_id, done_id
+        ]
+        stats = reloaded.get_statistics()
+        assert stats["total_tasks"] == 2
+        assert stats["status_counts"]["completed"] == 1
+
+        assert reloaded.purge_tasks(datetime.now() + timedelta(seconds=1)) == 1
+        assert reloaded.get_task(done_id) is None
+        assert reloaded.delete_task(pending_id)
+        assert reloaded.get_statistics()["total_tasks"] == 0
+
+    def test_executor_statistics_from_store(self, tmp_path):
+        """测试执行器统计直接由存储聚合，已结束作业不常驻内存"""
+        executor = AutomationExecutor(AutomationScheduler(str(tmp_path)),
+                                      str(tmp_path / "executor"))
+        job_id = executor.create_batch_job("批量", ["主题1", "主题2"])
+        executor.cancel_batch_job(job_id)
+
+        assert job_id not in executor.batch_jobs
+        assert executor.get_batch_job(job_id).status == \
+            ExecutionStatus.CANCELLED
+        stats = executor.get_statistics()
+        assert stats["total_jobs"] == 1
+        assert stats["total_tasks"] == 2
+        assert stats["status_counts"]["cancelled"] == 1
+
+    def test_monitor_alerts_survive_restart(self, tmp_path):
+        """测试告警逐条写入，重启后恢复"""
+        scheduler = AutomationScheduler(str(tmp_path))
+        monitor = AutomationMonitor(scheduler, str(tmp_path / "monitor"))
+        monitor.add_alert(AlertLevel.WARNING, "告警", "test")
+        assert monitor.resolve_alert(monitor.alerts[0].id)
+
+        reloaded = AutomationMonitor(scheduler, str(tmp_path / "monitor"))
+        assert len(reloaded.alerts) == 1
+        assert reloaded.alerts[0].resolved
+
+        assert reloaded.prune_history(datetime.now() +
+                                      timedelta(seconds=1)) == (1, 0)
+        assert AutomationMonitor(scheduler,
+                                 str(tmp_path / "monitor")).alerts == []
@@ -0,0 +1,124 @@
+"""
+Prompt 模板注册表测试
+验证模板预编译、快速渲染、热重载和渲染耗时统计
+"""
+
+import os
+import sys
+
+import pytest
+
+from doc_agent.common import CompiledPrompt, PromptSelector
+
+GENRES = {
+    "default": {
+        "prompt_versions": {
+            "reflection": "v1_default",
+            "planner": "v1_default",
+            "writer": "v_missing"
+        }
+    },
+    "custom": {
+        "prompt_versions": {
+            "hot": "v1"
+        }
+    }
+}
+
+
+class TestCompiledPrompt:
+    """预编译模板测试类"""
+
+    def test_render_matches_str_format(self):
+        """测试渲染结果与 str.format 一致，忽略多余参数"""
+        template = "主题：{topic}\n{{字面量}}\n章节 {number}/{total}：{topic}"
+        compiled = CompiledPrompt(template)
+        values = {"topic": "大坝{安全}", "number": 2, "total": 5, "extra": 1}
+
+        assert compiled.render(**values) == template.format(**values)
+        assert compiled.format(**values) == template.format(**values)
+        assert compiled == template
+        assert compiled.fields == ["topic", "number", "total", "topic"]
+
+    def test_missing_variable_raises_key_error(self):
+        """测试缺少变量时与 str.format 一样抛出 KeyError"""
+        with pytest.raises(KeyError):
+            CompiledPrompt("{topic}{title}").render(topic="主题")
+
+    def test_rejects_unsafe_fields(self):
+        """测试拒绝属性访问、下标和格式说明等占位符"""
+        for template in ("{topic.__class__}", "{topic[0]}", "{count:>5}",
+                         "{topic!r}", "{0}"):
+            with pytest.raises(ValueError):
+                CompiledPrompt(template)
+
+
+class TestPromptRegistry:
+    """Prompt 注册表测试类"""
+
+    def test_warm_up_and_cached_lookup(self, monkeypatch):
+        """测试启动预编译后 get_prompt 不再解析模块"""
+        selector = PromptSelector(GENRES, reload_interval=None)
+        assert selector.warm_up() == 2
+
+        resolved = []
+        original = selector.registry._resolver
+        monkeypatch.setattr(
+            selector.registry, "_resolver",
+            lambda *args: resolved.append(args) or original(*args))
+
+        prompt = selector.get_prompt("chapter_workflow", "reflection")
+        assert isinstance(prompt, CompiledPrompt)
+        assert prompt.key == ("chapter_workflow", "reflection", "default",
+                              "v1_default")
+        assert selector.get_prompt("chapter_workflow", "reflection") is prompt
+        assert resolved == []
+
+        # 未实现的版本仍按原有方式报错
+        with pytest.raises(KeyError):
+            selector.get_prompt("chapter_workflow", "writer")
+
+    def test_render_stats(self):
+        """测试按模板键统计渲染次数和耗时"""
+        selector = PromptSelector(GENRES, reload_interval=None)
+        prompt = selector.get_prompt("chapter_workflow", "planner")
+        for _ in range(3):
+            prompt.format(topic="主题")
+
+        stats = selector.render_stats()[
+            "chapter_workflow.planner.default.v1_default"]
+        assert stats["count"] == 3
+        assert stats["max_ms"] >= stats["avg_ms"] >= 0
+
+    def test_hot_reload_changed_module(self, tmp_path, monkeypatch):
+        """测试 prompt 模块文件修改后自动重新加载，无需重启"""
+        module_file = tmp_path / "hot_prompt_module.py"
+        module_file.write_text('PROMPTS = {"v1": "旧版本 {topic}"}\n',
+                               encoding="utf-8")
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.delitem(sys.modules, "hot_prompt_module", raising=False)
+
+        selector = PromptSelector(GENRES, reload_interval=0)
+        monkeypatch.setattr(selector, "_module_path",
+                            lambda *args: "hot_prompt_module")
+        assert selector.get_prompt("prompts", "hot",
+                                   "custom").format(topic="大坝") == "旧版本 大坝"
+
+        module_file.write_text(
+            'PROMPTS = {"v1": "新版本 {topic}", "v2": "第二版 {topic}"}\n',
+            encoding="utf-8")
+        stat = module_file.stat()
+        os.utime(module_file, (stat.st_atime, stat.st_mtime + 10))
+
+        assert selector.get_prompt("prompts", "hot",
+                                   "custom").format(topic="大坝") == "新版本 大坝"
+
+        # 切换 genre 策略中的版本
+        selector.reload_prompts(
+            {"custom": {
+                "prompt_versions": {
+                    "hot": "v2"
+                }
+            }})
+        assert selector.get_prompt("prompts", "hot",
+                                   "custom").format(topic="大坝") == "第二版 大坝"
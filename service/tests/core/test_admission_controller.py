@@ -0,0 +1,196 @@
+"""
+API 任务准入控制测试
+验证分通道并发、权重调度、排队上限、排队位置查询和基于端点时延的动态并发
+"""
+
+import asyncio
+
+import pytest
+
+from doc_agent.core.admission_controller import (
+    AdmissionController,
+    QueueFullError,
+)
+from doc_agent.core.config import AdmissionConfig, AdmissionLaneConfig
+from doc_agent.llm_clients.latency import LatencyTracker
+
+
+def _config(**overrides) -> AdmissionConfig:
+    lanes = {
+        "outline":
+        AdmissionLaneConfig(weight=3.0,
+                            max_concurrency=2,
+                            max_queue=5,
+                            expected_duration=10.0),
+        "document":
+        AdmissionLaneConfig(weight=1.0,
+                            max_concurrency=2,
+                            max_queue=2,
+                            expected_duration=100.0),
+    }
+    return AdmissionConfig(lanes=lanes, **overrides)
+
+
+@pytest.fixture
+def latency():
+    return LatencyTracker()
+
+
+class TestAdmissionController:
+    """准入控制器测试类"""
+
+    def test_lane_limit_and_queue_full(self, latency):
+        """测试通道并发上限、排队上限和 Retry-After 估算"""
+
+        async def scenario():
+            controller = AdmissionController(_config(max_concurrency=4),
+                                             latency)
+            running = [
+                await controller.acquire("document", f"doc-{i}")
+                for i in range(2)
+            ]
+            waiters = [
+                asyncio.ensure_future(
+                    controller.acquire("document", f"doc-{i}"))
+                for i in range(2, 4)
+            ]
+            await asyncio.sleep(0)
+
+            with pytest.raises(QueueFullError) as error:
+                await controller.acquire("document", "doc-4")
+            # 平均耗时 100 秒、通道并发 2：约 50 秒后队首可以开始
+            assert error.value.retry_after == 50
+
+            # 文档通道已满不影响大纲通道
+            outline = await controller.acquire("outline", "outline-1")
+            assert controller.position("outline-1")["status"] == "running"
+
+            assert controller.position("doc-3") == {
+                "ticket_id": "doc-3",
+                "lane": "document",
+                "status": "queued",
+                "position": 2,
+                "eta_seconds": 100
+            }
+
+            controller.release(running[0])
+            assert (await waiters[0]).running
+            assert controller.position("doc-3")["position"] == 1
+            assert controller.position("doc-0") is None
+
+            controller.release(running[1])
+            for ticket in [outline, *[await waiter for waiter in waiters]]:
+                controller.release(ticket)
+            return controller.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        assert snapshot["running"] == 0
+        assert snapshot["rejected"] == 1
+
+    def test_weighted_dispatch_prefers_interactive_lane(self, latency):
+        """测试全局名额紧张时按权重分配，大纲任务不会被排队的文档任务堵住"""
+
+        async def scenario():
+            controller = AdmissionController(_config(max_concurrency=1),
+                                             latency)
+            holder = await controller.acquire("document", "doc-0")
+            order = []
+
+            async def job(lane, ticket_id):
+                async with controller.slot(lane, ticket_id):
+                    order.append(ticket_id)
+
+            tasks = [
+                asyncio.ensure_future(job("document", "doc-1")),
+                asyncio.ensure_future(job("document", "doc-2")),
+                asyncio.ensure_future(job("outline", "outline-1")),
+                asyncio.ensure_future(job("outline", "outline-2")),
+            ]
+            await asyncio.sleep(0)
+            controller.release(holder)
+            await asyncio.gather(*tasks)
+            return order
+
+        order = asyncio.run(scenario())
+        # 后到的大纲任务权重更高，先于已排队的文档任务执行
+        assert order[:2] == ["outline-1", "outline-2"]
+        assert order[2:] == ["doc-1", "doc-2"]
+
+    def test_cancelled_waiter_leaves_queue(self, latency):
+        """测试排队中被取消的任务移出队列，不占用名额"""
+
+        async def scenario():
+            controller = AdmissionController(_config(max_concurrency=1),
+                                             latency)
+            holder = await controller.acquire("outline", "outline-0")
+            waiter = asyncio.ensure_future(
+                controller.acquire("outline", "outline-1"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert controller.position("outline-1") is None
+
+            controller.release(holder)
+            return controller.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        assert snapshot["running"] == 0
+        assert snapshot["lanes"]["outline"]["queued"] == 0
+
+    def test_limits_shrink_with_llm_latency(self, latency):
+        """测试 LLM 端点时延超过目标时按比例收缩并发上限，恢复后放开"""
+
+        async def scenario():
+            controller = AdmissionController(
+                _config(max_concurrency=4, target_first_byte_latency=2.0),
+                latency)
+            latency.observe(4.0, streaming=True)
+            limits = controller.snapshot()
+            assert limits["max_concurrency"] == 2
+            assert limits["lanes"]["document"]["max_concurrency"] == 1
+
+            first = await controller.acquire("document", "doc-0")
+            second = asyncio.ensure_future(
+                controller.acquire("document", "doc-1"))
+            await asyncio.sleep(0)
+            assert controller.position("doc-1")["status"] == "queued"
+
+            # 时延恢复后，下一次排队时多出的名额分配给已排队的任务
+            latency.reset()
+            latency.observe(1.0, streaming=True)
+            await controller.acquire("outline", "outline-0")
+            assert (await second).running
+            controller.release(first)
+
+        asyncio.run(scenario())
+
+    def test_response_latency_does_not_shrink_limits(self, latency):
+        """测试非流式调用的长响应时延（长输出）不会收缩并发上限"""
+        controller = AdmissionController(
+            _config(max_concurrency=4, target_first_byte_latency=2.0),
+            latency)
+        latency.observe(120.0, streaming=False)
+        latency.observe(1.0, streaming=True)
+
+        snapshot = controller.snapshot()
+        assert snapshot["max_concurrency"] == 4
+        assert snapshot["llm_latency"]["response_seconds"] == 120.0
+
+    def test_submit_runs_job_in_background(self, latency):
+        """测试 submit 立即返回，任务获得名额后在后台执行并释放名额"""
+
+        async def scenario():
+            controller = AdmissionController(_config(), latency)
+            done = asyncio.Event()
+
+            async def job():
+                done.set()
+
+            task = controller.submit("outline", "outline-1", job)
+            await asyncio.wait_for(task, timeout=1)
+            return done.is_set(), controller.position("outline-1")
+
+        finished, position = asyncio.run(scenario())
+        assert finished
+        assert position is None
@@ -0,0 +1,107 @@
+"""
+章节滚动摘要测试
+"""
+
+import asyncio
+
+import pytest
+
+from doc_agent.graph.common import (
+    build_rolling_context,
+    get_job_store,
+    release_job_store,
+    schedule_chapter_summary,
+)
+
+
+class _SlowLLMClient:
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.prompts = []
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        self.prompts.append(prompt)
+        if self.delay:
+            import time
+            time.sleep(self.delay)
+        return "本章摘要"
+
+
+def _chapters(count: int, content_length: int = 2000) -> list[dict]:
+    return [{
+        "title": f"标题{i + 1}",
+        "content": f"第{i + 1}章" + "正" * content_length,
+        "summary": f"摘要{i + 1}" * 20
+    } for i in range(count)]
+
+
+class TestRollingContext:
+    """滚动上下文测试类"""
+
+    def test_first_chapter(self):
+        """测试第一章使用默认上下文"""
+        assert build_rolling_context([]) == "这是第一章，没有前置内容。"
+
+    def test_context_is_bounded(self):
+        """测试章节数增加时上下文长度保持在上限附近"""
+        short = build_rolling_context(_chapters(3),
+                                      max_chars=1500,
+                                      previous_tail_chars=300)
+        long = build_rolling_context(_chapters(30),
+                                     max_chars=1500,
+                                     previous_tail_chars=300)
+
+        assert len(long) < 1700
+        assert "第30章 标题30：" in long
+        assert "第3章 标题3：" in short and "第1章 标题1：" in short
+
+    def test_earlier_chapters_collapse_to_titles(self):
+        """测试预算不足时较早章节只保留标题，最近章节保留摘要"""
+        context = build_rolling_context(_chapters(10),
+                                        max_chars=600,
+                                        previous_tail_chars=100)
+        assert "第10章 标题10：摘要10" in context
+        assert "第1章 标题1\n" in context
+
+    def test_missing_summary_uses_excerpt(self):
+        """测试摘要尚未生成时使用章节开头"""
+        chapters = _chapters(2)
+        chapters[0]["summary"] = ""
+        context = build_rolling_context(chapters, previous_tail_chars=0)
+        assert "第1章 标题1：第1章正正" in context
+        assert "Ending" not in context
+
+
+class TestChapterSummary:
+    """后台章节摘要测试类"""
+
+    def setup_method(self):
+        release_job_store("summary-test")
+
+    @pytest.mark.asyncio
+    async def test_summary_runs_in_background(self):
+        """测试摘要任务不阻塞调用方，完成后写入作业存储"""
+        store = get_job_store("summary-test")
+        store.chapters.put(0, "标题", "正文")
+
+        task = schedule_chapter_summary("summary-test", 0, "标题", "正文",
+                                        _SlowLLMClient(delay=0.05))
+        assert not task.done()
+        assert store.chapters.get(0)["summary"] == ""
+
+        assert await task == "本章摘要"
+        assert store.chapters.get(0)["summary"] == "本章摘要"
+
+    @pytest.mark.asyncio
+    async def test_release_cancels_pending_summary(self):
+        """测试释放作业存储时取消未完成的摘要任务"""
+        store = get_job_store("summary-test")
+        store.chapters.put(0, "标题", "正文")
+        task = schedule_chapter_summary("summary-test", 0, "标题", "正文",
+                                        _SlowLLMClient(delay=0.05))
+
+        release_job_store("summary-test")
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
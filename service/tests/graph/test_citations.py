@@ -0,0 +1,196 @@
+"""
+引用标记引擎测试
+"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from doc_agent.graph.chapter_workflow.nodes import writer
+from doc_agent.graph.common import (
+    StreamingCitationTracker,
+    process_citations,
+    rewrite_citations,
+)
+from doc_agent.graph.common.citations import SOURCES_TAG
+from doc_agent.schemas import Source
+
+STREAM_TEXT = ("甲**<信息源 3>**乙<信息源4>丙<[1], [2]>丁<[5]>戊[6]"
+               "己<sources>[7, 8]</sources>庚[a]<b>**加粗**")
+
+
+class TestRewriteCitations:
+    """引用标记单次扫描测试类"""
+
+    def test_standardize_all_formats(self):
+        """测试各种引用格式统一为 [n]，并在同一次扫描中收集ID"""
+        text = ("甲**<信息源 3>**乙<信息源4>丙<[1], [2]>丁<[5]>戊[6]"
+                "己<sources>[7, 8]</sources>")
+        rewritten, cited_ids = rewrite_citations(text)
+
+        assert rewritten == "甲[3]乙[4]丙[1][2]丁[5]戊[6]己<sources>[7, 8]</sources>"
+        assert cited_ids == {1, 2, 3, 4, 5, 6, 7, 8}
+
+    def test_text_without_citations(self):
+        """测试没有引用标记时原样返回"""
+        assert rewrite_citations("没有引用。") == ("没有引用。", set())
+
+    def test_custom_formatter_kinds(self):
+        """测试只把指定类型的标记交给回调，其他标记原样保留"""
+        calls = []
+
+        def formatter(kind, source_ids, original):
+            calls.append((kind, source_ids, original))
+            return "#"
+
+        rewritten, cited_ids = rewrite_citations(
+            "a<sources>[1,x, 2]</sources>b[3]c<sources>[]</sources>",
+            formatter,
+            kinds=frozenset({SOURCES_TAG}))
+
+        assert rewritten == "a#b[3]c#"
+        assert cited_ids == {1, 2}
+        assert calls[0] == (SOURCES_TAG, [1, 2], "<sources>[1,x, 2]</sources>")
+
+
+class TestProcessCitations:
+    """<sources> 标签处理测试类"""
+
+    def test_global_numbering(self):
+        """测试按全局引用顺序编号，重复标签分别替换"""
+        sources = [SimpleNamespace(id=i, title=f"信源{i}") for i in (1, 2)]
+        global_cited = {}
+
+        text, cited = process_citations(
+            "甲<sources>[2, 1]</sources>乙<sources>[]</sources>"
+            "丙<sources>[1]</sources>丁<sources>[2]</sources>[9]", sources,
+            global_cited)
+
+        assert text == "甲[1][2]乙丙[2]丁[1][9]"
+        assert [source.id for source in cited] == [2, 1, 1, 2]
+        assert list(global_cited) == [2, 1]
+
+
+class TestStreamingCitationTracker:
+    """流式引用状态机测试类"""
+
+    def test_markers_split_across_chunks(self):
+        """测试任意切分 token 时输出与整段处理一致"""
+        expected = rewrite_citations(STREAM_TEXT)[0]
+        for seed in range(100):
+            rng = random.Random(seed)
+            cuts = sorted(
+                rng.sample(range(1, len(STREAM_TEXT)), rng.randint(1, 20)))
+            chunks = [
+                STREAM_TEXT[start:end]
+                for start, end in zip([0] + cuts, cuts + [len(STREAM_TEXT)])
+            ]
+            tracker = StreamingCitationTracker()
+
+            output = "".join(tracker.feed(chunk) for chunk in chunks)
+            output += tracker.finish()
+
+            assert output == expected == tracker.text
+            assert tracker.cited_ids == set(range(1, 9))
+
+    def test_adjacent_bold_markers(self):
+        """测试相邻的加粗标记按 1~3 个字符随机切分时输出与整段处理一致"""
+        text = "据统计**<信息源 1>****<信息源 2>**，增长显著。"
+        expected = rewrite_citations(text)[0]
+        assert expected == "据统计[1][2]，增长显著。"
+        for seed in range(200):
+            rng = random.Random(seed)
+            chunks, start = [], 0
+            while start < len(text):
+                end = start + rng.randint(1, 3)
+                chunks.append(text[start:end])
+                start = end
+            tracker = StreamingCitationTracker()
+
+            output = "".join(tracker.feed(chunk) for chunk in chunks)
+            output += tracker.finish()
+
+            assert output == expected == tracker.text
+
+    def test_only_partial_marker_is_held(self):
+        """测试只扣留末尾未写完的标记，新引用实时回调"""
+        cited = []
+        tracker = StreamingCitationTracker(on_cited=cited.append)
+
+        assert tracker.feed("正文<[1") == "正文"
+        assert tracker.feed("]>后续[") == "[1]后续"
+        assert tracker.feed("1]和[2]。") == "[1]和[2]。"
+        assert tracker.finish() == ""
+        assert cited == [[1], [2]]
+
+
+class _FakeStreamingHandler:
+
+    def __init__(self, **kwargs):
+        self.tokens = []
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.tokens.append(token)
+
+    def flush(self):
+        pass
+
+
+class TestWriterStreaming:
+    """写作节点流式引用测试类"""
+
+    def test_writer_streams_normalized_citations(self, monkeypatch):
+        """测试写作节点推送标准化引用并实时发布信源引用事件"""
+        handlers = []
+        events = []
+        monkeypatch.setattr(
+            writer, "TokenStreamCallbackHandler",
+            lambda **kwargs: handlers.append(_FakeStreamingHandler()) or
+            handlers[-1])
+        monkeypatch.setattr(writer, "publish_event",
+                            lambda *args, **kwargs: events.append(args))
+        chunks = ["## 标题\n正文<信", "息源 1>继续**<信息源", " 2>**结束[9]"]
+        llm_client = SimpleNamespace(stream=lambda *args, **kwargs: iter(chunks))
+        sources = [
+            Source(id=i,
+                   doc_id=f"doc-{i}",
+                   doc_from="self",
+                   domain_id="domain",
+                   index="index",
+                   source_type="es_result",
+                   title=f"信源{i}",
+                   content="内容") for i in (1, 2, 3)
+        ]
+        state = {
+            "job_id": "writer-test",
+            "topic": "主题",
+            "chapters_to_process": [{
+                "chapter_title": "标题"
+            }],
+            "current_chapter_index": 0,
+            "completed_chapters": [],
+            "gathered_sources": sources
+        }
+
+        result = writer.writer_node(state, llm_client, prompt_selector=None)
+
+        assert result["final_document"] == "## 标题\n正文[1]继续[2]结束[9]"
+        assert "".join(handlers[0].tokens) == result["final_document"] + "\n"
+        assert [source.id for source in result["cited_sources_in_chapter"]
+                ] == [1, 2]
+        cited_events = [event[4] for event in events if event[1] == "信源引用"]
+        assert [event["sourceIds"] for event in cited_events] == [[1], [2]]
+
+    def test_writer_requires_job_id(self):
+        """测试缺少 job_id 时写作节点报错，不复用其他作业缓存的提示词片段"""
+        state = {
+            "topic": "主题",
+            "chapters_to_process": [{
+                "chapter_title": "标题"
+            }],
+            "current_chapter_index": 0
+        }
+
+        with pytest.raises(ValueError, match="job_id"):
+            writer.writer_node(state, SimpleNamespace(), prompt_selector=None)
@@ -0,0 +1,153 @@
+"""
+增量文档组装测试
+验证章节完成时即清理、追加并发布文档增量，最终化只拼接已组装的部分
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from doc_agent.graph.common import (
+    DocumentAssembler,
+    clean_chapter_content,
+    release_job_store,
+)
+from doc_agent.schemas import Source
+
+
+def _source(source_id: int) -> Source:
+    return Source(id=source_id,
+                  doc_id=f"doc-{source_id}",
+                  doc_from="self",
+                  domain_id="domain",
+                  index="index",
+                  source_type="es_result",
+                  title=f"信源{source_id}",
+                  content="内容",
+                  cited=True)
+
+
+OUTLINE = {
+    "title": "文档标题",
+    "summary": "文档摘要",
+    "chapters": [{
+        "number": 1,
+        "title": "概述"
+    }, {
+        "number": 2,
+        "title": "方案"
+    }]
+}
+
+
+class TestDocumentAssembler:
+    """增量文档组装器测试类"""
+
+    def test_clean_chapter_content(self):
+        """测试清理代码块标记、统一章节标题并压缩空行"""
+        content = "```markdown\n## 原标题\n\n\n\n### 小节\n正文\n```"
+        assert clean_chapter_content(content, 2,
+                                     "方案") == "## 2. 方案\n\n### 小节\n正文"
+        assert clean_chapter_content("## 原标题") == "## 原标题"
+
+    def test_incremental_document_layout(self):
+        """测试增量组装的文档与章节顺序无关，且引用只登记一次"""
+        assembler = DocumentAssembler()
+        assembler.set_header("主题", OUTLINE)
+        assembler.append_chapter(1, "## 方案\n正文二", 2, "方案")
+        delta = assembler.append_chapter(0, "## 概述\n正文一", 1, "概述")
+
+        assert delta == "\n\n## 1. 概述\n正文一\n\n\n---\n"
+        document = assembler.document()
+        assert document.startswith("# 文档标题\n\n## 摘要\n\n文档摘要\n")
+        assert "1. 概述\n\n2. 方案\n" in document
+        assert document.index("正文一") < document.index("正文二")
+
+        assert assembler.add_sources([_source(1), _source(2)]) == [
+            "[1] 信源1 (es_result)", "[2] 信源2 (es_result)"
+        ]
+        assert assembler.add_sources([_source(2)]) == []
+        assert assembler.bibliography() == ("\n## 参考文献\n\n[1] 信源1 (es_result)\n"
+                                            "[2] 信源2 (es_result)")
+        # 按给定的引用顺序列出，未登记的ID被忽略
+        assert assembler.bibliography([2, 1, 3]) == (
+            "\n## 参考文献\n\n[2] 信源2 (es_result)\n[1] 信源1 (es_result)")
+        assert assembler.bibliography([]).endswith("暂无参考文献。\n")
+
+    def test_refresh_chapter_keeps_heading(self):
+        """测试章节被编辑后按原编号和标题重新清理"""
+        assembler = DocumentAssembler()
+        assembler.append_chapter(0, "## 概述\n正文", 1, "概述")
+        assembler.refresh_chapter(0, "## 概述\n\n\n\n编辑后")
+        assert assembler.document() == "\n\n## 1. 概述\n\n编辑后\n\n\n---\n"
+
+
+class _FakeChapterWorkflow:
+
+    async def ainvoke(self, state: dict) -> dict:
+        index = state["current_chapter_index"]
+        return {
+            "final_document": f"## 标题\n\n正文{index}",
+            "cited_sources_in_chapter": [_source(index + 1)]
+        }
+
+
+class TestIncrementalFinalize:
+    """增量最终化测试类"""
+
+    def setup_method(self):
+        release_job_store("assembler-test")
+
+    @pytest.mark.asyncio
+    async def test_chapters_stream_document_deltas(self, monkeypatch):
+        """测试每章完成时发布文档增量，最终化和参考文献直接使用组装结果"""
+        try:
+            from doc_agent.graph.main_orchestrator import builder
+            from doc_agent.graph.main_orchestrator.nodes import generation
+        except ImportError as e:
+            pytest.skip(f"编排器依赖导入失败，跳过测试: {e}")
+
+        events = []
+        monkeypatch.setattr(builder, "publish_event",
+                            lambda *args, **kwargs: events.append(args))
+        monkeypatch.setattr(generation, "publish_event",
+                            lambda *args, **kwargs: None)
+        monkeypatch.setattr(
+            builder, "get_llm_client",
+            lambda: SimpleNamespace(invoke=lambda *args, **kwargs: "摘要"))
+        node = builder.create_chapter_processing_node(_FakeChapterWorkflow())
+
+        state = {
+            "job_id": "assembler-test",
+            "topic": "主题",
+            "document_outline": OUTLINE,
+            "chapters_to_process": [{
+                "chapter_title": "概述"
+            }, {
+                "chapter_title": "方案"
+            }],
+            "current_chapter_index": 0,
+            "completed_chapters": [],
+            "cited_source_ids": [],
+            "current_citation_index": 0
+        }
+        for index in range(2):
+            state["current_chapter_index"] = index
+            result = await node(state)
+            state["completed_chapters"] += result["completed_chapters"]
+            state["cited_source_ids"] += result["cited_source_ids"]
+
+        deltas = [event[4] for event in events if event[1] == "文档更新"]
+        assert [delta["chapterIndex"] for delta in deltas] == [0, 1]
+        assert deltas[0]["delta"].startswith("# 文档标题")
+        assert deltas[1]["delta"] == "\n\n## 2. 方案\n\n正文1\n\n\n---\n"
+        assert deltas[1]["citations"] == ["[2] 信源2 (es_result)"]
+
+        final = builder.finalize_document_node(state)
+        assert final["final_document"] == "".join(
+            delta["delta"] for delta in deltas)
+
+        monkeypatch.chdir("/tmp")
+        state["final_document"] = final["final_document"]
+        document = generation.bibliography_node(state)["final_document"]
+        assert document.endswith("[1] 信源1 (es_result)\n[2] 信源2 (es_result)")
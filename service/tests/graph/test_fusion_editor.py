@@ -0,0 +1,127 @@
+"""
+融合编辑节点测试
+验证长文档按重叠窗口并行编辑，以及时间预算不足时跳过编辑
+"""
+
+import threading
+import time
+
+import pytest
+
+from doc_agent.graph.common import get_job_store, release_job_store
+
+
+@pytest.fixture
+def editor():
+    try:
+        from doc_agent.graph.main_orchestrator.nodes import editor
+    except ImportError as e:
+        pytest.skip(f"编排器依赖导入失败，跳过测试: {e}")
+    return editor
+
+
+def _config(**overrides) -> dict:
+    config = {
+        "level": "standard",
+        "chapter_target_words": 400,
+        "job_time_budget": -1,
+        "fusion_window_chapters": 2,
+        "fusion_window_max_chars": 1000,
+        "fusion_max_concurrency": 4,
+        "fusion_tokens_per_second": 40
+    }
+    config.update(overrides)
+    return config
+
+
+def _state(chapter_count: int, content_length: int) -> dict:
+    store = get_job_store("fusion-test")
+    refs = [
+        store.chapters.put(i, f"第{i + 1}章", f"第{i + 1}章正文" +
+                           "内" * content_length + "\n\n\n\n结尾")
+        for i in range(chapter_count)
+    ]
+    return {
+        "job_id": "fusion-test",
+        "topic": "主题",
+        "completed_chapters": refs
+    }
+
+
+class _RecordingLLMClient:
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.prompts = []
+        self.threads = set()
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        self.prompts.append(prompt)
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        chapters = [
+            line for line in prompt.splitlines() if line.startswith("【章节")
+        ]
+        return "\n\n".join(f"{chapter}修改建议：统一术语" for chapter in chapters)
+
+
+class TestFusionEditor:
+    """融合编辑节点测试类"""
+
+    def setup_method(self):
+        release_job_store("fusion-test")
+
+    def test_windows_overlap_by_one_chapter(self, editor):
+        """测试窗口按相邻章节滑动且相互重叠"""
+        contents = ["内" * 600] * 5
+        assert editor._build_editing_windows(contents, 2, 1000) == [[0, 1],
+                                                                     [1, 2],
+                                                                     [2, 3],
+                                                                     [3, 4]]
+        assert editor._build_editing_windows(contents, 3, 1000) == [[0, 1, 2],
+                                                                     [2, 3, 4]]
+        assert editor._build_editing_windows(contents, 2,
+                                             10000) == [[0, 1, 2, 3, 4]]
+
+    def test_short_document_single_call(self, editor, monkeypatch):
+        """测试短文档仍整体编辑一次"""
+        monkeypatch.setattr(type(editor.settings), "get_complexity_config",
+                            lambda self: _config())
+        llm_client = _RecordingLLMClient()
+
+        result = editor.fusion_editor_node(_state(3, 100), llm_client)
+
+        assert result["fusion_edited"] is True
+        assert len(llm_client.prompts) == 1
+        assert "【章节3】" in llm_client.prompts[0]
+
+    def test_long_document_parallel_windows(self, editor, monkeypatch):
+        """测试长文档按窗口并行编辑，重叠窗口的相同建议只保留一次"""
+        monkeypatch.setattr(type(editor.settings), "get_complexity_config",
+                            lambda self: _config())
+        llm_client = _RecordingLLMClient(delay=0.05)
+
+        result = editor.fusion_editor_node(_state(4, 800), llm_client)
+
+        assert result["fusion_edited"] is True
+        assert len(llm_client.prompts) == 3
+        assert len(llm_client.threads) > 1
+        assert all(len(prompt) < 2000 for prompt in llm_client.prompts)
+        assert result["editing_suggestions"].split("\n\n") == [
+            f"【章节{i}】修改建议：统一术语" for i in range(1, 5)
+        ]
+        # 格式清理后的正文写回作业存储
+        assert "\n\n\n" not in get_job_store("fusion-test").chapters.content(0)
+
+    def test_skip_when_over_time_budget(self, editor, monkeypatch):
+        """测试预计耗时超过作业剩余时间预算时跳过融合编辑"""
+        monkeypatch.setattr(type(editor.settings), "get_complexity_config",
+                            lambda self: _config(job_time_budget=60))
+        llm_client = _RecordingLLMClient()
+        state = _state(4, 800)
+        state["job_started_at"] = time.time() - 55
+
+        result = editor.fusion_editor_node(state, llm_client)
+
+        assert result == {"fusion_edited": False}
+        assert llm_client.prompts == []
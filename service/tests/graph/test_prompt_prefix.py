@@ -0,0 +1,92 @@
+"""
+稳定前缀提示词布局测试
+验证同一作业内各章节的提示词共享作业级前缀，以及共享前缀统计
+"""
+
+from types import SimpleNamespace
+
+from doc_agent.graph.chapter_workflow.nodes import writer
+from doc_agent.graph.common import PromptPrefixTracker, common_prefix_length
+from doc_agent.prompts.writer import PROMPTS
+
+CHAPTERS = [{
+    "chapter_title": f"第{i + 1}章",
+    "description": f"章节描述{i + 1}",
+    "chapter_word_count": 1000 + i
+} for i in range(3)]
+
+
+def _documents(count: int, size: int = 400) -> list:
+    return [
+        SimpleNamespace(content=f"文档{i}" + "风格" * size)
+        for i in range(count)
+    ]
+
+
+class TestPromptPrefixTracker:
+    """共享前缀统计测试类"""
+
+    def test_common_prefix_length(self):
+        """测试最长公共前缀长度"""
+        assert common_prefix_length("abcdef", "abcxyz") == 3
+        assert common_prefix_length("abc", "abcdef") == 3
+        assert common_prefix_length("", "abc") == 0
+        assert common_prefix_length("xbc", "abc") == 0
+
+    def test_report_per_node(self):
+        """测试按节点统计所有提示词共同的前缀和可复用比例"""
+        tracker = PromptPrefixTracker()
+        for prompt in ("固定前缀-章节一", "固定前缀-章节二", "固定前-其他"):
+            tracker.record("writer", prompt)
+        tracker.record("planner", "单独一次")
+
+        report = tracker.report()
+        assert report["writer"]["prompts"] == 3
+        assert report["writer"]["shared_prefix_chars"] == len("固定前")
+        assert report["writer"]["reusable_ratio"] == round(
+            (len("固定前缀-章节") + len("固定前")) / (8 + 8 + 6), 3)
+        assert report["planner"]["shared_prefix_chars"] == len("单独一次")
+
+
+class TestStablePrefixLayout:
+    """稳定前缀布局测试类"""
+
+    def _prompts(self, shared_sections: dict) -> list[str]:
+        return [
+            writer._build_prompt(PROMPTS["v4_fast"], "主题",
+                                 chapter["chapter_title"],
+                                 chapter["description"], index, CHAPTERS,
+                                 f"前文{index}", [], shared_sections,
+                                 chapter["chapter_word_count"], [])
+            for index, chapter in enumerate(CHAPTERS)
+        ]
+
+    def test_job_sections_precede_chapter_content(self):
+        """测试大纲、写作要求和风格参考位于共享前缀内，章节信息在其后"""
+        shared_sections = writer._build_shared_sections(
+            "主题", CHAPTERS, _documents(30), _documents(200), "")
+        prompts = self._prompts(shared_sections)
+
+        tracker = PromptPrefixTracker()
+        for prompt in prompts:
+            tracker.record("writer", prompt)
+        shared = tracker.report()["writer"]["shared_prefix_chars"]
+
+        prefix = prompts[0][:shared]
+        assert "1. 第1章\n2. 第2章\n3. 第3章" in prefix
+        assert shared_sections["style_requirements"]
+        assert shared_sections["style_requirements"] in prefix
+        assert shared_sections["prompt_requirements"] in prefix
+        assert "章节描述1" not in prefix
+        assert shared > len(prompts[0]) // 2
+
+    def test_sampling_is_deterministic(self):
+        """测试超出预算的样式指南按确定的方式采样"""
+        style_guide = _documents(200)
+        first = writer._build_shared_sections("主题", CHAPTERS, [], style_guide,
+                                              "")
+        second = writer._build_shared_sections("主题", CHAPTERS, [],
+                                               style_guide, "")
+        assert first == second
+        assert len(first["style_requirements"]) < sum(
+            len(doc.content) for doc in style_guide)
@@ -0,0 +1,62 @@
+from doc_agent.tools.es_retrieval import (
+    AdaptiveNumCandidates,
+    overlap_recall,
+    reciprocal_rank_fusion,
+)
+
+
+def _hits(*ids: str) -> list[dict]:
+    return [{"_index": "idx", "_id": doc_id} for doc_id in ids]
+
+
+class TestReciprocalRankFusion:
+    """倒数排名融合测试类"""
+
+    def test_documents_in_both_lists_rank_first(self):
+        """测试同时被两路召回的文档排在最前，单路文档得以保留"""
+        fused = reciprocal_rank_fusion([_hits("a", "b", "c"),
+                                        _hits("d", "b")],
+                                       rank_constant=60)
+
+        assert [hit["_id"] for hit, _ in fused][:2] == ["b", "a"]
+        assert {hit["_id"] for hit, _ in fused} == {"a", "b", "c", "d"}
+        assert fused[0][1] == 1 / 62 + 1 / 62
+
+    def test_overlap_recall(self):
+        """测试以影子查询为基准的召回率"""
+        assert overlap_recall(_hits("a", "b"), _hits("a", "c")) == 0.5
+        assert overlap_recall(_hits("a"), []) is None
+
+
+class TestAdaptiveNumCandidates:
+    """num_candidates 自适应调节测试类"""
+
+    def test_low_recall_increases_candidates(self):
+        """测试召回率不足且时延达标时增大候选数"""
+        tuner = AdaptiveNumCandidates(initial_multiplier=2.0,
+                                      target_recall=0.95,
+                                      target_latency_ms=100)
+        before = tuner.num_candidates(10)
+        tuner.observe(latency_ms=20, recall=0.6)
+        assert tuner.num_candidates(10) > before
+
+    def test_high_latency_decreases_candidates(self):
+        """测试时延超标时优先减少候选数"""
+        tuner = AdaptiveNumCandidates(initial_multiplier=8.0,
+                                      target_latency_ms=100)
+        tuner.observe(latency_ms=500, recall=0.5)
+        assert tuner.multiplier < 8.0
+
+    def test_bounds_and_probe_schedule(self):
+        """测试候选数边界与影子查询频率"""
+        tuner = AdaptiveNumCandidates(initial_multiplier=1.0,
+                                      min_multiplier=1.5,
+                                      probe_every=3,
+                                      max_candidates=50)
+        tuner.observe(latency_ms=10, recall=1.0)
+        assert tuner.multiplier == 1.5
+        assert tuner.num_candidates(5) >= 5
+        assert tuner.probe_candidates(10) == 50
+        assert [tuner.should_probe() for _ in range(6)] == [
+            True, False, False, True, False, False
+        ]
@@ -0,0 +1,302 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from doc_agent.tools.es_metadata import es_metadata_registry
+from doc_agent.tools.es_service import ESService
+
+
+def _hit(index: str, doc_id: str = "d1", **source) -> dict:
+    """构造ES命中"""
+    return {"_id": doc_id, "_index": index, "_score": 1.5, "_source": source}
+
+
+class TestESServiceDecoding:
+    """ESService命中解码测试类"""
+
+    @pytest.fixture
+    def service(self):
+        """创建已加载别名的ES服务（不连接真实集群）"""
+        service = ESService(hosts=["http://fake:9200"])
+        service.index_aliases = {
+            "standard_index_prod_v3": ["standard_index_prod"],
+            "personal_knowledge_base_v1": ["personal_knowledge_base"],
+        }
+        # connect 时根据别名构建的扩展映射表
+        service.augmented_index_domain_map = {
+            "standard_index_prod_v3": "standard",
+            "standard_index_prod": "standard",
+        }
+        service._rebuild_domain_lookup()
+        return service
+
+    def test_domain_lookup_resolves_aliases(self, service):
+        """测试索引名和别名都能解析到domain_id，未知索引使用索引名"""
+        results = service._decode_hits([
+            _hit("standard_index_prod_v3", content="标准"),
+            _hit("personal_knowledge_base", content="上传"),
+            _hit("unknown_index", content="未知"),
+        ])
+
+        assert [r.domain_id for r in results] == [
+            "standard", "documentUploadAnswer", "unknown_index"
+        ]
+        assert [r.doc_from for r in results
+                ] == ["data_platform", "self", "data_platform"]
+
+    def test_decode_field_fallbacks(self, service):
+        """测试内容、来源字段的回退顺序与metadata.source"""
+        result = service._decode_hits([
+            _hit("unknown_index",
+                 doc_id="chunk-1",
+                 text="切分内容",
+                 content_view="原文视图",
+                 meta_data={"file_name": "a.pdf"})
+        ], alias_name="alias")[0]
+
+        assert result.id == "chunk-1"
+        assert result.original_content == "原文视图"
+        assert result.div_content == "切分内容"
+        assert result.source == "a.pdf"
+        assert result.metadata["source"] == "data_platform"
+        assert result.alias_name == "alias"
+        assert not hasattr(result, "__dict__")
+
+    @pytest.mark.asyncio
+    async def test_search_multiple_indices_uses_alias_per_response(
+            self, service):
+        """测试msearch结果按请求顺序标记别名"""
+        service._initialized = True
+        service._client = _mock_client()
+        service._client.msearch = AsyncMock(
+            return_value={
+                "responses": [{
+                    "hits": {
+                        "hits": [_hit("standard_index_prod_v3", content="甲")]
+                    }
+                }, {
+                    "error": "index_not_found"
+                }]
+            })
+
+        results = await service.search_multiple_indices(
+            ["standard_index_prod", "other_index_prod"], "查询")
+
+        assert len(results) == 1
+        assert results[0].alias_name == "standard_index_prod"
+        assert results[0].domain_id == "standard"
+
+
+def _mock_client() -> MagicMock:
+    """模拟ES客户端的元数据接口"""
+    client = MagicMock()
+    client.indices.get_alias = AsyncMock(
+        return_value={
+            "standard_index_prod_v3": {
+                "aliases": {
+                    "standard_index_prod": {}
+                }
+            },
+            "other_index_prod_v1": {
+                "aliases": {
+                    "other_index_prod": {}
+                }
+            },
+        })
+    client.cat.indices = AsyncMock(return_value=[{
+        "index": "standard_index_prod_v3",
+        "docs.count": "42"
+    }])
+    client.indices.get_mapping = AsyncMock(
+        return_value={
+            "standard_index_prod_v3": {
+                "mappings": {
+                    "properties": {
+                        "context_vector": {
+                            "dims": 1024
+                        }
+                    }
+                }
+            }
+        })
+    return client
+
+
+class TestESMetadataSharing:
+    """ES索引元数据共享与后台刷新测试类"""
+
+    @pytest.fixture(autouse=True)
+    def clean_registry(self):
+        es_metadata_registry.invalidate()
+        yield
+        es_metadata_registry.invalidate()
+
+    @pytest.mark.asyncio
+    async def test_metadata_loaded_once_for_all_services(self):
+        """测试多个服务实例并发连接时只加载一次元数据"""
+        client = _mock_client()
+        services = [ESService(hosts=["http://shared:9200"]) for _ in range(3)]
+        for service in services:
+            service._client = client
+            service._initialized = True
+
+        await asyncio.gather(*(service._sync_metadata()
+                               for service in services))
+
+        client.indices.get_alias.assert_awaited_once()
+        assert all(s.valid_indeces == ["standard_index_prod", "other_index_prod"]
+                   for s in services)
+        snapshot = await services[0].get_metadata()
+        assert snapshot.vector_dims == 1024
+        assert snapshot.knowledge_indices[0]["name"] == "standard_index_prod_v3"
+
+    @pytest.mark.asyncio
+    async def test_stale_metadata_refreshes_in_background(self):
+        """测试元数据过期后立即返回旧快照并在后台替换"""
+        client = _mock_client()
+        service = ESService(hosts=["http://stale:9200"], metadata_ttl=0)
+        service._client = client
+        service._initialized = True
+        await service._sync_metadata()
+        old_snapshot = service._metadata
+
+        refresh_started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_get_alias(index):
+            refresh_started.set()
+            await release.wait()
+            return {"thesis_index_prod_v2": {"aliases": {"thesis_index_prod": {}}}}
+
+        client.indices.get_alias = AsyncMock(side_effect=slow_get_alias)
+
+        # 过期时不等待刷新，继续使用旧快照
+        await service._sync_metadata()
+        await refresh_started.wait()
+        assert service._metadata is old_snapshot
+
+        release.set()
+        await asyncio.sleep(0.01)
+        await service._sync_metadata()
+        assert service._metadata is not old_snapshot
+        assert service.valid_indeces == ["thesis_index_prod"]
+
+
+class TestFileTokenStreaming:
+    """按file_token流式读取测试类"""
+
+    @pytest.fixture
+    def service(self):
+        service = ESService(hosts=["http://stream:9200"])
+        service._initialized = True
+        service._client = _mock_client()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_pit_pagination_reads_all_chunks(self, service):
+        """测试PIT + search_after 分页读取全部切片并关闭PIT"""
+        client = service._client
+        client.open_point_in_time = AsyncMock(return_value={"id": "pit-1"})
+        client.close_point_in_time = AsyncMock()
+
+        def page(start, count):
+            hits = []
+            for i in range(start, start + count):
+                hit = _hit("personal_knowledge_base_v1",
+                           doc_id=f"c{i}",
+                           content=f"片段{i}")
+                hit["sort"] = [i, i]
+                hits.append(hit)
+            return {"pit_id": "pit-2", "hits": {"hits": hits}}
+
+        # t1 有 3 个切片（两页），t2 有 2 个切片（满页后再取到空页）
+        client.search = AsyncMock(side_effect=[
+            page(0, 2), page(2, 1), page(3, 2), page(5, 0)
+        ])
+
+        chunks = [
+            chunk.div_content
+            async for chunk in service.iter_file_token_chunks(["t1", "t2"],
+                                                              page_size=2)
+        ]
+
+        assert chunks == [f"片段{i}" for i in range(5)]
+        calls = client.search.call_args_list
+        assert len(calls) == 4
+        # 逐个文件查询，切片序号不会在文件之间交错
+        assert [call.kwargs["query"] for call in calls] == [
+            {"term": {"doc_id": "t1"}},
+            {"term": {"doc_id": "t1"}},
+            {"term": {"doc_id": "t2"}},
+            {"term": {"doc_id": "t2"}},
+        ]
+        assert calls[0].kwargs["search_after"] is None
+        assert calls[1].kwargs["search_after"] == [1, 1]
+        assert calls[1].kwargs["pit"]["id"] == "pit-2"
+        # 下一个文件从头开始分页
+        assert calls[2].kwargs["search_after"] is None
+        assert calls[3].kwargs["search_after"] == [4, 4]
+        client.open_point_in_time.assert_awaited_once()
+        client.close_point_in_time.assert_awaited_once_with(id="pit-2")
+
+    @pytest.mark.asyncio
+    async def test_pit_closed_on_error(self, service):
+        """测试读取失败时仍关闭PIT"""
+        client = service._client
+        client.open_point_in_time = AsyncMock(return_value={"id": "pit-1"})
+        client.close_point_in_time = AsyncMock()
+        client.search = AsyncMock(side_effect=RuntimeError("search failed"))
+
+        with pytest.raises(RuntimeError):
+            async for _ in service.iter_file_token_chunks("t1"):
+                pass
+
+        client.close_point_in_time.assert_awaited_once_with(id="pit-1")
+
+
+class TestHybridRRFSearch:
+    """kNN + BM25 RRF 混合检索测试类"""
+
+    @pytest.mark.asyncio
+    async def test_rrf_uses_single_msearch_and_index_vector_dims(self):
+        """测试一次msearch完成两路检索，按映射维度调整向量并融合结果"""
+        es_metadata_registry.invalidate()
+        service = ESService(hosts=["http://rrf:9200"])
+        service._initialized = True
+        service._client = _mock_client()
+        service.candidate_tuner.probe_every = 0
+        knn_hits = [
+            _hit("standard_index_prod_v3", doc_id="a", content="甲"),
+            _hit("standard_index_prod_v3", doc_id="b", content="乙")
+        ]
+        bm25_hits = [_hit("standard_index_prod_v3", doc_id="c", content="丙"),
+                     _hit("standard_index_prod_v3", doc_id="b", content="乙")]
+        service._client.msearch = AsyncMock(
+            return_value={
+                "responses": [{
+                    "took": 12,
+                    "hits": {
+                        "hits": knn_hits
+                    }
+                }, {
+                    "took": 5,
+                    "hits": {
+                        "hits": bm25_hits
+                    }
+                }]
+            })
+
+        vector = [0.1] * 1536
+        results = await service.search("*", "查询", top_k=3, query_vector=vector)
+
+        body = service._client.msearch.call_args.kwargs["body"]
+        assert len(body) == 4
+        assert len(body[1]["knn"]["query_vector"]) == 1024
+        assert len(vector) == 1536
+        assert "multi_match" in str(body[3]["query"])
+        assert [r.id for r in results] == ["b", "a", "c"]
+        # b 在两路中都排第2：(1/62 + 1/62) / (2/61)
+        assert results[0].score == pytest.approx(61 / 62)
+        assert service.candidate_tuner.latency_ms == 12
+        es_metadata_registry.invalidate()
@@ -0,0 +1,133 @@
+"""
+预热解释器池测试
+验证工作进程复用、执行隔离、超时终止、输出截断、按次数回收和异步接口
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from doc_agent.tools.code_execute import CodeExecuteTool
+from doc_agent.tools.interpreter_pool import InterpreterPool, WorkerTimeoutError
+
+pytestmark = pytest.mark.skipif(os.name != "posix",
+                                reason="解释器池依赖 POSIX 管道")
+
+
+@pytest.fixture
+def pool():
+    pool = InterpreterPool(size=2,
+                           preload_modules=("json", "statistics",
+                                            "not_installed_module"),
+                           max_runs_per_worker=3,
+                           max_output_chars=300)
+    yield pool
+    pool.close()
+
+
+class TestInterpreterPool:
+    """解释器池测试类"""
+
+    def test_workers_start_on_first_run(self, pool):
+        """测试创建解释器池时不启动工作进程，第一次执行时才启动"""
+        assert not pool._workers
+
+        assert pool.run("print('ok')").output == "ok\n"
+        assert len(pool._workers) == 2
+
+    def test_run_reuses_worker_with_fresh_globals(self, pool):
+        """测试代码在预热进程中执行，每次执行的全局变量互不影响"""
+        first = pool.run("import os\nvalue = 1\nprint(os.getpid())")
+        second = pool.run("print('value' in globals())")
+
+        assert first.output.strip().isdigit()
+        assert second.output == "False\n"
+        assert second.stderr == ""
+
+    def test_error_traceback_in_stderr(self, pool):
+        """测试异常堆栈写入 stderr，工作进程继续可用"""
+        result = pool.run("print('before')\nprint(undefined_var)")
+
+        assert result.stdout == "before\n"
+        assert result.stderr.startswith("Traceback")
+        assert 'File "<code>", line 2' in result.stderr
+        assert "NameError" in result.stderr
+        assert pool.run("print(1 + 1)").output == "2\n"
+
+    def test_timeout_kills_execution(self, pool):
+        """测试超时的执行被终止，后续执行不受影响"""
+        with pytest.raises(WorkerTimeoutError):
+            pool.run("while True:\n    pass", timeout=0.5)
+
+        assert pool.stats["timeouts"] == 1
+        assert pool.run("print('ok')").output == "ok\n"
+
+    def test_module_changes_do_not_leak(self):
+        """测试用户代码修改的模块状态和分帧用的 json 不会影响后续执行"""
+        pool = InterpreterPool(size=1, preload_modules=("json", "math"))
+        try:
+            pool.run("import math, json\n"
+                     "math.pi = 3\n"
+                     "json.dumps = None\n"
+                     "json.loads = None")
+            assert pool.run("import math\nprint(math.pi)").output == (
+                "3.141592653589793\n")
+            assert pool.run("import json\nprint(json.dumps([1]))").output == (
+                "[1]\n")
+        finally:
+            pool.close()
+
+    def test_hard_exit_reported(self, pool):
+        """测试用户代码直接退出进程时返回说明，工作进程继续可用"""
+        result = pool.run("import os\nos._exit(3)")
+
+        assert "exit code 3" in result.stderr
+        assert pool.stats["crashed"] == 0
+        assert pool.run("print('ok')").output == "ok\n"
+
+    def test_output_truncated(self, pool):
+        """测试输出超过上限时被截断"""
+        result = pool.run("print('x' * 1000)")
+
+        assert result.truncated
+        assert len(result.stdout) == 300
+
+    def test_recycle_after_max_runs(self, pool):
+        """测试工作进程执行指定次数后回收重建"""
+        pids = {
+            pool.run("import os\nprint(os.getpid())").output
+            for _ in range(8)
+        }
+
+        assert pool.stats["recycled"] >= 2
+        assert len(pids) > 2
+
+    @pytest.mark.asyncio
+    async def test_async_concurrent_runs(self, pool):
+        """测试异步接口并发执行，不阻塞事件循环"""
+        results = await asyncio.gather(*(pool.arun(f"print({i} * 2)")
+                                         for i in range(4)))
+
+        assert [result.output for result in results] == [
+            "0\n", "2\n", "4\n", "6\n"
+        ]
+
+
+class TestCodeExecuteToolWithPool:
+    """使用解释器池的代码执行工具测试类"""
+
+    def test_execute_formats_output(self, pool):
+        """测试工具输出格式与子进程方式一致，超时返回相同提示"""
+        tool = CodeExecuteTool(pool=pool)
+
+        assert tool.execute("print('hello world')") == "hello world\n"
+        assert tool.execute("import time\ntime.sleep(5)",
+                            timeout=0.3) == "代码执行超时"
+        assert tool.execute("print('y' * 500)").endswith("[输出过长，已截断]")
+
+    @pytest.mark.asyncio
+    async def test_aexecute(self, pool):
+        """测试异步执行接口"""
+        tool = CodeExecuteTool(pool=pool)
+        assert await tool.aexecute("print(sum(range(5)))") == "10\n"
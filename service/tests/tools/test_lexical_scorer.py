@@ -0,0 +1,30 @@
+from doc_agent.tools.lexical_scorer import BM25Scorer, term_coverage, tokenize
+
+
+class TestLexicalScorer:
+    """本地词法评分测试类"""
+
+    def test_tokenize_mixed_text(self):
+        """测试中文按二元组、英文按单词切分"""
+        assert tokenize("水电站 BM25 Rerank") == ["水电", "电站", "bm25", "rerank"]
+        assert tokenize("坝") == ["坝"]
+
+    def test_bm25_prefers_relevant_document(self):
+        """测试包含查询词的文档得分更高"""
+        documents = ["大坝混凝土施工质量控制", "水电站大坝安全监测系统", "机器学习算法详解"]
+        scores = BM25Scorer().score("大坝安全监测", documents)
+
+        assert scores[1] > scores[0] > scores[2]
+        assert scores[2] == 0.0
+
+    def test_bm25_empty_inputs(self):
+        """测试空查询和空文档列表"""
+        assert BM25Scorer().score("查询", []) == []
+        assert BM25Scorer().score("!!", ["文档"]) == [0.0]
+
+    def test_term_coverage(self):
+        """测试查询词项覆盖率"""
+        matched, coverage = term_coverage("机器学习", "机器学习算法详解")
+        assert matched == 3
+        assert coverage == 1.0
+        assert term_coverage("", "文本") == (0, 0.0)
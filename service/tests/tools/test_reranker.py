@@ -1,4 +1,6 @@
-from unittest.mock import patch
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -315,3 +317,267 @@ class TestRerankerTool:
         # 验证重排序评分等于原始评分（回退情况）
         for result in reranked_results:
             assert result.rerank_score == result.score
+
+
+def _make_result(doc_id: str, content: str, score: float) -> ESSearchResult:
+    """创建字段完整的ES搜索结果"""
+    return ESSearchResult(id=doc_id,
+                          doc_id=doc_id,
+                          index="test_index",
+                          domain_id="test_domain",
+                          doc_from="data_platform",
+                          file_token="",
+                          original_content=f"{content}（原文）",
+                          div_content=content,
+                          score=score)
+
+
+class TestRerankerToolAsync:
+    """RerankerTool异步与批量重排序测试类"""
+
+    @pytest.fixture
+    def groups(self):
+        """两组 (query, 搜索结果)"""
+        return [("机器学习", [
+            _make_result("a1", "人工智能在医疗诊断中的应用", 0.8),
+            _make_result("a2", "机器学习算法详解", 0.9)
+        ]), ("水电站", [_make_result("b1", "水电站大坝安全监测", 0.7)])]
+
+    @pytest.mark.asyncio
+    async def test_arerank_batch_parallel(self, groups):
+        """测试未配置批量接口时按组并行调用并分别解析"""
+        reranker_tool = RerankerTool(base_url="http://fake", api_key="fake")
+
+        async def fake_ainvoke(prompt, documents, size):
+            return {
+                "sorted_doc_list": [{
+                    "text": doc,
+                    "rerank_score": float(len(documents) - i)
+                } for i, doc in enumerate(reversed(documents))]
+            }
+
+        with patch.object(reranker_tool.reranker_client,
+                          "ainvoke",
+                          side_effect=fake_ainvoke) as mock_ainvoke:
+            results = await reranker_tool.arerank_batch(groups, top_k=2)
+
+        assert mock_ainvoke.await_count == 2
+        assert [r.id for r in results[0]] == ["a2", "a1"]
+        assert [r.id for r in results[1]] == ["b1"]
+
+    @pytest.mark.asyncio
+    async def test_arerank_batch_single_request(self, groups):
+        """测试配置批量接口时多组查询一次请求完成"""
+        reranker_tool = RerankerTool(base_url="http://fake",
+                                     api_key="fake",
+                                     batch_url="http://fake/batch")
+        response = MagicMock()
+        response.json.return_value = {
+            "results": [{
+                "sorted_doc_list": [{
+                    "text": "人工智能在医疗诊断中的应用",
+                    "rerank_score": 0.9
+                }]
+            }, {
+                "sorted_doc_list": [{
+                    "text": "水电站大坝安全监测",
+                    "rerank_score": 0.5
+                }]
+            }]
+        }
+        client = MagicMock()
+        client.post = AsyncMock(return_value=response)
+
+        with patch.object(reranker_tool.reranker_client,
+                          "_get_async_client",
+                          return_value=client):
+            results = await reranker_tool.arerank_batch(groups)
+
+        client.post.assert_awaited_once()
+        payload = client.post.call_args.kwargs["json"]["batch"]
+        assert [item["query"] for item in payload] == ["机器学习", "水电站"]
+        assert results[0][0].id == "a1"
+        assert results[1][0].rerank_score == 0.5
+
+    @pytest.mark.asyncio
+    async def test_arerank_failure_falls_back_per_group(self, groups):
+        """测试单组失败只回退该组（回退为本地BM25评分）"""
+        reranker_tool = RerankerTool(base_url="http://fake", api_key="fake")
+
+        async def fake_ainvoke(prompt, documents, size):
+            if prompt == "水电站":
+                raise Exception("API调用失败")
+            return {
+                "sorted_doc_list": [{
+                    "text": documents[0],
+                    "rerank_score": 0.3
+                }]
+            }
+
+        with patch.object(reranker_tool.reranker_client,
+                          "ainvoke",
+                          side_effect=fake_ainvoke):
+            results = await reranker_tool.arerank_batch(groups)
+
+        assert results[0][0].rerank_score == 0.3
+        assert results[1][0].id == "b1"
+        assert results[1][0].rerank_score > 0
+
+
+class TestRerankScoreCache:
+    """重排序分数缓存测试类"""
+
+    @staticmethod
+    async def fake_ainvoke(prompt, documents, size):
+        return {
+            "sorted_doc_list": [{
+                "text": doc,
+                "rerank_score": round(0.1 * (i + 1), 2)
+            } for i, doc in enumerate(documents)]
+        }
+
+    @pytest.mark.asyncio
+    async def test_only_unseen_documents_are_sent(self):
+        """测试已缓存分数的文档不再发送给重排序服务"""
+        reranker_tool = RerankerTool(base_url="http://fake", api_key="fake")
+        first = [_make_result("a1", "文档一", 0.8), _make_result("a2", "文档二", 0.9)]
+        second = first + [_make_result("a3", "文档三", 0.7)]
+
+        with patch.object(reranker_tool.reranker_client,
+                          "ainvoke",
+                          side_effect=self.fake_ainvoke) as mock_ainvoke:
+            await reranker_tool.arerank_search_results("查询", first)
+            results = await reranker_tool.arerank_search_results(
+                " 查询 ", second)
+
+        assert mock_ainvoke.await_count == 2
+        assert mock_ainvoke.call_args.kwargs["documents"] == ["文档三"]
+        # 缓存分数与新分数合并后统一排序
+        assert [r.id for r in results] == ["a2", "a1", "a3"]
+        assert [r.rerank_score for r in results] == [0.2, 0.1, 0.1]
+
+        stats = reranker_tool.cache_stats()["rerank"]
+        assert stats["hits"] == 2
+        assert stats["misses"] == 3
+
+    @pytest.mark.asyncio
+    async def test_fully_cached_group_skips_request(self):
+        """测试全部命中缓存时不请求重排序服务并按 top_k 截断"""
+        reranker_tool = RerankerTool(base_url="http://fake", api_key="fake")
+        group = [_make_result("a1", "文档一", 0.8), _make_result("a2", "文档二", 0.9)]
+
+        with patch.object(reranker_tool.reranker_client,
+                          "ainvoke",
+                          side_effect=self.fake_ainvoke) as mock_ainvoke:
+            await reranker_tool.arerank_batch([("查询", group)])
+            results = await reranker_tool.arerank_batch([("查询", group)],
+                                                        top_k=1)
+
+        mock_ainvoke.assert_awaited_once()
+        assert [r.id for r in results[0]] == ["a2"]
+
+    def test_cache_is_bounded(self):
+        """测试缓存超过上限时淘汰最久未使用的条目"""
+        reranker_tool = RerankerTool(base_url="http://fake",
+                                     api_key="fake",
+                                     score_cache_size=2)
+        results = [
+            _make_result(f"d{i}", f"文档{i}", 0.5) for i in range(3)
+        ]
+        response = {
+            "sorted_doc_list": [{
+                "text": r.div_content,
+                "rerank_score": 0.5
+            } for r in results]
+        }
+
+        with patch.object(reranker_tool.reranker_client,
+                          "invoke",
+                          return_value=response):
+            reranker_tool.rerank_search_results("查询", results)
+
+        assert len(reranker_tool.score_cache) == 2
+        cached, unseen = reranker_tool._plan_group("查询", results)
+        assert [r.id for r in unseen] == ["d0"]
+        assert sorted(cached) == [1, 2]
+
+
+class TestRerankerLocalFallback:
+    """本地BM25兜底重排序测试类"""
+
+    @pytest.fixture
+    def results(self):
+        return [
+            _make_result("r1", "机器学习算法详解", 0.9),
+            _make_result("r2", "水电站大坝安全监测", 0.5)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_latency_budget_uses_local_scores(self, results):
+        """测试远程重排序超出时延预算时使用本地评分并进入降级冷却"""
+        reranker_tool = RerankerTool(base_url="http://fake",
+                                     api_key="fake",
+                                     latency_budget=0.05)
+
+        async def slow_ainvoke(prompt, documents, size):
+            await asyncio.sleep(1)
+
+        with patch.object(reranker_tool.reranker_client,
+                          "ainvoke",
+                          side_effect=slow_ainvoke) as mock_ainvoke:
+            reranked = await reranker_tool.arerank_search_results(
+                "大坝安全", results)
+            # 冷却期内不再请求远程服务
+            await reranker_tool.arerank_search_results("大坝安全", results)
+
+        assert mock_ainvoke.call_count == 1
+        assert [r.id for r in reranked] == ["r2", "r1"]
+        assert reranked[0].rerank_score > 0
+        assert reranker_tool.cache_stats()["rerank"]["hits"] == 0
+
+    def test_sync_latency_budget_is_a_deadline(self, results):
+        """测试同步重排序以时延预算作为整个调用的截止时间"""
+        reranker_tool = RerankerTool(base_url="http://fake",
+                                     api_key="fake",
+                                     latency_budget=0.05)
+
+        def slow_invoke(prompt, timeout, documents, size):
+            # 每个阶段都未超时，但整个调用远超预算
+            time.sleep(0.5)
+
+        with patch.object(reranker_tool.reranker_client,
+                          "invoke",
+                          side_effect=slow_invoke) as mock_invoke:
+            start = time.perf_counter()
+            reranked = reranker_tool.rerank_search_results("大坝安全", results)
+            elapsed = time.perf_counter() - start
+            reranker_tool.rerank_search_results("大坝安全", results)
+
+        assert elapsed < 0.4
+        assert mock_invoke.call_count == 1
+        assert [r.id for r in reranked] == ["r2", "r1"]
+
+    def test_sync_failure_uses_local_scores(self, results):
+        """测试同步重排序失败时使用本地评分"""
+        reranker_tool = RerankerTool(base_url="http://fake", api_key="fake")
+
+        with patch.object(reranker_tool.reranker_client,
+                          "invoke",
+                          side_effect=Exception("API调用失败")):
+            reranked = reranker_tool.rerank_search_results("水电站", results)
+
+        assert [r.id for r in reranked] == ["r2", "r1"]
+
+    def test_local_only_mode_skips_remote(self, results):
+        """测试本地模式不请求远程服务，无匹配时保持原始评分顺序"""
+        reranker_tool = RerankerTool(base_url="http://fake",
+                                     api_key="fake",
+                                     local_only=True)
+
+        with patch.object(reranker_tool.reranker_client,
+                          "invoke") as mock_invoke:
+            reranked = reranker_tool.rerank_search_results("无关查询", results,
+                                                           top_k=1)
+
+        mock_invoke.assert_not_called()
+        assert [r.id for r in reranked] == ["r1"]
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from doc_agent.core.config import settings
+from doc_agent.tools.web_cache import (
+    CacheStats,
+    CacheStatsScope,
+    DiskCacheTier,
+    WebSearchCache,
+    normalize_query,
+)
+from doc_agent.tools.web_search import WebSearchConfig, WebSearchTool
+
+
+class TestWebSearchCache:
+    """WebSearchCache测试类"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """创建只带磁盘层的缓存"""
+        return WebSearchCache(disk_tier=DiskCacheTier(str(tmp_path)),
+                              search_ttl=60,
+                              page_ttl=60)
+
+    def test_normalize_query(self):
+        """测试查询规范化忽略大小写、全角和多余空白"""
+        assert normalize_query("  Python   异步编程 ") == "python 异步编程"
+        assert normalize_query("ＡＩ 发展") == normalize_query("ai 发展")
+
+    @pytest.mark.asyncio
+    async def test_search_hit_and_miss(self, cache):
+        """测试搜索响应缓存的命中与未命中统计"""
+        assert await cache.get_search("人工智能", 5) is None
+        await cache.set_search("人工智能", 5, [{"url": "http://a"}])
+
+        assert await cache.get_search(" 人工智能 ", 5) == [{"url": "http://a"}]
+        # count 不同视为不同的查询
+        assert await cache.get_search("人工智能", 3) is None
+
+        stats = cache.stats.snapshot()["search"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+
+    @pytest.mark.asyncio
+    async def test_expired_search_entry_is_miss(self, cache):
+        """测试过期的搜索响应被视为未命中"""
+        cache.search_ttl = -1
+        await cache.set_search("过期查询", 5, [{"url": "http://a"}])
+        assert await cache.get_search("过期查询", 5) is None
+
+    @pytest.mark.asyncio
+    async def test_page_entry_keeps_validators(self, cache):
+        """测试网页条目保存校验头，过期后仍可用于条件请求"""
+        cache.page_ttl = -1
+        await cache.set_page("http://a", "正文", etag='"v1"')
+
+        entry = await cache.get_page("http://a")
+        assert entry["text"] == "正文"
+        assert entry["etag"] == '"v1"'
+        assert entry["fresh"] is False
+
+    def test_disk_tier_respects_size_cap(self, tmp_path):
+        """测试磁盘层超出容量时淘汰最久未访问的条目"""
+        tier = DiskCacheTier(str(tmp_path), max_bytes=2000)
+        for i in range(10):
+            tier.set(f"page:{i:040x}", {"text": "x" * 300})
+            time.sleep(0.01)
+
+        total = sum(p.stat().st_size for p in tmp_path.rglob("*.json"))
+        assert total <= 2000
+        assert tier.get(f"page:{9:040x}") is not None
+        assert tier.get(f"page:{0:040x}") is None
+
+    @pytest.mark.asyncio
+    async def test_stats_scope_per_call(self):
+        """测试并发调用各自的统计范围只包含本次调用的事件"""
+        stats = CacheStats()
+        stats.record("search", "misses")
+
+        async def call(hits: int) -> dict:
+            scope = CacheStatsScope().start()
+            for _ in range(hits):
+                stats.record("search", "hits")
+                await asyncio.sleep(0)
+            stats.record("search", "misses")
+            scope.stop()
+            return scope.snapshot()
+
+        first, second = await asyncio.gather(call(1), call(3))
+        assert first["search"]["hits"] == 1
+        assert first["search"]["hit_rate"] == 0.5
+        assert second["search"]["hits"] == 3
+        assert second["search"]["misses"] == 1
+        assert stats.snapshot()["search"]["hits"] == 4
+
+        # 结束后不再计入
+        with CacheStatsScope() as scope:
+            stats.record("page", "hits")
+        stats.record("page", "hits")
+        assert scope.snapshot(("page", ))["page"]["hits"] == 1
+        assert scope.snapshot(("search", )) == {}
+
+    def test_cache_dir_under_output_dir(self, tmp_path):
+        """测试相对的缓存目录位于配置的输出目录下，而不是当前工作目录"""
+        config = WebSearchConfig()
+        assert config.cache_dir == os.path.join(settings.output_dir,
+                                                "cache/web_search")
+        assert os.path.isabs(config.cache_dir)
+        assert WebSearchConfig({
+            "cache_dir": str(tmp_path)
+        }).cache_dir == str(tmp_path)
+
+    @pytest.mark.asyncio
+    async def test_web_search_tool_uses_cache(self, tmp_path):
+        """测试WebSearchTool命中缓存时不再请求外部接口"""
+        tool = WebSearchTool(config={"cache_dir": str(tmp_path)})
+        response = [{"url": "http://a", "materialContent": "内容"}]
+
+        with patch.object(tool,
+                          "_request_web_search",
+                          new=AsyncMock(return_value=response)) as mock_request:
+            assert await tool.get_web_search("缓存测试") == response
+            assert await tool.get_web_search("缓存测试") == response
+
+        mock_request.assert_awaited_once()
+        assert tool.cache_stats()["search"]["hits"] == 1
@@ -0,0 +1,92 @@
+import pytest
+
+from doc_agent.tools.web_search import WebScraper
+from doc_agent.utils.html_extractor import (
+    DOCUMENT_STRIP_TAGS,
+    get_html_extractor,
+    html_to_text,
+)
+
+SAMPLE_PAGE = """
+<html><head><title>页面标题</title><style>.a {color: red}</style></head>
+<body>
+  <nav><a href="/">首页</a><a href="/about">关于</a></nav>
+  <div class="sidebar"><p>推荐阅读推荐阅读推荐阅读推荐阅读推荐阅读推荐阅读</p></div>
+  <article class="post">
+    <h1>水电站施工质量控制</h1>
+    <p>混凝土浇筑需要严格控制温度，避免出现温度裂缝，同时加强养护管理。</p>
+    <p>大坝监测系统包括变形、渗流和应力应变等多个方面，需要长期运行。</p>
+  </article>
+  <!-- 注释内容 -->
+  <script>var tracking = 1;</script>
+  <footer>Copyright 2024</footer>
+</body></html>
+"""
+
+
+class TestHtmlExtractor:
+    """HTML提取引擎测试类"""
+
+    def test_lxml_removes_boilerplate(self):
+        """测试lxml引擎一次性剥离样板标签并保留段落边界"""
+        text = html_to_text(SAMPLE_PAGE, engine="lxml")
+        lines = text.split("\n")
+
+        assert "水电站施工质量控制" in lines
+        assert any(line.startswith("混凝土浇筑") for line in lines)
+        for noise in ("首页", "tracking", "Copyright", "注释内容", "color"):
+            assert noise not in text
+
+    def test_main_content_heuristic(self):
+        """测试正文密度启发式只保留文章主体"""
+        text = html_to_text(SAMPLE_PAGE, main_content=True, engine="lxml")
+
+        assert "大坝监测系统" in text
+        assert "推荐阅读" not in text
+
+    def test_bytes_input_uses_declared_charset(self):
+        """测试字节输入按meta声明的编码解码"""
+        raw = ('<html><head><meta charset="gbk"></head>'
+               '<body><p>中文段落</p></body></html>').encode("gbk")
+        assert html_to_text(raw, engine="lxml") == "中文段落"
+
+    def test_latin1_bytes_fallback(self):
+        """测试无法按 utf-8 / gb18030 解码的西文页面回退到 latin-1，不丢字符"""
+        raw = "<html><body><p>Café déjà vu</p></body></html>".encode("latin-1")
+        assert html_to_text(raw, engine="lxml") == "Café déjà vu"
+
+    def test_form_wrapped_page_keeps_content(self):
+        """测试整页包在 <form> 里的页面（ASP.NET）不会被清空"""
+        page = ('<html><body><form id="form1"><aside>侧栏说明</aside>'
+                '<p>表单内的正文段落</p></form></body></html>')
+
+        assert "表单内的正文段落" in html_to_text(page, engine="lxml")
+        text = html_to_text(page,
+                            engine="lxml",
+                            strip_tags=DOCUMENT_STRIP_TAGS)
+        assert "侧栏说明" in text
+        assert "表单内的正文段落" in text
+
+    def test_table_cells_are_separated(self):
+        """测试表格单元格之间有分隔，每行单独成行"""
+        page = ("<table><tr><th>指标</th><th>数值</th></tr>"
+                "<tr><td>坝高</td><td>185米</td></tr></table>")
+        assert html_to_text(page, engine="lxml") == "指标 数值\n坝高 185米"
+
+    @pytest.mark.parametrize("engine", ["lxml", "bs4"])
+    def test_empty_input(self, engine):
+        """测试空输入返回空字符串"""
+        assert html_to_text("", engine=engine) == ""
+        assert html_to_text("   ", engine=engine) == ""
+
+    def test_unknown_engine(self):
+        """测试未知引擎名称"""
+        with pytest.raises(ValueError):
+            get_html_extractor("unknown")
+
+    def test_web_scraper_returns_single_line(self):
+        """测试WebScraper输出合并为单行文本"""
+        text = WebScraper().extract_text_from_html(SAMPLE_PAGE)
+
+        assert "\n" not in text
+        assert "水电站施工质量控制 混凝土浇筑" in text
@@ -0,0 +1,193 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from doc_agent.utils import retrieval_prefetch
+from doc_agent.utils.retrieval_prefetch import (
+    RetrievalPrefetcher,
+    build_chapter_queries,
+    parse_embedding_response,
+)
+
+VECTOR = [0.1] * 1536
+
+
+class _FakeESSearchTool:
+
+    async def get_vector_dims(self) -> int:
+        return len(VECTOR)
+
+
+class _FakeEmbeddingClient:
+
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        self.calls.append(prompt)
+        return json.dumps([VECTOR])
+
+
+def _chapters(count: int) -> list[dict]:
+    return [{
+        "chapter_title": f"第{i}章",
+        "sub_sections": [{
+            "section_title": f"小节{i}.1"
+        }, {
+            "section_title": f"小节{i}.2"
+        }]
+    } for i in range(count)]
+
+
+class TestChapterQueries:
+    """预取查询生成测试类"""
+
+    def test_queries_from_titles(self):
+        """测试按章节标题和子节标题生成查询并限制数量"""
+        queries = build_chapter_queries("电网", _chapters(2)[1], max_queries=2)
+        assert queries == ["电网 第1章", "第1章 小节1.1"]
+
+    def test_parse_embedding_response(self):
+        """测试解析嵌套列表和字典格式的向量"""
+        assert parse_embedding_response(json.dumps([[1.0, 2.0]])) == [1.0, 2.0]
+        assert parse_embedding_response(json.dumps({"data": [3.0]})) == [3.0]
+        assert parse_embedding_response("not json") is None
+
+
+class TestRetrievalPrefetcher:
+    """跨章节检索预取测试类"""
+
+    @pytest.fixture
+    def search_mock(self, monkeypatch):
+        mock = AsyncMock(return_value=(None, ["结果"], "格式化结果"))
+        monkeypatch.setattr(retrieval_prefetch, "search_and_rerank", mock)
+        return mock
+
+    @pytest.mark.asyncio
+    async def test_prefetch_warms_later_chapters(self, search_mock):
+        """测试只预取后续章节，且章节检索时直接命中缓存"""
+        embedding_client = _FakeEmbeddingClient()
+        web_search_tool = AsyncMock()
+        prefetcher = RetrievalPrefetcher(es_search_tool=_FakeESSearchTool(),
+                                         web_search_tool=web_search_tool,
+                                         embedding_client=embedding_client,
+                                         max_queries_per_chapter=2)
+
+        task = prefetcher.start("job", "电网", _chapters(3), start_index=1)
+        await task
+
+        assert prefetcher.chapter_queries("job", 0) == []
+        queries = prefetcher.chapter_queries("job", 2)
+        assert queries == ["电网 第2章", "第2章 小节2.1"]
+        assert search_mock.await_count == 4
+        assert web_search_tool.search_async.await_count == 4
+
+        vector = await prefetcher.embed("job", queries[0])
+        results = await prefetcher.search("job", queries[0], vector)
+
+        assert results == (["结果"], "格式化结果")
+        assert len(embedding_client.calls) == 4
+        assert search_mock.await_count == 4
+        assert prefetcher.cache_stats()["prefetch"]["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self, monkeypatch):
+        """测试后台预取不超过并发上限"""
+        running = 0
+        peak = 0
+
+        async def slow_search(**kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return None, [], ""
+
+        monkeypatch.setattr(retrieval_prefetch, "search_and_rerank",
+                            slow_search)
+        prefetcher = RetrievalPrefetcher(
+            es_search_tool=_FakeESSearchTool(),
+            embedding_client=_FakeEmbeddingClient(),
+            max_concurrency=2)
+
+        await prefetcher.start("job", "主题", _chapters(5), is_online=False)
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_inflight_query_is_shared(self, search_mock):
+        """测试进行中的查询被并发调用方共享，向量维度不正确时直接报错"""
+        gate = asyncio.Event()
+
+        async def gated_search(**kwargs):
+            await gate.wait()
+            return None, ["结果"], ""
+
+        search_mock.side_effect = gated_search
+        prefetcher = RetrievalPrefetcher(es_search_tool=_FakeESSearchTool())
+
+        first = asyncio.create_task(prefetcher.search("job", "查询", VECTOR))
+        second = asyncio.create_task(prefetcher.search("job", " 查询 ", VECTOR))
+        await asyncio.sleep(0)
+        gate.set()
+
+        assert await first == await second == (["结果"], "")
+        assert search_mock.await_count == 1
+
+        with pytest.raises(ValueError):
+            await prefetcher.search("job", "查询", [0.1])
+
+    @pytest.mark.asyncio
+    async def test_vector_dims_follow_index_mapping(self, search_mock):
+        """测试向量维度以ES索引映射为准，而不是固定的 1536"""
+        es_search_tool = AsyncMock()
+        es_search_tool.get_vector_dims.return_value = 4
+        prefetcher = RetrievalPrefetcher(es_search_tool=es_search_tool)
+
+        assert await prefetcher.search("job", "查询", [0.1] * 4) == (
+            ["结果"], "格式化结果")
+        with pytest.raises(ValueError):
+            await prefetcher.search("job", "查询", VECTOR)
+
+    @pytest.mark.asyncio
+    async def test_eviction_keeps_inflight_searches(self, search_mock):
+        """测试作业数超出上限被淘汰时，进行中的共享检索仍返回结果"""
+        gate = asyncio.Event()
+
+        async def gated_search(**kwargs):
+            await gate.wait()
+            return None, ["结果"], ""
+
+        search_mock.side_effect = gated_search
+        prefetcher = RetrievalPrefetcher(es_search_tool=_FakeESSearchTool(),
+                                         max_jobs=1)
+
+        pending = asyncio.create_task(prefetcher.search("job-1", "查询", VECTOR))
+        await asyncio.sleep(0)
+        other = asyncio.create_task(prefetcher.search("job-2", "查询", VECTOR))
+        await asyncio.sleep(0)
+        gate.set()
+
+        assert await pending == await other == (["结果"], "")
+
+    @pytest.mark.asyncio
+    async def test_release_cancels_prefetch(self, search_mock):
+        """测试释放作业时取消未完成的预取并清空缓存"""
+
+        async def hanging_search(**kwargs):
+            await asyncio.sleep(10)
+
+        search_mock.side_effect = hanging_search
+        prefetcher = RetrievalPrefetcher(
+            es_search_tool=_FakeESSearchTool(), embedding_client=_FakeEmbeddingClient())
+
+        task = prefetcher.start("job", "主题", _chapters(2), is_online=False)
+        await asyncio.sleep(0.01)
+        prefetcher.release("job")
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert prefetcher.chapter_queries("job", 1) == []
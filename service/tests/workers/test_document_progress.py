@@ -0,0 +1,93 @@
+"""
+文档生成任务的章节进度测试
+验证进度事件由章节工作流真实的节点开始/结束驱动，章节内容不再逐字重放
+"""
+
+import asyncio
+import time
+from typing import TypedDict
+
+from langgraph.graph import END, StateGraph
+
+from workers import tasks
+
+
+class FakePublisher:
+    """记录发布事件的发布器，与 RedisStreamPublisher 一样是同步接口"""
+
+    def __init__(self):
+        self.events = []
+
+    def publish_event(self, job_id, event_data, enable_listen_logger=True):
+        self.events.append(event_data)
+
+
+class _ChapterState(TypedDict, total=False):
+    steps: list
+    final_document: str
+
+
+def _build_chapter_graph():
+
+    def planner(state):
+        return {"steps": state.get("steps", []) + ["planner"]}
+
+    async def writer(state):
+        return {
+            "steps": state["steps"] + ["writer"],
+            "final_document": "章节内容"
+        }
+
+    workflow = StateGraph(_ChapterState)
+    workflow.add_node("planner", planner)
+    workflow.add_node("writer", writer)
+    workflow.set_entry_point("planner")
+    workflow.add_edge("planner", "writer")
+    workflow.add_edge("writer", END)
+    return workflow.compile()
+
+
+class TestChapterProgress:
+    """章节进度事件测试类"""
+
+    def test_progress_follows_real_nodes(self):
+        """测试每个节点开始和结束各发布一次进度，并返回工作流最终状态"""
+        publisher = FakePublisher()
+        result = asyncio.run(
+            tasks.run_chapter_with_progress(
+                tasks.AsyncStreamPublisher(publisher), "job-1",
+                _build_chapter_graph(), {}, "第一章", 0))
+
+        assert result["final_document"] == "章节内容"
+        assert result["steps"] == ["planner", "writer"]
+
+        progress = [(event["step"], event["status"])
+                    for event in publisher.events
+                    if event["eventType"] == "chapter_progress"]
+        assert progress == [("planner", "running"), ("planner", "completed"),
+                            ("writer", "running"), ("writer", "completed")]
+        assert all(event["chapterIndex"] == 0 for event in publisher.events
+                   if event["eventType"] == "chapter_progress")
+
+        # writer_started 在 writer 节点真正开始时发布
+        event_types = [event["eventType"] for event in publisher.events]
+        writer_start = event_types.index("writer_started")
+        assert publisher.events[writer_start - 1]["step"] == "writer"
+
+    def test_content_completed_without_replay(self):
+        """测试章节内容只发布完成事件，不再按字符分块重放"""
+        publisher = FakePublisher()
+        content = "很长的章节内容" * 100
+
+        start = time.perf_counter()
+        asyncio.run(
+            tasks.publish_document_content_completed(
+                tasks.AsyncStreamPublisher(publisher), "job-1", content))
+
+        assert time.perf_counter() - start < 0.5
+        assert publisher.events == [{
+            "eventType": "document_content_completed",
+            "taskType": "document_generation",
+            "contentLength": len(content),
+            "status": "completed"
+        }]
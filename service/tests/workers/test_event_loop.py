@@ -0,0 +1,123 @@
+"""
+Celery worker 常驻事件循环测试
+验证任务体在同一个事件循环中执行，循环绑定的客户端在任务之间复用
+"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from doc_agent.graph.common import job_store
+from workers import event_loop, tasks
+
+
+@pytest.fixture
+def worker_loop():
+    loop = event_loop.get_worker_loop()
+    yield loop
+
+
+class TestWorkerEventLoop:
+    """常驻事件循环测试类"""
+
+    def test_tasks_share_one_loop(self, worker_loop):
+        """测试多次提交的任务运行在同一个常驻循环中，循环绑定的对象可以跨任务使用"""
+        queue_holder = {}
+
+        async def first():
+            queue_holder["queue"] = asyncio.Queue()
+            await queue_holder["queue"].put("from first task")
+            return asyncio.get_running_loop()
+
+        async def second():
+            return asyncio.get_running_loop(), await queue_holder["queue"].get()
+
+        first_loop = event_loop.run_in_worker_loop(first())
+        second_loop, message = event_loop.run_in_worker_loop(second())
+
+        assert first_loop is second_loop is worker_loop.loop
+        assert message == "from first task"
+        assert event_loop.get_worker_loop() is worker_loop
+
+    def test_exception_propagates(self, worker_loop):
+        """测试任务体的异常抛给调用方，循环继续可用"""
+
+        async def failing():
+            raise ValueError("任务失败")
+
+        with pytest.raises(ValueError, match="任务失败"):
+            event_loop.run_in_worker_loop(failing())
+        assert worker_loop.is_running
+
+    def test_recreated_after_fork(self, worker_loop, monkeypatch):
+        """测试 fork 出的子进程（PID 变化）会重新创建自己的循环"""
+        monkeypatch.setattr(os, "getpid", lambda: worker_loop.pid + 1)
+        child_loop = event_loop.get_worker_loop()
+        try:
+            assert child_loop is not worker_loop
+            assert event_loop.current_worker_loop() is child_loop
+        finally:
+            child_loop.close()
+            monkeypatch.undo()
+            event_loop._worker_loop = worker_loop
+
+
+class TestSharedRedisClient:
+    """共享 Redis 客户端测试类"""
+
+    def test_client_reused_inside_worker_loop(self, worker_loop,
+                                              monkeypatch):
+        """测试常驻循环中的任务复用同一个 Redis 客户端，其他循环各自创建"""
+        monkeypatch.setattr(tasks, "_shared_redis_client", None)
+
+        async def client_id():
+            return id(tasks.get_redis_client())
+
+        first = event_loop.run_in_worker_loop(client_id())
+        second = event_loop.run_in_worker_loop(client_id())
+        other = asyncio.run(client_id())
+
+        assert first == second
+        assert other != first
+
+
+class TestJobStoreRelease:
+    """作业存储释放测试类"""
+
+    def test_job_store_released_after_failure(self, worker_loop,
+                                              monkeypatch):
+        """测试常驻进程中作业失败后同样释放作业存储和检索预取，不会跨任务累积"""
+        released = []
+        prefetcher = SimpleNamespace(release=released.append)
+        monkeypatch.setattr(
+            tasks, "get_container",
+            lambda: SimpleNamespace(retrieval_prefetcher=prefetcher))
+
+        async def failing_job():
+            job_store.get_job_store("release-test").chapters.put(0, "标题", "正文")
+            raise RuntimeError("工作流失败")
+
+        with pytest.raises(RuntimeError):
+            event_loop.run_in_worker_loop(
+                tasks._release_after("release-test", failing_job()))
+        assert "release-test" not in job_store._job_stores
+        assert released == ["release-test"]
+
+    def test_release_keeps_original_error(self, worker_loop, monkeypatch):
+        """测试容器不可用时仍释放作业存储，并保留作业本身的异常"""
+
+        def broken_container():
+            raise RuntimeError("容器初始化失败")
+
+        monkeypatch.setattr(tasks, "get_container", broken_container)
+
+        async def failing_job():
+            job_store.get_job_store("release-test").chapters.put(0, "标题", "正文")
+            raise ValueError("工作流失败")
+
+        with pytest.raises(ValueError, match="工作流失败"):
+            event_loop.run_in_worker_loop(
+                tasks._release_after("release-test", failing_job()))
+        assert "release-test" not in job_store._job_stores
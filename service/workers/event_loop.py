@@ -0,0 +1,128 @@
+"""
+Celery worker 进程级的常驻事件循环
+
+每个 worker 进程只创建一个事件循环，运行在后台线程中，任务体通过
+run_coroutine_threadsafe 提交到该循环执行。容器、Redis 连接池、ES/LLM 客户端
+以及编译好的图都绑定在这个循环上，在任务之间复用，不再随 asyncio.run 反复创建和泄漏。
+
+- worker_process_init（prefork 子进程启动）时创建循环并在循环线程中初始化容器
+- 其他执行池（solo/threads）在第一次提交任务时按需创建
+- worker_process_shutdown 时清理容器资源并停止循环
+"""
+
+import asyncio
+import os
+import threading
+from collections.abc import Coroutine
+from typing import Any, Optional, TypeVar
+
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from doc_agent.core.logger import logger
+
+T = TypeVar("T")
+
+
+class WorkerEventLoop:
+    """运行在后台线程中的常驻事件循环"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.pid = os.getpid()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        name="celery-worker-loop",
+                                        daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    def in_loop(self) -> bool:
+        """当前是否在该事件循环线程中"""
+        return threading.current_thread() is self._thread
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """在常驻循环中执行协程并阻塞等待结果"""
+        if self.in_loop():
+            raise RuntimeError("不能在事件循环线程中同步等待协程")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self, timeout: float = 10.0):
+        """停止事件循环并等待后台线程退出"""
+        if not self.is_running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
+
+
+_worker_loop: Optional[WorkerEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_worker_loop() -> WorkerEventLoop:
+    """获取当前进程的常驻事件循环（fork 后的子进程会重新创建）"""
+    global _worker_loop
+    with _lock:
+        if _worker_loop is None or _worker_loop.pid != os.getpid(
+        ) or not _worker_loop.is_running:
+            _worker_loop = WorkerEventLoop()
+            logger.info(f"Worker 进程 {os.getpid()} 已创建常驻事件循环")
+        return _worker_loop
+
+
+def current_worker_loop() -> Optional[WorkerEventLoop]:
+    """当前进程已创建的常驻事件循环，没有时返回 None"""
+    if _worker_loop is not None and _worker_loop.pid == os.getpid(
+    ) and _worker_loop.is_running:
+        return _worker_loop
+    return None
+
+
+def run_in_worker_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """Celery 任务的入口：把任务体提交到进程的常驻事件循环执行"""
+    return get_worker_loop().run(coro)
+
+
+async def _warm_up():
+    from doc_agent.core.container import get_container
+    get_container()
+
+
+async def _cleanup():
+    from doc_agent.core import container as container_module
+    if container_module._container_instance is not None:
+        await container_module._container_instance.cleanup()
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**kwargs):
+    """worker 子进程启动：创建事件循环并在循环线程中初始化容器"""
+    try:
+        run_in_worker_loop(_warm_up())
+        logger.info(f"Worker 进程 {os.getpid()} 容器初始化完成")
+    except Exception as e:
+        # 初始化失败不阻止 worker 启动，任务执行时会再次尝试
+        logger.error(f"Worker 进程 {os.getpid()} 容器初始化失败: {e}")
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(**kwargs):
+    """worker 子进程退出：释放容器资源并停止事件循环"""
+    loop = current_worker_loop()
+    if loop is None:
+        return
+    try:
+        loop.run(_cleanup())
+    except Exception as e:
+        logger.error(f"Worker 进程 {os.getpid()} 清理资源失败: {e}")
+    loop.close()
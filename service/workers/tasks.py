@@ -1,15 +1,22 @@
 import asyncio
 import json
-from typing import Union
+from typing import Optional, Union
 
 import redis.asyncio as redis
+
 from doc_agent.core.logger import logger
 
+# 导入 Redis Stream Publisher
+from doc_agent.core.redis_stream_publisher import RedisStreamPublisher
+
+# 作业结束后释放章节正文、信源等作业级数据
+from doc_agent.graph.common import release_job_store
+
 # 导入 Celery 应用程序
 from .celery_app import celery_app
 
-# 导入 Redis Stream Publisher
-from doc_agent.core.redis_stream_publisher import RedisStreamPublisher
+# 任务体统一提交到 worker 进程的常驻事件循环执行
+from .event_loop import current_worker_loop, run_in_worker_loop
 
 
 def _get_detailed_progress_message(node_name: str) -> str:
@@ -29,6 +36,7 @@ def _get_detailed_progress_message(node_name: str) -> str:
         "researcher": "已完成深入研究阶段，正在分析收集到的详细信息...",
         "writer": "已完成内容撰写阶段，正在完善文档内容...",
         "reflection": "已完成反思优化阶段，正在检查和完善文档质量...",
+        "reflector": "已完成反思优化阶段，正在检查和完善文档质量...",
         "supervisor": "已完成监督决策阶段，正在评估当前进度并确定下一步行动...",
         "editor": "已完成编辑优化阶段，正在完善文档格式和内容...",
         "generation": "已完成内容生成阶段，正在创建最终的文档内容...",
@@ -38,26 +46,74 @@ def _get_detailed_progress_message(node_name: str) -> str:
     return progress_messages.get(node_name, f"已完成步骤: {node_name}")
 
 
+class AsyncStreamPublisher:
+    """
+    在线程中调用同步的 RedisStreamPublisher，任务体里可以 await 发布方法，
+    同步的 Redis 调用不会阻塞常驻事件循环
+    """
+
+    def __init__(self, publisher: RedisStreamPublisher):
+        self._publisher = publisher
+
+    def __getattr__(self, name: str):
+        method = getattr(self._publisher, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+async def _release_after(job_id: Union[str, int], coro):
+    """在常驻事件循环中执行作业，结束后（无论成功失败）释放作业数据"""
+    try:
+        return await coro
+    finally:
+        release_job(job_id)
+
+
 # 延迟导入container以避免循环导入
 def get_container():
-    """延迟导入container以避免循环导入"""
-    from doc_agent.core.container import container
-    return container
+    """延迟导入container以避免循环导入（进程内单例，在任务之间复用）"""
+    from doc_agent.core.container import get_container as get_app_container
+    return get_app_container()
+
+
+def release_job(job_id: Union[str, int]):
+    """作业结束后释放作业存储，并丢弃检索预取缓存、取消未完成的预取任务"""
+    job_id = str(job_id)
+    release_job_store(job_id)
+    try:
+        get_container().retrieval_prefetcher.release(job_id)
+    except Exception as e:
+        # 容器初始化失败时作业本身已失败，不能用清理异常覆盖原始错误
+        logger.warning(f"释放作业 {job_id} 的检索预取缓存失败: {e}")
 
 
-# Redis连接现在每次都创建新的，避免连接超时问题
+# 常驻事件循环上共享的 Redis 客户端，连接池在任务之间复用
+_shared_redis_client: Optional[redis.Redis] = None
 
 
 def get_redis_client() -> redis.Redis:
-    """获取Redis客户端实例"""
+    """
+    获取Redis客户端实例
+
+    在 worker 常驻事件循环中返回共享的客户端；其他事件循环中每次创建新的客户端，
+    避免把绑定在某个循环上的连接带到另一个循环中使用
+    """
+    global _shared_redis_client
+    worker_loop = current_worker_loop()
+    shared = worker_loop is not None and worker_loop.in_loop()
+    if shared and _shared_redis_client is not None:
+        return _shared_redis_client
+
     try:
-        # 每次都创建新的连接，避免连接超时问题
         from doc_agent.core.config import settings
         redis_client = redis.from_url(settings.redis_url,
                                       encoding="utf-8",
                                       decode_responses=True)
-        # 测试连接
-        redis_client.ping()
+        if shared:
+            _shared_redis_client = redis_client
         logger.info("Redis客户端连接成功")
         return redis_client
     except Exception as e:
@@ -91,8 +147,8 @@ def generate_outline_from_query_task(job_id: Union[str, int],
     logger.info(f"大纲生成任务开始 - Job ID: {job_id}")
 
     try:
-        # 使用同步方式运行异步函数
-        return asyncio.run(
+        # 在 worker 的常驻事件循环中运行异步函数
+        return run_in_worker_loop(
             _generate_outline_from_query_task_async(job_id, task_prompt,
                                                     is_online, context_files,
                                                     style_guide_content,
@@ -115,8 +171,7 @@ async def _generate_outline_from_query_task_async(
     try:
         # 获取Redis客户端和发布器
         redis = await get_redis_client()
-        from doc_agent.core.redis_stream_publisher import RedisStreamPublisher
-        publisher = RedisStreamPublisher(redis)
+        publisher = AsyncStreamPublisher(get_container().redis_publisher)
 
         # 发布任务开始事件
         await publisher.publish_task_started(job_id=job_id,
@@ -133,13 +188,15 @@ async def _generate_outline_from_query_task_async(
         logger.info(f"  redis_stream_key: {redis_stream_key}")
 
         # 使用真正的工作流生成大纲
-        from doc_agent.core.container import container
-        from doc_agent.graph.state import ResearchState
+        container = get_container()
         import uuid
 
+        from doc_agent.graph.state import ResearchState
+
         # 创建初始状态
         run_id = f"run-{uuid.uuid4().hex[:8]}"
         initial_state = ResearchState(
+            job_id=str(job_id),
             topic=task_prompt,
             style_guide_content=style_guide_content or "",
             requirements_content=requirements or "",
@@ -151,8 +208,7 @@ async def _generate_outline_from_query_task_async(
             completed_chapters=[],
             final_document="",
             sources=[],
-            all_sources=[],
-            cited_sources=[],
+            cited_source_ids=[],
             cited_sources_in_chapter=[],
             messages=[],
             run_id=run_id,
@@ -260,6 +316,10 @@ async def _generate_outline_from_query_task_async(
 
         return "FAILED"
 
+    finally:
+        # 章节正文、信源、检索预取等作业数据只在作业期间保留
+        release_job(job_id)
+
 
 @celery_app.task(name="workers.tasks.generate_document_from_outline_task")
 def generate_document_from_outline_task(job_id: str,
@@ -294,11 +354,15 @@ def generate_document_from_outline_task(job_id: str,
         }
 
         logger.info("🚀 开始执行文档生成工作流...")
-        # 同步执行完整的 LangGraph 工作流
-        final_state = main_orchestrator.invoke(
-            initial_state, config={"configurable": {
-                "thread_id": job_id
-            }})
+        # 在 worker 的常驻事件循环中执行完整的 LangGraph 工作流
+        final_state = run_in_worker_loop(
+            _release_after(
+                job_id,
+                main_orchestrator.ainvoke(
+                    initial_state,
+                    config={"configurable": {
+                        "thread_id": job_id
+                    }})))
 
         logger.success(f"✅ 文档生成工作流执行完毕: {job_id}")
         return {
@@ -326,8 +390,7 @@ async def _generate_document_from_outline_task_async(job_id: Union[str, int],
         # 获取Redis客户端和发布器
         logger.info(f"🔗 连接Redis...")
         redis = await get_redis_client()
-        from doc_agent.core.redis_stream_publisher import RedisStreamPublisher
-        publisher = RedisStreamPublisher(redis)
+        publisher = AsyncStreamPublisher(get_container().redis_publisher)
         logger.info(f"✅ Redis连接成功")
 
         # 发布任务开始事件
@@ -356,6 +419,7 @@ async def _generate_document_from_outline_task_async(job_id: Union[str, int],
         # 构建初始状态 - 参考 test_decoupled_workflow.py 中的正确配置
         initial_state = ResearchState(
             run_id=str(job_id),
+            job_id=str(job_id),  # writer 节点据此把 LLM token 实时推送到该任务的事件流
             topic=outline.get("title", "技术文档"),
             style_guide_content=None,
             requirements_content=None,
@@ -369,9 +433,8 @@ async def _generate_document_from_outline_task_async(job_id: Union[str, int],
             search_queries=[],
             gathered_sources=[],
             sources=[],  # 🔧 修复：添加缺失的字段
-            all_sources=[],  # 🔧 修复：添加缺失的字段
             current_citation_index=1,  # 🔧 修复：引用索引应该从1开始
-            cited_sources=[],  # 🔧 修复：添加缺失的字段
+            cited_source_ids=[],
             cited_sources_in_chapter=[],  # 🔧 修复：添加缺失的字段
             messages=[])
         logger.info(f"✅ 研究状态初始化完成")
@@ -449,33 +512,13 @@ async def _generate_document_from_outline_task_async(job_id: Union[str, int],
             logger.info(f"✅ 章节处理进度已发布")
 
             try:
-                # 模拟章节处理步骤（参照 mock 实现）
-                logger.info(f"🔄 开始模拟章节处理步骤...")
-                steps = ["planner", "researcher", "supervisor", "writer"]
-                for step in steps:
-                    logger.info(f"⚙️ 执行步骤: {step}")
-                    await publisher.publish_event(
-                        job_id, {
-                            "eventType": "chapter_progress",
-                            "taskType": "document_generation",
-                            "chapterTitle": chapter_title,
-                            "step": step,
-                            "progress": f"正在执行{step}步骤",
-                            "status": "running"
-                        })
-                    # 模拟步骤处理时间
-                    await asyncio.sleep(0.5)
-                    logger.info(f"✅ 步骤 {step} 完成")
-
-                # 执行章节工作流
+                # 执行章节工作流，进度事件由真实的节点开始/结束驱动
                 logger.info(f"🚀 开始执行章节工作流...")
                 logger.info(f"📊 当前状态键: {list(current_state.keys())}")
 
-                # 添加更多调试信息
-                logger.info(f"🔍 章节工作流类型: {type(chapter_workflow)}")
-                logger.info(f"🔍 章节工作流方法: {dir(chapter_workflow)}")
-
-                result = await chapter_workflow.ainvoke(current_state)
+                result = await run_chapter_with_progress(
+                    publisher, job_id, chapter_workflow, current_state,
+                    chapter_title, chapter_index)
                 logger.info(f"✅ 章节工作流执行完成")
                 logger.info(
                     f"📊 工作流结果键: {list(result.keys()) if isinstance(result, dict) else 'Not a dict'}"
@@ -531,22 +574,9 @@ async def _generate_document_from_outline_task_async(job_id: Union[str, int],
                     })
                 logger.info(f"✅ 章节完成事件已发布")
 
-                # 发布写作开始事件
-                logger.info(f"📢 发布写作开始事件...")
-                await publisher.publish_event(
-                    job_id, {
-                        "eventType": "writer_started",
-                        "taskType": "document_generation",
-                        "progress": f"开始编写章节 {chapter_index + 1}",
-                        "status": "running"
-                    })
-                logger.info(f"✅ 写作开始事件已发布")
-
-                # 流式输出章节内容
-                logger.info(f"📤 开始流式输出章节内容...")
-                await stream_document_content(publisher, job_id,
-                                              chapter_content)
-                logger.info(f"✅ 章节内容流式输出完成")
+                # 章节 token 已由 writer 节点实时推送，这里只发布输出完成事件
+                await publish_document_content_completed(
+                    publisher, job_id, chapter_content)
 
                 logger.info(f"✅ Job {job_id}: 章节 {chapter_title} 处理完成")
 
@@ -675,48 +705,91 @@ async def _generate_document_from_outline_task_async(job_id: Union[str, int],
 
         return "FAILED"
 
+    finally:
+        # 章节正文、信源、检索预取等作业数据只在作业期间保留
+        release_job(job_id)
 
-async def stream_document_content(publisher: RedisStreamPublisher,
-                                  job_id: str,
-                                  content: str,
-                                  chunk_size: int = 10):
-    """流式输出文档内容到Redis Stream"""
-    try:
-        # 将内容按字符分割成token
-        tokens = list(content)
 
-        for i in range(0, len(tokens), chunk_size):
-            chunk = tokens[i:i + chunk_size]
-            chunk_text = ''.join(chunk)
+async def run_chapter_with_progress(publisher: AsyncStreamPublisher,
+                                    job_id: Union[str, int], chapter_workflow,
+                                    state: dict, chapter_title: str,
+                                    chapter_index: int) -> dict:
+    """
+    执行章节工作流，并在每个节点真实开始和结束时发布 chapter_progress 事件
+
+    writer 节点开始时额外发布 writer_started 事件，LLM token 由 writer 节点自己实时推送
 
-            # 发布内容流事件
+    Returns:
+        dict: 工作流的最终状态
+    """
+    node_names = set(chapter_workflow.nodes) - {"__start__"}
+    result = None
+    async for event in chapter_workflow.astream_events(state, version="v2"):
+        kind = event["event"]
+        if not event["parent_ids"]:
+            # 图本身的结束事件携带最终状态
+            if kind == "on_chain_end":
+                result = event["data"].get("output")
+            continue
+
+        node = event["name"]
+        if (kind not in ("on_chain_start", "on_chain_end")
+                or node not in node_names
+                or event["metadata"].get("langgraph_node") != node):
+            continue
+
+        started = kind == "on_chain_start"
+        logger.info(f"⚙️ 节点 {node} {'开始' if started else '完成'}")
+        await publisher.publish_event(
+            job_id, {
+                "eventType":
+                "chapter_progress",
+                "taskType":
+                "document_generation",
+                "chapterTitle":
+                chapter_title,
+                "chapterIndex":
+                chapter_index,
+                "step":
+                node,
+                "progress":
+                f"正在执行{node}步骤"
+                if started else _get_detailed_progress_message(node),
+                "status":
+                "running" if started else "completed"
+            })
+        if started and node == "writer":
             await publisher.publish_event(
                 job_id, {
-                    "eventType": "document_content_stream",
+                    "eventType": "writer_started",
                     "taskType": "document_generation",
-                    "content": chunk_text,
-                    "tokenIndex": i,
-                    "totalTokens": len(tokens),
-                    "progress": f"{i + len(chunk)}/{len(tokens)}",
-                    "status": "streaming"
+                    "progress": f"开始编写章节 {chapter_index + 1}",
+                    "status": "running"
                 })
 
-            # 模拟token生成的时间间隔
-            await asyncio.sleep(0.1)
+    return result or {}
+
 
-        # 发布流式输出完成事件
+async def publish_document_content_completed(publisher: AsyncStreamPublisher,
+                                             job_id: Union[str, int],
+                                             content: str):
+    """
+    发布章节内容输出完成事件
+
+    章节正文不再以 document_content_stream 事件逐段重放：writer 节点在生成时已把
+    LLM 的实时输出以 "大模型实时输出" 事件（增量文本在 token 字段）推送到同一个任务流，
+    与 API 后台任务的事件格式一致。完成事件中的 contentLength 为章节正文的字符数
+    """
+    try:
         await publisher.publish_event(
             job_id, {
                 "eventType": "document_content_completed",
                 "taskType": "document_generation",
-                "totalTokens": len(tokens),
+                "contentLength": len(content),
                 "status": "completed"
             })
-
-        logger.info(f"文档内容流式输出完成，共 {len(tokens)} 个token")
-
     except Exception as e:
-        logger.error(f"流式输出文档内容失败: {e}")
+        logger.error(f"发布内容输出完成事件失败: {e}")
 
 
 def generate_mock_sources_for_chapter(chapter_title: str,
@@ -882,8 +955,8 @@ def get_job_status(job_id: Union[str, int]) -> dict:
         任务状态字典
     """
     try:
-        # 使用同步方式运行异步函数
-        return asyncio.run(_get_job_status_async(job_id))
+        # 在 worker 的常驻事件循环中运行异步函数
+        return run_in_worker_loop(_get_job_status_async(job_id))
     except Exception as e:
         logger.error(f"获取任务状态失败: {e}")
         return {"status": "error", "error": str(e)}
@@ -926,8 +999,8 @@ def run_main_workflow(job_id: str, topic: str, genre: str = "default") -> str:
     logger.info(f"主工作流开始 - Job ID: {job_id}, Topic: {topic}, Genre: {genre}")
 
     try:
-        # 使用同步方式运行异步函数
-        return asyncio.run(_run_main_workflow_async(job_id, topic, genre))
+        # 在 worker 的常驻事件循环中运行异步函数
+        return run_in_worker_loop(_run_main_workflow_async(job_id, topic, genre))
     except Exception as e:
         logger.error(f"主工作流任务失败: {e}")
         return "FAILED"
@@ -956,11 +1029,13 @@ async def _run_main_workflow_async(job_id: str,
         runnable = container.get_graph_runnable_for_job(job_id, genre)
 
         # 创建初始状态
-        from doc_agent.graph.state import ResearchState
         import uuid
 
+        from doc_agent.graph.state import ResearchState
+
         run_id = f"run-{uuid.uuid4().hex[:8]}"
         initial_state = ResearchState(
+            job_id=str(job_id),
             topic=topic,
             style_guide_content="",
             requirements_content="",
@@ -972,8 +1047,7 @@ async def _run_main_workflow_async(job_id: str,
             completed_chapters=[],
             final_document="",
             sources=[],
-            all_sources=[],
-            cited_sources=[],
+            cited_source_ids=[],
             cited_sources_in_chapter=[],
             messages=[],
             run_id=run_id,
@@ -1014,6 +1088,10 @@ async def _run_main_workflow_async(job_id: str,
 
         return "FAILED"
 
+    finally:
+        # 章节正文、信源、检索预取等作业数据只在作业期间保留
+        release_job(job_id)
+
 
 @celery_app.task
 def test_celery_task(message: str) -> str:
@@ -1078,8 +1156,8 @@ def process_files_task(context_id: str, files: list[dict]) -> str:
     logger.info(f"文件处理任务开始 - Context ID: {context_id}, 文件数量: {len(files)}")
 
     try:
-        # 使用同步方式运行异步函数
-        return asyncio.run(_process_files_task_async(context_id, files))
+        # 在 worker 的常驻事件循环中运行异步函数
+        return run_in_worker_loop(_process_files_task_async(context_id, files))
     except Exception as e:
         logger.error(f"文件处理任务失败: {e}")
         return "FAILED"